@@ -46,6 +46,7 @@ app.conf.update(
         'services.scheduled_etl_service.cleanup_old_etl_logs': {'queue': 'maintenance'},
         'services.scheduled_etl_service.update_etl_job_schedules': {'queue': 'scheduling'},
         'celery_app.send_dashboard_email_task': {'queue': 'emails'},
+        'celery_app.send_dashboard_email_batch_task': {'queue': 'emails'},
         'celery_app.run_etl_operation_task': {'queue': 'data_processing'},
         'celery_app.export_dashboard_task': {'queue': 'exports'},
         'celery_app.update_semantic_layer_task': {'queue': 'semantic'},
@@ -57,6 +58,7 @@ app.conf.update(
     # Rate limiting
     task_annotations={
         'celery_app.send_dashboard_email_task': {'rate_limit': '20/m'},
+        'celery_app.send_dashboard_email_batch_task': {'rate_limit': '20/m'},
         'celery_app.export_dashboard_task': {'rate_limit': '10/m'},
         'celery_app.run_etl_operation_task': {'rate_limit': '5/m'},
         'celery_app.update_semantic_layer_task': {'rate_limit': '3/m'},
@@ -109,124 +111,143 @@ def debug_task(self):
     return 'Celery is working!'
 
 
-@app.task(bind=True, max_retries=3)
-def send_dashboard_email_task(self, dashboard_id, recipient_email, email_config=None):
+def _prepare_dashboard_email(dashboard, email_config=None):
     """
-    Enhanced Celery task for sending dashboard emails with PDF/PNG attachments
+    Render a dashboard email once for any number of recipients.
+    Exports come from the export cache, so unchanged dashboards are not re-rendered.
+    
+    Returns:
+        Dictionary with subject, body, attachments, schedule_info, export_format and frequency
     """
-    try:
-        from services.email_service import EmailService
-        from services.dashboard_export_service import DashboardExportService
-        from dashboards.models import Dashboard
-        
-        # Get dashboard
-        dashboard = Dashboard.objects.get(id=dashboard_id)
-        email_service = EmailService()
-        export_service = DashboardExportService()
-        
-        # Get export format from config
-        export_format = email_config.get('export_format', 'png') if email_config else 'png'
-        dashboard_name = email_config.get('dashboard_name', dashboard.name) if email_config else dashboard.name
-        frequency = email_config.get('frequency', 'once') if email_config else 'once'
-        
-        # Generate dashboard export using enhanced Puppeteer service
-        attachments = []
-        
-        if export_format == 'pdf':
+    from services.dashboard_export_service import DashboardExportService
+    
+    # Get export format from config
+    export_format = email_config.get('export_format', 'png') if email_config else 'png'
+    dashboard_name = email_config.get('dashboard_name', dashboard.name) if email_config else dashboard.name
+    frequency = email_config.get('frequency', 'once') if email_config else 'once'
+    
+    # Generate dashboard export using enhanced Puppeteer service
+    export_service = DashboardExportService()
+    attachments = []
+    
+    if export_format == 'pdf':
+        try:
+            # Try Puppeteer service first for fully rendered charts
+            from services.puppeteer_export_service import PuppeteerExportService
+            puppeteer_service = PuppeteerExportService()
+            
+            pdf_content, pdf_filename = puppeteer_service.export_dashboard_pdf(dashboard)
+            attachments.append({
+                'content': pdf_content,
+                'filename': pdf_filename,
+                'type': 'pdf'
+            })
+            logger.info(f"Generated Puppeteer PDF export: {pdf_filename}")
+        except Exception as e:
+            logger.warning(f"Puppeteer PDF export failed, using fallback: {e}")
             try:
-                # Try Puppeteer service first for fully rendered charts
-                from services.puppeteer_export_service import PuppeteerExportService
-                puppeteer_service = PuppeteerExportService()
-                
-                pdf_content, pdf_filename = puppeteer_service.export_dashboard_pdf(dashboard)
+                # Fallback to static export service
+                pdf_content, pdf_filename = export_service.export_dashboard_pdf(dashboard)
                 attachments.append({
                     'content': pdf_content,
                     'filename': pdf_filename,
                     'type': 'pdf'
                 })
-                logger.info(f"Generated Puppeteer PDF export: {pdf_filename}")
-            except Exception as e:
-                logger.warning(f"Puppeteer PDF export failed, using fallback: {e}")
-                try:
-                    # Fallback to static export service
-                    pdf_content, pdf_filename = export_service.export_dashboard_pdf(dashboard)
-                    attachments.append({
-                        'content': pdf_content,
-                        'filename': pdf_filename,
-                        'type': 'pdf'
-                    })
-                    logger.info(f"Generated fallback PDF export: {pdf_filename}")
-                except Exception as fallback_error:
-                    logger.warning(f"Fallback PDF export also failed: {fallback_error}")
-                    # Final fallback to HTML
-                    html_content = export_service.generate_email_html(dashboard, 'pdf')
-                    attachments.append({
-                        'content': html_content,
-                        'filename': f"dashboard_{dashboard_name.replace(' ', '_')}.html",
-                        'type': 'html'
-                    })
-        else:
+                logger.info(f"Generated fallback PDF export: {pdf_filename}")
+            except Exception as fallback_error:
+                logger.warning(f"Fallback PDF export also failed: {fallback_error}")
+                # Final fallback to HTML
+                html_content = export_service.generate_email_html(dashboard, 'pdf')
+                attachments.append({
+                    'content': html_content,
+                    'filename': f"dashboard_{dashboard_name.replace(' ', '_')}.html",
+                    'type': 'html'
+                })
+    else:
+        try:
+            # Try Puppeteer service first for fully rendered charts
+            from services.puppeteer_export_service import PuppeteerExportService
+            puppeteer_service = PuppeteerExportService()
+            
+            png_content, png_filename = puppeteer_service.export_dashboard_png(dashboard)
+            attachments.append({
+                'content': png_content,
+                'filename': png_filename,
+                'type': 'png'
+            })
+            logger.info(f"Generated Puppeteer PNG export: {png_filename}")
+        except Exception as e:
+            logger.warning(f"Puppeteer PNG export failed, using fallback: {e}")
             try:
-                # Try Puppeteer service first for fully rendered charts
-                from services.puppeteer_export_service import PuppeteerExportService
-                puppeteer_service = PuppeteerExportService()
-                
-                png_content, png_filename = puppeteer_service.export_dashboard_png(dashboard)
+                # Fallback to static export service
+                png_content, png_filename = export_service.export_dashboard_png(dashboard)
                 attachments.append({
                     'content': png_content,
                     'filename': png_filename,
                     'type': 'png'
                 })
-                logger.info(f"Generated Puppeteer PNG export: {png_filename}")
-            except Exception as e:
-                logger.warning(f"Puppeteer PNG export failed, using fallback: {e}")
-                try:
-                    # Fallback to static export service
-                    png_content, png_filename = export_service.export_dashboard_png(dashboard)
-                    attachments.append({
-                        'content': png_content,
-                        'filename': png_filename,
-                        'type': 'png'
-                    })
-                    logger.info(f"Generated fallback PNG export: {png_filename}")
-                except Exception as fallback_error:
-                    logger.warning(f"Fallback PNG export also failed: {fallback_error}")
-                    # Final fallback to HTML
-                    html_content = export_service.generate_email_html(dashboard, 'png')
-                    attachments.append({
-                        'content': html_content,
-                        'filename': f"dashboard_{dashboard_name.replace(' ', '_')}.html",
-                        'type': 'html'
-                    })
-        
-        # Generate email content
-        email_html = export_service.generate_email_html(dashboard, export_format)
-        
-        # Prepare email
-        if frequency == 'once':
-            subject = f"Dashboard Report: {dashboard_name}"
-            body = email_html
-        else:
-            subject = f"Scheduled Dashboard Report ({frequency.title()}): {dashboard_name}"
-            body = f"""
-            <div style="background: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
-                <h4 style="margin: 0; color: #856404;">📅 Scheduled Report</h4>
-                <p style="margin: 5px 0 0 0; color: #856404;">This is your {frequency} scheduled dashboard report.</p>
-            </div>
-            {email_html}
-            """
+                logger.info(f"Generated fallback PNG export: {png_filename}")
+            except Exception as fallback_error:
+                logger.warning(f"Fallback PNG export also failed: {fallback_error}")
+                # Final fallback to HTML
+                html_content = export_service.generate_email_html(dashboard, 'png')
+                attachments.append({
+                    'content': html_content,
+                    'filename': f"dashboard_{dashboard_name.replace(' ', '_')}.html",
+                    'type': 'html'
+                })
+    
+    # Generate email content
+    email_html = export_service.generate_email_html(dashboard, export_format)
+    
+    # Prepare email
+    if frequency == 'once':
+        subject = f"Dashboard Report: {dashboard_name}"
+        body = email_html
+    else:
+        subject = f"Scheduled Dashboard Report ({frequency.title()}): {dashboard_name}"
+        body = f"""
+        <div style="background: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
+            <h4 style="margin: 0; color: #856404;">📅 Scheduled Report</h4>
+            <p style="margin: 5px 0 0 0; color: #856404;">This is your {frequency} scheduled dashboard report.</p>
+        </div>
+        {email_html}
+        """
+    
+    return {
+        'subject': subject,
+        'body': body,
+        'attachments': attachments,
+        'schedule_info': {
+            'is_scheduled_job': frequency != 'once',
+            'frequency': frequency,
+            'export_format': export_format
+        },
+        'export_format': export_format,
+        'frequency': frequency,
+    }
+
+
+@app.task(bind=True, max_retries=3)
+def send_dashboard_email_task(self, dashboard_id, recipient_email, email_config=None):
+    """
+    Enhanced Celery task for sending dashboard emails with PDF/PNG attachments
+    """
+    try:
+        from services.email_service import EmailService
+        from dashboards.models import Dashboard
+        
+        # Get dashboard
+        dashboard = Dashboard.objects.get(id=dashboard_id)
+        email = _prepare_dashboard_email(dashboard, email_config)
         
         # Send email
-        success = email_service.send_dashboard_email(
+        success = EmailService().send_dashboard_email(
             recipient_email=recipient_email,
-            subject=subject,
-            body=body,
-            attachments=attachments,
-            schedule_info={
-                'is_scheduled_job': frequency != 'once',
-                'frequency': frequency,
-                'export_format': export_format
-            }
+            subject=email['subject'],
+            body=email['body'],
+            attachments=email['attachments'],
+            schedule_info=email['schedule_info']
         )
         
         logger.info(f"Dashboard email sent successfully to {recipient_email}: {success}")
@@ -234,9 +255,9 @@ def send_dashboard_email_task(self, dashboard_id, recipient_email, email_config=
             'success': success, 
             'dashboard_id': dashboard_id, 
             'recipient': recipient_email,
-            'export_format': export_format,
-            'frequency': frequency,
-            'attachments_count': len(attachments)
+            'export_format': email['export_format'],
+            'frequency': email['frequency'],
+            'attachments_count': len(email['attachments'])
         }
         
     except Exception as exc:
@@ -246,6 +267,58 @@ def send_dashboard_email_task(self, dashboard_id, recipient_email, email_config=
         raise
 
 
+@app.task(bind=True, max_retries=3)
+def send_dashboard_email_batch_task(self, dashboard_id, recipient_emails, email_config=None):
+    """
+    Celery task for sending a dashboard email to many recipients.
+    The dashboard is rendered once and sent over one SMTP connection;
+    retries only go to the recipients that failed.
+    """
+    try:
+        from services.email_service import EmailService
+        from dashboards.models import Dashboard
+        
+        dashboard = Dashboard.objects.get(id=dashboard_id)
+        email = _prepare_dashboard_email(dashboard, email_config)
+        
+        results = EmailService().send_dashboard_emails(
+            recipient_emails,
+            subject=email['subject'],
+            body=email['body'],
+            attachments=email['attachments'],
+            schedule_info=email['schedule_info']
+        )
+        
+    except Exception as exc:
+        logger.error(f"Failed to send dashboard email batch: {exc}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(countdown=60 * (self.request.retries + 1), exc=exc)
+        raise
+    
+    failed = [recipient for recipient, success in results.items() if not success]
+    logger.info(
+        f"Dashboard {dashboard_id} email sent to {len(results) - len(failed)}/{len(results)} recipients"
+        + (f", failed: {', '.join(failed)}" if failed else "")
+    )
+    
+    if failed and self.request.retries < self.max_retries:
+        # Retry only the recipients that failed
+        raise self.retry(
+            args=[dashboard_id, failed, email_config],
+            countdown=60 * (self.request.retries + 1)
+        )
+    
+    return {
+        'success': not failed,
+        'dashboard_id': dashboard_id,
+        'results': results,
+        'failed': failed,
+        'export_format': email['export_format'],
+        'frequency': email['frequency'],
+        'attachments_count': len(email['attachments'])
+    }
+
+
 @app.task(bind=True, max_retries=2)
 def run_etl_operation_task(self, etl_operation_id):
     """
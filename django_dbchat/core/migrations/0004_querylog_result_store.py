@@ -0,0 +1,62 @@
+import json
+
+from django.db import migrations, models
+
+
+def move_results_to_store(apps, schema_editor):
+    from utils.result_store import result_store
+
+    QueryLog = apps.get_model("core", "QueryLog")
+    for query_log in QueryLog.objects.filter(result_ref="").iterator():
+        query_results = query_log.query_results
+        if not isinstance(query_results, dict) or not isinstance(query_results.get("data"), list):
+            continue
+        stored = result_store.put(query_results.pop("data"))
+        query_results["preview"] = stored["preview"]
+        query_log.query_results = query_results
+        query_log.result_ref = stored["ref"]
+        query_log.result_row_count = stored["row_count"]
+        query_log.save(update_fields=["query_results", "result_ref", "result_row_count"])
+
+
+def move_results_from_store(apps, schema_editor):
+    from utils.result_store import result_store
+
+    QueryLog = apps.get_model("core", "QueryLog")
+    for query_log in QueryLog.objects.exclude(result_ref="").iterator():
+        query_results = query_log.query_results if isinstance(query_log.query_results, dict) else {}
+        preview = query_results.pop("preview", [])
+        try:
+            query_results["data"] = json.loads(json.dumps(result_store.read(query_log.result_ref), default=str))
+        except FileNotFoundError:
+            query_results["data"] = preview
+        query_log.query_results = query_results
+        query_log.save(update_fields=["query_results"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_alter_llmconfig_base_url_alter_llmconfig_model_name_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="querylog",
+            name="result_ref",
+            field=models.CharField(
+                blank=True, help_text="Result store reference of the full result set", max_length=64
+            ),
+        ),
+        migrations.AddField(
+            model_name="querylog",
+            name="result_row_count",
+            field=models.IntegerField(default=0, help_text="Rows in the stored result set"),
+        ),
+        migrations.AlterField(
+            model_name="querylog",
+            name="query_results",
+            field=models.JSONField(blank=True, default=dict, help_text="Query execution metadata and result preview"),
+        ),
+        migrations.RunPython(move_results_to_store, move_results_from_store),
+    ]
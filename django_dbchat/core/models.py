@@ -516,7 +516,16 @@ class QueryLog(models.Model):
     query_results = models.JSONField(
         default=dict, 
         blank=True,
-        help_text='Query execution results'
+        help_text='Query execution metadata and result preview'
+    )
+    result_ref = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text='Result store reference of the full result set'
+    )
+    result_row_count = models.IntegerField(
+        default=0,
+        help_text='Rows in the stored result set'
     )
     execution_time = models.FloatField(
         null=True, 
@@ -17,6 +17,7 @@ urlpatterns = [
     path('query/', views.query, name='query'),
     path('query/history/', views.query_history, name='query_history'),
     path('query/results/', views.query_results, name='query_results'),
+    path('query/<int:query_id>/data/', views.query_result_data, name='query_result_data'),
     
     # Configuration pages
     path('llm-config/', views.llm_config, name='llm_config'),
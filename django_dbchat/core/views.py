@@ -43,7 +43,7 @@ def home(request):
         recent_queries = []
         try:
             from .models import QueryLog
-            recent_queries = QueryLog.objects.filter(user=request.user).order_by('-created_at')[:5]
+            recent_queries = QueryLog.objects.filter(user=request.user).defer('query_results').order_by('-created_at')[:5]
         except Exception as e:
             logger.warning(f"QueryLog table not ready: {e}")
         
@@ -218,7 +218,8 @@ def query(request):
             execute_success, result = data_service.execute_query(
                 sql_query, 
                 data_source.connection_info, 
-                user_id=request.user.id
+                user_id=request.user.id,
+                data_source=data_source
             )
             
             if not execute_success:
@@ -243,8 +244,10 @@ def query(request):
             try:
                 from .models import QueryLog
                 from core.utils import make_json_serializable
+                from utils.result_store import result_store
                 
                 # Properly serialize the result data for storage with NaN handling
+                result_ref = ''
                 try:
                     # Clean result_data of NaN values BEFORE serialization
                     cleaned_result_data = []
@@ -263,8 +266,16 @@ def query(request):
                                 else:
                                     cleaned_result_data.append(row)
                     
+                    # Full results go to the result store; the log keeps a preview
+                    if cleaned_result_data and isinstance(cleaned_result_data[0], dict):
+                        stored = result_store.put(cleaned_result_data)
+                        result_ref = stored['ref']
+                        preview = stored['preview']
+                    else:
+                        preview = cleaned_result_data[:result_store.preview_rows]
+                    
                     serialized_results = make_json_serializable({
-                        'data': cleaned_result_data,
+                        'preview': preview,
                         'row_count': row_count,
                         'columns': list(cleaned_result_data[0].keys()) if cleaned_result_data and len(cleaned_result_data) > 0 and isinstance(cleaned_result_data[0], dict) else [],
                         'generated_sql': sql_query,
@@ -284,6 +295,8 @@ def query(request):
                     generated_sql=sql_query,
                     final_sql=sql_query,  # Store the final SQL as well
                     query_results=serialized_results,  # Store the serialized results
+                    result_ref=result_ref,
+                    result_row_count=row_count,
                     status='completed',
                     llm_provider=llm_service.preferred_provider,
                     execution_time=0.0
@@ -312,6 +325,35 @@ def query(request):
     else:
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
+@login_required
+@viewer_or_creator_required
+def query_result_data(request, query_id):
+    """Page through a logged query's stored results ('columns', 'offset' and 'limit' query parameters)"""
+    from .models import QueryLog
+    
+    query_log = QueryLog.objects.filter(id=query_id, user=request.user).first()
+    if not query_log:
+        return JsonResponse({'error': 'Query not found'}, status=404)
+    
+    columns = [column.strip() for column in request.GET.get('columns', '').split(',') if column.strip()]
+    try:
+        offset = max(0, int(request.GET.get('offset') or 0))
+        limit = max(0, int(request.GET.get('limit') or 1000))
+    except ValueError:
+        return JsonResponse({'error': 'offset and limit must be integers'}, status=400)
+    
+    query_results = query_log.query_results if isinstance(query_log.query_results, dict) else {}
+    query_results = _with_stored_results(query_log, query_results, columns, offset, limit)
+    return JsonResponse({
+        'success': True,
+        'query_id': query_log.id,
+        'data': query_results.get('data', []),
+        'row_count': query_log.result_row_count or query_results.get('row_count', 0),
+        'truncated': query_results.get('truncated', False),
+        'offset': offset,
+        'limit': limit,
+    })
+
 @login_required
 @viewer_or_creator_required
 def query_history(request):
@@ -321,7 +363,7 @@ def query_history(request):
         query_logs = []
         try:
             from .models import QueryLog
-            query_logs = QueryLog.objects.filter(user=request.user).order_by('-created_at')[:50]
+            query_logs = QueryLog.objects.filter(user=request.user).defer('query_results').order_by('-created_at')[:50]
         except (ImportError, AttributeError):
             # QueryLog model doesn't exist, create empty list
             pass
@@ -761,6 +803,35 @@ def llm_config(request):
         return redirect("core:home")
 
 
+def _with_stored_results(query_log, query_results, columns=None, offset=0, limit=None):
+    """
+    Query results metadata with the stored result rows attached as 'data'.
+    Without a readable stored result the preview rows are paged instead and
+    'truncated' tells whether they cover the whole result.
+    """
+    from utils.result_store import result_store
+    
+    query_results = dict(query_results)
+    preview = query_results.pop('preview', [])
+    if query_log.result_ref:
+        try:
+            query_results['data'] = result_store.read(query_log.result_ref, columns, offset, limit)
+            query_results['truncated'] = False
+            return query_results
+        except FileNotFoundError:
+            logger.warning(f"Stored result {query_log.result_ref} of query {query_log.id} is missing, showing its preview")
+    
+    if not isinstance(preview, list):
+        preview = []
+    rows = preview[offset:None if limit is None else offset + limit]
+    if columns:
+        rows = [{column: row[column] for column in columns if column in row} if isinstance(row, dict) else row
+                for row in rows]
+    query_results['data'] = rows
+    query_results['truncated'] = (query_log.result_row_count or query_results.get('row_count') or 0) > len(preview)
+    return query_results
+
+
 @login_required
 @viewer_or_creator_required
 def query_results(request):
@@ -789,6 +860,7 @@ def query_results(request):
                     result_display = "No results available"
                 elif isinstance(query_results_data, dict):
                     import json
+                    query_results_data = _with_stored_results(latest_query, query_results_data)
                     result_display = json.dumps(query_results_data, indent=2, default=str)
                 elif isinstance(query_results_data, str):
                     # If it's already a string, use it directly
@@ -897,7 +969,8 @@ def execute_query_logic(natural_query: str, user, data_source):
         execute_success, result = data_service.execute_query(
             sql_query, 
             data_source.connection_info, 
-            user_id=user.id
+            user_id=user.id,
+            data_source=data_source
         )
         
         if not execute_success:
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboards", "0002_add_result_data_field"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dashboarditem",
+            name="sql_query",
+            field=models.TextField(blank=True, help_text="Compiled SQL executed on refresh"),
+        ),
+        migrations.AddField(
+            model_name="dashboarditem",
+            name="target_table",
+            field=models.CharField(
+                blank=True, help_text="Integrated DuckDB table the compiled SQL reads", max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="dashboarditem",
+            name="query_params",
+            field=models.JSONField(
+                blank=True, default=dict, help_text="Dashboard filter bindings (filter name -> column)"
+            ),
+        ),
+    ]
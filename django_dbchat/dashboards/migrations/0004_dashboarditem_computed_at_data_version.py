@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboards", "0003_dashboarditem_compiled_plan"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dashboarditem",
+            name="computed_at",
+            field=models.DateTimeField(blank=True, help_text="When the cached result was computed", null=True),
+        ),
+        migrations.AddField(
+            model_name="dashboarditem",
+            name="data_version",
+            field=models.PositiveBigIntegerField(
+                blank=True, help_text="Data source data version the cached result was computed from", null=True
+            ),
+        ),
+    ]
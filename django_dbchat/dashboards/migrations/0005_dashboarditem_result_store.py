@@ -0,0 +1,61 @@
+import json
+
+from django.db import migrations, models
+
+
+def move_results_to_store(apps, schema_editor):
+    from utils.result_store import result_store
+
+    DashboardItem = apps.get_model("dashboards", "DashboardItem")
+    for item in DashboardItem.objects.exclude(result_data=[]).iterator():
+        if not isinstance(item.result_data, list) or not item.result_data:
+            continue
+        stored = result_store.put(item.result_data)
+        item.result_ref = stored["ref"]
+        item.result_row_count = stored["row_count"]
+        item.result_preview = stored["preview"]
+        item.save(update_fields=["result_ref", "result_row_count", "result_preview"])
+
+
+def move_results_from_store(apps, schema_editor):
+    from utils.result_store import result_store
+
+    DashboardItem = apps.get_model("dashboards", "DashboardItem")
+    for item in DashboardItem.objects.exclude(result_ref="").iterator():
+        try:
+            item.result_data = json.loads(json.dumps(result_store.read(item.result_ref), default=str))
+        except FileNotFoundError:
+            item.result_data = item.result_preview
+        item.save(update_fields=["result_data"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboards", "0004_dashboarditem_computed_at_data_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dashboarditem",
+            name="result_ref",
+            field=models.CharField(
+                blank=True, help_text="Result store reference of the cached query result", max_length=64
+            ),
+        ),
+        migrations.AddField(
+            model_name="dashboarditem",
+            name="result_row_count",
+            field=models.IntegerField(default=0, help_text="Rows in the cached query result"),
+        ),
+        migrations.AddField(
+            model_name="dashboarditem",
+            name="result_preview",
+            field=models.JSONField(blank=True, default=list, help_text="First rows of the cached query result"),
+        ),
+        migrations.RunPython(move_results_to_store, move_results_from_store),
+        migrations.RemoveField(
+            model_name="dashboarditem",
+            name="result_data",
+        ),
+    ]
@@ -95,14 +95,21 @@ class DashboardItem(models.Model):
     item_type = models.CharField(max_length=50, choices=ITEM_TYPES)
     chart_type = models.CharField(max_length=50, choices=CHART_TYPES, blank=True)
     query = models.TextField(blank=True, help_text='SQL query for data')
+    sql_query = models.TextField(blank=True, help_text='Compiled SQL executed on refresh')
+    target_table = models.CharField(max_length=255, blank=True, help_text='Integrated DuckDB table the compiled SQL reads')
+    query_params = models.JSONField(default=dict, blank=True, help_text='Dashboard filter bindings (filter name -> column)')
     chart_config = models.JSONField(default=dict, help_text='Chart configuration')
-    result_data = models.JSONField(default=list, blank=True, help_text='Cached query result data')
+    result_ref = models.CharField(max_length=64, blank=True, help_text='Result store reference of the cached query result')
+    result_row_count = models.IntegerField(default=0, help_text='Rows in the cached query result')
+    result_preview = models.JSONField(default=list, blank=True, help_text='First rows of the cached query result')
     position_x = models.IntegerField(default=0, help_text='X position in grid')
     position_y = models.IntegerField(default=0, help_text='Y position in grid')
     width = models.IntegerField(default=4, help_text='Width in grid units')
     height = models.IntegerField(default=3, help_text='Height in grid units')
     data_source = models.CharField(max_length=200, blank=True, help_text='Data source identifier')
     refresh_interval = models.IntegerField(default=0, help_text='Refresh interval in seconds')
+    computed_at = models.DateTimeField(null=True, blank=True, help_text='When the cached result was computed')
+    data_version = models.PositiveBigIntegerField(null=True, blank=True, help_text='Data source data version the cached result was computed from')
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
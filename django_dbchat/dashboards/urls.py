@@ -8,6 +8,7 @@ urlpatterns = [
     path('', views.dashboard_list, name='list'),
     path('create/', views.dashboard_create, name='create'),
     path('<uuid:dashboard_id>/', views.dashboard_detail, name='detail'),
+    path('<uuid:dashboard_id>/data/', views.dashboard_data, name='data'),
     path('api/list/', views.dashboard_list_api, name='api_list'),
     path('<uuid:dashboard_id>/add-item/', views.add_item_to_dashboard, name='add_item'),
     path('create-with-item/', views.create_dashboard_with_item, name='create_with_item'),
@@ -1,13 +1,15 @@
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
-from django.db import models
 import json
+import re
 from .models import Dashboard, DashboardItem
+from services.dashboard_data_service import dashboard_data_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -90,14 +92,13 @@ def add_item_to_dashboard(request, dashboard_id):
             return JsonResponse({'success': False, 'error': 'Dashboard not found'}, status=404)
         
         # Create dashboard item with actual result data
-        item = DashboardItem.objects.create(
+        item = DashboardItem(
             dashboard=dashboard,
             title=data.get('title', 'Untitled')[:200],  # Ensure max length
             item_type='chart',  # Set default item type
             chart_type=data.get('chart_type', 'table'),
             query=data.get('query', ''),
             chart_config=data.get('chart_config', {}),
-            result_data=data.get('result_data', []),  # Store actual query results
             position_x=0,
             position_y=dashboard.items.count() if hasattr(dashboard, 'items') else 0,
             width=6,
@@ -105,6 +106,10 @@ def add_item_to_dashboard(request, dashboard_id):
             data_source='query',  # Set default data source
             refresh_interval=0  # Set default refresh interval
         )
+        if data.get('result_data'):
+            dashboard_data_service.store_result(item, data['result_data'])  # Store actual query results
+        item.save()
+        _capture_item_plan(item, request.user)
         
         return JsonResponse({
             'success': True, 
@@ -141,14 +146,13 @@ def create_dashboard_with_item(request):
         )
         
         # Create dashboard item with actual result data
-        item = DashboardItem.objects.create(
+        item = DashboardItem(
             dashboard=dashboard,
             title=data.get('title', 'Untitled')[:200],  # Ensure max length
             item_type='chart',  # Required field
             chart_type=data.get('chart_type', 'table'),
             query=data.get('query', ''),
             chart_config=data.get('chart_config', {}),
-            result_data=data.get('result_data', []),  # Store actual query results
             position_x=0,
             position_y=0,
             width=6,
@@ -156,6 +160,10 @@ def create_dashboard_with_item(request):
             data_source='query',  # Required field
             refresh_interval=0  # Default value
         )
+        if data.get('result_data'):
+            dashboard_data_service.store_result(item, data['result_data'])  # Store actual query results
+        item.save()
+        _capture_item_plan(item, request.user)
         
         return JsonResponse({
             'success': True, 
@@ -263,6 +271,34 @@ def share_dashboard(request, dashboard_id):
         logger.error(f"Error sharing dashboard: {e}")
         return JsonResponse({'error': str(e)}, status=500)
 
+def _parse_dashboard_filters(request):
+    """Dashboard filter values passed as a JSON object in the 'filters' query parameter"""
+    try:
+        filters = json.loads(request.GET.get('filters') or '{}')
+    except json.JSONDecodeError:
+        return {}
+    return filters if isinstance(filters, dict) else {}
+
+def _parse_result_page(request):
+    """Column projection ('columns', comma-separated) and page ('offset', 'limit') requested for item data"""
+    columns = [column.strip() for column in request.GET.get('columns', '').split(',') if column.strip()]
+    try:
+        offset = max(0, int(request.GET.get('offset') or 0))
+    except ValueError:
+        offset = 0
+    try:
+        limit = max(0, int(request.GET['limit'])) if request.GET.get('limit') else None
+    except ValueError:
+        limit = None
+    return {'columns': columns, 'offset': offset, 'limit': limit}
+
+def _capture_item_plan(item, user):
+    """Store the compiled SQL of the query an item was saved from so refreshes skip the LLM"""
+    try:
+        dashboard_data_service.capture_plan(item, user)
+    except Exception as plan_error:
+        logger.warning(f"Could not compile dashboard item {item.id}: {plan_error}")
+
 @login_required
 def dashboard_item_data(request, item_id):
     """Get data for a specific dashboard item - prioritize stored result data"""
@@ -271,150 +307,17 @@ def dashboard_item_data(request, item_id):
         
         logger.info(f"Fetching data for dashboard item {item_id}: {item.title}")
         
-        # First priority: Check if the item has stored result data (even if empty)
-        if hasattr(item, 'result_data') and item.result_data is not None:
-            if isinstance(item.result_data, list) and len(item.result_data) > 0:
-                logger.info(f"Found stored result data for item {item_id} ({len(item.result_data)} rows)")
-                return JsonResponse({
-                    'success': True,
-                    'result_data': item.result_data,
-                    'chart_type': item.chart_type,
-                    'title': item.title,
-                    'data_source': 'cached',
-                    'row_count': len(item.result_data)
-                })
-            else:
-                logger.info(f"Item {item_id} has empty result_data, will try to execute query")
-        
-        # Second priority: Try to re-execute the query if no stored data
-        if not item.query:
-            logger.warning(f"No query found for dashboard item {item_id}")
-            return JsonResponse({
-                'success': False,
-                'error': 'No data available',
-                'details': 'This dashboard item has no stored data and no query to execute'
-            }, status=400)
-            
-        logger.info(f"Attempting to re-execute query for item {item_id}: {item.query[:100]}...")
-            
-        try:
-            # Import here to avoid circular imports
-            from core.views import execute_query_logic
-            from datasets.models import DataSource
-            
-            # Get all available data sources for the user
-            data_sources = DataSource.objects.filter(
-                models.Q(created_by=request.user) | models.Q(shared_with_users=request.user)
-            ).filter(status='active')
-            
-            logger.info(f"Found {data_sources.count()} active data sources")
-            
-            if not data_sources.exists():
-                logger.error(f"No active data sources found for user {request.user.id}")
-                return JsonResponse({
-                    'success': False,
-                    'error': 'No active data sources available',
-                    'details': 'You need to upload and activate a data source first'
-                }, status=404)
-            
-            # Use smart data source matching (simplified version)
-            target_data_source = None
-            query_lower = item.query.lower()
-            
-            # Method 1: Try to find data source by query content
-            for ds in data_sources:
-                if ds.source_type == 'csv' and ds.schema_info:
-                    schema_columns = set(ds.schema_info.get('columns', {}).keys())
-                    schema_columns_lower = {col.lower().replace(' ', '_') for col in schema_columns}
-                    
-                    # Extract column references from query
-                    import re
-                    quoted_columns = re.findall(r'"([^"]+)"', item.query)
-                    unquoted_columns = re.findall(r'\b(\w+)\b', item.query.replace('"', ''))
-                    all_query_columns = set(quoted_columns + unquoted_columns)
-                    all_query_columns_lower = {col.lower().replace(' ', '_') for col in all_query_columns}
-                    
-                    # Check overlap
-                    overlap = schema_columns_lower.intersection(all_query_columns_lower)
-                    if len(overlap) >= 1:
-                        target_data_source = ds
-                        logger.info(f"Found data source by column overlap: {ds.name}")
-                        break
-            
-            # Method 2: Use first available suitable source
-            if not target_data_source:
-                target_data_source = data_sources.first()
-                logger.info(f"Using first available data source: {target_data_source.name}")
-            
-            if not target_data_source:
-                return JsonResponse({
-                    'success': False,
-                    'error': 'Cannot find suitable data source'
-                }, status=404)
-            
-            # Execute the query to get fresh data
-            success, result_data, sql_query, error_message, row_count = execute_query_logic(
-                item.query, request.user, target_data_source
-            )
-            
-            logger.info(f"Query execution result: success={success}, rows={row_count}")
-            
-            if success and result_data:
-                # Convert to list of dictionaries if needed
-                if isinstance(result_data, list) and len(result_data) > 0:
-                    if not isinstance(result_data[0], dict):
-                        # Convert to dict format
-                        columns = getattr(result_data, 'columns', [])
-                        if columns:
-                            result_data = [dict(zip(columns, row)) for row in result_data]
-                        else:
-                            # Generate generic column names
-                            if len(result_data) > 0:
-                                num_cols = len(result_data[0]) if hasattr(result_data[0], '__len__') else 1
-                                columns = [f'Column_{i+1}' for i in range(num_cols)]
-                                result_data = [dict(zip(columns, row)) for row in result_data]
-                
-                # Update the item with fresh data for future use
-                try:
-                    item.result_data = result_data
-                    item.save()
-                    logger.info(f"Successfully cached {len(result_data)} rows for future use")
-                except Exception as save_error:
-                    logger.warning(f"Failed to cache data: {save_error}")
-                
-                return JsonResponse({
-                    'success': True,
-                    'result_data': result_data,
-                    'chart_type': item.chart_type,
-                    'title': item.title,
-                    'row_count': row_count,
-                    'data_source': target_data_source.name,
-                    'sql_query': sql_query
-                })
-            else:
-                logger.error(f"Query execution failed: {error_message}")
-                return JsonResponse({
-                    'success': False,
-                    'error': 'Query execution failed',
-                    'details': error_message
-                }, status=400)
-                
-        except ImportError as import_error:
-            logger.error(f"Import error in dashboard_item_data: {import_error}")
-            return JsonResponse({
-                'success': False,
-                'error': 'System error: Required modules not available',
-                'details': str(import_error)
-            }, status=500)
-        except Exception as query_error:
-            logger.error(f"Query execution failed for dashboard item {item_id}: {query_error}")
-            import traceback
-            logger.error(f"Full traceback: {traceback.format_exc()}")
-            return JsonResponse({
-                'success': False,
-                'error': 'Query execution error',
-                'details': str(query_error)
-            }, status=500)
+        payload = dashboard_data_service.get_items_data(
+            [item], request.user,
+            filters=_parse_dashboard_filters(request),
+            force_refresh=request.GET.get('refresh') == '1',
+            **_parse_result_page(request)
+        )[str(item.id)]
+        status = payload.pop('status', 200)
+        response = JsonResponse(payload, status=status)
+        if payload.get('etag'):
+            response['ETag'] = payload['etag']
+        return response
         
     except Exception as e:
         logger.error(f"Error getting dashboard item data: {e}")
@@ -426,6 +329,45 @@ def dashboard_item_data(request, item_id):
             'details': str(e)
         }, status=500)
 
+@login_required
+@require_http_methods(["GET"])
+def dashboard_data(request, dashboard_id):
+    """
+    Get data for every item of a dashboard in one call.
+    Clients send the item ETags they hold in If-None-Match; unchanged items come back
+    without their data, and the whole response is a 304 when nothing changed.
+    """
+    try:
+        dashboard = get_object_or_404(Dashboard, id=dashboard_id, owner=request.user)
+        items = list(dashboard.items.all())
+        known_etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        
+        payloads = dashboard_data_service.get_items_data(
+            items, request.user, known_etags,
+            filters=_parse_dashboard_filters(request),
+            force_refresh=request.GET.get('refresh') == '1',
+            **_parse_result_page(request)
+        )
+        
+        if items and all(payload.get('not_modified') for payload in payloads.values()):
+            return HttpResponseNotModified()
+        
+        return JsonResponse({
+            'success': True,
+            'dashboard_id': str(dashboard.id),
+            'items': payloads
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting dashboard data: {e}")
+        import traceback
+        logger.error(f"Full traceback: {traceback.format_exc()}")
+        return JsonResponse({
+            'success': False,
+            'error': 'Internal server error',
+            'details': str(e)
+        }, status=500)
+
 @login_required
 def users_api(request):
     """Get list of users for sharing"""
@@ -467,6 +409,19 @@ def delete_dashboard_item(request, item_id):
         logger.error(f"Error deleting dashboard item: {e}")
         return JsonResponse({'error': str(e)}, status=500)
 
+def _parse_recipient_emails(value):
+    """Recipient list from a list or a comma/semicolon-separated string, without duplicates"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = re.split(r'[,;]', value)
+    recipients = []
+    for email in value:
+        email = str(email).strip()
+        if email and email not in recipients:
+            recipients.append(email)
+    return recipients
+
 @login_required
 @csrf_exempt
 def schedule_dashboard_email(request, dashboard_id):
@@ -480,12 +435,12 @@ def schedule_dashboard_email(request, dashboard_id):
         import json
         data = json.loads(request.body)
         
-        # Validate required fields
-        recipient_email = data.get('recipient_email')
+        # Validate required fields; recipients may be a list or a comma/semicolon-separated string
+        recipient_emails = _parse_recipient_emails(data.get('recipient_emails') or data.get('recipient_email'))
         export_format = data.get('export_format', 'png')  # 'png' or 'pdf'
         frequency = data.get('frequency', 'once')  # 'once', 'daily', 'weekly', 'monthly'
         
-        if not recipient_email:
+        if not recipient_emails:
             return JsonResponse({'error': 'Recipient email is required'}, status=400)
         
         if export_format not in ['png', 'pdf']:
@@ -498,7 +453,8 @@ def schedule_dashboard_email(request, dashboard_id):
             export_format=export_format,
             status='pending',
             export_settings={
-                'recipient_email': recipient_email,
+                'recipient_email': ', '.join(recipient_emails),
+                'recipient_emails': recipient_emails,
                 'frequency': frequency,
                 'scheduled_by': request.user.id,
                 'dashboard_name': dashboard.name
@@ -506,13 +462,13 @@ def schedule_dashboard_email(request, dashboard_id):
             requested_by=request.user
         )
         
-        # Schedule the task based on frequency
+        # Schedule one task for all recipients so the dashboard is rendered once per send
         if frequency == 'once':
             # Send immediately
-            from celery_app import send_dashboard_email_task
-            send_dashboard_email_task.delay(
+            from celery_app import send_dashboard_email_batch_task
+            send_dashboard_email_batch_task.delay(
                 str(dashboard.id), 
-                recipient_email, 
+                recipient_emails, 
                 {
                     'export_format': export_format,
                     'dashboard_name': dashboard.name
@@ -545,8 +501,8 @@ def schedule_dashboard_email(request, dashboard_id):
             PeriodicTask.objects.create(
                 interval=schedule,
                 name=task_name,
-                task='celery_app.send_dashboard_email_task',
-                args=json.dumps([str(dashboard.id), recipient_email, {
+                task='celery_app.send_dashboard_email_batch_task',
+                args=json.dumps([str(dashboard.id), recipient_emails, {
                     'export_format': export_format,
                     'dashboard_name': dashboard.name,
                     'frequency': frequency
@@ -559,7 +515,8 @@ def schedule_dashboard_email(request, dashboard_id):
             'message': f'Dashboard "{dashboard.name}" scheduled successfully',
             'export_id': str(dashboard_export.id),
             'frequency': frequency,
-            'format': export_format
+            'format': export_format,
+            'recipients': recipient_emails
         })
         
     except Exception as e:
@@ -649,7 +606,7 @@ def dashboard_scheduled_emails(request, dashboard_id):
                     'name': task.name,
                     'frequency': task.interval.every if task.interval else 'Unknown',
                     'period': task.interval.period if task.interval else 'Unknown',
-                    'recipient_email': args[1] if len(args) > 1 else 'Unknown',
+                    'recipient_email': (', '.join(args[1]) if isinstance(args[1], list) else args[1]) if len(args) > 1 else 'Unknown',
                     'export_format': args[2].get('export_format', 'png') if len(args) > 2 else 'png',
                     'enabled': task.enabled,
                     'last_run': task.last_run_at.isoformat() if task.last_run_at else None
@@ -198,7 +198,7 @@ class ScheduledETLJobAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('ETL Configuration', {
-            'fields': ('etl_config',),
+            'fields': ('etl_config', 'max_parallel_extracts'),
             'classes': ('collapse',)
         }),
         ('Notifications', {
@@ -10,6 +10,8 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import json
 
+from utils.duckdb_manager import duckdb_manager
+
 logger = logging.getLogger(__name__)
 
 @login_required
@@ -28,32 +30,13 @@ def check_join_readiness(request):
                 'error': 'Missing required parameters: left_source_id, right_source_id'
             }, status=400)
         
-        # Get DuckDB connection
-        try:
-            from datasets.data_access_layer import unified_data_access
-            
-            conn = unified_data_access.duckdb_connection
-            
-            if not conn:
-                unified_data_access._ensure_duckdb_connection()
-                conn = unified_data_access.duckdb_connection
-            
-            if not conn:
-                return JsonResponse({
-                    'error': 'Could not connect to database'
-                }, status=500)
-        
-        except Exception as conn_error:
-            return JsonResponse({
-                'error': f'Database connection failed: {str(conn_error)}'
-            }, status=500)
-        
         # Check join readiness
         from utils.data_source_sync import DataSourceSyncManager
         
-        readiness_report = DataSourceSyncManager.get_join_readiness_report(
-            left_source_id, right_source_id, request.user, conn
-        )
+        with duckdb_manager.session() as conn:
+            readiness_report = DataSourceSyncManager.get_join_readiness_report(
+                left_source_id, right_source_id, request.user, conn
+            )
         
         return JsonResponse({
             'success': True,
@@ -72,32 +55,13 @@ def check_join_readiness(request):
 def get_available_sources_for_joins(request):
     """Get list of data sources available for JOIN operations"""
     try:
-        # Get DuckDB connection
-        try:
-            from datasets.data_access_layer import unified_data_access
-            
-            conn = unified_data_access.duckdb_connection
-            
-            if not conn:
-                unified_data_access._ensure_duckdb_connection()
-                conn = unified_data_access.duckdb_connection
-            
-            if not conn:
-                return JsonResponse({
-                    'error': 'Could not connect to database'
-                }, status=500)
-        
-        except Exception as conn_error:
-            return JsonResponse({
-                'error': f'Database connection failed: {str(conn_error)}'
-            }, status=500)
-        
         # Get available sources
         from utils.data_source_sync import DataSourceSyncManager
         
-        available_sources = DataSourceSyncManager.get_available_data_sources_for_joins(
-            request.user, conn
-        )
+        with duckdb_manager.session() as conn:
+            available_sources = DataSourceSyncManager.get_available_data_sources_for_joins(
+                request.user, conn
+            )
         
         return JsonResponse({
             'success': True,
@@ -128,32 +92,13 @@ def suggest_join_alternatives(request):
                 'error': 'Missing required parameters: left_source_id, right_source_id'
             }, status=400)
         
-        # Get DuckDB connection
-        try:
-            from datasets.data_access_layer import unified_data_access
-            
-            conn = unified_data_access.duckdb_connection
-            
-            if not conn:
-                unified_data_access._ensure_duckdb_connection()
-                conn = unified_data_access.duckdb_connection
-            
-            if not conn:
-                return JsonResponse({
-                    'error': 'Could not connect to database'
-                }, status=500)
-        
-        except Exception as conn_error:
-            return JsonResponse({
-                'error': f'Database connection failed: {str(conn_error)}'
-            }, status=500)
-        
         # Get suggestions
         from utils.data_source_sync import DataSourceSyncManager
         
-        suggestions = DataSourceSyncManager.suggest_join_alternatives(
-            left_source_id, right_source_id, request.user, conn
-        )
+        with duckdb_manager.session() as conn:
+            suggestions = DataSourceSyncManager.suggest_join_alternatives(
+                left_source_id, right_source_id, request.user, conn
+            )
         
         return JsonResponse({
             'success': True,
@@ -7,12 +7,13 @@ import pandas as pd
 import numpy as np
 import json
 import logging
-import duckdb
 from typing import Tuple, Optional, Dict, Any, List
 from django.db import connection
 from django.conf import settings
 from django.core.files.storage import default_storage
 import os
+from utils.duckdb_manager import duckdb_manager
+from utils.data_catalog import data_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -24,22 +25,21 @@ class UnifiedDataAccessLayer:
     """
     
     def __init__(self):
-        self.duckdb_connection = None
         self.diagnostic_info = {}
-        self._ensure_duckdb_connection()
     
-    def _ensure_duckdb_connection(self):
-        """Ensure DuckDB connection is available"""
+    @property
+    def duckdb_connection(self):
+        """Per-thread cursor on the shared integrated DuckDB connection (inside a duckdb_manager session)"""
         try:
-            if not self.duckdb_connection:
-                # Use the integrated DuckDB database
-                db_path = os.path.join(settings.BASE_DIR, 'data', 'integrated.duckdb')
-                os.makedirs(os.path.dirname(db_path), exist_ok=True)
-                self.duckdb_connection = duckdb.connect(db_path)
-                logger.info(f"[DUCKDB] Connected to DuckDB at: {db_path}")
+            return duckdb_manager.cursor()
         except Exception as e:
-            logger.error(f"[ERROR] Failed to connect to DuckDB: {e}")
-            self.duckdb_connection = None
+            logger.error(f"[ERROR] Failed to get DuckDB cursor: {e}")
+            return None
+    
+    def _ensure_duckdb_connection(self):
+        """The enclosing duckdb_manager session opens DuckDB; log callers that have none"""
+        if not duckdb_manager.holds_lease():
+            logger.error("[ERROR] DuckDB accessed outside duckdb_manager.session()")
     
     def _safe_json_deserialize(self, data):
         """Safely deserialize JSON data back to pandas-compatible format"""
@@ -146,6 +146,7 @@ class UnifiedDataAccessLayer:
             logger.error(f"[TRACEBACK] Full traceback: {traceback.format_exc()}")
             return False, None, f"Critical error accessing data: {str(e)}"
     
+    @duckdb_manager.session()
     def _try_duckdb_storage(self, data_source) -> Tuple[bool, Optional[pd.DataFrame], str]:
         """Try to load data from DuckDB integrated storage"""
         try:
@@ -219,6 +220,47 @@ class UnifiedDataAccessLayer:
             logger.error(f"[TRACEBACK] Traceback: {traceback.format_exc()}")
             return False, None, f"DuckDB error: {str(e)}"
     
+    @duckdb_manager.session()
+    def get_integrated_table_name(self, data_source) -> Optional[str]:
+        """
+        Resolve the persistent DuckDB table that holds a data source's data
+        
+        Args:
+            data_source: DataSource model instance
+            
+        Returns:
+            Name of the existing integrated table, or None if none is stored
+        """
+        try:
+            conn = self.duckdb_connection
+            if conn is None:
+                return None
+            
+            source_hex = data_source.id.hex.replace('-', '_')
+            candidate_names = [
+                f"ds_{source_hex}",
+                getattr(data_source, 'table_name', None),
+                f"source_{source_hex}",
+                f"data_{data_source.name.lower().replace(' ', '_').replace('-', '_')}_{data_source.id.hex[:8]}",
+            ]
+            
+            for table_name in candidate_names:
+                if not table_name:
+                    continue
+                result = conn.execute(
+                    "SELECT table_name FROM information_schema.tables WHERE table_name = ?",
+                    [table_name]
+                ).fetchone()
+                if result:
+                    return result[0]
+            
+            return None
+            
+        except Exception as e:
+            logger.debug(f"[DEBUG] Could not resolve integrated table for {data_source.id}: {e}")
+            return None
+    
+    @duckdb_manager.session()
     def _store_in_duckdb(self, data_source, df: pd.DataFrame):
         """Store data in DuckDB with unique table naming to prevent conflicts"""
         try:
@@ -236,24 +278,32 @@ class UnifiedDataAccessLayer:
             logger.info(f"[INFO] Data shape: {len(df)} rows, {len(df.columns)} columns")
             logger.info(f"[INFO] Columns: {list(df.columns)[:10]}...")
             
-            # Clean up any existing table with the same name
-            self.duckdb_connection.execute(f"DROP TABLE IF EXISTS {table_name}")
-            
-            # Store data with error handling
-            self.duckdb_connection.execute(f"CREATE TABLE {table_name} AS SELECT * FROM df")
-            
-            # Verify storage
-            verification = self.duckdb_connection.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()
+            with duckdb_manager.writer() as conn:
+                # Clean up any existing table with the same name
+                conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+                
+                # Store data with error handling
+                conn.register(f"{table_name}_df", df)
+                conn.execute(f"CREATE TABLE {table_name} AS SELECT * FROM {table_name}_df")
+                conn.unregister(f"{table_name}_df")
+                
+                # Verify storage
+                verification = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()
             if verification and verification[0] == len(df):
                 logger.info(f"[SUCCESS] Successfully stored {verification[0]} rows in DuckDB table: {table_name}")
             else:
                 logger.warning(f"[WARNING] Row count mismatch during storage verification")
             
+            # Table contents changed - invalidate cached query results and catalog entry
+            data_source.bump_data_version()
+            data_catalog.refresh_table(table_name)
+            
         except Exception as e:
             logger.error(f"[ERROR] Failed to store data in DuckDB: {e}")
             import traceback
             logger.error(f"[TRACEBACK] Full traceback: {traceback.format_exc()}")
     
+    @duckdb_manager.session()
     def clear_duckdb_cache(self, data_source_id=None):
         """Clear DuckDB cache for specific data source or all data"""
         try:
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0017_fix_semantic_metric_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasource',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0, help_text='Bumped whenever the integrated data is refreshed'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0018_add_datasource_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduledetljob',
+            name='max_parallel_extracts',
+            field=models.PositiveSmallIntegerField(default=4, help_text='Maximum number of source tables extracted concurrently', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(32)]),
+        ),
+    ]
@@ -78,6 +78,7 @@ class DataSource(models.Model):
     data_quality_score = models.FloatField(null=True, blank=True, help_text='Data quality score (0-1)')
     estimated_row_count = models.BigIntegerField(null=True, blank=True, help_text='Estimated row count')
     file_size_bytes = models.BigIntegerField(null=True, blank=True, help_text='File size in bytes for file sources')
+    data_version = models.PositiveBigIntegerField(default=0, help_text='Bumped whenever the integrated data is refreshed')
     
     class Meta:
         db_table = 'data_sources'
@@ -94,6 +95,16 @@ class DataSource(models.Model):
     def __str__(self):
         return f"{self.name} ({self.source_type})"
     
+    def save(self, *args, **kwargs):
+        # data_version only moves through bump_data_version(); a full save of an instance
+        # loaded before a bump must not write its stale version back
+        if not self._state.adding and not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'data_version'
+            ]
+        super().save(*args, **kwargs)
+    
     def soft_delete(self):
         """Implement soft delete"""
         self.deleted_at = timezone.now()
@@ -107,6 +118,12 @@ class DataSource(models.Model):
         self.is_deleted = False
         self.status = 'active'
         self.save()
+    
+    def bump_data_version(self):
+        """Mark integrated data as changed so cached results are invalidated"""
+        DataSource.objects.filter(pk=self.pk).update(data_version=models.F('data_version') + 1)
+        self.refresh_from_db(fields=['data_version'])
+        return self.data_version
 
 
 class DataSourceShare(models.Model):
@@ -512,6 +529,11 @@ class ScheduledETLJob(models.Model):
         blank=True,
         help_text='ETL configuration options (incremental vs full refresh, etc.)'
     )
+    max_parallel_extracts = models.PositiveSmallIntegerField(
+        default=4,
+        help_text='Maximum number of source tables extracted concurrently',
+        validators=[MinValueValidator(1), MaxValueValidator(32)]
+    )
     
     # Notifications
     notify_on_success = models.BooleanField(default=False, help_text='Send notification on successful completion')
@@ -35,6 +35,7 @@ from services.integration_service import DataIntegrationService
 from services.semantic_service import SemanticService
 from utils.workflow_manager import WorkflowManager, WorkflowStep
 from utils.type_helpers import get_column_type_info
+from utils.duckdb_manager import duckdb_manager
 from licensing.decorators import creator_required, viewer_or_creator_required
 
 logger = logging.getLogger(__name__)
@@ -488,10 +489,11 @@ class DataSourceDetailView(View):
                     from utils.table_name_helper import get_integrated_table_name
                     table_name = get_integrated_table_name(data_source)
                     
-                    if integration_service.check_table_exists(table_name) and hasattr(integration_service.integrated_db, 'execute'):
-                         integration_service.integrated_db.execute(f'DROP TABLE IF EXISTS "{table_name}"')
-                         deletion_summary['integration_data'] = True
-                         logger.info(f"Dropped legacy integration table: {table_name}")
+                    with duckdb_manager.session():
+                        if integration_service.check_table_exists(table_name) and hasattr(integration_service.integrated_db, 'execute'):
+                             integration_service.integrated_db.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+                             deletion_summary['integration_data'] = True
+                             logger.info(f"Dropped legacy integration table: {table_name}")
                     
                 except Exception as integration_error:
                     logger.warning(f"Could not clean up legacy integration data: {integration_error}")
@@ -1046,9 +1048,7 @@ class SemanticLayerView(View):
             from datasets.models import SemanticTable, SemanticColumn, SemanticMetric
             from .data_access_layer import unified_data_access
             import pandas as pd
-            import duckdb
             import os
-            from django.conf import settings
             
             logger.info(f"[SEMANTIC] Starting semantic generation for: {data_source.name} (ID: {data_source.id})")
             
@@ -1086,14 +1086,12 @@ class SemanticLayerView(View):
                 logger.info(f"[TABLE_NAME] Looking for ETL-transformed table: {etl_table_name}")
                 
                 # Connect to integrated DuckDB database
-                db_path = os.path.join(settings.BASE_DIR, 'data', 'integrated.duckdb')
+                db_path = duckdb_manager.db_path
                 if not os.path.exists(db_path):
                     logger.error(f"[ERROR] Integrated DuckDB not found at: {db_path}")
                     raise Exception(f"Integrated database not found: {db_path}")
                 
-                conn = duckdb.connect(db_path)
-                
-                try:
+                with duckdb_manager.session() as conn:
                     # First, check if the ETL-transformed table exists
                     tables_query = "SHOW TABLES"
                     all_tables = conn.execute(tables_query).fetchall()
@@ -1149,9 +1147,6 @@ class SemanticLayerView(View):
                             logger.error(f"[ERROR] Expected ETL table: {etl_table_name}")
                             logger.error(f"[ERROR] Tried alternatives: {alternative_patterns}")
                     
-                finally:
-                    conn.close()
-                    
             except Exception as duckdb_error:
                 logger.error(f"[ERROR] DuckDB data loading failed: {duckdb_error}")
                 
@@ -4101,32 +4096,28 @@ def execute_etl_join(request):
         
         # Get DuckDB connection
         try:
-            import duckdb
             from datasets.data_access_layer import unified_data_access
             from services.schema_aware_etl_join_service import schema_aware_etl_join_service
             
-            # Ensure DuckDB connection
-            conn = unified_data_access.duckdb_connection
-            if not conn:
-                unified_data_access._ensure_duckdb_connection()
+            with duckdb_manager.session():
+                # Ensure DuckDB connection
                 conn = unified_data_access.duckdb_connection
-            
-            if not conn:
-                raise Exception("Could not connect to DuckDB - unified data access connection failed")
-            
-            # Set the connection for the schema-aware service
-            schema_aware_etl_join_service.set_connection(conn)
-            
-            # Execute join with schema-aware validation
-            join_result = schema_aware_etl_join_service.execute_join_with_schema_validation(
-                left_source_id=str(left_source_id),
-                right_source_id=str(right_source_id),
-                left_column=left_column,
-                right_column=right_column,
-                join_type=join_type,
-                operation_name=operation_name,
-                user=request.user
-            )
+                if not conn:
+                    raise Exception("Could not connect to DuckDB - unified data access connection failed")
+                
+                # Set the connection for the schema-aware service
+                schema_aware_etl_join_service.set_connection(conn)
+                
+                # Execute join with schema-aware validation
+                join_result = schema_aware_etl_join_service.execute_join_with_schema_validation(
+                    left_source_id=str(left_source_id),
+                    right_source_id=str(right_source_id),
+                    left_column=left_column,
+                    right_column=right_column,
+                    join_type=join_type,
+                    operation_name=operation_name,
+                    user=request.user
+                )
             
             if join_result.success:
                 # Successful join
@@ -4303,50 +4294,53 @@ def execute_etl_aggregate(request):
         if not source_id:
             return JsonResponse({'error': 'Missing required parameter: source_id'}, status=400)
         
-        if not group_by_columns and not aggregate_functions:
+        if not isinstance(aggregate_functions, (dict, list)) or not aggregate_functions:
             return JsonResponse({
-                'error': 'Either group_by_columns or aggregate_functions must be specified'
+                'error': 'At least one aggregate function must be specified'
             }, status=400)
         
+        if not isinstance(group_by_columns, list):
+            return JsonResponse({'error': 'group_by_columns must be a list of column names'}, status=400)
+        
         # Get data source
         try:
-            source = DataSource.objects.get(id=source_id, status='active')
+            source = DataSource.objects.get(id=source_id, created_by=request.user, status='active')
         except DataSource.DoesNotExist:
             return JsonResponse({'error': 'Data source not found'}, status=404)
         
-        # Create ETL operation using integration service
-        from services.integration_service import DataIntegrationService
-        integration_service = DataIntegrationService()
-        
-        source_table = f"source_{source.id.hex.replace('-', '_')}"
+        # Aggregate inside DuckDB; with a watermark column later refreshes only merge appended rows
+        from services.etl_aggregate_service import etl_aggregate_service
         
-        etl_params = {
-            'group_by_columns': group_by_columns,
-            'aggregate_functions': aggregate_functions
-        }
-        
-        # Create ETL operation
-        etl_operation_id = integration_service.create_etl_operation(
-            name=operation_name,
-            operation_type='aggregate',
-            source_tables=[source_table],
-            parameters=etl_params,
-            user_id=request.user.id
+        success, result = etl_aggregate_service.execute_aggregate_operation(
+            source_id=str(source.id),
+            group_by_columns=group_by_columns,
+            aggregate_functions=aggregate_functions,
+            operation_name=operation_name,
+            user_id=request.user.id,
+            source_table=data.get('source_table'),
+            watermark_column=data.get('watermark_column')
         )
         
-        # Get the created operation details
-        etl_operation = ETLOperation.objects.get(id=etl_operation_id)
+        if not success:
+            error_msg = result.get('error', 'Unknown error occurred')
+            logger.error(f"Aggregation operation failed: {error_msg}")
+            return JsonResponse({
+                'error': f'Failed to execute aggregation operation: {error_msg}'
+            }, status=400 if result.get('error_type') == 'invalid_request' else 500)
         
         return JsonResponse({
             'success': True,
-            'operation_id': str(etl_operation_id),
+            'operation_id': result['operation_id'],
             'operation_name': operation_name,
-            'output_table': etl_operation.output_table_name,
+            'output_table': result['output_table'],
             'message': f'Aggregation operation "{operation_name}" executed successfully',
             'details': {
                 'source': source.name,
+                'source_table': result['source_table'],
                 'group_by_columns': group_by_columns,
-                'aggregate_functions': aggregate_functions
+                'aggregate_functions': aggregate_functions,
+                'row_count': result['row_count'],
+                'watermark': result['watermark']
             }
         })
         
@@ -4371,100 +4365,87 @@ def get_etl_results(request, operation_id):
         
         # Load result data directly from DuckDB
         try:
-            import duckdb
-            from datasets.data_access_layer import unified_data_access
-            
-            # Get DuckDB connection
-            conn = unified_data_access.duckdb_connection
-            
-            if not conn:
-                # Try to ensure connection
-                unified_data_access._ensure_duckdb_connection()
-                conn = unified_data_access.duckdb_connection
-            
-            if not conn:
-                raise Exception("Could not connect to DuckDB")
-            
-            # Check if table exists
-            table_exists = conn.execute(f"""
-                SELECT COUNT(*) FROM information_schema.tables 
-                WHERE table_name = '{etl_operation.output_table_name}'
-            """).fetchone()[0]
-            
-            if not table_exists:
-                return JsonResponse({
-                    'success': True,
-                    'operation_id': operation_id,
-                    'operation_name': etl_operation.name,
-                    'row_count': 0,
-                    'columns': [],
-                    'data': [],
-                    'message': f'Output table {etl_operation.output_table_name} not found'
-                })
-            
-            # Get table info and data
-            row_count_result = conn.execute(f"SELECT COUNT(*) FROM {etl_operation.output_table_name}").fetchone()
-            total_rows = row_count_result[0] if row_count_result else 0
+            with duckdb_manager.session() as conn:
+                # Check if table exists
+                table_exists = conn.execute(f"""
+                    SELECT COUNT(*) FROM information_schema.tables 
+                    WHERE table_name = '{etl_operation.output_table_name}'
+                """).fetchone()[0]
+            
+                if not table_exists:
+                    return JsonResponse({
+                        'success': True,
+                        'operation_id': operation_id,
+                        'operation_name': etl_operation.name,
+                        'row_count': 0,
+                        'columns': [],
+                        'data': [],
+                        'message': f'Output table {etl_operation.output_table_name} not found'
+                    })
             
-            if total_rows == 0:
-                return JsonResponse({
-                    'success': True,
-                    'operation_id': operation_id,
-                    'operation_name': etl_operation.name,
-                    'row_count': 0,
-                    'columns': [],
-                    'data': [],
-                    'message': 'No data in result table'
-                })
+                # Get table info and data
+                row_count_result = conn.execute(f"SELECT COUNT(*) FROM {etl_operation.output_table_name}").fetchone()
+                total_rows = row_count_result[0] if row_count_result else 0
             
-            # Get column information
-            columns_result = conn.execute(f"DESCRIBE {etl_operation.output_table_name}").fetchall()
-            columns = [col[0] for col in columns_result]  # Column names
-            column_types = [col[1] for col in columns_result]  # Column types
+                if total_rows == 0:
+                    return JsonResponse({
+                        'success': True,
+                        'operation_id': operation_id,
+                        'operation_name': etl_operation.name,
+                        'row_count': 0,
+                        'columns': [],
+                        'data': [],
+                        'message': 'No data in result table'
+                    })
             
-            # Get sample data (first 100 rows)
-            sample_data_result = conn.execute(f"SELECT * FROM {etl_operation.output_table_name} LIMIT 100").fetchall()
+                # Get column information
+                columns_result = conn.execute(f"DESCRIBE {etl_operation.output_table_name}").fetchall()
+                columns = [col[0] for col in columns_result]  # Column names
+                column_types = [col[1] for col in columns_result]  # Column types
+            
+                # Get sample data (first 100 rows)
+                sample_data_result = conn.execute(f"SELECT * FROM {etl_operation.output_table_name} LIMIT 100").fetchall()
+            
+                # Convert to JSON-serializable format
+                data = []
+                for row in sample_data_result:
+                    row_data = {}
+                    for i, col in enumerate(columns):
+                        value = row[i]
+                        # Handle different data types
+                        if value is None:
+                            row_data[col] = None
+                        elif isinstance(value, (int, float, str, bool)):
+                            row_data[col] = value
+                        else:
+                            row_data[col] = str(value)
+                    data.append(row_data)
             
-            # Convert to JSON-serializable format
-            data = []
-            for row in sample_data_result:
-                row_data = {}
+                # Build column information
+                column_info = []
                 for i, col in enumerate(columns):
-                    value = row[i]
-                    # Handle different data types
-                    if value is None:
-                        row_data[col] = None
-                    elif isinstance(value, (int, float, str, bool)):
-                        row_data[col] = value
-                    else:
-                        row_data[col] = str(value)
-                data.append(row_data)
-            
-            # Build column information
-            column_info = []
-            for i, col in enumerate(columns):
-                # Get sample values for this column
-                sample_values_result = conn.execute(f"""
-                    SELECT DISTINCT "{col}" FROM {etl_operation.output_table_name} 
-                    WHERE "{col}" IS NOT NULL 
-                    LIMIT 3
-                """).fetchall()
-                sample_values = [str(row[0]) for row in sample_values_result]
+                    # Get sample values for this column
+                    sample_values_result = conn.execute(f"""
+                        SELECT DISTINCT "{col}" FROM {etl_operation.output_table_name} 
+                        WHERE "{col}" IS NOT NULL 
+                        LIMIT 3
+                    """).fetchall()
+                    sample_values = [str(row[0]) for row in sample_values_result]
                 
-                # Get non-null count
-                non_null_result = conn.execute(f"""
-                    SELECT COUNT("{col}") FROM {etl_operation.output_table_name} 
-                    WHERE "{col}" IS NOT NULL
-                """).fetchone()
-                non_null_count = non_null_result[0] if non_null_result else 0
+                    # Get non-null count
+                    non_null_result = conn.execute(f"""
+                        SELECT COUNT("{col}") FROM {etl_operation.output_table_name} 
+                        WHERE "{col}" IS NOT NULL
+                    """).fetchone()
+                    non_null_count = non_null_result[0] if non_null_result else 0
                 
-                col_info = {
-                    'name': col,
-                    'type': column_types[i],
-                    'non_null_count': non_null_count,
-                    'sample_values': sample_values
-                }
-                column_info.append(col_info)
+                    col_info = {
+                        'name': col,
+                        'type': column_types[i],
+                        'non_null_count': non_null_count,
+                        'sample_values': sample_values
+                    }
+                    column_info.append(col_info)
             
             logger.info(f"Successfully loaded ETL results: {total_rows} rows, {len(columns)} columns")
             
@@ -4522,54 +4503,48 @@ def create_data_source_from_etl_result(request):
         
         logger.info(f"Creating data source from ETL result: {etl_operation.output_table_name}")
         
-        # Check if table exists in database
-        from datasets.data_access_layer import unified_data_access
-        unified_data_access._ensure_duckdb_connection()
-        conn = unified_data_access.duckdb_connection
-        
-        if not conn:
-            return JsonResponse({'error': 'Database connection not available'}, status=500)
-        
-        # Validate that the output table exists
-        try:
-            # Try to describe the table to check if it exists
-            columns_result = conn.execute(f"DESCRIBE {etl_operation.output_table_name}").fetchall()
-            if not columns_result:
-                return JsonResponse({'error': f'Output table {etl_operation.output_table_name} is empty'}, status=400)
-        except Exception as e:
-            logger.error(f"Error checking output table: {e}")
-            return JsonResponse({'error': f'Output table {etl_operation.output_table_name} does not exist'}, status=400)
+        # Check that the output table exists and read its metadata
+        with duckdb_manager.session() as conn:
+            # Validate that the output table exists
+            try:
+                # Try to describe the table to check if it exists
+                columns_result = conn.execute(f"DESCRIBE {etl_operation.output_table_name}").fetchall()
+                if not columns_result:
+                    return JsonResponse({'error': f'Output table {etl_operation.output_table_name} is empty'}, status=400)
+            except Exception as e:
+                logger.error(f"Error checking output table: {e}")
+                return JsonResponse({'error': f'Output table {etl_operation.output_table_name} does not exist'}, status=400)
         
-        # Get table metadata
-        try:
-            row_count_result = conn.execute(f"SELECT COUNT(*) FROM {etl_operation.output_table_name}").fetchone()
-            row_count = row_count_result[0] if row_count_result else 0
+            # Get table metadata
+            try:
+                row_count_result = conn.execute(f"SELECT COUNT(*) FROM {etl_operation.output_table_name}").fetchone()
+                row_count = row_count_result[0] if row_count_result else 0
             
-            # Get sample data
-            sample_data_result = conn.execute(f"SELECT * FROM {etl_operation.output_table_name} LIMIT 5").fetchall()
-            column_names = [desc[0] for desc in columns_result]
+                # Get sample data
+                sample_data_result = conn.execute(f"SELECT * FROM {etl_operation.output_table_name} LIMIT 5").fetchall()
+                column_names = [desc[0] for desc in columns_result]
             
-            sample_data = []
-            for row in sample_data_result:
-                sample_data.append(dict(zip(column_names, row)))
+                sample_data = []
+                for row in sample_data_result:
+                    sample_data.append(dict(zip(column_names, row)))
             
-            # Build schema info
-            schema_info = {
-                'columns': []
-            }
+                # Build schema info
+                schema_info = {
+                    'columns': []
+                }
             
-            for col_desc in columns_result:
-                col_name = col_desc[0]
-                col_type = col_desc[1]
-                schema_info['columns'].append({
-                    'name': col_name,
-                    'type': col_type,
-                    'nullable': True  # Default assumption
-                })
+                for col_desc in columns_result:
+                    col_name = col_desc[0]
+                    col_type = col_desc[1]
+                    schema_info['columns'].append({
+                        'name': col_name,
+                        'type': col_type,
+                        'nullable': True  # Default assumption
+                    })
             
-        except Exception as e:
-            logger.error(f"Error getting table metadata: {e}")
-            return JsonResponse({'error': f'Error reading table metadata: {str(e)}'}, status=500)
+            except Exception as e:
+                logger.error(f"Error getting table metadata: {e}")
+                return JsonResponse({'error': f'Error reading table metadata: {str(e)}'}, status=500)
         
         # Generate unique name for the new data source
         new_name = f"{etl_operation.name} - Result"
@@ -4948,9 +4923,7 @@ def diagnose_business_metrics_api(request):
             from services.semantic_service import SemanticService
             from services.integration_service import DataIntegrationService
             from utils.table_name_helper import get_integrated_table_name
-            import duckdb
             import os
-            from django.conf import settings
             
             semantic_service = SemanticService()
             integration_service = DataIntegrationService()
@@ -4972,16 +4945,13 @@ def diagnose_business_metrics_api(request):
             
             # Check DuckDB connection and tables
             try:
-                db_path = os.path.join(settings.BASE_DIR, 'data', 'integrated.duckdb')
-                if os.path.exists(db_path):
-                    conn = duckdb.connect(db_path)
+                if os.path.exists(duckdb_manager.db_path):
                     try:
-                        result = conn.execute("SHOW TABLES").fetchall()
+                        with duckdb_manager.session() as conn:
+                            result = conn.execute("SHOW TABLES").fetchall()
                         diagnostic_info['duckdb_tables'] = [table[0] for table in result]
                     except Exception as e:
                         diagnostic_info['duckdb_tables'] = [f"Error: {str(e)}"]
-                    finally:
-                        conn.close()
                 else:
                     diagnostic_info['duckdb_tables'] = ["DuckDB file not found"]
             except Exception as e:
@@ -5478,6 +5448,14 @@ def create_scheduled_etl_job(request):
         if data_sources.count() != len(data_source_ids):
             return JsonResponse({'error': 'One or more data sources not found or not accessible'}, status=400)
         
+        # Model validators don't run on create
+        try:
+            max_parallel_extracts = int(data.get('max_parallel_extracts', 4))
+        except (TypeError, ValueError):
+            return JsonResponse({'error': 'max_parallel_extracts must be an integer'}, status=400)
+        if not 1 <= max_parallel_extracts <= 32:
+            return JsonResponse({'error': 'max_parallel_extracts must be between 1 and 32'}, status=400)
+        
         # Create the scheduled job
         job = ScheduledETLJob.objects.create(
             name=name,
@@ -5492,6 +5470,7 @@ def create_scheduled_etl_job(request):
             retry_delay_minutes=data.get('retry_delay_minutes', 5),
             failure_threshold=data.get('failure_threshold', 5),
             etl_config=data.get('etl_config', {}),
+            max_parallel_extracts=max_parallel_extracts,
             notify_on_success=data.get('notify_on_success', False),
             notify_on_failure=data.get('notify_on_failure', True),
             notification_emails=data.get('notification_emails', []),
@@ -5569,6 +5548,7 @@ def scheduled_etl_job_detail(request, job_id):
             'retry_delay_minutes': job.retry_delay_minutes,
             'failure_threshold': job.failure_threshold,
             'etl_config': job.etl_config,
+            'max_parallel_extracts': job.max_parallel_extracts,
             'notify_on_success': job.notify_on_success,
             'notify_on_failure': job.notify_on_failure,
             'notification_emails': job.notification_emails,
@@ -21,6 +21,9 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
 
+# Task modules outside Django apps that beat and ETL jobs schedule by name
+app.conf.imports = ('services.dashboard_refresh_service', 'services.etl_dag_service')
+
 # Celery configuration
 app.conf.update(
     task_serializer='json',
@@ -45,7 +48,10 @@ app.conf.update(
         'services.scheduled_etl_service.schedule_pending_etl_jobs': {'queue': 'scheduling'},
         'services.scheduled_etl_service.cleanup_old_etl_logs': {'queue': 'maintenance'},
         'services.scheduled_etl_service.update_etl_job_schedules': {'queue': 'scheduling'},
+        'services.dashboard_refresh_service.refresh_dashboard_items': {'queue': 'data_refresh'},
+        'services.etl_dag_service.refresh_etl_pipeline': {'queue': 'data_refresh'},
         'celery_app.send_dashboard_email_task': {'queue': 'emails'},
+        'celery_app.send_dashboard_email_batch_task': {'queue': 'emails'},
         'celery_app.run_etl_operation_task': {'queue': 'data_processing'},
         'celery_app.export_dashboard_task': {'queue': 'exports'},
         'celery_app.update_semantic_layer_task': {'queue': 'semantic'},
@@ -57,6 +63,7 @@ app.conf.update(
     # Rate limiting
     task_annotations={
         'celery_app.send_dashboard_email_task': {'rate_limit': '20/m'},
+        'celery_app.send_dashboard_email_batch_task': {'rate_limit': '20/m'},
         'celery_app.export_dashboard_task': {'rate_limit': '10/m'},
         'celery_app.run_etl_operation_task': {'rate_limit': '5/m'},
         'celery_app.update_semantic_layer_task': {'rate_limit': '3/m'},
@@ -98,6 +105,11 @@ app.conf.update(
             'task': 'services.scheduled_etl_service.update_etl_job_schedules',
             'schedule': crontab(hour=0, minute=30),  # Daily at 12:30 AM
         },
+        # Dashboard tiles
+        'refresh-dashboard-items': {
+            'task': 'services.dashboard_refresh_service.refresh_dashboard_items',
+            'schedule': crontab(minute='*'),  # Every minute; items refresh on their own interval
+        },
     },
 )
 
@@ -122,9 +134,8 @@ def send_dashboard_email_task(self, dashboard_id, recipient_email, email_config=
         dashboard = Dashboard.objects.get(id=dashboard_id)
         email_service = EmailService()
         
-        # Generate dashboard content
-        dashboard_items = list(dashboard.dashboard_items.all().values())
-        dashboard_html = email_service.generate_dashboard_html(dashboard_items, dashboard.name)
+        # Generate dashboard content once per dashboard state, shared across recipients
+        dashboard_html, image_bytes = email_service.render_dashboard_attachments(dashboard)
         
         # Prepare attachments
         attachments = []
@@ -137,7 +148,6 @@ def send_dashboard_email_task(self, dashboard_id, recipient_email, email_config=
         })
         
         # Image attachment
-        image_bytes = email_service.generate_dashboard_image(dashboard_html, dashboard.name)
         if image_bytes:
             attachments.append({
                 'content': image_bytes,
@@ -225,14 +235,12 @@ def export_dashboard_task(self, dashboard_id, export_format='html', options=None
         dashboard = Dashboard.objects.get(id=dashboard_id)
         email_service = EmailService()
         
-        # Get dashboard items
-        dashboard_items = list(dashboard.dashboard_items.all().values())
-        
+        # Exports are cached per dashboard state, so unchanged dashboards are not re-rendered
         if export_format == 'html':
-            content = email_service.generate_dashboard_html(dashboard_items, dashboard.name)
+            from services.dashboard_export_service import DashboardExportService
+            content = DashboardExportService().generate_email_html(dashboard)
         elif export_format == 'png':
-            dashboard_html = email_service.generate_dashboard_html(dashboard_items, dashboard.name)
-            content = email_service.generate_dashboard_image(dashboard_html, dashboard.name)
+            _, content = email_service.render_dashboard_attachments(dashboard)
         else:
             raise ValueError(f"Unsupported export format: {export_format}")
         
@@ -336,8 +344,16 @@ def cleanup_old_query_logs(self, days_to_keep=30):
         # Delete old query logs
         deleted_count, _ = QueryLog.objects.filter(created_at__lt=cutoff_date).delete()
         
-        logger.info(f"Cleaned up {deleted_count} old query logs")
-        return {'deleted_count': deleted_count, 'cutoff_date': cutoff_date.isoformat()}
+        # Remove stored results no query log or dashboard item references any more
+        from dashboards.models import DashboardItem
+        from utils.result_store import result_store
+        
+        referenced = set(QueryLog.objects.exclude(result_ref='').values_list('result_ref', flat=True))
+        referenced.update(DashboardItem.objects.exclude(result_ref='').values_list('result_ref', flat=True))
+        purged_count = result_store.purge_unreferenced(referenced)
+        
+        logger.info(f"Cleaned up {deleted_count} old query logs and {purged_count} unreferenced results")
+        return {'deleted_count': deleted_count, 'purged_results': purged_count, 'cutoff_date': cutoff_date.isoformat()}
         
     except Exception as exc:
         logger.error(f"Failed to cleanup old query logs: {exc}")
@@ -300,7 +300,15 @@ CSRF_COOKIE_AGE = 31449600  # 1 year
 # File Upload Configuration
 FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
-MAX_CSV_FILE_SIZE = 500 * 1024 * 1024  # 500MB for CSV files
+MAX_CSV_FILE_SIZE = int(os.environ.get('MAX_CSV_FILE_SIZE', str(500 * 1024 * 1024)))  # 500MB for CSV files read into memory
+CSV_SNIFF_SAMPLE_BYTES = int(os.environ.get('CSV_SNIFF_SAMPLE_BYTES', str(1024 * 1024)))  # Bytes read to detect CSV encoding and dialect
+CSV_TYPE_SAMPLE_ROWS = int(os.environ.get('CSV_TYPE_SAMPLE_ROWS', '100000'))  # Rows DuckDB samples for CSV type detection
+
+# Query Result Cache Configuration
+QUERY_RESULT_CACHE_MAX_BYTES = int(os.environ.get('QUERY_RESULT_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))  # 256MB
+QUERY_RESULT_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('QUERY_RESULT_CACHE_MAX_ENTRY_BYTES', str(16 * 1024 * 1024)))  # 16MB
+QUERY_RESULT_CACHE_TIMEOUT = int(os.environ.get('QUERY_RESULT_CACHE_TIMEOUT', '86400'))  # versioned entries, 24 hours
+QUERY_RESULT_CACHE_UNVERSIONED_TIMEOUT = int(os.environ.get('QUERY_RESULT_CACHE_UNVERSIONED_TIMEOUT', '300'))  # 5 minutes
 
 # LLM Configuration - Enhanced for Llama 3.2b
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
@@ -309,6 +317,12 @@ OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o')  # Updated to GPT-4o as
 LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'local')  # 'openai' or 'local' (default to local Llama 3.2b)
 LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', '3'))
 LLM_CACHE_TIMEOUT = int(os.environ.get('LLM_CACHE_TIMEOUT', '1800'))  # 30 minutes
+SQL_SIMILARITY_THRESHOLD = float(os.environ.get('SQL_SIMILARITY_THRESHOLD', '0.85'))  # TF-IDF cosine for paraphrase reuse
+SQL_SIMILARITY_INDEX_TTL = int(os.environ.get('SQL_SIMILARITY_INDEX_TTL', '300'))  # 5 minutes
+SQL_SIMILARITY_INDEX_SIZE = int(os.environ.get('SQL_SIMILARITY_INDEX_SIZE', '500'))  # QueryLog rows per table
+DATA_CATALOG_RECONCILE_INTERVAL = int(os.environ.get('DATA_CATALOG_RECONCILE_INTERVAL', '60'))  # seconds between table catalog reconciles
+SEMANTIC_PROFILE_SAMPLE_ROWS = int(os.environ.get('SEMANTIC_PROFILE_SAMPLE_ROWS', '100000'))  # Reservoir sample for text type histograms
+SEMANTIC_PROFILE_TOP_K_MAX_DISTINCT = int(os.environ.get('SEMANTIC_PROFILE_TOP_K_MAX_DISTINCT', '1000'))  # Columns above this cardinality get no top values
 LLM_REQUEST_TIMEOUT = int(os.environ.get('LLM_REQUEST_TIMEOUT', '60'))
 
 # Ollama Configuration - Enhanced for Llama 3.2b
@@ -329,10 +343,38 @@ OPENAI_MAX_TOKENS = int(os.environ.get('OPENAI_MAX_TOKENS', '1000'))
 DUCKDB_PATH = os.environ.get('DUCKDB_PATH', 'data')
 
 # Performance Configuration
+DUCKDB_LOCK_TIMEOUT = int(os.environ.get('DUCKDB_LOCK_TIMEOUT', '30'))  # Seconds a process waits for another to release the integrated DuckDB file
+DUCKDB_MAX_HOLD_SECONDS = int(os.environ.get('DUCKDB_MAX_HOLD_SECONDS', '300'))  # Log threads holding the integrated DuckDB file longer than this
 DATABASE_CONNECTION_POOL_SIZE = int(os.environ.get('DATABASE_CONNECTION_POOL_SIZE', '5'))
+DATABASE_POOL_TIMEOUT = int(os.environ.get('DATABASE_POOL_TIMEOUT', '10'))  # Seconds to wait for a free pooled connection
+DATABASE_POOL_IDLE_TIMEOUT = int(os.environ.get('DATABASE_POOL_IDLE_TIMEOUT', '300'))  # Close connections idle this long
+DATABASE_POOL_MAX_LIFETIME = int(os.environ.get('DATABASE_POOL_MAX_LIFETIME', '1800'))  # Recycle connections after this age
+ETL_STREAM_BATCH_SIZE = int(os.environ.get('ETL_STREAM_BATCH_SIZE', '50000'))  # Rows fetched per server-side cursor batch
+DASHBOARD_DATA_MAX_WORKERS = int(os.environ.get('DASHBOARD_DATA_MAX_WORKERS', '4'))  # Concurrent item queries per dashboard load
+DASHBOARD_REFRESH_BATCH_SIZE = int(os.environ.get('DASHBOARD_REFRESH_BATCH_SIZE', '50'))  # Items recomputed per batch by the background refresher
+DASHBOARD_REFRESH_RETRY_BACKOFF = int(os.environ.get('DASHBOARD_REFRESH_RETRY_BACKOFF', '300'))  # Seconds before a failed item is retried, doubling per failure
+DASHBOARD_REFRESH_MAX_BACKOFF = int(os.environ.get('DASHBOARD_REFRESH_MAX_BACKOFF', str(6 * 3600)))  # Longest wait between retries of a failing item
+DASHBOARD_REFRESH_LOCK_TIMEOUT = int(os.environ.get('DASHBOARD_REFRESH_LOCK_TIMEOUT', '900'))  # Seconds an item stays claimed by a refresh run
+ETL_DAG_MAX_WORKERS = int(os.environ.get('ETL_DAG_MAX_WORKERS', '4'))  # Independent downstream ETL operations re-run at once
+RESULT_STORE_PATH = os.environ.get('RESULT_STORE_PATH', os.path.join(BASE_DIR, 'data', 'results'))  # Parquet files of query and dashboard results
+RESULT_STORE_PREVIEW_ROWS = int(os.environ.get('RESULT_STORE_PREVIEW_ROWS', '20'))  # Rows kept inline on the model as a preview
+EXPORT_MAX_ROWS_PER_ITEM = int(os.environ.get('EXPORT_MAX_ROWS_PER_ITEM', '500'))  # Rows per dashboard item in PDF/PNG/email exports
+RENDER_WORKER_CONCURRENCY = int(os.environ.get('RENDER_WORKER_CONCURRENCY', '2'))  # Pages the export render worker renders at once
+RENDER_WORKER_MAX_RENDERS = int(os.environ.get('RENDER_WORKER_MAX_RENDERS', '50'))  # Renders before the worker recycles its browser
+RENDER_WORKER_TIMEOUT = int(os.environ.get('RENDER_WORKER_TIMEOUT', '120'))  # Seconds to wait for a queued render
+RENDER_WORKER_NODE_PATH = os.environ.get('NODE_PATH', '/usr/lib/node_modules')  # Where the puppeteer module is installed
+EXPORT_CACHE_PATH = os.environ.get('EXPORT_CACHE_PATH', os.path.join(BASE_DIR, 'data', 'exports'))  # Rendered dashboard exports
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))  # LRU eviction beyond this size
+COLUMN_INDEX_MAX_POSTING = int(os.environ.get('COLUMN_INDEX_MAX_POSTING', '500'))  # Name tokens shared by more columns only match on full names
+COLUMN_INDEX_SKETCH_VALUES = int(os.environ.get('COLUMN_INDEX_SKETCH_VALUES', '1024'))  # Smallest value hashes kept per column sketch
+COLUMN_INDEX_RECONCILE_INTERVAL = int(os.environ.get('COLUMN_INDEX_RECONCILE_INTERVAL', '300'))  # Seconds between column index reconciles
+JOIN_PREFLIGHT_MAX_ROWS = int(os.environ.get('JOIN_PREFLIGHT_MAX_ROWS', '50000000'))  # ETL joins estimated above this many rows are refused
+JOIN_PREFLIGHT_WARN_FACTOR = int(os.environ.get('JOIN_PREFLIGHT_WARN_FACTOR', '10'))  # Warn when a join multiplies its larger input this many times
 
 # Data Integration Configuration
 INTEGRATED_DB_PATH = os.environ.get('INTEGRATED_DB_PATH', os.path.join(BASE_DIR, 'data', 'integrated.duckdb'))
+# Attach the integrated database read-only (e.g. for Celery workers that only read)
+INTEGRATED_DB_READ_ONLY = os.environ.get('INTEGRATED_DB_READ_ONLY', 'False').lower() == 'true'
 DATA_INTEGRATION_SETTINGS = {
     'DATABASE_PATH': INTEGRATED_DB_PATH,
     'CONNECTION_TIMEOUT': int(os.environ.get('INTEGRATION_DB_TIMEOUT', '30')),
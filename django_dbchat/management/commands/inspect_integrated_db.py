@@ -8,6 +8,7 @@ from django.conf import settings
 from services.integration_service import DataIntegrationService
 from datasets.models import DataSource
 from utils.table_name_helper import TableNameManager, get_integrated_table_name
+from utils.duckdb_manager import duckdb_manager
 import json
 import logging
 
@@ -44,6 +45,7 @@ class Command(BaseCommand):
             help='Output format (text or json)',
         )
     
+    @duckdb_manager.session()
     def handle(self, *args, **options):
         try:
             integration_service = DataIntegrationService()
@@ -7,13 +7,13 @@ with formula helpers and DuckDB integration for LLM queries
 import logging
 import re
 import json
-import duckdb
 from typing import Dict, List, Tuple, Optional, Any
 from django.db import transaction
 from django.conf import settings
 from django.core.cache import cache
 from datasets.models import SemanticMetric, SemanticTable, SemanticColumn
 from django.contrib.auth import get_user_model
+from utils.duckdb_manager import duckdb_manager
 import os
 
 logger = logging.getLogger(__name__)
@@ -84,7 +84,7 @@ class BusinessMetricsService:
         try:
             os.makedirs(os.path.dirname(self.duckdb_path), exist_ok=True)
             
-            with duckdb.connect(self.duckdb_path) as conn:
+            with duckdb_manager.session() as conn:
                 # Create business metrics table
                 conn.execute("""
                     CREATE TABLE IF NOT EXISTS business_metrics (
@@ -217,7 +217,7 @@ class BusinessMetricsService:
     def _test_formula_syntax(self, formula: str, table_name: Optional[str] = None) -> Tuple[bool, str]:
         """Test formula syntax using DuckDB"""
         try:
-            with duckdb.connect(self.duckdb_path) as conn:
+            with duckdb_manager.session() as conn:
                 if table_name:
                     # Test with actual table if it exists
                     try:
@@ -386,7 +386,7 @@ class BusinessMetricsService:
     def _store_metric_in_duckdb(self, metric: SemanticMetric):
         """Store metric in DuckDB for LLM queries"""
         try:
-            with duckdb.connect(self.duckdb_path) as conn:
+            with duckdb_manager.session() as conn:
                 # Convert metric to DuckDB format
                 metric_data = {
                     'id': str(metric.id),
@@ -417,7 +417,7 @@ class BusinessMetricsService:
     def get_metrics_for_llm(self) -> List[Dict[str, Any]]:
         """Get all business metrics formatted for LLM consumption"""
         try:
-            with duckdb.connect(self.duckdb_path) as conn:
+            with duckdb_manager.session() as conn:
                 result = conn.execute("""
                     SELECT id, name, display_name, description, metric_type, 
                            calculation, unit, base_table
@@ -488,7 +488,7 @@ class BusinessMetricsService:
     def _store_metric_history(self, metric_id: str, change_type: str, old_calc: str, new_calc: str, reason: str = ""):
         """Store metric change history"""
         try:
-            with duckdb.connect(self.duckdb_path) as conn:
+            with duckdb_manager.session() as conn:
                 conn.execute("""
                     INSERT INTO business_metrics_history 
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
@@ -509,7 +509,7 @@ class BusinessMetricsService:
             metric.delete()
             
             # Delete from DuckDB
-            with duckdb.connect(self.duckdb_path) as conn:
+            with duckdb_manager.session() as conn:
                 conn.execute("DELETE FROM business_metrics WHERE id = ?", [metric_id])
             
             # Clear caches
@@ -527,7 +527,7 @@ class BusinessMetricsService:
     def test_metric_calculation(self, calculation: str, table_name: str, limit: int = 5) -> Tuple[bool, str, Any]:
         """Test a metric calculation against real data"""
         try:
-            with duckdb.connect(self.duckdb_path) as conn:
+            with duckdb_manager.session() as conn:
                 test_query = f"""
                     SELECT {calculation} as metric_value 
                     FROM {table_name} 
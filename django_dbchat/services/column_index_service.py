@@ -0,0 +1,467 @@
+"""
+Column Index Service for ConvaBI Application
+Finds candidate join columns across data sources without comparing every column pair
+"""
+
+import re
+import time
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Set, Tuple, Iterable
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from datasets.models import DataSource
+from utils.duckdb_manager import duckdb_manager
+from utils.data_catalog import data_catalog
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+LSH_BANDS = 32  # 2 signature rows per band: pairs with Jaccard similarity above ~0.2 usually share a bucket
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Permutation coefficients below 2^31 keep a * hash + b inside a 64-bit integer in DuckDB
+_random = np.random.RandomState(7)
+_PERM_A = [int(value) for value in _random.randint(1, 1 << 31, NUM_PERM, dtype=np.int64)]
+_PERM_B = [int(value) for value in _random.randint(0, 1 << 31, NUM_PERM, dtype=np.int64)]
+
+_TOKEN_SYNONYMS = {
+    'identifier': 'id', 'num': 'number', 'no': 'number', 'nbr': 'number', 'cd': 'code',
+    'dt': 'date', 'qty': 'quantity', 'amt': 'amount', 'cust': 'customer', 'prod': 'product',
+}
+
+# Column types that can share join keys
+_KEY_FAMILIES = {'integer': 'key', 'string': 'key', 'float': 'number', 'temporal': 'temporal', 'boolean': 'boolean'}
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def name_tokens(name: str) -> List[str]:
+    """Normalised tokens of a column name: split on case and punctuation, lower-cased, singular, with synonyms"""
+    spaced = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', str(name))
+    tokens = []
+    for token in re.split(r'[^A-Za-z0-9]+', spaced.lower()):
+        if not token:
+            continue
+        token = _TOKEN_SYNONYMS.get(token, token)
+        if len(token) > 2 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def type_family(column_type: str) -> str:
+    """Broad family of a semantic or database column type"""
+    column_type = str(column_type or '').lower()
+    if 'bool' in column_type:
+        return 'boolean'
+    if 'date' in column_type or 'time' in column_type:
+        return 'temporal'
+    if any(name in column_type for name in ('int', 'integer', 'bigint', 'smallint')):
+        return 'integer'
+    if any(name in column_type for name in ('float', 'double', 'decimal', 'numeric', 'real')):
+        return 'float'
+    if any(name in column_type for name in ('str', 'string', 'varchar', 'char', 'text', 'object')):
+        return 'string'
+    return 'other'
+
+
+def minhash_sql(hash_column: str) -> str:
+    """Select list computing a MinHash signature over a column of 64-bit value hashes"""
+    return ', '.join(
+        f"MIN(({a} * ({hash_column} & {_MAX_HASH}) + {b}) % {_MERSENNE_PRIME}) & {_MAX_HASH}"
+        for a, b in zip(_PERM_A, _PERM_B)
+    )
+
+
+class ColumnIndexService:
+    """
+    Inverted index over the columns of all active data sources.
+
+    Each column is posted under its normalised name, each of its name tokens
+    and, when its values were sketched, the LSH band hashes of a MinHash
+    signature of its distinct values; name postings are keyed by type family
+    so text ids never meet dates. Candidate join columns for a column are the
+    union of its postings, so lookups touch only plausible columns instead of
+    every column of every source. Tokens shared by more than
+    ``COLUMN_INDEX_MAX_POSTING`` columns (``id``, ``name``...) only match on
+    the full name.
+
+    Sketches come from the integrated DuckDB table when a source is indexed:
+    a MinHash signature over all distinct values for the LSH postings, the
+    ``COLUMN_INDEX_SKETCH_VALUES`` smallest value hashes (a bottom-k sample,
+    coordinated across columns because every column keeps the same end of
+    the hash range) and an approximate distinct count, which together
+    estimate how much two columns' values overlap. Index entries are
+    published through the Django cache so every worker shares them; sources
+    created or changed elsewhere are picked up by a periodic reconcile
+    against the data source table, which indexes names and types only.
+    The shared manifest is merged under a short ``cache.add`` lock, and
+    entries that could not be published yet stay local and are retried on
+    the next lookup, so concurrent publishers never drop each other's sketches.
+    """
+
+    MANIFEST_KEY = 'column_index_manifest'
+    VERSION_KEY = 'column_index_version'
+    ENTRY_KEY = 'column_index_source:{}'
+    LOCK_KEY = 'column_index_lock'
+    LOCK_TIMEOUT = 10
+    LOCK_WAIT = 2.0
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
+        self._unpublished: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._version = None
+        self._reconciled_at = 0.0
+        self.max_posting = getattr(settings, 'COLUMN_INDEX_MAX_POSTING', 500)
+        self.sketch_values = getattr(settings, 'COLUMN_INDEX_SKETCH_VALUES', 1024)
+        self.reconcile_interval = getattr(settings, 'COLUMN_INDEX_RECONCILE_INTERVAL', 300)
+
+    @property
+    def version(self):
+        self._sync()
+        return self._version
+
+    def index_source(self, data_source, sketch: bool = True) -> Dict[str, Any]:
+        """
+        Index (or re-index) a data source's columns
+
+        Args:
+            data_source: DataSource instance
+            sketch: Also sketch column values from the integrated table
+
+        Returns:
+            The source's index entry
+        """
+        entry = self._build_entry(data_source, self._entries.get(str(data_source.id)))
+        if sketch:
+            self._sketch_columns(data_source, entry)
+        with self._lock:
+            self._put(str(data_source.id), entry)
+        self._publish({str(data_source.id): entry})
+        return entry
+
+    def remove_source(self, source_id: str):
+        with self._lock:
+            self._drop(str(source_id))
+        self._publish({}, removed=[str(source_id)])
+
+    def get_sources(self) -> Dict[str, Dict[str, Any]]:
+        """Index entries keyed by source id"""
+        self._sync()
+        with self._lock:
+            return dict(self._entries)
+
+    def get_source(self, source_id: str) -> Optional[Dict[str, Any]]:
+        self._sync()
+        return self._entries.get(str(source_id))
+
+    def candidates(self, source_id: str, after_id: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        """
+        Columns in other sources that could join with a source's columns
+
+        Args:
+            source_id: Source whose columns are looked up
+            after_id: Only return columns of sources whose id sorts after this one
+
+        Returns:
+            (column, other source id, other column) triples
+        """
+        self._sync()
+        source_id = str(source_id)
+        entry = self._entries.get(source_id)
+        if not entry:
+            return []
+
+        found = []
+        with self._lock:
+            for column_name, profile in entry['columns'].items():
+                matches = set()
+                for key, exact in self._posting_keys(profile):
+                    posting = self._postings.get(key, ())
+                    if not exact and len(posting) > self.max_posting:
+                        continue
+                    matches.update(posting)
+                for other_id, other_column in matches:
+                    if other_id != source_id and (after_id is None or other_id > after_id):
+                        found.append((column_name, other_id, other_column))
+        return found
+
+    def estimate_overlap(self, profile1: Dict[str, Any], profile2: Dict[str, Any]) -> Optional[float]:
+        """
+        Estimated share of the smaller column's distinct values found in the other column
+
+        Returns:
+            Overlap between 0 and 1, or None when either column has no sketch
+        """
+        sample1, sample2 = profile1.get('sample'), profile2.get('sample')
+        if sample1 is None or sample2 is None:
+            return None
+        distinct1, distinct2 = profile1.get('distinct', 0), profile2.get('distinct', 0)
+        if not distinct1 or not distinct2:
+            return 0.0
+
+        # Jaccard similarity from the k smallest hashes of the union: those are in both
+        # bottom-k samples exactly when the value is in both columns
+        hashes1 = np.frombuffer(sample1, dtype=np.uint64)
+        hashes2 = np.frombuffer(sample2, dtype=np.uint64)
+        if self._complete(hashes1, distinct1) and self._complete(hashes2, distinct2):
+            # Both samples hold every distinct value, so the overlap is exact
+            shared = len(np.intersect1d(hashes1, hashes2, assume_unique=True))
+            return shared / min(distinct1, distinct2)
+
+        k = min(len(hashes1), len(hashes2))
+        if not k:
+            return 0.0
+        smallest = np.union1d(hashes1, hashes2)[:k]
+        shared = np.intersect1d(np.intersect1d(hashes1, hashes2, assume_unique=True), smallest, assume_unique=True)
+        jaccard = len(shared) / k
+
+        intersection = jaccard * (distinct1 + distinct2) / (1 + jaccard)
+        return min(1.0, intersection / min(distinct1, distinct2))
+
+    def _complete(self, hashes: np.ndarray, distinct: int) -> bool:
+        """Whether a bottom-k sample holds all of its column's distinct values"""
+        return len(hashes) == distinct and len(hashes) < self.sketch_values
+
+    def _build_entry(self, data_source, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Column profiles from a source's schema, keeping sketches of unchanged columns"""
+        columns = (data_source.schema_info or {}).get('tables', {}).get('main_table', {}).get('columns', {})
+        previous_columns = (previous or {}).get('columns', {})
+
+        profiles = {}
+        for column_name, column_info in columns.items():
+            tokens = name_tokens(column_name)
+            profile = {
+                'tokens': tokens,
+                'name': '_'.join(tokens),
+                'family': type_family(column_info.get('type', '')),
+                'info': {
+                    key: column_info[key]
+                    for key in ('type', 'unique_count', 'null_count', 'potential_key', 'potential_foreign_key')
+                    if key in column_info
+                },
+            }
+            earlier = previous_columns.get(column_name)
+            if earlier and earlier.get('sample') is not None and earlier['family'] == profile['family']:
+                for key in ('sketch', 'sample', 'distinct'):
+                    profile[key] = earlier[key]
+            profiles[column_name] = profile
+
+        return {
+            'name': data_source.name,
+            'signature': str(data_source.updated_at),
+            'columns': profiles,
+        }
+
+    def _sketch_columns(self, data_source, entry: Dict[str, Any]):
+        """Sketch the distinct values of key-like columns in the source's integrated table"""
+        # One lease for the catalog lookups and every column's sketch
+        with duckdb_manager.session() as conn:
+            table_name = data_catalog.get_table_for_data_source(data_source.id)
+            if not table_name:
+                return
+            table = data_catalog.get_table(table_name) or {}
+            table_columns = set(table.get('columns', []))
+
+            sketched = 0
+            for column_name, profile in entry['columns'].items():
+                if _KEY_FAMILIES.get(profile['family']) != 'key' or column_name not in table_columns:
+                    continue
+                column = _quote_identifier(column_name)
+                hashes = (
+                    f"SELECT hash(lower(trim(CAST({column} AS VARCHAR)))) AS h "
+                    f"FROM {_quote_identifier(table_name)} WHERE {column} IS NOT NULL"
+                )
+                try:
+                    summary = conn.execute(
+                        f"SELECT approx_count_distinct(h), {minhash_sql('h')} FROM ({hashes})"
+                    ).fetchone()
+                    sample = conn.execute(
+                        f"SELECT DISTINCT h FROM ({hashes}) ORDER BY h LIMIT {int(self.sketch_values)}"
+                    ).fetchall()
+                except Exception as e:
+                    logger.debug(f"[COLUMN_INDEX] Could not sketch {table_name}.{column_name}: {e}")
+                    continue
+
+                if summary[0]:
+                    profile['sketch'] = np.array(summary[1:], dtype=np.uint32).tobytes()
+                else:
+                    profile['sketch'] = np.full(NUM_PERM, _MAX_HASH, dtype=np.uint32).tobytes()
+                profile['sample'] = np.fromiter((row[0] for row in sample), dtype=np.uint64, count=len(sample)).tobytes()
+                # The sample is complete when the column has fewer distinct values than it holds
+                profile['distinct'] = len(sample) if len(sample) < self.sketch_values else max(int(summary[0]), len(sample))
+                sketched += 1
+
+        logger.info(f"[COLUMN_INDEX] Sketched {sketched} columns of {data_source.name} from {table_name}")
+
+    def _posting_keys(self, profile: Dict[str, Any]) -> Iterable[Tuple[str, bool]]:
+        """Index keys of a column, flagged True for keys that are always followed regardless of posting size"""
+        family = _KEY_FAMILIES.get(profile['family'], profile['family'])
+        if profile['name']:
+            yield f"name:{family}:{profile['name']}", True
+        for token in set(profile['tokens']):
+            yield f"token:{family}:{token}", False
+        sketch = profile.get('sketch')
+        if sketch is not None and profile.get('distinct'):
+            rows_per_band = NUM_PERM // LSH_BANDS
+            signature = np.frombuffer(sketch, dtype=np.uint32)
+            for band in range(LSH_BANDS):
+                band_values = signature[band * rows_per_band:(band + 1) * rows_per_band]
+                yield f"lsh:{band}:{band_values.tobytes().hex()}", False
+
+    def _put(self, source_id: str, entry: Dict[str, Any]):
+        self._drop(source_id)
+        self._entries[source_id] = entry
+        for column_name, profile in entry['columns'].items():
+            for key, _ in self._posting_keys(profile):
+                self._postings[key].add((source_id, column_name))
+
+    def _drop(self, source_id: str):
+        entry = self._entries.pop(source_id, None)
+        if not entry:
+            return
+        for column_name, profile in entry['columns'].items():
+            for key, _ in self._posting_keys(profile):
+                posting = self._postings.get(key)
+                if posting is not None:
+                    posting.discard((source_id, column_name))
+                    if not posting:
+                        del self._postings[key]
+
+    def _sync(self):
+        """Pick up entries published by other processes and reconcile when due"""
+        try:
+            shared_version = cache.get(self.VERSION_KEY)
+            if shared_version is not None and shared_version != self._version:
+                manifest = cache.get(self.MANIFEST_KEY) or {}
+                with self._lock:
+                    # Local changes the shared index doesn't have yet win over it
+                    for source_id in [source_id for source_id in self._entries
+                                      if source_id not in manifest and source_id not in self._unpublished]:
+                        self._drop(source_id)
+                    changed = [
+                        source_id for source_id, signature in manifest.items()
+                        if source_id not in self._unpublished
+                        and self._entries.get(source_id, {}).get('signature') != signature
+                    ]
+                if changed:
+                    entries = cache.get_many([self.ENTRY_KEY.format(source_id) for source_id in changed])
+                    with self._lock:
+                        for source_id in changed:
+                            entry = entries.get(self.ENTRY_KEY.format(source_id))
+                            if entry is not None:
+                                self._put(source_id, entry)
+                self._version = shared_version
+        except Exception as e:
+            logger.debug(f"[COLUMN_INDEX] Shared index unavailable: {e}")
+
+        if self._unpublished:
+            # Don't hold up lookups waiting for the lock; the next one retries
+            self._publish({}, wait=False)
+
+        if time.time() - self._reconciled_at >= self.reconcile_interval:
+            self._reconcile()
+
+    def _reconcile(self):
+        """Bring the index in line with the active data sources, re-indexing only changed ones"""
+        self._reconciled_at = time.time()
+        try:
+            signatures = {
+                str(source_id): str(updated_at)
+                for source_id, updated_at in DataSource.objects.filter(status='active').values_list('id', 'updated_at')
+            }
+        except Exception as e:
+            logger.warning(f"[COLUMN_INDEX] Reconcile failed: {e}")
+            return
+
+        with self._lock:
+            removed = [source_id for source_id in self._entries if source_id not in signatures]
+            for source_id in removed:
+                self._drop(source_id)
+            stale = [
+                source_id for source_id, signature in signatures.items()
+                if self._entries.get(source_id, {}).get('signature') != signature
+            ]
+
+        changed = {}
+        for data_source in DataSource.objects.filter(id__in=stale).only('id', 'name', 'schema_info', 'updated_at'):
+            changed[str(data_source.id)] = self._build_entry(data_source, self._entries.get(str(data_source.id)))
+
+        with self._lock:
+            for source_id, entry in changed.items():
+                self._put(source_id, entry)
+
+        if changed or removed:
+            logger.info(f"[COLUMN_INDEX] Reconciled: {len(changed)} indexed, {len(removed)} removed, {len(signatures)} total")
+            self._publish(changed, removed=removed)
+
+    def _publish(self, changed: Dict[str, Dict[str, Any]], removed: Optional[List[str]] = None, wait: bool = True):
+        """Share changed entries with other processes and bump the index version"""
+        with self._lock:
+            self._unpublished.update(changed)
+            for source_id in removed or []:
+                self._unpublished[source_id] = None
+            pending = dict(self._unpublished)
+        if not pending:
+            return
+
+        if not self._acquire_shared_lock(self.LOCK_WAIT if wait else 0):
+            logger.debug(f"[COLUMN_INDEX] Shared index busy, {len(pending)} changes left for the next lookup")
+            return
+        try:
+            written = {source_id: entry for source_id, entry in pending.items() if entry is not None}
+            dropped = [source_id for source_id, entry in pending.items() if entry is None]
+            if written:
+                cache.set_many({self.ENTRY_KEY.format(source_id): entry for source_id, entry in written.items()}, timeout=None)
+            if dropped:
+                cache.delete_many([self.ENTRY_KEY.format(source_id) for source_id in dropped])
+
+            manifest = cache.get(self.MANIFEST_KEY) or {}
+            for source_id, entry in written.items():
+                manifest[source_id] = entry['signature']
+            for source_id in dropped:
+                manifest.pop(source_id, None)
+            cache.set(self.MANIFEST_KEY, manifest, timeout=None)
+
+            # Atomic bump so concurrent publishers never hand out the same version
+            cache.add(self.VERSION_KEY, 0, timeout=None)
+            version = cache.incr(self.VERSION_KEY)
+            with self._lock:
+                for source_id, entry in pending.items():
+                    if self._unpublished.get(source_id, False) is entry:
+                        del self._unpublished[source_id]
+                # Another process published in between: leave the version stale so the next lookup reloads
+                if version == (self._version or 0) + 1:
+                    self._version = version
+        except Exception as e:
+            logger.debug(f"[COLUMN_INDEX] Could not publish index changes: {e}")
+        finally:
+            cache.delete(self.LOCK_KEY)
+
+    def _acquire_shared_lock(self, wait: float) -> bool:
+        """Take the cross-process index lock, waiting up to ``wait`` seconds for another publisher"""
+        deadline = time.time() + wait
+        while True:
+            try:
+                if cache.add(self.LOCK_KEY, 1, timeout=self.LOCK_TIMEOUT):
+                    return True
+            except Exception as e:
+                logger.debug(f"[COLUMN_INDEX] Shared index unavailable: {e}")
+                return False
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.01)
+
+
+# Global instance
+column_index_service = ColumnIndexService()
@@ -0,0 +1,210 @@
+"""
+CSV Ingestion Service for ConvaBI Application
+Streams CSV files straight into the integrated DuckDB database
+"""
+
+import os
+import logging
+import tempfile
+from typing import Dict, Any, Tuple
+
+from django.conf import settings
+
+from services.enhanced_csv_processor import EnhancedCSVProcessor
+from utils.duckdb_manager import duckdb_manager
+from utils.data_catalog import data_catalog
+
+logger = logging.getLogger(__name__)
+
+# Encodings DuckDB's CSV reader consumes without transcoding
+_NATIVE_ENCODINGS = {'utf-8', 'utf-8-sig', 'ascii'}
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class EmptyCSVError(ValueError):
+    """Raised when a CSV file has a header but no rows"""
+
+
+class CSVIngestionService:
+    """
+    Single-pass CSV ingestion pipeline.
+
+    Encoding and dialect are sniffed once from a byte sample, then DuckDB's
+    native CSV reader streams the file into the target table, so memory use
+    does not depend on file size. Files in encodings DuckDB cannot read are
+    transcoded to UTF-8 in fixed-size chunks first.
+    """
+
+    def __init__(self):
+        self.processor = EnhancedCSVProcessor()
+        self.type_sample_rows = getattr(settings, 'CSV_TYPE_SAMPLE_ROWS', 100000)
+        self.transcode_chunk_chars = getattr(settings, 'CSV_TRANSCODE_CHUNK_CHARS', 4 * 1024 * 1024)
+
+    def ingest_to_duckdb(self, file_path: str, table_name: str, mode: str = 'full') -> Dict[str, Any]:
+        """
+        Load a CSV file into an integrated DuckDB table
+
+        Args:
+            file_path: Path to the CSV file
+            table_name: Target table name
+            mode: 'full' replaces the table, 'incremental' appends (falls back to full for new tables)
+
+        Returns:
+            Dictionary with rows, mode, encoding, delimiter and file_size
+        """
+        dialect = self.processor.sniff_csv_dialect(file_path)
+        logger.info(
+            f"Ingesting CSV {file_path} into {table_name} "
+            f"(encoding: {dialect['encoding']}, delimiter: {repr(dialect['delimiter'])}, mode: {mode})"
+        )
+
+        encoding = dialect['encoding']
+        sample_size = self.type_sample_rows
+        while True:
+            temp_path = None
+            try:
+                source_path = file_path
+                if encoding not in _NATIVE_ENCODINGS:
+                    temp_path = self._transcode_to_utf8(file_path, encoding)
+                    source_path = temp_path
+
+                with duckdb_manager.session():
+                    applied_mode, rows = self._load(source_path, table_name, dialect, mode, sample_size)
+                    data_catalog.refresh_table(table_name)
+
+                return {
+                    'rows': rows,
+                    'mode': applied_mode,
+                    'encoding': encoding,
+                    'delimiter': dialect['delimiter'],
+                    'file_size': os.path.getsize(file_path),
+                }
+
+            except EmptyCSVError:
+                raise
+            except Exception as e:
+                message = str(e).lower()
+                logger.warning(f"CSV ingestion attempt failed (encoding: {encoding}, sample_size: {sample_size}): {e}")
+                if encoding in _NATIVE_ENCODINGS and ('unicode' in message or 'utf' in message or 'encoding' in message):
+                    # Invalid bytes past the sniffed sample - transcode from a single-byte encoding
+                    encoding = 'cp1252'
+                elif sample_size != -1:
+                    # Types that only show up past the sample - sniff types over the whole file
+                    sample_size = -1
+                else:
+                    raise Exception(f"Failed to ingest CSV file {file_path}: {e}")
+            finally:
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def build_schema_info(self, table_name: str, sample_rows: int = 50) -> Dict[str, Any]:
+        """Summarise an integrated table's columns with aggregate SQL instead of loading it"""
+        table = _quote_identifier(table_name)
+        with duckdb_manager.session() as conn:
+            schema = conn.execute(f"DESCRIBE {table}").fetchall()
+
+            aggregates = ', '.join(
+                f"COUNT(*) - COUNT({_quote_identifier(row[0])}), approx_count_distinct({_quote_identifier(row[0])})"
+                for row in schema
+            )
+            stats = conn.execute(f"SELECT COUNT(*){', ' + aggregates if aggregates else ''} FROM {table}").fetchone()
+            sample = conn.execute(f"SELECT * FROM {table} LIMIT {int(sample_rows)}").fetchall()
+
+        columns = []
+        for index, row in enumerate(schema):
+            null_count = stats[1 + index * 2]
+            distinct_count = stats[2 + index * 2]
+
+            sample_values = []
+            for sample_row in sample:
+                value = sample_row[index]
+                if value is None:
+                    continue
+                sample_values.append(value if isinstance(value, (int, float, str, bool)) else str(value))
+                if len(sample_values) >= 3:
+                    break
+
+            columns.append({
+                'name': str(row[0]),
+                'type': str(row[1]),
+                'nullable': bool(null_count),
+                'unique_values': int(distinct_count) if distinct_count < 1000 else 1000,
+                'sample_values': sample_values,
+            })
+
+        return {'columns': columns, 'row_count': int(stats[0])}
+
+    def _load(self, source_path: str, table_name: str, dialect: Dict[str, Any],
+              mode: str, sample_size: int) -> Tuple[str, int]:
+        """Stream the CSV into DuckDB inside one transaction"""
+        quotechar = dialect.get('quotechar') or '"'
+        header = 'true' if dialect.get('has_header', True) else 'false'
+        # read_csv_auto keeps column and type detection on while the sniffed dialect is pinned
+        read_expr = (
+            f"read_csv_auto({_sql_literal(source_path)}, "
+            f"delim={_sql_literal(dialect['delimiter'])}, "
+            f"quote={_sql_literal(quotechar)}, "
+            f"header={header}, sample_size={int(sample_size)})"
+        )
+        table = _quote_identifier(table_name)
+
+        with duckdb_manager.writer() as conn:
+            table_exists = conn.execute(
+                "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
+                [table_name]
+            ).fetchone()[0] > 0
+            if mode == 'incremental' and not table_exists:
+                logger.info(f"Table {table_name} doesn't exist, treating incremental as full refresh")
+                mode = 'full'
+
+            conn.begin()
+            try:
+                if mode == 'incremental':
+                    rows = conn.execute(f"INSERT INTO {table} BY NAME SELECT * FROM {read_expr}").fetchone()[0]
+                else:
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                    conn.execute(f"CREATE TABLE {table} AS SELECT * FROM {read_expr}")
+                    rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+                if rows == 0 and mode == 'full':
+                    raise EmptyCSVError(f"CSV file is empty: {source_path}")
+
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        logger.info(f"Loaded {rows} rows into {table_name} ({mode})")
+        return mode, int(rows)
+
+    def _transcode_to_utf8(self, file_path: str, encoding: str) -> str:
+        """Re-encode a file to UTF-8 in fixed-size chunks so memory stays bounded"""
+        temp_dir = getattr(settings, 'CSV_INGEST_TEMP_DIR', None)
+        fd, temp_path = tempfile.mkstemp(suffix='.csv', dir=temp_dir)
+        try:
+            with open(file_path, 'r', encoding=encoding, errors='replace', newline='') as source, \
+                    os.fdopen(fd, 'w', encoding='utf-8', newline='') as target:
+                first_chunk = True
+                while True:
+                    chunk = source.read(self.transcode_chunk_chars)
+                    if not chunk:
+                        break
+                    if first_chunk:
+                        chunk = chunk.lstrip('\ufeff')
+                        first_chunk = False
+                    target.write(chunk)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return temp_path
+
+
+# Global instance
+csv_ingestion_service = CSVIngestionService()
@@ -0,0 +1,528 @@
+"""
+Dashboard Data Service for ConvaBI Application
+Loads the data behind dashboard items, one tile at a time or a whole dashboard in one batch
+"""
+
+import re
+import json
+import uuid
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from django.conf import settings
+from django.db import connection, models
+from django.utils import timezone
+
+from utils.duckdb_manager import duckdb_manager
+from utils.result_store import result_store
+
+logger = logging.getLogger(__name__)
+
+_QUOTED_IDENTIFIER = re.compile(r'"([^"]+)"')
+_BARE_IDENTIFIER = re.compile(r'\b(\w+)\b')
+_LEADING_WITH = re.compile(r'^\s*WITH\s+(RECURSIVE\s+)?', re.IGNORECASE)
+_QUALIFIER = r'(?:"(?:[^"]|"")+"|[A-Za-z_]\w*)\s*\.\s*'
+
+
+def _normalize_column(name: str) -> str:
+    return str(name).lower().replace(' ', '_')
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class DashboardDataService:
+    """
+    Resolves and loads dashboard item data.
+
+    Items keep a compiled plan: the SQL rewritten for their integrated DuckDB
+    table, the table itself and the dashboard filters bound to its columns.
+    Refreshing an item runs that plan directly, so the SQL is stable and no
+    LLM call is made. Items saved before plans existed are compiled once
+    through the LLM, after which their plan is stored.
+
+    Item results live in the result store; the item keeps the reference, the
+    row count and a preview. Stored results are served from there unless a
+    refresh or a filter is requested, reading only the requested columns and
+    page. Pending items run concurrently on a bounded thread pool. Every
+    payload carries an ETag so clients can skip tiles that have not changed
+    since they last rendered them.
+    """
+
+    PLAN_FIELDS = ['sql_query', 'target_table', 'query_params', 'data_source']
+    RESULT_FIELDS = ['result_ref', 'result_row_count', 'result_preview', 'computed_at', 'data_version']
+
+    def __init__(self):
+        self.max_workers = getattr(settings, 'DASHBOARD_DATA_MAX_WORKERS', 4)
+        self._data_service = None
+
+    @property
+    def data_service(self):
+        if self._data_service is None:
+            from services.data_service import DataService
+            self._data_service = DataService()
+        return self._data_service
+
+    def item_etag(self, item, view: str = '') -> str:
+        """Quoted ETag for an item's stored payload, per column projection and page"""
+        updated_at = item.updated_at.isoformat() if item.updated_at else ''
+        return '"' + hashlib.sha1(f"{item.id}:{updated_at}:{view}".encode()).hexdigest()[:24] + '"'
+
+    def store_result(self, item, records: List[Dict[str, Any]]) -> str:
+        """
+        Write a result set to the result store and point the item at it (the caller saves the item)
+
+        Returns:
+            The reference the item held before, to delete once the item is saved
+        """
+        previous_ref = item.result_ref
+        stored = result_store.put(records)
+        item.result_ref = stored['ref']
+        item.result_row_count = stored['row_count']
+        item.result_preview = stored['preview']
+        return previous_ref
+
+    def has_plan(self, item) -> bool:
+        return bool(item.sql_query and item.target_table)
+
+    def get_items_data(self, items: Iterable, user, known_etags: Optional[Iterable[str]] = None,
+                       filters: Optional[Dict[str, Any]] = None, force_refresh: bool = False,
+                       columns: Optional[List[str]] = None, offset: int = 0,
+                       limit: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Load data for dashboard items
+
+        Args:
+            items: DashboardItem instances
+            user: Requesting user, whose data sources are searched for items without a plan
+            known_etags: ETags the client already holds; matching items are returned as not modified
+            filters: Dashboard filter values by filter name, applied to items that bind the filter
+            force_refresh: Re-run item queries even when result data is stored
+            columns: Columns to return (all when empty)
+            offset: Rows to skip
+            limit: Maximum rows to return (all when None)
+
+        Returns:
+            Dictionary of item id -> payload. Every payload has 'success' and an HTTP-style 'status'.
+        """
+        known_etags = set(known_etags or [])
+        page = {'columns': list(columns or []), 'offset': max(0, int(offset or 0)), 'limit': limit}
+        payloads = {}
+        pending = []
+
+        for item in items:
+            item_id = str(item.id)
+            bindings = self._bind_filters(item, filters)
+            if item.result_ref and not bindings and not force_refresh:
+                etag = self.item_etag(item, self._view_key(page))
+                if etag in known_etags:
+                    payloads[item_id] = self._not_modified(etag)
+                    continue
+                try:
+                    rows = self._read_stored(item, page)
+                except FileNotFoundError:
+                    logger.warning(f"Stored result {item.result_ref} of dashboard item {item_id} is missing, re-running it")
+                else:
+                    payloads[item_id] = self._item_payload(item, rows, 'cached', etag, offset=page['offset'])
+                    continue
+
+            if self.has_plan(item) or item.query:
+                pending.append((item, bindings))
+            else:
+                logger.warning(f"No query found for dashboard item {item_id}")
+                payloads[item_id] = {
+                    'success': False,
+                    'error': 'No data available',
+                    'details': 'This dashboard item has no stored data and no query to execute',
+                    'status': 400,
+                }
+
+        if pending:
+            payloads.update(self._execute_items(pending, user, known_etags, page))
+
+        return payloads
+
+    def compile_plan(self, item, data_source, generated_sql: str) -> bool:
+        """Set an item's plan from generated SQL and its data source (the caller saves the item)"""
+        from datasets.data_access_layer import unified_data_access
+
+        table_name = unified_data_access.get_integrated_table_name(data_source)
+        if not table_name:
+            logger.info(f"Data source {data_source.name} has no integrated table, item {item.id} stays uncompiled")
+            return False
+
+        compiled_sql = self.data_service.compile_integrated_query(generated_sql, table_name)
+        if not compiled_sql:
+            logger.warning(f"Generated SQL for item {item.id} is not a single SELECT, item stays uncompiled")
+            return False
+
+        item.sql_query = compiled_sql
+        item.target_table = table_name
+        item.data_source = str(data_source.id)
+        item.query_params = self._filter_bindings(item, table_name)
+        logger.info(f"Compiled dashboard item {item.id} against {table_name} with {len(item.query_params)} filter bindings")
+        return True
+
+    def capture_plan(self, item, user) -> bool:
+        """Compile a new item from the logged SQL of the query it was saved from"""
+        from core.models import QueryLog
+        from datasets.models import DataSource
+
+        if not item.query:
+            return False
+
+        query_log = QueryLog.objects.filter(
+            user=user, natural_query=item.query, status='completed'
+        ).order_by('-created_at').first()
+        if not query_log:
+            return False
+
+        generated_sql = query_log.final_sql or query_log.generated_sql
+        query_results = query_log.query_results if isinstance(query_log.query_results, dict) else {}
+        source_name = query_results.get('data_source_name')
+        if not generated_sql or not source_name:
+            return False
+
+        data_source = DataSource.objects.filter(
+            models.Q(created_by=user) | models.Q(shared_with_users=user),
+            name=source_name, status='active'
+        ).first()
+        if not data_source or not self.compile_plan(item, data_source, generated_sql):
+            return False
+
+        update_fields = list(self.PLAN_FIELDS)
+        if item.result_ref:
+            # The stored result came from the query that was just run
+            item.computed_at = timezone.now()
+            item.data_version = data_source.data_version
+            update_fields.extend(['computed_at', 'data_version'])
+        item.save(update_fields=update_fields + ['updated_at'])
+        return True
+
+    def _not_modified(self, etag: str) -> Dict[str, Any]:
+        return {'success': True, 'not_modified': True, 'etag': etag, 'status': 304}
+
+    def _view_key(self, page: Dict[str, Any]) -> str:
+        if not page['columns'] and not page['offset'] and page['limit'] is None:
+            return ''
+        return json.dumps(page, sort_keys=True)
+
+    def _read_stored(self, item, page: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Rows of an item's stored result, from its preview when that holds the whole page"""
+        preview = item.result_preview if isinstance(item.result_preview, list) else []
+        end = item.result_row_count if page['limit'] is None else min(item.result_row_count, page['offset'] + page['limit'])
+        if end <= len(preview):
+            return self._page_records(preview, page)
+        return result_store.read(item.result_ref, page['columns'], page['offset'], page['limit'])
+
+    def _page_records(self, records: List[Dict[str, Any]], page: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Apply a column projection and page to in-memory records"""
+        end = None if page['limit'] is None else page['offset'] + max(0, int(page['limit']))
+        records = records[page['offset']:end]
+        if page['columns']:
+            records = [{column: row[column] for column in page['columns'] if column in row} for row in records]
+        return records
+
+    def _item_payload(self, item, result_data: List[Dict[str, Any]], data_source: str, etag: str,
+                      **extra) -> Dict[str, Any]:
+        payload = {
+            'success': True,
+            'result_data': result_data,
+            'chart_type': item.chart_type,
+            'title': item.title,
+            'data_source': data_source,
+            'row_count': item.result_row_count,
+            'computed_at': item.computed_at.isoformat() if item.computed_at else None,
+            'data_version': item.data_version,
+            'etag': etag,
+            'status': 200,
+        }
+        payload.update(extra)
+        return payload
+
+    def _execute_items(self, pending: List[Tuple[Any, Dict[str, Any]]], user, known_etags: set,
+                       page: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Resolve data sources once for uncompiled items, then run every item on a bounded pool"""
+        payloads = {}
+        targets = {}
+
+        uncompiled = [item for item, _ in pending if not self.has_plan(item)]
+        if uncompiled:
+            targets = self._resolve_data_sources(uncompiled, user)
+            if not targets:
+                logger.error(f"No active data sources found for user {user.id}")
+                for item in uncompiled:
+                    payloads[str(item.id)] = {
+                        'success': False,
+                        'error': 'No active data sources available',
+                        'details': 'You need to upload and activate a data source first',
+                        'status': 404,
+                    }
+                pending = [(item, bindings) for item, bindings in pending if self.has_plan(item)]
+                if not pending:
+                    return payloads
+
+        # Read data versions before the queries run so a concurrent ETL is never stamped as seen
+        versions = self.data_versions([item for item, _ in pending if self.has_plan(item)])
+
+        workers = max(1, min(int(self.max_workers or 1), len(pending)))
+        logger.info(f"Executing {len(pending)} dashboard item queries with {workers} workers")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dashboard-data') as executor:
+            futures = [
+                (item, bindings, executor.submit(self._execute_item, item, bindings, targets.get(item.id), user))
+                for item, bindings in pending
+            ]
+            results = [(item, bindings, future.result()) for item, bindings, future in futures]
+
+        versions.update(self.data_versions([item for item, _, result in results if result['compiled']]))
+
+        for item, bindings, result in results:
+            item_id = str(item.id)
+            if not result['success']:
+                logger.error(f"Query execution failed for dashboard item {item_id}: {result['error']}")
+                payloads[item_id] = {
+                    'success': False,
+                    'error': 'Query execution failed',
+                    'details': result['error'],
+                    'status': 400,
+                }
+                continue
+            # An empty result is a valid answer (e.g. a filter that matches nothing)
+            result['result_data'] = result['result_data'] or []
+
+            # Store the plan and unfiltered data on the item for future use
+            update_fields = list(self.PLAN_FIELDS) if result['compiled'] else []
+            previous_ref = None
+            if not bindings:
+                try:
+                    previous_ref = self.store_result(item, result['result_data'])
+                    item.computed_at = timezone.now()
+                    item.data_version = versions.get(self.source_key(item))
+                    update_fields.extend(self.RESULT_FIELDS)
+                except Exception as store_error:
+                    logger.warning(f"Failed to store result of dashboard item {item_id}: {store_error}")
+            if update_fields:
+                try:
+                    item.save(update_fields=update_fields + ['updated_at'])
+                    logger.info(f"Stored {', '.join(update_fields)} for dashboard item {item_id}")
+                    result_store.delete(previous_ref)
+                except Exception as save_error:
+                    logger.warning(f"Failed to store data for dashboard item {item_id}: {save_error}")
+
+            rows = self._page_records(result['result_data'], page)
+            if bindings:
+                # Filtered payloads are identified by their content
+                etag = '"' + hashlib.sha1(
+                    json.dumps(rows, sort_keys=True, default=str).encode()
+                ).hexdigest()[:24] + '"'
+            else:
+                etag = self.item_etag(item, self._view_key(page))
+
+            if etag in known_etags:
+                payloads[item_id] = self._not_modified(etag)
+                continue
+
+            extra = {'row_count': result['row_count'], 'offset': page['offset'], 'sql_query': result['sql_query']}
+            if bindings:
+                extra['computed_at'] = timezone.now().isoformat()
+            payloads[item_id] = self._item_payload(item, rows, result['data_source'], etag, **extra)
+
+        return payloads
+
+    def source_key(self, item) -> Optional[str]:
+        """Normalised id of the data source an item reads, if it is known"""
+        try:
+            return str(uuid.UUID(str(item.data_source)))
+        except ValueError:
+            return None
+
+    def data_versions(self, items: Iterable) -> Dict[str, int]:
+        """Current data version of each item's data source, by source key"""
+        source_keys = {self.source_key(item) for item in items} - {None}
+        if not source_keys:
+            return {}
+
+        from datasets.models import DataSource
+        return {
+            str(pk): version
+            for pk, version in DataSource.objects.filter(id__in=source_keys).values_list('id', 'data_version')
+        }
+
+    def _resolve_data_sources(self, items: List, user) -> Dict[Any, Any]:
+        """Match items to the user's active data sources, normalising each source's columns once"""
+        from datasets.models import DataSource
+
+        data_sources = list(
+            DataSource.objects.filter(
+                models.Q(created_by=user) | models.Q(shared_with_users=user)
+            ).filter(status='active').distinct()
+        )
+        if not data_sources:
+            return {}
+
+        source_columns = [
+            (ds, {_normalize_column(col) for col in (ds.schema_info or {}).get('columns', {})})
+            for ds in data_sources if ds.source_type == 'csv' and ds.schema_info
+        ]
+        return {item.id: self._match_data_source(item, source_columns, data_sources[0]) for item in items}
+
+    def _match_data_source(self, item, source_columns: List[Tuple[Any, set]], default):
+        """Pick the data source whose columns the item's query references, else the default"""
+        query_columns = set(_QUOTED_IDENTIFIER.findall(item.query))
+        query_columns.update(_BARE_IDENTIFIER.findall(item.query.replace('"', '')))
+        query_columns = {_normalize_column(col) for col in query_columns}
+
+        for data_source, columns in source_columns:
+            if columns & query_columns:
+                logger.info(f"Found data source by column overlap for item {item.id}: {data_source.name}")
+                return data_source
+
+        logger.info(f"Using first available data source for item {item.id}: {default.name}")
+        return default
+
+    def _execute_item(self, item, bindings: Dict[str, Any], data_source, user) -> Dict[str, Any]:
+        """Run one item in a worker thread: its stored plan, or a one-off LLM compile"""
+        result = {
+            'success': False, 'result_data': None, 'sql_query': item.sql_query or None,
+            'error': None, 'row_count': 0, 'compiled': False, 'data_source': item.target_table,
+        }
+        try:
+            if not self.has_plan(item):
+                # Import here to avoid circular imports
+                from core.views import execute_query_logic
+
+                logger.info(f"Compiling dashboard item {item.id} through the LLM: {item.query[:100]}...")
+                success, result_data, sql_query, error_message, row_count = execute_query_logic(
+                    item.query, user, data_source
+                )
+                result.update({
+                    'success': success, 'result_data': self._as_records(result_data), 'sql_query': sql_query,
+                    'error': error_message, 'row_count': row_count, 'data_source': data_source.name,
+                })
+                if not success:
+                    return result
+
+                result['compiled'] = self.compile_plan(item, data_source, sql_query)
+                if not (result['compiled'] and bindings):
+                    return result
+
+            frame = self._run_plan(item, bindings)
+            result_data = frame.astype(object).where(frame.notna(), None).to_dict('records')
+            result.update({
+                'success': True, 'result_data': result_data, 'sql_query': item.sql_query,
+                'error': None, 'row_count': len(result_data),
+            })
+            return result
+
+        except Exception as e:
+            logger.error(f"Query execution error for dashboard item {item.id}: {e}")
+            result.update({'success': False, 'error': str(e)})
+            return result
+        finally:
+            # Worker threads own their Django and DuckDB connections
+            connection.close()
+            try:
+                duckdb_manager.release_cursor()
+            except Exception as duck_error:
+                logger.warning(f"Error releasing DuckDB cursor: {duck_error}")
+
+    def _run_plan(self, item, bindings: Dict[str, Any]):
+        """Execute an item's compiled SQL on DuckDB with dashboard filters bound as parameters"""
+        sql, params = self._bind_sql(item.sql_query, item.target_table, bindings)
+        logger.info(f"Running compiled plan for dashboard item {item.id} on {item.target_table} ({len(params)} parameters)")
+        with duckdb_manager.session() as conn:
+            return conn.execute(sql, params).fetchdf()
+
+    def _bind_sql(self, sql: str, table_name: str, bindings: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """
+        Apply filter bindings by shadowing the target table with a filtered CTE of the same name,
+        so the compiled SQL itself never changes (qualified references such as main.<table> are
+        pointed at the CTE)
+        """
+        if not bindings:
+            return sql, []
+
+        conditions = []
+        params = []
+        for column, value in bindings.items():
+            quoted = _quote_identifier(column)
+            if isinstance(value, (list, tuple)):
+                conditions.append(f"{quoted} IN ({', '.join('?' for _ in value)})")
+                params.extend(value)
+            elif isinstance(value, dict):
+                low = value.get('min', value.get('start'))
+                high = value.get('max', value.get('end'))
+                if low not in (None, ''):
+                    conditions.append(f"{quoted} >= ?")
+                    params.append(low)
+                if high not in (None, ''):
+                    conditions.append(f"{quoted} <= ?")
+                    params.append(high)
+            else:
+                conditions.append(f"{quoted} = ?")
+                params.append(value)
+
+        if not conditions:
+            return sql, []
+
+        table = _quote_identifier(table_name)
+        filtered = f"{table} AS (SELECT * FROM main.{table} WHERE {' AND '.join(conditions)})"
+        # Schema- or catalog-qualified references would bypass the CTE, so point them at it
+        qualified = re.compile(
+            rf'(?:{_QUALIFIER})+(?:{re.escape(table)}|\b{re.escape(table_name)}\b(?!"))', re.IGNORECASE
+        )
+        statement = qualified.sub(lambda _: table, sql.strip().rstrip(';'))
+        leading_with = _LEADING_WITH.match(statement)
+        if leading_with:
+            recursive = 'RECURSIVE ' if leading_with.group(1) else ''
+            return f"WITH {recursive}{filtered}, {statement[leading_with.end():]}", params
+        return f"WITH {filtered} {statement}", params
+
+    def _bind_filters(self, item, filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Column -> value for the dashboard filters this item binds and the request sets"""
+        if not filters or not self.has_plan(item):
+            return {}
+        return {
+            column: filters[name]
+            for name, column in sorted((item.query_params or {}).items())
+            if filters.get(name) not in (None, '', [], {})
+        }
+
+    def _filter_bindings(self, item, table_name: str) -> Dict[str, str]:
+        """Bind the dashboard filters that apply to an item to columns of its target table"""
+        from dashboards.models import DashboardFilter
+        from utils.data_catalog import data_catalog
+
+        table = data_catalog.get_table(table_name) or {}
+        columns = {_normalize_column(column): column for column in table.get('columns', [])}
+        dashboard_filters = DashboardFilter.objects.filter(
+            models.Q(is_global=True) | models.Q(target_items=item),
+            dashboard_id=item.dashboard_id
+        ).distinct()
+
+        bindings = {}
+        for dashboard_filter in dashboard_filters:
+            column = columns.get(_normalize_column(dashboard_filter.column_reference))
+            if column:
+                bindings[dashboard_filter.name] = column
+        return bindings
+
+    def _as_records(self, result_data):
+        """Convert row tuples to a list of dictionaries"""
+        if not isinstance(result_data, list) or not result_data or isinstance(result_data[0], dict):
+            return result_data
+
+        columns = getattr(result_data, 'columns', [])
+        if not columns:
+            # Generate generic column names
+            num_cols = len(result_data[0]) if hasattr(result_data[0], '__len__') else 1
+            columns = [f'Column_{i+1}' for i in range(num_cols)]
+        return [dict(zip(columns, row)) for row in result_data]
+
+
+# Global instance
+dashboard_data_service = DashboardDataService()
@@ -7,7 +7,6 @@ Uses Playwright for PNG screenshots and WeasyPrint for PDF generation.
 """
 
 import os
-import json
 import logging
 import tempfile
 from datetime import datetime
@@ -18,6 +17,9 @@ from django.conf import settings
 from django.template.loader import render_to_string
 from django.template import Template, Context
 
+from services.dashboard_data_service import dashboard_data_service
+from utils.export_cache import export_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +28,7 @@ class DashboardExportService:
     
     def __init__(self):
         self.temp_dir = tempfile.gettempdir()
+        self.max_rows_per_item = getattr(settings, 'EXPORT_MAX_ROWS_PER_ITEM', 500)
     
     def export_dashboard_png(self, dashboard) -> Tuple[bytes, str]:
         """
@@ -71,30 +74,36 @@ class DashboardExportService:
         try:
             from playwright.sync_api import sync_playwright
             
-            # Generate HTML content
-            html_content = self._generate_dashboard_html_with_data(dashboard, for_export=True)
+            def render():
+                # Generate HTML content
+                html_content = self._generate_dashboard_html_with_data(dashboard, for_export=True)
             
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                page = browser.new_page(
-                    viewport={'width': 1200, 'height': 800},
-                    device_scale_factor=2  # High DPI
-                )
-                
-                # Set content and wait for rendering
-                page.set_content(html_content, wait_until='networkidle')
+                with sync_playwright() as p:
+                    browser = p.chromium.launch(headless=True)
+                    page = browser.new_page(
+                        viewport={'width': 1200, 'height': 800},
+                        device_scale_factor=2  # High DPI
+                    )
                 
-                # Take screenshot
-                screenshot_bytes = page.screenshot(
-                    type=format_type,
-                    full_page=True,
-                    quality=95 if format_type == 'jpeg' else None
-                )
+                    # Set content and wait for rendering
+                    page.set_content(html_content, wait_until='networkidle')
                 
-                browser.close()
+                    # Take screenshot
+                    screenshot_bytes = page.screenshot(
+                        type=format_type,
+                        full_page=True,
+                        quality=95 if format_type == 'jpeg' else None
+                    )
                 
-                filename = f"dashboard_{dashboard.name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format_type}"
-                return screenshot_bytes, filename
+                    browser.close()
+                    return screenshot_bytes
+            
+            screenshot_bytes = export_cache.get_or_render(
+                export_cache.dashboard_key(dashboard, f'playwright.{format_type}'), render
+            )
+            
+            filename = f"dashboard_{dashboard.name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format_type}"
+            return screenshot_bytes, filename
                 
         except Exception as e:
             logger.error(f"Playwright export failed: {e}")
@@ -105,16 +114,19 @@ class DashboardExportService:
         try:
             import weasyprint
             
-            # Generate enhanced HTML content with proper chart data
-            html_content = self._generate_dashboard_html_with_data(dashboard, for_pdf=True)
+            def render():
+                # Generate enhanced HTML content with proper chart data
+                html_content = self._generate_dashboard_html_with_data(dashboard, for_pdf=True)
+                
+                # Generate PDF with better configuration
+                html_doc = weasyprint.HTML(string=html_content, base_url=settings.BASE_DIR)
+                return html_doc.write_pdf(
+                    optimize_images=True,
+                    pdf_version='1.7',
+                    pdf_forms=False
+                )
             
-            # Generate PDF with better configuration
-            html_doc = weasyprint.HTML(string=html_content, base_url=settings.BASE_DIR)
-            pdf_bytes = html_doc.write_pdf(
-                optimize_images=True,
-                pdf_version='1.7',
-                pdf_forms=False
-            )
+            pdf_bytes = export_cache.get_or_render(export_cache.dashboard_key(dashboard, 'weasyprint.pdf'), render)
             
             filename = f"dashboard_{dashboard.name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
             return pdf_bytes, filename
@@ -218,22 +230,26 @@ class DashboardExportService:
             return b'', 'dashboard_export_failed.pdf'
     
     def _get_dashboard_data(self, dashboard):
-        """Get dashboard data with proper error handling"""
-        items_data = []
+        """
+        Get dashboard data for export through the shared item-data service.
+        All items are loaded in one batch: stored results are read from the result
+        store and the rest run concurrently. Each item is capped at
+        EXPORT_MAX_ROWS_PER_ITEM rows, so only those rows are ever read.
+        """
+        items = list(dashboard.items.all())
+        try:
+            payloads = dashboard_data_service.get_items_data(items, dashboard.owner, limit=self.max_rows_per_item)
+        except Exception as e:
+            logger.error(f"Could not fetch data for dashboard {dashboard.id}: {e}")
+            payloads = {}
         
-        for item in dashboard.items.all():
-            try:
-                # Try to get real data for this item
-                result_data = self._fetch_item_data(item, dashboard.owner)
-            except Exception as e:
-                logger.warning(f"Could not fetch data for item {item.id}: {e}")
-                # Use sample data as fallback
-                result_data = [
-                    {'Category': 'Sample A', 'Value': 100},
-                    {'Category': 'Sample B', 'Value': 80},
-                    {'Category': 'Sample C', 'Value': 60}
-                ]
+        items_data = []
+        for item in items:
+            payload = payloads.get(str(item.id), {})
+            if not payload.get('success'):
+                logger.warning(f"Could not fetch data for item {item.id}: {payload.get('details') or payload.get('error')}")
             
+            result_data = payload.get('result_data') or []
             item_data = {
                 'id': str(item.id),
                 'title': item.title,
@@ -243,37 +259,14 @@ class DashboardExportService:
                 'width': item.width,
                 'height': item.height,
                 'query': item.query,
-                'data': result_data
+                'data': result_data,
+                'row_count': max(payload.get('row_count') or 0, len(result_data)),
+                'error': None if payload.get('success') else payload.get('error', 'No data available')
             }
             items_data.append(item_data)
         
         return items_data
     
-    def _fetch_item_data(self, item, user):
-        """Fetch data for a dashboard item"""
-        try:
-            from django.test import RequestFactory
-            from dashboards.views import dashboard_item_data
-            
-            # Create a mock request
-            factory = RequestFactory()
-            request = factory.get(f'/dashboards/api/dashboard-item/{item.id}/data/')
-            request.user = user
-            
-            # Get data response
-            response = dashboard_item_data(request, item.id)
-            
-            if response.status_code == 200:
-                import json
-                data = json.loads(response.content)
-                return data.get('result_data', [])
-            else:
-                return []
-                
-        except Exception as e:
-            logger.warning(f"Failed to fetch item data: {e}")
-            return []
-    
     def _generate_dashboard_html_with_data(self, dashboard, for_pdf=False, for_export=False) -> str:
         """Generate HTML content for dashboard export with actual data"""
         
@@ -422,12 +415,12 @@ class DashboardExportService:
                                 </tbody>
                             </table>
                             <p style="margin-top: 10px; font-size: 0.85rem; color: #666;">
-                                📈 {{ item.data|length }} record{{ item.data|length|pluralize }} displayed
+                                📈 {{ item.data|length }}{% if item.row_count > item.data|length %} of {{ item.row_count }}{% endif %} record{{ item.row_count|pluralize }} displayed
                             </p>
                         {% else %}
                             <div class="no-data">
                                 <strong>No data available</strong><br>
-                                <small>The query did not return any results</small>
+                                <small>{% if item.error %}{{ item.error }}{% else %}The query did not return any results{% endif %}</small>
                             </div>
                         {% endif %}
                     </div>
@@ -455,6 +448,10 @@ class DashboardExportService:
         
         return template.render(context)
     
-    def generate_email_html(self, dashboard) -> str:
-        """Generate HTML content for email"""
-        return self._generate_dashboard_html_with_data(dashboard, for_pdf=False, for_export=True) 
\ No newline at end of file
+    def generate_email_html(self, dashboard, export_format=None) -> str:
+        """Generate HTML content for email, rendered once per dashboard state and shared by every recipient"""
+        html_bytes = export_cache.get_or_render(
+            export_cache.dashboard_key(dashboard, 'email.html'),
+            lambda: self._generate_dashboard_html_with_data(dashboard, for_pdf=False, for_export=True).encode('utf-8')
+        )
+        return html_bytes.decode('utf-8') 
\ No newline at end of file
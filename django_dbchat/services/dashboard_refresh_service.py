@@ -0,0 +1,164 @@
+"""
+Dashboard Refresh Service for ConvaBI Application
+Precomputes dashboard item results in the background so viewers always get stored tiles
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, Any, List, Optional, Iterable
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from dashboards.models import DashboardItem
+from services.dashboard_data_service import dashboard_data_service
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardRefreshService:
+    """
+    Recomputes stored dashboard item results.
+
+    Only items with a compiled plan are refreshed, so no LLM call is ever
+    made in the background. An item is due when it has no stored result, or
+    when its data source's data version has moved past the version its result
+    was computed from and its refresh interval (the item's own, else the
+    dashboard's) has elapsed since ``computed_at``. Items whose data source is
+    unknown are recomputed on their interval alone. Due items are refreshed
+    per data source in batches of ``DASHBOARD_REFRESH_BATCH_SIZE``.
+
+    A failed refresh is recorded in the cache and the item is not retried
+    before ``DASHBOARD_REFRESH_RETRY_BACKOFF`` seconds, doubling with every
+    further failure up to ``DASHBOARD_REFRESH_MAX_BACKOFF``. Each item is
+    claimed with a ``cache.add`` lock before it is recomputed, so overlapping
+    runs (beat ticks and post-ETL refreshes) never compute the same item twice.
+    """
+
+    LOCK_KEY = 'dashboard_refresh:lock:{}'
+    FAILURE_KEY = 'dashboard_refresh:failure:{}'
+
+    def __init__(self):
+        self.batch_size = getattr(settings, 'DASHBOARD_REFRESH_BATCH_SIZE', 50)
+        self.retry_backoff = getattr(settings, 'DASHBOARD_REFRESH_RETRY_BACKOFF', 300)
+        self.max_backoff = getattr(settings, 'DASHBOARD_REFRESH_MAX_BACKOFF', 6 * 3600)
+        self.lock_timeout = getattr(settings, 'DASHBOARD_REFRESH_LOCK_TIMEOUT', 900)
+
+    def is_due(self, item, data_version: Optional[int], now, failure: Optional[Dict[str, Any]] = None) -> bool:
+        """Whether an item's stored result should be recomputed"""
+        if failure and now < failure['retry_at']:
+            return False
+
+        if not item.result_ref or item.computed_at is None:
+            return True
+
+        interval = item.refresh_interval or item.dashboard.refresh_interval
+        if interval > 0 and now - item.computed_at < timedelta(seconds=interval):
+            return False
+
+        if data_version is not None:
+            return item.data_version != data_version
+        return interval > 0
+
+    def refresh_due_items(self, data_source_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Recompute every due item, optionally only those reading the given data sources
+
+        Returns:
+            Dictionary with checked, due, refreshed and failed counts, and the number of due
+            items skipped because another run is refreshing them
+        """
+        items = DashboardItem.objects.select_related('dashboard__owner').exclude(sql_query='').exclude(target_table='')
+        if data_source_ids is not None:
+            items = items.filter(data_source__in=[str(source_id) for source_id in data_source_ids])
+        items = list(items)
+
+        versions = dashboard_data_service.data_versions(items)
+        failures = cache.get_many([self.FAILURE_KEY.format(item.id) for item in items])
+        now = timezone.now()
+        due = [
+            item for item in items
+            if self.is_due(item, versions.get(dashboard_data_service.source_key(item)), now,
+                           failures.get(self.FAILURE_KEY.format(item.id)))
+        ]
+
+        stats = {'checked': len(items), 'due': len(due), 'refreshed': 0, 'failed': 0, 'locked': 0}
+        claimed = [item for item in due if cache.add(self.LOCK_KEY.format(item.id), 1, timeout=self.lock_timeout)]
+        stats['locked'] = len(due) - len(claimed)
+        if not claimed:
+            return stats
+
+        try:
+            by_source: Dict[Optional[str], List] = {}
+            for item in claimed:
+                by_source.setdefault(dashboard_data_service.source_key(item) or item.target_table, []).append(item)
+
+            for source_key, source_items in by_source.items():
+                for start in range(0, len(source_items), self.batch_size):
+                    batch = source_items[start:start + self.batch_size]
+                    try:
+                        payloads = dashboard_data_service.get_items_data(batch, batch[0].dashboard.owner, force_refresh=True)
+                    except Exception as e:
+                        logger.error(f"[DASHBOARD_REFRESH] Refreshing items reading {source_key} failed: {e}", exc_info=True)
+                        payloads = {}
+                    failed = [item for item in batch if not payloads.get(str(item.id), {}).get('success')]
+                    self._record_results(batch, failed, failures)
+                    stats['refreshed'] += len(batch) - len(failed)
+                    stats['failed'] += len(failed)
+                    logger.info(f"[DASHBOARD_REFRESH] Refreshed {len(batch) - len(failed)}/{len(batch)} items reading {source_key}")
+        finally:
+            cache.delete_many([self.LOCK_KEY.format(item.id) for item in claimed])
+
+        logger.info(
+            f"[DASHBOARD_REFRESH] Checked {stats['checked']} items: {stats['due']} due, "
+            f"{stats['refreshed']} refreshed, {stats['failed']} failed, {stats['locked']} already being refreshed"
+        )
+        return stats
+
+    def _record_results(self, batch: List, failed: List, failures: Dict[str, Dict[str, Any]]):
+        """Clear the failure record of refreshed items and push back the next retry of failed ones"""
+        failed_ids = {item.id for item in failed}
+        cache.delete_many([
+            self.FAILURE_KEY.format(item.id) for item in batch
+            if item.id not in failed_ids and self.FAILURE_KEY.format(item.id) in failures
+        ])
+
+        now = timezone.now()
+        records = {}
+        for item in failed:
+            count = (failures.get(self.FAILURE_KEY.format(item.id)) or {}).get('count', 0) + 1
+            backoff = min(self.retry_backoff * 2 ** (count - 1), self.max_backoff)
+            records[self.FAILURE_KEY.format(item.id)] = {
+                'count': count, 'failed_at': now, 'retry_at': now + timedelta(seconds=backoff)
+            }
+            logger.warning(f"[DASHBOARD_REFRESH] Item {item.id} failed {count} time(s), next retry in {backoff}s")
+        if records:
+            cache.set_many(records, timeout=self.max_backoff * 2)
+
+
+@shared_task
+def refresh_dashboard_items(data_source_ids: Optional[List[str]] = None):
+    """
+    Celery task to recompute due dashboard items.
+    Runs periodically from beat, and after ETL jobs for the data sources they refreshed.
+    """
+    try:
+        stats = dashboard_refresh_service.refresh_due_items(data_source_ids)
+        return {'success': True, **stats}
+        
+    except Exception as e:
+        error_msg = f"Error refreshing dashboard items: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        return {
+            'success': False,
+            'error': error_msg
+        }
+    finally:
+        connection.close()
+
+
+# Global instance
+dashboard_refresh_service = DashboardRefreshService()
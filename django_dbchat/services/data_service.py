@@ -12,29 +12,47 @@ import logging
 import os
 import time
 import re
+import hashlib
 from typing import Dict, List, Any, Optional, Tuple
 from django.conf import settings
 from django.db import connections
-from django.core.cache import cache
 from core.models import QueryLog
 from datasets.models import DataSource
 from utils.type_helpers import (
     map_pandas_dtype_to_standard,
     infer_semantic_type_from_series,
     convert_object_columns_to_string,
-    get_column_type_info
+    get_column_type_info,
+    infer_and_convert_types
 )
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from django.utils import timezone
+from utils.duckdb_manager import duckdb_manager
+from utils.data_catalog import data_catalog
+from utils.result_cache import query_result_cache, connection_fingerprint
+from utils.performance import connection_pool_manager
+from services.streaming_extract_service import streaming_extract_service
 
 logger = logging.getLogger(__name__)
 
+# Table names in FROM/JOIN position; schema-qualified names and table functions are left alone
+_TABLE_REFERENCE = re.compile(r'\b(FROM|JOIN)(\s+)("([^"]+)"|([A-Za-z_]\w*))(?!\s*[.(])', re.IGNORECASE)
+_CTE_NAME = re.compile(r'(?:\bWITH(?:\s+RECURSIVE)?|,)\s*"?(\w+)"?\s+AS\s*\(', re.IGNORECASE)
+# Names generated queries use for "the data source's table"
+_PLACEHOLDER_TABLE = re.compile(
+    r'^(data|csv_data|main_table|ds_[0-9a-f_]{8,}|source_(id_)?[0-9a-f_]{8,}|etl_\w+_\d{8}_\d{6}_\w+)$',
+    re.IGNORECASE
+)
+
 class DataService:
     """
     Enhanced data execution service with connection pooling, caching, and security features
     """
     
+    # Connection types whose connections are pooled per database
+    POOLED_CONNECTION_TYPES = ('postgresql', 'mysql', 'oracle', 'sqlserver')
+    
     def __init__(self):
         self.connections_cache = {}
         self.connection_pools = {}
@@ -51,25 +69,39 @@ class DataService:
                 self.max_pool_size = 5
         except Exception as e:
             logger.warning(f"Failed to initialize connection pools: {e}")
+            self.max_pool_size = 5
+        
+        # Pools are shared by every DataService instance in the process
+        self.connection_pools = connection_pool_manager
     
     def get_connection(self, connection_info: Dict[str, Any]) -> Optional[Any]:
         """
         Get database connection with connection pooling and retry logic
+        
+        Remote database connections are checked out of a bounded per-database
+        pool; calling ``close()`` on them returns them to the pool.
         """
         connection_type = connection_info.get('type', 'postgresql')
         
-        # Create cache key for connection pooling
-        cache_key = self._create_connection_cache_key(connection_info)
-        
-        # Clear any existing cached connections to prevent engine/cursor errors
-        if cache_key in self.connections_cache:
+        if connection_type in self.POOLED_CONNECTION_TYPES:
+            cache_key = self._create_connection_cache_key(connection_info)
             try:
-                old_conn = self.connections_cache[cache_key]
-                if hasattr(old_conn, 'close'):
-                    old_conn.close()
-            except:
-                pass
-            del self.connections_cache[cache_key]
+                return self.connection_pools.get_connection(
+                    cache_key,
+                    factory=lambda: self._create_connection(connection_info),
+                    health_check=lambda conn: self._test_connection_health(conn, connection_type),
+                    max_size=self.max_pool_size,
+                    name=self._describe_connection(connection_info)
+                )
+            except Exception as e:
+                logger.error(f"Failed to get pooled {connection_type} connection: {e}")
+                return None
+        
+        return self._create_connection(connection_info)
+    
+    def _create_connection(self, connection_info: Dict[str, Any]) -> Optional[Any]:
+        """Open a new connection with retry logic"""
+        connection_type = connection_info.get('type', 'postgresql')
         
         # Create new connection with retry logic
         max_retries = 3
@@ -100,8 +132,6 @@ class DataService:
                         return conn  # Return DataFrame even if empty (valid state)
                     # If conn is None for CSV, continue to retry
                 elif conn is not None:
-                    # For database connections, return directly (skip caching for now)
-                    # self.connections_cache[cache_key] = conn  # Disabled to prevent engine/cursor mixing
                     return conn
                     
             except Exception as e:
@@ -114,26 +144,51 @@ class DataService:
         return None
     
     def _create_connection_cache_key(self, connection_info: Dict[str, Any]) -> str:
-        """Create a cache key for connection info (excluding sensitive data)"""
+        """Create a pool key for connection info (secrets are only included as a digest)"""
+        password = connection_info.get('password') or ''
         safe_info = {
             'type': connection_info.get('type'),
             'host': connection_info.get('host'),
             'port': connection_info.get('port'),
             'database': connection_info.get('database'),
             'username': connection_info.get('username'),
-            'file_path': connection_info.get('file_path')
+            'file_path': connection_info.get('file_path'),
+            'driver': connection_info.get('driver'),
+            'service_name': connection_info.get('service_name'),
+            'password': hashlib.sha256(str(password).encode('utf-8')).hexdigest()
         }
-        return f"conn_{hash(json.dumps(safe_info, sort_keys=True))}"
+        payload = json.dumps(safe_info, sort_keys=True, default=str)
+        return f"conn_{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]}"
+    
+    def _describe_connection(self, connection_info: Dict[str, Any]) -> str:
+        """Readable pool name for logs and metrics"""
+        return (
+            f"{connection_info.get('type')}://{connection_info.get('username') or ''}@"
+            f"{connection_info.get('host') or ''}:{connection_info.get('port') or ''}/"
+            f"{connection_info.get('database') or ''}"
+        )
+    
+    def get_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get metrics for every source-database connection pool"""
+        return self.connection_pools.get_all_pool_stats()
     
     def _test_connection_health(self, conn, connection_type: str) -> bool:
         """Test if a cached connection is still healthy"""
         try:
-            if connection_type in ['postgresql', 'mysql']:
+            if getattr(conn, 'closed', False):
+                return False
+            if connection_type in ['postgresql', 'mysql', 'sqlserver']:
                 cursor = conn.cursor()
                 cursor.execute("SELECT 1")
                 cursor.fetchone()
                 cursor.close()
                 return True
+            elif connection_type == 'oracle':
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM DUAL")
+                cursor.fetchone()
+                cursor.close()
+                return True
             elif connection_type == 'sqlite':
                 cursor = conn.cursor()
                 cursor.execute("SELECT 1")
@@ -312,39 +367,28 @@ class DataService:
             if not resolved_path:
                 return None
             
-            # Check file size limit (100MB default)
+            # The whole file is loaded into memory here, so keep the size limit
             max_file_size = getattr(settings, 'MAX_CSV_FILE_SIZE', 100 * 1024 * 1024)
             file_size = os.path.getsize(resolved_path)
             if file_size > max_file_size:
                 logger.error(f"CSV file too large: {file_size} bytes (max: {max_file_size})")
                 return None
             
-            # Read CSV file with comprehensive encoding handling
+            # Read CSV file in a single pass using the encoding and dialect sniffed from a byte sample
             logger.info(f"Reading CSV from: {resolved_path}")
             
-            # Try multiple encodings in order of likelihood
-            encodings_to_try = ['utf-8', 'utf-16', 'latin-1', 'cp1252', 'iso-8859-1', 'windows-1252']
-            
-            df = None
-            successful_encoding = None
-            
-            for encoding in encodings_to_try:
-                try:
-                    logger.info(f"Attempting to read CSV with encoding: {encoding}")
-                    df = pd.read_csv(resolved_path, encoding=encoding)
-                    successful_encoding = encoding
-                    logger.info(f"Successfully read CSV with {encoding} encoding")
-                    break
-                except UnicodeDecodeError as e:
-                    logger.warning(f"Failed to read CSV with {encoding} encoding: {e}")
-                    continue
-                except Exception as e:
-                    logger.warning(f"Unexpected error reading CSV with {encoding} encoding: {e}")
-                    continue
+            from services.enhanced_csv_processor import EnhancedCSVProcessor
+            dialect = EnhancedCSVProcessor().sniff_csv_dialect(resolved_path)
+            logger.info(f"Detected CSV encoding: {dialect['encoding']}, delimiter: {repr(dialect['delimiter'])}")
             
-            if df is None:
-                logger.error(f"Failed to read CSV file with any encoding: {resolved_path}")
-                return None
+            try:
+                df = pd.read_csv(resolved_path, encoding=dialect['encoding'], sep=dialect['delimiter'],
+                                 quotechar=dialect['quotechar'])
+            except UnicodeDecodeError as e:
+                # Invalid bytes beyond the sniffed sample - fall back to a single-byte encoding
+                logger.warning(f"Failed to read CSV with {dialect['encoding']} encoding: {e}")
+                df = pd.read_csv(resolved_path, encoding='cp1252', encoding_errors='replace',
+                                 sep=dialect['delimiter'], quotechar=dialect['quotechar'])
             
             logger.info(f"Successfully loaded CSV with {len(df)} rows and {len(df.columns)} columns")
             
@@ -406,10 +450,12 @@ class DataService:
             return None
     
     def execute_query(self, query: str, connection_info: Dict[str, Any], 
-                     user_id: Optional[int] = None, use_cache: bool = True) -> Tuple[bool, Any]:
+                     user_id: Optional[int] = None, use_cache: bool = True,
+                     data_source=None) -> Tuple[bool, Any]:
         """
         Execute SQL query with enhanced security and performance features
         FIXED: Always prioritize DuckDB data over CSV files
+        data_source: optional DataSource whose integrated table should be queried directly
         """
         # Input validation and SQL injection prevention
         if not query or not query.strip():
@@ -425,10 +471,12 @@ class DataService:
                 logger.warning(f"Potentially dangerous query blocked: {query[:100]}")
                 return False, f"Query contains potentially dangerous keyword: {keyword}"
         
-        # Check query cache if enabled
+        # Check query cache if enabled - keyed by normalised SQL and the source's data version
+        cache_key = None
+        cache_versioned = False
         if use_cache:
-            cache_key = f"query_cache_{hash(query)}_{hash(json.dumps(connection_info, sort_keys=True))}"
-            cached_result = cache.get(cache_key)
+            cache_key, cache_versioned = self._build_result_cache_key(query, connection_info, data_source)
+            cached_result = query_result_cache.get(cache_key)
             if cached_result is not None:
                 logger.info("Returning cached query result")
                 return True, cached_result
@@ -437,9 +485,11 @@ class DataService:
         connection_type = connection_info.get('type', 'postgresql')
         
         # Try to find data in DuckDB for ANY source type (not just CSV)
-        duckdb_success, duckdb_result = self._try_duckdb_query_first(query, connection_info, user_id)
+        duckdb_success, duckdb_result = self._try_duckdb_query_first(query, connection_info, user_id, data_source)
         if duckdb_success:
             logger.info("Successfully executed query against DuckDB integrated data")
+            if use_cache and isinstance(duckdb_result, pd.DataFrame) and not duckdb_result.empty:
+                query_result_cache.set(cache_key, duckdb_result, versioned=cache_versioned)
             return True, duckdb_result
         
         # If DuckDB failed, fall back to original connection logic
@@ -488,8 +538,8 @@ class DataService:
                 else:
                     raise Exception(result[1])  # Raise the error message
             else:
-                # For database connections, use pandas read_sql
-                result = pd.read_sql(query, connection)
+                # For database connections, fetch in server-side cursor batches through Arrow
+                result = streaming_extract_service.fetch_dataframe(connection, query, connection_info.get('type'))
             
             execution_time = time.time() - start_time
             
@@ -506,7 +556,7 @@ class DataService:
             
             # Cache successful results
             if use_cache and result_count > 0:
-                cache.set(cache_key, result, timeout=300)  # Cache for 5 minutes
+                query_result_cache.set(cache_key, result, versioned=cache_versioned)
             
             # Log successful query
             if user_id:
@@ -526,24 +576,51 @@ class DataService:
             return False, error_msg
             
         finally:
-            # Only close non-cached connections (not DataFrames)
+            # Close database connections (pooled ones go back to their pool)
             if (connection is not None and 
                 not isinstance(connection, pd.DataFrame) and 
                 hasattr(connection, 'close') and 
                 connection_info.get('type') != 'csv'):
-                cache_key = self._create_connection_cache_key(connection_info)
-                if cache_key not in self.connections_cache:
-                    connection.close()
+                connection.close()
     
-    def _try_duckdb_query_first(self, query: str, connection_info: Dict[str, Any], user_id: Optional[int] = None) -> Tuple[bool, Any]:
+    def _build_result_cache_key(self, query: str, connection_info: Dict[str, Any], data_source=None) -> Tuple[str, bool]:
+        """
+        Build a process-independent result cache key
+        Returns (cache_key, versioned) - versioned keys are invalidated by data refreshes
+        """
+        if data_source is None and connection_info.get('file_path'):
+            try:
+                data_source = DataSource.objects.filter(
+                    connection_info__file_path=connection_info.get('file_path'),
+                    status='active'
+                ).only('id', 'data_version').first()
+            except Exception as e:
+                logger.debug(f"Could not resolve data source for result cache: {e}")
+        
+        if data_source is not None and getattr(data_source, 'data_version', None) is not None:
+            return query_result_cache.build_key(query, f"ds:{data_source.id}", data_source.data_version), True
+        
+        return query_result_cache.build_key(query, f"conn:{connection_fingerprint(connection_info)}"), False
+    
+    def _try_duckdb_query_first(self, query: str, connection_info: Dict[str, Any], user_id: Optional[int] = None,
+                                data_source=None) -> Tuple[bool, Any]:
         """
         NEW: Try to execute query against DuckDB first for any connection type
-        This ensures we always use integrated data when available
+        This ensures we always use integrated data when available.
+        Queries run directly on the persistent integrated table, so aggregates
+        cover the full table and nothing is copied into pandas first.
         """
         try:
             from datasets.models import DataSource
             from datasets.data_access_layer import unified_data_access
             
+            # Strategy 0: The caller already knows the data source
+            if data_source is not None:
+                table_name = unified_data_access.get_integrated_table_name(data_source)
+                if table_name:
+                    logger.info(f"[DUCKDB_FIRST] Using integrated table {table_name} for {data_source.name}")
+                    return self._execute_query_on_integrated_table(query, table_name, user_id)
+            
             # Strategy 1: Try to find data source by file path (for CSV)
             csv_file_path = connection_info.get('file_path')
             if csv_file_path:
@@ -555,7 +632,11 @@ class DataService:
                 
                 if data_source:
                     logger.info(f"[DUCKDB_FIRST] Found data source: {data_source.name}")
-                    # Try to get data from unified access layer
+                    table_name = unified_data_access.get_integrated_table_name(data_source)
+                    if table_name:
+                        return self._execute_query_on_integrated_table(query, table_name, user_id)
+                    
+                    # Not integrated yet - load through the unified access layer
                     success, df, message = unified_data_access.get_data_source_data(data_source)
                     
                     if success and df is not None and not df.empty:
@@ -577,12 +658,11 @@ class DataService:
                 
                 for data_source in active_data_sources:
                     logger.info(f"[DUCKDB_FIRST] Trying data source: {data_source.name}")
-                    success, df, message = unified_data_access.get_data_source_data(data_source)
+                    table_name = unified_data_access.get_integrated_table_name(data_source)
                     
-                    if success and df is not None and not df.empty:
-                        logger.info(f"[DUCKDB_FIRST] Found data in {data_source.name}: {len(df)} rows")
-                        # Execute query on the DataFrame using DuckDB
-                        return self._execute_query_on_dataframe_with_duckdb(query, df, user_id)
+                    if table_name:
+                        logger.info(f"[DUCKDB_FIRST] Found integrated table for {data_source.name}: {table_name}")
+                        return self._execute_query_on_integrated_table(query, table_name, user_id)
             
             logger.info("[DUCKDB_FIRST] No DuckDB data found")
             return False, None
@@ -591,6 +671,70 @@ class DataService:
             logger.warning(f"[DUCKDB_FIRST] Error trying DuckDB first: {e}")
             return False, None
     
+    def _is_read_only_query(self, query: str) -> bool:
+        """Only single SELECT/WITH statements may run against the persistent database"""
+        statement = query.strip().rstrip(';').strip()
+        if ';' in statement:
+            return False
+        return bool(re.match(r'^\s*(SELECT|WITH)\b', statement, flags=re.IGNORECASE))
+    
+    def compile_integrated_query(self, query: str, table_name: str) -> Optional[str]:
+        """
+        Rewrite a generated query into the SQL that runs on a persistent integrated table
+        Returns None for anything but a single SELECT statement
+        """
+        if not self._is_read_only_query(query):
+            return None
+        
+        return self._rewrite_table_references(query, table_name)
+    
+    def _rewrite_table_references(self, query: str, table_name: str) -> str:
+        """
+        Point placeholder table names (data, csv_data, main_table, stale ds_/source_/etl_ names) at an integrated table.
+        Only names in FROM/JOIN position are rewritten, and never names of existing tables or of the query's CTEs.
+        """
+        existing_tables = {name.lower() for name in data_catalog.get_tables()}
+        cte_names = {name.lower() for name in _CTE_NAME.findall(query)}
+        
+        def rewrite(match):
+            name = match.group(4) or match.group(5)
+            lowered = name.lower()
+            if lowered in existing_tables or lowered in cte_names or not _PLACEHOLDER_TABLE.match(name):
+                return match.group(0)
+            return f'{match.group(1)}{match.group(2)}"{table_name}"'
+        
+        adapted_query = _TABLE_REFERENCE.sub(rewrite, query)
+        if adapted_query != query:
+            logger.info(f"Adapted query: {query} -> {adapted_query}")
+        return adapted_query
+    
+    def _execute_query_on_integrated_table(self, query: str, table_name: str, user_id: Optional[int] = None) -> Tuple[bool, Any]:
+        """
+        Execute query directly against a persistent integrated DuckDB table
+        Table references are rewritten to the ds_<uuid> table instead of a pandas copy
+        """
+        try:
+            adapted_query = self.compile_integrated_query(query, table_name)
+            if adapted_query is None:
+                return False, "Only single SELECT statements can run against integrated data"
+            
+            start_time = time.time()
+            
+            with duckdb_manager.session() as conn:
+                result = conn.execute(adapted_query).fetchdf()
+            
+            execution_time = time.time() - start_time
+            
+            if user_id:
+                self._log_query(user_id, adapted_query, 'SUCCESS', len(result), "", execution_time)
+            
+            logger.info(f"Integrated DuckDB query on {table_name} executed in {execution_time:.2f}s, {len(result)} rows returned")
+            return True, result
+            
+        except Exception as e:
+            logger.error(f"Integrated DuckDB query failed on {table_name}: {e}")
+            return False, str(e)
+    
     def _execute_query_on_dataframe_with_duckdb(self, query: str, df: pd.DataFrame, user_id: Optional[int] = None) -> Tuple[bool, Any]:
         """
         Execute query on a DataFrame using DuckDB for better SQL compatibility
@@ -695,40 +839,31 @@ class DataService:
         FIXED: Better table name mapping and alias handling + SQL syntax validation
         """
         try:
-            # Enhanced: Use robust DuckDB connection with better error handling
-            import duckdb
-            
-            db_path = 'data/integrated.duckdb'
-            logger.info(f"Using persistent DuckDB database at: {os.path.abspath(db_path)}")
-            
-            conn = duckdb.connect(db_path)
-            logger.info(f"DuckDB integrated database initialized successfully at: {os.path.abspath(db_path)}")
-            version_result = conn.execute('PRAGMA version').fetchone()
-            logger.info(f"DuckDB version: {version_result[0] if version_result else 'unknown'}")
-            
-            # FIXED: Better table name resolution
-            available_tables = [t[0] for t in conn.execute("SHOW TABLES").fetchall()]
-            logger.info(f"Available tables in DuckDB: {available_tables}")
-            
-                        # FIXED: Use consistent table name resolution to prevent switching
-            actual_table_name = self._get_consistent_table_name(query, available_tables, table_name)
-            if not actual_table_name:
-                logger.error(f"No matching table found for: {table_name}")
-                logger.error(f"Available tables: {available_tables}")
-                return False, f"Table not found: {table_name}"
+            # Hold the integrated database only while this query runs
+            with duckdb_manager.session() as conn:
+                # FIXED: Better table name resolution
+                available_tables = [t[0] for t in conn.execute("SHOW TABLES").fetchall()]
+                logger.info(f"Available tables in DuckDB: {available_tables}")
+            
+                            # FIXED: Use consistent table name resolution to prevent switching
+                actual_table_name = self._get_consistent_table_name(query, available_tables, table_name)
+                if not actual_table_name:
+                    logger.error(f"No matching table found for: {table_name}")
+                    logger.error(f"Available tables: {available_tables}")
+                    return False, f"Table not found: {table_name}"
 
-            logger.info(f"Using consistent table name: {actual_table_name}")
+                logger.info(f"Using consistent table name: {actual_table_name}")
 
-            # FIXED: Enhanced query adaptation with consistent table name usage
-            adapted_query = self._adapt_query_with_better_mapping(query, actual_table_name, conn)
+                # FIXED: Enhanced query adaptation with consistent table name usage
+                adapted_query = self._adapt_query_with_better_mapping(query, actual_table_name, conn)
             
-            # NEW: Validate and fix SQL syntax before execution
-            validated_query = self._validate_and_fix_sql_syntax(adapted_query)
+                # NEW: Validate and fix SQL syntax before execution
+                validated_query = self._validate_and_fix_sql_syntax(adapted_query)
             
-            logger.info(f"Executing integrated query: {validated_query}")
+                logger.info(f"Executing integrated query: {validated_query}")
             
-            # Layer 3: Execute with fallback strategy
-            return self._execute_with_fallback(conn, validated_query, actual_table_name, user_id)
+                # Layer 3: Execute with fallback strategy
+                return self._execute_with_fallback(conn, validated_query, actual_table_name, user_id)
             
         except Exception as e:
             error_msg = f"DuckDB query execution failed: {str(e)}"
@@ -739,9 +874,6 @@ class DataService:
                 self._log_query(user_id, query, 'FAILURE', 0, error_msg)
             
             return False, error_msg
-        finally:
-            if 'conn' in locals():
-                conn.close()
     
     def _execute_with_fallback(self, conn, query: str, table_name: str, user_id: Optional[int] = None) -> Tuple[bool, Any]:
         """
@@ -1228,7 +1360,6 @@ class DataService:
         
         # Apply universal pattern-based column name conversions
         # This replaces hardcoded business domain mappings with pattern-based detection
-        import re
         underscore_columns = re.findall(r'\b([A-Za-z_]+_[A-Za-z_]+)\b', converted_query)
         for underscore_col in underscore_columns:
             # Convert underscore to space and quote
@@ -1712,25 +1843,19 @@ class DataService:
     def _get_business_metrics_for_schema(self) -> List[Dict[str, Any]]:
         """Get user-defined business metrics for LLM schema context"""
         try:
-            import duckdb
-            import os
-            
-            db_path = os.path.join('data', 'integrated.duckdb')
-            if not os.path.exists(db_path):
+            if not os.path.exists(duckdb_manager.db_path):
                 logger.info("DuckDB file not found, no business metrics available")
                 return []
             
-            conn = duckdb.connect(db_path)
-            
-            try:
+            with duckdb_manager.session() as conn:
                 # Check if business metrics table exists
                 tables = conn.execute("SHOW TABLES").fetchall()
                 table_names = [table[0] for table in tables]
-                
+            
                 if 'user_business_metrics' not in table_names:
                     logger.info("User business metrics table not found")
                     return []
-                
+            
                 # Get active business metrics
                 metrics_query = """
                 SELECT 
@@ -1747,31 +1872,28 @@ class DataService:
                 WHERE is_active = TRUE
                 ORDER BY category, metric_name
                 """
-                
+            
                 metrics_result = conn.execute(metrics_query).fetchall()
+            
+            business_metrics = []
+            for metric in metrics_result:
+                (name, display, desc, formula, category, dtype, unit, 
+                 agg_type, context) = metric
                 
-                business_metrics = []
-                for metric in metrics_result:
-                    (name, display, desc, formula, category, dtype, unit, 
-                     agg_type, context) = metric
-                    
-                    business_metrics.append({
-                        'metric_name': name,
-                        'display_name': display,
-                        'description': desc,
-                        'formula': formula,
-                        'category': category,
-                        'data_type': dtype,
-                        'unit': unit,
-                        'aggregation_type': agg_type,
-                        'business_context': context
-                    })
-                
-                logger.info(f"Successfully loaded {len(business_metrics)} business metrics for schema")
-                return business_metrics
-                
-            finally:
-                conn.close()
+                business_metrics.append({
+                    'metric_name': name,
+                    'display_name': display,
+                    'description': desc,
+                    'formula': formula,
+                    'category': category,
+                    'data_type': dtype,
+                    'unit': unit,
+                    'aggregation_type': agg_type,
+                    'business_context': context
+                })
+            
+            logger.info(f"Successfully loaded {len(business_metrics)} business metrics for schema")
+            return business_metrics
                 
         except Exception as e:
             logger.warning(f"Error loading business metrics for schema: {e}")
@@ -1847,110 +1969,10 @@ class DataService:
             logger.error(f"Error applying ETL transformations to schema: {e}")
             return schema
     
-    def _infer_data_type_from_samples(self, series: pd.Series, sample_values: list) -> str:
-        """
-        Infer data type from sample values with enhanced error handling for mixed types
-        FIXED: Prioritize date detection to prevent dates being converted to integers
-        """
-        if not sample_values:
-            return 'string'
-        
-        # Convert all samples to strings for safe processing
-        str_samples = []
-        for v in sample_values:
-            try:
-                if v is not None and pd.notna(v):
-                    str_samples.append(str(v).strip())
-            except Exception as e:
-                logger.debug(f"Error converting sample value to string: {v}, error: {e}")
-                continue
-        
-        if not str_samples:
-            return 'string'
-        
-        # PRIORITY 1: Check for date patterns FIRST (before numeric checks)
-        # This prevents date strings like "2023-01-01" from being misidentified as integers
-        date_patterns = [
-            r'\d{4}-\d{1,2}-\d{1,2}',  # YYYY-MM-DD (more flexible)
-            r'\d{1,2}/\d{1,2}/\d{4}',  # MM/DD/YYYY or M/D/YYYY
-            r'\d{1,2}-\d{1,2}-\d{4}',  # MM-DD-YYYY or M-D-YYYY
-            r'\d{2}/\d{2}/\d{2}',      # MM/DD/YY
-            r'\d{4}/\d{1,2}/\d{1,2}',  # YYYY/MM/DD
-        ]
-        
-        for pattern in date_patterns:
-            pattern_count = 0
-            for val in str_samples:
-                try:
-                    val_str = str(val).strip()
-                    if re.match(pattern, val_str):
-                        # Additional validation: try to actually parse as date
-                        try:
-                            pd.to_datetime(val_str, format='%d-%m-%Y', dayfirst=True, errors='raise')
-                            pattern_count += 1
-                        except:
-                            # If it matches pattern but can't be parsed as date, skip
-                            pass
-                except (AttributeError, TypeError) as e:
-                    logger.debug(f"Error processing date pattern for value: {val}, error: {e}")
-                    continue
-            
-            # If majority of samples match date pattern and can be parsed, it's a date
-            if pattern_count >= len(str_samples) * 0.8:  # 80% threshold
-                logger.info(f"Identified date column with {pattern_count}/{len(str_samples)} matching samples")
-                return 'date'
-        
-        # PRIORITY 2: Check for boolean values
-        boolean_values = {'true', 'false', '1', '0', 'yes', 'no', 'y', 'n', 't', 'f'}
-        boolean_count = 0
-        for val in str_samples:
-            try:
-                val_str = str(val).strip().lower()
-                if val_str in boolean_values:
-                    boolean_count += 1
-            except (AttributeError, TypeError) as e:
-                logger.debug(f"Error processing boolean check for value: {val}, error: {e}")
-                continue
-        
-        if boolean_count == len(str_samples):
-            return 'boolean'
-        
-        # PRIORITY 3: Check for purely numeric values (integers/floats)
-        # Only after we've ruled out dates and booleans
-        numeric_count = 0
-        float_count = 0
-        
-        for val in str_samples:
-            try:
-                val_str = str(val).strip()
-                # More careful numeric detection
-                if val_str.replace('.', '').replace('-', '').replace('+', '').replace('e', '').replace('E', '').isdigit():
-                    numeric_count += 1
-                    if '.' in val_str or 'e' in val_str.lower():
-                        float_count += 1
-                elif val_str.replace('.', '').replace('-', '').replace('+', '').isdigit():
-                    # Handle scientific notation and decimals
-                    try:
-                        float(val_str)
-                        numeric_count += 1
-                        if '.' in val_str or 'e' in val_str.lower():
-                            float_count += 1
-                    except ValueError:
-                        pass
-            except (AttributeError, TypeError) as e:
-                logger.debug(f"Error processing numeric check for value: {val}, error: {e}")
-                continue
-        
-        if numeric_count == len(str_samples):
-            return 'float' if float_count > 0 else 'integer'
-        
-        # Default to string for everything else
-        return 'string'
-    
     def _auto_convert_data_types(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str]]:
         """
         Automatically convert DataFrame columns to appropriate data types with enhanced error handling
-        FIXED: Added DataFrame boolean context safety checks
+        Uses the shared vectorised inference engine on a stratified sample of each column
         """
         # ENHANCED: Validate input DataFrame to prevent boolean context issues
         if not isinstance(df, pd.DataFrame):
@@ -1965,150 +1987,19 @@ class DataService:
             logger.warning("_auto_convert_data_types called with DataFrame having no columns")
             return df, {}
         
-        # ENHANCED: Safe DataFrame copy with validation
-        try:
-            df_converted = df.copy()
-        except Exception as copy_error:
-            logger.error(f"Failed to copy DataFrame in _auto_convert_data_types: {copy_error}")
-            return df, {}
+        df_converted, conversions = infer_and_convert_types(df)
         
         type_mapping = {}
-        
-        for column in df.columns:
-            original_type = str(df[column].dtype)
+        for column, conversion in conversions.items():
+            inferred_type = 'date' if conversion['type'] == 'datetime' else conversion['type']
             
-            try:
-                # Get sample values for type inference with safe conversion
-                sample_values = []
-                for val in df[column].dropna().head(10):
-                    try:
-                        if val is not None and pd.notna(val):
-                            sample_values.append(str(val))
-                    except Exception as e:
-                        logger.debug(f"Error converting sample to string for column {column}: {val}, error: {e}")
-                        continue
-                
-                if not sample_values:
-                    inferred_type = 'string'
-                else:
-                    inferred_type = self._infer_data_type_from_samples(df[column], sample_values)
-                
-                # Apply conversion based on inferred type with error handling
-                if inferred_type == 'integer':
-                    try:
-                        # ENHANCED: More conservative integer conversion
-                        # First check if any values look like dates to prevent misclassification
-                        sample_check = df[column].dropna().head(10).astype(str)
-                        looks_like_dates = any(
-                            re.match(r'\d{4}-\d{1,2}-\d{1,2}', str(val)) or
-                            re.match(r'\d{1,2}/\d{1,2}/\d{4}', str(val)) or
-                            re.match(r'\d{1,2}-\d{1,2}-\d{4}', str(val))
-                            for val in sample_check
-                        )
-                        
-                        if looks_like_dates:
-                            logger.warning(f"Column {column} has date-like values, skipping integer conversion")
-                            df_converted[column] = df_converted[column].astype(str)
-                            type_mapping[column] = 'string'
-                        else:
-                            # Safe integer conversion - only if we're confident
-                            numeric_converted = pd.to_numeric(df[column], errors='coerce')
-                            null_count = numeric_converted.isna().sum()
-                            total_count = len(df[column])
-                            
-                            # If more than 10% of values become null, don't convert
-                            if null_count > total_count * 0.1:
-                                logger.warning(f"Column {column}: {null_count}/{total_count} values would become null, keeping as string")
-                                df_converted[column] = df_converted[column].astype(str)
-                                type_mapping[column] = 'string'
-                            else:
-                                # Safe conversion with original values preserved for nulls
-                                df_converted[column] = numeric_converted.fillna(df[column]).astype('Int64')
-                                type_mapping[column] = 'integer'
-                                logger.info(f"Successfully converted column {column} to integer with {null_count} nulls handled")
-                    except Exception as e:
-                        logger.warning(f"Failed to convert column {column} to integer: {e}")
-                        df_converted[column] = df_converted[column].astype(str)
-                        type_mapping[column] = 'string'
-                        
-                elif inferred_type == 'float':
-                    try:
-                        # ENHANCED: More conservative float conversion
-                        numeric_converted = pd.to_numeric(df[column], errors='coerce')
-                        null_count = numeric_converted.isna().sum()
-                        total_count = len(df[column])
-                        
-                        # If more than 10% of values become null, don't convert
-                        if null_count > total_count * 0.1:
-                            logger.warning(f"Column {column}: {null_count}/{total_count} values would become null, keeping as string")
-                            df_converted[column] = df_converted[column].astype(str)
-                            type_mapping[column] = 'string'
-                        else:
-                            df_converted[column] = numeric_converted
-                            type_mapping[column] = 'float'
-                            logger.info(f"Successfully converted column {column} to float with {null_count} nulls")
-                    except Exception as e:
-                        logger.warning(f"Failed to convert column {column} to float: {e}")
-                        df_converted[column] = df_converted[column].astype(str)
-                        type_mapping[column] = 'string'
-                        
-                elif inferred_type == 'boolean':
-                    try:
-                        # Enhanced boolean conversion with safe string processing
-                        def safe_bool_convert(val):
-                            if pd.isna(val):
-                                return False
-                            try:
-                                val_str = str(val).strip().lower()
-                                return val_str in ['true', '1', 'yes', 'y', 't']
-                            except (AttributeError, TypeError):
-                                return False
-                        
-                        df_converted[column] = df[column].apply(safe_bool_convert)
-                        type_mapping[column] = 'boolean'
-                    except Exception as e:
-                        logger.warning(f"Failed to convert column {column} to boolean: {e}")
-                        df_converted[column] = df_converted[column].astype(str)
-                        type_mapping[column] = 'string'
-                        
-                elif inferred_type == 'date':
-                    try:
-                        # ENHANCED: Better date conversion with format detection - FIXED: Remove deprecated parameter
-                        converted_dates = pd.to_datetime(df[column], errors='coerce')
-                        null_count = converted_dates.isna().sum()
-                        total_count = len(df[column])
-                        
-                        # If more than 20% of values become null, don't convert
-                        if null_count > total_count * 0.2:
-                            logger.warning(f"Column {column}: {null_count}/{total_count} dates failed to parse, keeping as string")
-                            df_converted[column] = df_converted[column].astype(str)
-                            type_mapping[column] = 'string'
-                        else:
-                            df_converted[column] = converted_dates
-                            type_mapping[column] = 'date'
-                            logger.info(f"Successfully converted column {column} to date with {null_count} failed conversions")
-                    except Exception as e:
-                        logger.warning(f"Failed to convert column {column} to date: {e}")
-                        df_converted[column] = df_converted[column].astype(str)
-                        type_mapping[column] = 'string'
-                        
-                else:
-                    # Default to string with safe conversion
-                    try:
-                        df_converted[column] = df_converted[column].astype(str)
-                        type_mapping[column] = 'string'
-                    except Exception as e:
-                        logger.warning(f"Failed to convert column {column} to string: {e}")
-                        type_mapping[column] = 'string'
-                
-            except Exception as e:
-                logger.warning(f"Error processing column {column}: {e}")
-                # Fallback to string type
-                try:
-                    df_converted[column] = df_converted[column].astype(str)
-                except Exception:
-                    pass
-                type_mapping[column] = 'string'
+            if inferred_type == 'string':
+                # Mixed-type object columns (e.g. numbers and text) are stored as text, keeping nulls
+                series = df_converted[column]
+                if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+                    df_converted[column] = series.where(series.isna(), series.astype(str))
+            
+            type_mapping[column] = inferred_type
         
         logger.info(f"Applied automatic type conversion to {len(type_mapping)} columns")
         return df_converted, type_mapping
@@ -2176,6 +2067,12 @@ class DataService:
                     
             except Exception as query_error:
                 return False, f"Connection established but test query failed: {str(query_error)}"
+            finally:
+                # Return pooled connections to their pool
+                try:
+                    connection.close()
+                except Exception:
+                    pass
                 
         except Exception as e:
             logger.error(f"Connection test failed for {connection_type}: {e}")
@@ -2546,14 +2443,15 @@ class DataService:
             return False, f"Connection test failed: {str(e)}"
     
     def close_all_connections(self):
-        """Close all cached connections"""
+        """Close all cached and pooled connections"""
         for cache_key, conn in list(self.connections_cache.items()):
             try:
                 if hasattr(conn, 'close'):
                     conn.close()
             except Exception as e:
                 logger.warning(f"Error closing connection {cache_key}: {e}")
-        self.connections_cache.clear() 
+        self.connections_cache.clear()
+        self.connection_pools.close_all()
 
     def generate_limit_query(self, base_query: str, limit: int, db_type: str) -> str:
         """
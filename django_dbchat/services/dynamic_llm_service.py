@@ -8,11 +8,13 @@ Now with optimized Llama 3.2b support and improved OpenAI integration
 import json
 import logging
 import requests
-import duckdb
 import re
 from typing import Tuple, Dict, Any, Optional, List
 from django.conf import settings
 from .column_mapper import ColumnMapper
+from utils.duckdb_manager import duckdb_manager
+from utils.sql_generation_cache import sql_generation_cache, schema_fingerprint
+from utils.data_catalog import data_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -23,14 +25,9 @@ class DynamicLLMService:
     """
     
     def __init__(self):
-        # CRITICAL FIX: Use the same path resolution as DataService
-        try:
-            from django.conf import settings
-            import os
-            self.duckdb_path = os.path.join(settings.BASE_DIR, 'data', 'integrated.duckdb')
-            logger.info(f"DynamicLLMService using DuckDB path: {self.duckdb_path}")
-        except:
-            self.duckdb_path = 'data/integrated.duckdb'
+        # Same integrated database path as every other service
+        self.duckdb_path = duckdb_manager.db_path
+        logger.info(f"DynamicLLMService using DuckDB path: {self.duckdb_path}")
             
         self._load_llm_config()
         # Initialize universal SQL syntax instructions
@@ -129,16 +126,10 @@ CRITICAL SQL SYNTAX REQUIREMENTS:
             # CRITICAL FIX: If we have a specific data source, prefer the matching table
             target_table = environment['best_table']
             if data_source and hasattr(data_source, 'id'):
-                data_source_id = str(data_source.id).replace('-', '')
-                logger.info(f"Looking for table matching data source ID: {data_source_id}")
-                
-                # Look for tables that contain the data source ID
-                for table_name in environment['available_tables']:
-                    table_clean = table_name.replace('-', '').replace('_', '')
-                    if data_source_id in table_clean:
-                        target_table = table_name
-                        logger.info(f"Found matching table for data source: {target_table}")
-                        break
+                matching_table = data_catalog.get_table_for_data_source(data_source.id)
+                if matching_table and matching_table in environment['table_analyses']:
+                    target_table = matching_table
+                    logger.info(f"Found matching table for data source: {target_table}")
             
             if not target_table:
                 return False, "No usable data found"
@@ -148,6 +139,19 @@ CRITICAL SQL SYNTAX REQUIREMENTS:
             # Get table analysis
             analysis = environment['table_analyses'][target_table]
             
+            # Reuse SQL generated earlier for the same question and schema
+            fingerprint = schema_fingerprint(target_table, analysis['columns'], analysis.get('column_types'))
+            cached_sql = sql_generation_cache.get(query, target_table, fingerprint)
+            if cached_sql:
+                logger.info(f"Using cached SQL for query: '{query}'")
+                return True, cached_sql
+            
+            # Reuse validated SQL from a close paraphrase that already ran successfully
+            similar_sql = sql_generation_cache.find_similar(query, target_table)
+            if similar_sql and self._validate_sql(similar_sql):
+                sql_generation_cache.set(query, target_table, fingerprint, similar_sql)
+                return True, similar_sql
+            
             # CRITICAL FIX: Try template-based SQL generation first for common patterns
             template_sql = self._try_template_sql_generation(query, target_table, analysis)
             if template_sql:
@@ -208,6 +212,8 @@ CRITICAL SQL SYNTAX REQUIREMENTS:
                 logger.info(f"Generated SQL successfully using table {target_table}")
                 # Post-process SQL to fix any generic table names
                 sql = self._fix_table_names_in_sql(sql, target_table)
+                if self._validate_sql(sql):
+                    sql_generation_cache.set(query, target_table, fingerprint, sql)
                 return True, sql
             else:
                 return False, sql
@@ -234,14 +240,24 @@ CRITICAL SQL SYNTAX REQUIREMENTS:
     def _test_sql_execution(self, sql: str) -> Tuple[bool, str]:
         """Test SQL execution against the database"""
         try:
-            with duckdb.connect(self.duckdb_path) as conn:
-                # Test with LIMIT 1 to avoid large results
-                test_sql = sql.rstrip(';') + ' LIMIT 1;'
+            # Test with LIMIT 1 to avoid large results
+            test_sql = sql.rstrip(';') + ' LIMIT 1;'
+            with duckdb_manager.session() as conn:
                 result = conn.execute(test_sql).fetchall()
-                return True, f"SQL executed successfully, returned {len(result)} rows"
+            return True, f"SQL executed successfully, returned {len(result)} rows"
         except Exception as e:
             return False, str(e)
     
+    def _validate_sql(self, sql: str) -> bool:
+        """Check that SQL binds against the current schema without executing it"""
+        try:
+            with duckdb_manager.session() as conn:
+                conn.execute(f"EXPLAIN {sql.strip().rstrip(';')}")
+            return True
+        except Exception as e:
+            logger.debug(f"SQL failed validation: {e}")
+            return False
+    
     def _fix_common_sql_issues(self, sql: str, target_table: str) -> str:
         """Fix common SQL issues"""
         fixed_sql = sql
@@ -256,90 +272,27 @@ CRITICAL SQL SYNTAX REQUIREMENTS:
     
     def discover_data_environment(self) -> Dict:
         """
-        Discover the complete data environment with enhanced analysis
+        Describe the data environment from the cached table catalog
         FIXED: Better table selection logic and fallback handling
         """
         try:
-            # CRITICAL FIX: Use the same path resolution as DataService
-            logger.info(f"DynamicLLMService connecting to DuckDB at: {self.duckdb_path}")
-            
-            # Add retry logic for DuckDB connections due to potential file locking
-            max_retries = 3
-            last_error = None
+            table_analyses = data_catalog.get_tables()
+            
+            if not table_analyses:
+                logger.warning("No tables found in DuckDB")
+                return {
+                    'available_tables': [],
+                    'best_table': None,
+                    'table_analyses': {}
+                }
             
-            for attempt in range(max_retries):
-                try:
-                    with duckdb.connect(self.duckdb_path) as conn:
-                        # Get all tables
-                        tables = conn.execute("SHOW TABLES").fetchall()
-                        
-                        if not tables:
-                            logger.warning("No tables found in DuckDB")
-                            return {
-                                'available_tables': [],
-                                'best_table': None,
-                                'table_analyses': {}
-                            }
-                        
-                        logger.info(f"Found {len(tables)} tables in DuckDB: {[t[0] for t in tables]}")
-                        table_analyses = {}
-                        
-                        for table_row in tables:
-                            table_name = table_row[0]
-                            try:
-                                # Get schema
-                                schema = conn.execute(f'DESCRIBE "{table_name}"').fetchall()
-                                columns = [row[0] for row in schema]
-                                column_types = {row[0]: row[1] for row in schema}
-                                
-                                # Get sample data
-                                sample_data = conn.execute(f'SELECT * FROM "{table_name}" LIMIT 5').fetchall()
-                                
-                                # Get row count
-                                row_count = conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
-                                
-                                table_analyses[table_name] = {
-                                    'columns': columns,
-                                    'column_types': column_types,
-                                    'sample_data': sample_data,
-                                    'row_count': row_count,
-                                    'schema': schema
-                                }
-                                
-                                logger.info(f"Analyzed table {table_name}: {row_count} rows, {len(columns)} columns")
-                                
-                            except Exception as e:
-                                logger.warning(f"Could not analyze table {table_name}: {e}")
-                                continue
-                        
-                        # If we got here, the connection worked - return the results
-                        available_tables = list(table_analyses.keys())
-                        best_table = self._select_best_table(table_analyses) if available_tables else None
-                        
-                        return {
-                            'available_tables': available_tables,
-                            'best_table': best_table,
-                            'table_analyses': table_analyses
-                        }
-                        
-                except Exception as duck_error:
-                    last_error = duck_error
-                    if "already open" in str(duck_error).lower():
-                        logger.warning(f"DuckDB file locked, attempt {attempt + 1}/{max_retries}: {duck_error}")
-                        if attempt < max_retries - 1:
-                            import time
-                            time.sleep(0.5)  # Wait before retry
-                            continue
-                    else:
-                        # Non-locking error, don't retry
-                        break
+            available_tables = list(table_analyses.keys())
+            best_table = self._select_best_table(table_analyses)
             
-            # If all retries failed, return fallback
-            logger.error(f"Failed to connect to DuckDB after {max_retries} attempts: {last_error}")
             return {
-                'available_tables': [],
-                'best_table': None,
-                'table_analyses': {}
+                'available_tables': available_tables,
+                'best_table': best_table,
+                'table_analyses': table_analyses
             }
             
         except Exception as e:
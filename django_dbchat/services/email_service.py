@@ -3,7 +3,7 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import logging
 from django.conf import settings
 from django.core.mail import send_mail
@@ -26,6 +26,7 @@ import os
 import tempfile
 from celery import shared_task
 from core.models import LLMConfig
+from utils.export_cache import export_cache
 
 class EmailService:
     """
@@ -91,6 +92,30 @@ class EmailService:
         Returns:
             Boolean indicating success
         """
+        return self.send_dashboard_emails([recipient_email], subject, body, attachments, schedule_info)[recipient_email]
+    
+    def send_dashboard_emails(self, recipient_emails: List[str], subject: str, body: str,
+                            attachments: List[Dict[str, Any]] = None,
+                            schedule_info: Dict[str, Any] = None) -> Dict[str, bool]:
+        """
+        Send the same dashboard email to several recipients over one SMTP connection.
+        The message and its attachments are encoded once; each recipient gets their own copy.
+        
+        Args:
+            recipient_emails: Email addresses of the recipients
+            subject: Email subject
+            body: Email body (HTML)
+            attachments: List of attachment dicts with content, filename, type
+            schedule_info: Optional scheduling information
+        
+        Returns:
+            Dictionary of recipient -> success
+        """
+        recipient_emails = list(dict.fromkeys(recipient_emails))
+        results = {recipient: False for recipient in recipient_emails}
+        if not recipient_emails:
+            return results
+        
         email_cfg = self.get_email_config()
         
         smtp_server_host = email_cfg.get("SMTP_SERVER")
@@ -100,39 +125,78 @@ class EmailService:
         
         if not all([smtp_user, smtp_pass, sender, smtp_server_host]):
             error_msg = "Email server credentials are not configured."
-            logger.warning(f"Email not configured for {recipient_email}: {error_msg}")
+            logger.warning(f"Email not configured for {', '.join(recipient_emails)}: {error_msg}")
             
             # For development/testing: create a simple file-based email log instead
-            try:
-                import os
-                from django.conf import settings
-                log_dir = os.path.join(settings.BASE_DIR, 'logs')
-                os.makedirs(log_dir, exist_ok=True)
-                
-                log_file = os.path.join(log_dir, 'email_log.txt')
-                with open(log_file, 'a', encoding='utf-8') as f:
-                    from datetime import datetime
-                    f.write(f"\n{'='*50}\n")
-                    f.write(f"Email Log Entry - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write(f"To: {recipient_email}\n")
-                    f.write(f"Subject: {subject}\n")
-                    f.write(f"Attachments: {len(attachments) if attachments else 0}\n")
-                    f.write(f"Schedule Info: {schedule_info}\n")
-                    f.write(f"Body Preview: {body[:200]}...\n")
-                    f.write(f"{'='*50}\n")
-                
-                logger.info(f"Email logged to file for {recipient_email} (SMTP not configured)")
-                return True  # Return True for development mode
+            for recipient in recipient_emails:
+                results[recipient] = self._log_email(recipient, subject, body, attachments, schedule_info)
+            return results
+        
+        try:
+            msg = self._build_message(email_cfg, subject, body, attachments)
+        except Exception as e:
+            logger.error(f"Failed to build dashboard email: {e}")
+            return results
+        
+        # Send email
+        try:
+            server = self._open_smtp(email_cfg)
+        except Exception as e:
+            logger.error(f"Failed to send email: {e}")
+            return results
+        
+        try:
+            for recipient in recipient_emails:
+                del msg['To']
+                msg['To'] = recipient
+                try:
+                    try:
+                        server.sendmail(sender, recipient, msg.as_string())
+                    except smtplib.SMTPServerDisconnected:
+                        # The server dropped the connection mid-batch; reconnect and carry on
+                        try:
+                            server = self._open_smtp(email_cfg)
+                        except Exception as e:
+                            logger.error(f"Failed to reconnect to SMTP server: {e}")
+                            break
+                        server.sendmail(sender, recipient, msg.as_string())
+                except (smtplib.SMTPException, OSError) as e:
+                    # Socket timeouts and resets fail this recipient only
+                    logger.error(f"Failed to send email to {recipient}: {e}")
+                    continue
                 
-            except Exception as log_error:
-                logger.error(f"Failed to log email: {log_error}")
-                return False
+                results[recipient] = True
+                if not (schedule_info and schedule_info.get('is_scheduled_job')):
+                    logger.info(f"Dashboard email sent to {recipient}")
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                pass
         
-        # Create email message
+        if len(recipient_emails) > 1:
+            logger.info(f"Dashboard email sent to {sum(results.values())}/{len(recipient_emails)} recipients over one connection")
+        return results
+    
+    def _open_smtp(self, email_cfg: Dict[str, Any]):
+        """Open an authenticated SMTP connection"""
+        port = int(email_cfg.get("SMTP_PORT", 587))
+        timeout = email_cfg.get("TIMEOUT", 30)
+        if email_cfg.get('USE_SSL'):
+            server = smtplib.SMTP_SSL(email_cfg.get("SMTP_SERVER"), port, timeout=timeout)
+        else:
+            server = smtplib.SMTP(email_cfg.get("SMTP_SERVER"), port, timeout=timeout)
+            if email_cfg.get('USE_TLS'):
+                server.starttls()
+        server.login(email_cfg.get("SMTP_USERNAME") or "", email_cfg.get("SMTP_PASSWORD") or "")
+        return server
+    
+    def _build_message(self, email_cfg: Dict[str, Any], subject: str, body: str,
+                       attachments: List[Dict[str, Any]] = None) -> MIMEMultipart:
+        """Create the email message with its attachments encoded"""
         msg = MIMEMultipart('mixed')
         sender_name = email_cfg.get("SENDER_NAME", "ConvaBI System")
-        msg['From'] = f"{sender_name} <{sender}>"
-        msg['To'] = recipient_email
+        msg['From'] = f"{sender_name} <{email_cfg.get('SENDER_EMAIL')}>"
         msg['Subject'] = subject
         msg.attach(MIMEText(body, 'html'))
         
@@ -165,27 +229,32 @@ class EmailService:
                                   f'attachment; filename="{attachment_filename}.{attachment_type}"')
                     msg.attach(part)
         
-        # Send email
+        return msg
+    
+    def _log_email(self, recipient_email: str, subject: str, body: str,
+                   attachments: List[Dict[str, Any]] = None, schedule_info: Dict[str, Any] = None) -> bool:
+        """Write an email to logs/email_log.txt when SMTP is not configured"""
         try:
-            port = int(email_cfg.get("SMTP_PORT", 587))
-            timeout = email_cfg.get("TIMEOUT", 30)
-            server = smtplib.SMTP(smtp_server_host, port, timeout=timeout)
-            if email_cfg.get('USE_TLS'):
-                server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.sendmail(sender, recipient_email, msg.as_string())
-            server.quit()
+            from datetime import datetime
+            log_dir = os.path.join(settings.BASE_DIR, 'logs')
+            os.makedirs(log_dir, exist_ok=True)
             
-            if not (schedule_info and schedule_info.get('is_scheduled_job')):
-                logger.info(f"Dashboard email sent to {recipient_email}")
-            return True
+            log_file = os.path.join(log_dir, 'email_log.txt')
+            with open(log_file, 'a', encoding='utf-8') as f:
+                f.write(f"\n{'='*50}\n")
+                f.write(f"Email Log Entry - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                f.write(f"To: {recipient_email}\n")
+                f.write(f"Subject: {subject}\n")
+                f.write(f"Attachments: {len(attachments) if attachments else 0}\n")
+                f.write(f"Schedule Info: {schedule_info}\n")
+                f.write(f"Body Preview: {body[:200]}...\n")
+                f.write(f"{'='*50}\n")
             
-        except Exception as e:
-            error_msg = f"Failed to send email: {e}"
-            if schedule_info and schedule_info.get('is_scheduled_job'):
-                logger.error(error_msg)
-            else:
-                logger.error(error_msg)
+            logger.info(f"Email logged to file for {recipient_email} (SMTP not configured)")
+            return True  # Return True for development mode
+            
+        except Exception as log_error:
+            logger.error(f"Failed to log email: {log_error}")
             return False
     
     def generate_dashboard_image(self, dashboard_html_content: str, 
@@ -238,6 +307,24 @@ class EmailService:
             logger.error(f"Image generation failed: {e}")
             return None
     
+    def render_dashboard_attachments(self, dashboard) -> Tuple[str, Optional[bytes]]:
+        """
+        HTML and PNG renderings of a dashboard for email.
+        Both come from the export cache, so a schedule sending the same dashboard
+        to many recipients renders it once.
+        
+        Returns:
+            Tuple of (html, image bytes or None)
+        """
+        from services.dashboard_export_service import DashboardExportService
+        
+        dashboard_html = DashboardExportService().generate_email_html(dashboard)
+        image_bytes = export_cache.get_or_render(
+            export_cache.dashboard_key(dashboard, 'email.png'),
+            lambda: self.generate_dashboard_image(dashboard_html, dashboard.name) or b''
+        )
+        return dashboard_html, image_bytes or None
+    
     def generate_dashboard_html(self, dashboard_items: List[Dict[str, Any]], 
                               dashboard_name: str = "Dashboard") -> str:
         """
@@ -336,9 +423,8 @@ def send_scheduled_dashboard_email(dashboard_id: str, recipient_email: str):
         dashboard = Dashboard.objects.get(id=dashboard_id)
         email_service = EmailService()
         
-        # Generate dashboard HTML
-        dashboard_items = list(dashboard.dashboard_items.all().values())
-        dashboard_html = email_service.generate_dashboard_html(dashboard_items, dashboard.name)
+        # Render dashboard once per dashboard state, shared across recipients
+        dashboard_html, image_bytes = email_service.render_dashboard_attachments(dashboard)
         
         # Generate attachments
         attachments = []
@@ -351,7 +437,6 @@ def send_scheduled_dashboard_email(dashboard_id: str, recipient_email: str):
         })
         
         # Image attachment
-        image_bytes = email_service.generate_dashboard_image(dashboard_html, dashboard.name)
         if image_bytes:
             attachments.append({
                 'content': image_bytes,
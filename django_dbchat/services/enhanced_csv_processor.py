@@ -16,6 +16,7 @@ import json
 from typing import Dict, List, Tuple, Any, Optional
 from io import StringIO
 import csv
+import codecs
 from django.core.files.storage import default_storage
 from django.conf import settings
 import os
@@ -59,30 +60,16 @@ class EnhancedCSVProcessor:
             Dictionary with detected structure information
         """
         try:
-            # Try different encodings
-            content = None
-            detected_encoding = 'utf-8'
-            
-            for encoding in self.supported_encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        content = f.read()
-                        detected_encoding = encoding
-                        break
-                except (UnicodeDecodeError, UnicodeError):
-                    continue
-            
-            if not content:
-                raise ValueError("Could not read file with any supported encoding")
+            # Sniff encoding and dialect from a byte sample instead of reading the whole file
+            dialect = self.sniff_csv_dialect(file_path)
+            detected_encoding = dialect['encoding']
+            delimiter = dialect['delimiter']
+            has_header = dialect['has_header']
             
             # Sample first few lines for analysis
-            lines = content.split('\n')[:20]  # Analyze first 20 lines
-            
-            # Detect delimiter
-            delimiter = self._detect_delimiter(lines)
-            
-            # Detect if file has header
-            has_header = self._detect_header(lines, delimiter)
+            lines = dialect['sample_lines'][:20]  # Analyze first 20 lines
+            if not lines:
+                raise ValueError("Could not read file with any supported encoding")
             
             # Detect if columns contain nested comma-separated values
             nested_columns = self._detect_nested_columns(lines, delimiter)
@@ -129,6 +116,72 @@ class EnhancedCSVProcessor:
             }
             return self._safe_json_serialize(error_response)
     
+    def sniff_csv_dialect(self, file_path: str, sample_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Detect encoding, delimiter, quote character and header from a byte sample
+        
+        Only the first ``sample_bytes`` of the file are read, so the cost does not
+        grow with file size.
+        
+        Args:
+            file_path: Path to the CSV file
+            sample_bytes: Number of bytes to sample (defaults to CSV_SNIFF_SAMPLE_BYTES)
+            
+        Returns:
+            Dictionary with encoding, delimiter, quotechar, has_header and sample_lines
+        """
+        sample_bytes = sample_bytes or getattr(settings, 'CSV_SNIFF_SAMPLE_BYTES', 1024 * 1024)
+        with open(file_path, 'rb') as f:
+            raw = f.read(sample_bytes)
+            at_eof = not f.read(1)
+        
+        encoding = self._detect_encoding(raw)
+        text = raw.decode(encoding, errors='replace')
+        if text.startswith('\ufeff'):
+            text = text[1:]
+        
+        lines = text.splitlines()
+        if not at_eof and len(lines) > 1:
+            lines = lines[:-1]  # Drop the partial last line of the sample
+        lines = [line for line in lines if line.strip()]
+        
+        delimiter = None
+        quotechar = '"'
+        try:
+            sniffed = csv.Sniffer().sniff('\n'.join(lines[:50]), delimiters=',;\t|')
+            delimiter = sniffed.delimiter
+            quotechar = sniffed.quotechar or '"'
+        except csv.Error:
+            pass
+        
+        if not delimiter or not self._validate_delimiter_consistency(lines, delimiter):
+            delimiter = self._detect_delimiter(lines)
+        
+        return {
+            'encoding': encoding,
+            'delimiter': delimiter,
+            'quotechar': quotechar,
+            'has_header': self._detect_header(lines, delimiter),
+            'sample_lines': lines,
+        }
+    
+    def _detect_encoding(self, raw: bytes) -> str:
+        """Detect the text encoding of a byte sample"""
+        if raw.startswith(b'\xef\xbb\xbf'):
+            return 'utf-8-sig'
+        if raw.startswith(b'\xff\xfe') or raw.startswith(b'\xfe\xff'):
+            return 'utf-16'
+        
+        for encoding in ['utf-8', 'cp1252']:
+            try:
+                # Incremental decode tolerates a multi-byte character cut off at the sample end
+                codecs.getincrementaldecoder(encoding)().decode(raw, final=False)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        
+        return 'latin-1'  # Decodes any byte sequence
+    
     def _detect_delimiter(self, lines: List[str]) -> str:
         """Detect the most likely delimiter"""
         if not lines:
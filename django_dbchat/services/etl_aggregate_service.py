@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+ETL Aggregate Service
+Runs aggregate operations inside DuckDB and re-aggregates only newly appended rows
+"""
+
+import logging
+import time
+from typing import List, Dict, Any, Tuple, Optional, Set
+
+from django.utils import timezone
+from datasets.models import DataSource, ETLOperation
+from datasets.data_access_layer import unified_data_access
+from utils.duckdb_manager import duckdb_manager
+from utils.data_catalog import data_catalog
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_FUNCTIONS = ['SUM', 'COUNT', 'AVG', 'MIN', 'MAX']
+
+# How each stored partial combines with the partial of newly appended rows
+_MERGE_FUNCTIONS = {'SUM': 'SUM', 'COUNT': 'SUM', 'MIN': 'MIN', 'MAX': 'MAX'}
+
+WATERMARK_COLUMN = '__watermark'
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class ETLAggregateService:
+    """
+    Service for executing aggregate operations on data sources.
+
+    The output table stores decomposable partial aggregates: SUM, COUNT, MIN
+    and MAX as-is, and AVG as a hidden sum and count next to the average.
+    When the operation has a watermark column, the output also keeps the
+    highest watermark of each group, so a refresh only aggregates source rows
+    above the stored watermark and merges them into the existing groups. The
+    output is rebuilt instead when the source shrank or the number of rows at
+    or below the stored watermark changed, which is how a replaced source (a
+    full ETL refresh) shows up; a rewrite that keeps that count is treated as
+    append-only. Rows whose watermark is NULL are only picked up by full
+    rebuilds.
+    """
+
+    def execute_aggregate_operation(self, source_id: str, group_by_columns: List[str], aggregate_functions: Any,
+                                    operation_name: str, user_id: Optional[int] = None,
+                                    source_table: Optional[str] = None,
+                                    watermark_column: Optional[str] = None) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Create and run an aggregate operation
+
+        Args:
+            source_id: Data source ID
+            group_by_columns: Columns to group by
+            aggregate_functions: {column: function or [functions]} or [{'column': ..., 'function': ...}];
+                                 use column '*' for COUNT(*)
+            operation_name: Name for the operation
+            user_id: User executing the operation
+            source_table: Integrated table to aggregate, either the source's main table (the default)
+                          or the output of an ETL operation derived from it
+            watermark_column: Ever-increasing source column enabling incremental refreshes
+                              (defaults to the source's incremental ETL column)
+
+        Returns:
+            Tuple[success, result_info]
+        """
+        try:
+            try:
+                source = DataSource.objects.get(id=source_id, status='active')
+            except DataSource.DoesNotExist:
+                return False, {'error': f'Data source {source_id} not found or inactive', 'error_type': 'invalid_request'}
+
+            integrated_table = unified_data_access.get_integrated_table_name(source)
+            source_table = source_table or integrated_table
+            if not source_table:
+                return False, {'error': f'No integrated table found for {source.name}', 'error_type': 'invalid_request'}
+            if source_table not in self._get_source_tables(source, integrated_table):
+                return False, {'error': f'Table {source_table} does not belong to {source.name}', 'error_type': 'invalid_request'}
+
+            column_types = self._get_column_types(source_table)
+            if column_types is None:
+                return False, {'error': f'Table {source_table} not found', 'error_type': 'invalid_request'}
+
+            if watermark_column is None:
+                default_column = (source.connection_info or {}).get('incremental_column')
+                watermark_column = default_column if default_column in column_types else None
+
+            aggregations = self._parse_aggregations(aggregate_functions)
+            error = self._validate(column_types, group_by_columns, aggregations, watermark_column)
+            if error:
+                return False, {'error': error, 'error_type': 'invalid_request'}
+
+            output_table_name = f"etl_aggregate_{timezone.now().strftime('%Y%m%d_%H%M%S')}_ds_{source.id.hex[:5]}"
+            etl_operation = ETLOperation.objects.create(
+                name=operation_name,
+                operation_type='aggregate',
+                source_tables=[source_table],
+                parameters={
+                    'source_id': str(source.id),
+                    'group_by_columns': group_by_columns,
+                    'aggregations': aggregations,
+                    'watermark_column': watermark_column
+                },
+                sql_query=self._build_full_sql(source_table, group_by_columns, aggregations, watermark_column),
+                output_table_name=output_table_name,
+                status='running',
+                created_by_id=user_id or 1,
+                data_lineage={
+                    'operation_type': 'aggregate',
+                    'source_data_sources': [str(source.id)],
+                    'source_table': source_table,
+                    'created_at': timezone.now().isoformat()
+                }
+            )
+
+            success, result = self.refresh_aggregate_operation(etl_operation, force_full=True)
+            if not success:
+                return False, result
+
+            return True, {
+                'operation_id': str(etl_operation.id),
+                'operation_name': operation_name,
+                'output_table': output_table_name,
+                'source': source.name,
+                'source_table': source_table,
+                **result
+            }
+
+        except Exception as e:
+            logger.error(f"Aggregate operation failed: {e}", exc_info=True)
+            return False, {'error': str(e)}
+
+    def refresh_aggregate_operation(self, etl_operation: ETLOperation,
+                                    force_full: bool = False) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Bring an aggregate operation's output up to date with its source table
+
+        Merges only rows above the stored watermark when possible, otherwise rebuilds the output.
+
+        Returns:
+            Tuple[success, result_info] with mode, row_count and rows_aggregated
+        """
+        parameters = dict(etl_operation.parameters or {})
+        source_table = etl_operation.source_tables[0]
+        output_table = etl_operation.output_table_name
+        group_by_columns = parameters.get('group_by_columns', [])
+        aggregations = parameters.get('aggregations', [])
+        watermark_column = parameters.get('watermark_column')
+        previous = parameters.get('watermark') or {}
+        start_time = time.time()
+
+        try:
+            # One lease for the whole refresh so the helpers below don't reopen the database
+            with duckdb_manager.session():
+                source_state = self._get_source_state(source_table)
+                if source_state is None:
+                    raise ValueError(f"Source table {source_table} not found")
+
+                last_watermark = None
+                if watermark_column and not force_full and self._table_exists(output_table) \
+                        and source_state['rows'] >= previous.get('source_rows', 0):
+                    last_watermark = self._get_output_watermark(output_table)
+                    # Table oids change whenever the database is reopened, so a replaced source is
+                    # recognised by the rows the output already covers no longer adding up
+                    if last_watermark is not None and \
+                            self._count_covered_rows(source_table, watermark_column, last_watermark) != previous.get('covered_rows'):
+                        last_watermark = None
+
+                if last_watermark is not None:
+                    mode = 'incremental'
+                    new_watermark, new_rows = self._get_new_rows(source_table, watermark_column, last_watermark)
+                    if new_rows:
+                        delta_sql = self._build_partial_sql(
+                            source_table, group_by_columns, aggregations, watermark_column,
+                            where=f"{_quote_identifier(watermark_column)} > ? AND {_quote_identifier(watermark_column)} <= ?"
+                        )
+                        merge_sql = self._build_merge_sql(output_table, delta_sql, group_by_columns, aggregations, watermark_column)
+                        row_count = self._replace_output(output_table, merge_sql, [last_watermark, new_watermark])
+                    else:
+                        row_count = etl_operation.row_count
+                        new_watermark = last_watermark
+                else:
+                    mode = 'full'
+                    new_rows = source_state['rows']
+                    row_count = self._replace_output(
+                        output_table, self._build_full_sql(source_table, group_by_columns, aggregations, watermark_column)
+                    )
+                    new_watermark = self._get_output_watermark(output_table) if watermark_column else None
+
+                covered_rows = None
+                if new_watermark is not None:
+                    covered_rows = self._count_covered_rows(source_table, watermark_column, new_watermark)
+
+            execution_time = time.time() - start_time
+            parameters['watermark'] = {
+                'column': watermark_column,
+                'value': None if new_watermark is None else str(new_watermark),
+                'source_rows': source_state['rows'],
+                'covered_rows': covered_rows,
+                'mode': mode,
+                'updated_at': timezone.now().isoformat()
+            }
+            etl_operation.parameters = parameters
+            etl_operation.status = 'completed'
+            etl_operation.error_message = ''
+            etl_operation.last_run = timezone.now()
+            etl_operation.execution_time = execution_time
+            etl_operation.row_count = row_count
+            etl_operation.result_summary = {
+                'total_rows': row_count,
+                'group_by_columns': group_by_columns,
+                'aggregations': [aggregation['alias'] for aggregation in aggregations],
+                'refresh_mode': mode,
+                'rows_aggregated': new_rows
+            }
+            etl_operation.save()
+
+            logger.info(
+                f"[ETL_AGGREGATE] {mode.title()} refresh of {output_table}: "
+                f"{new_rows} source rows aggregated into {row_count} groups in {execution_time:.2f}s"
+            )
+            return True, {'mode': mode, 'row_count': row_count, 'rows_aggregated': new_rows,
+                          'watermark': parameters['watermark']['value']}
+
+        except Exception as e:
+            logger.error(f"[ETL_AGGREGATE] Refresh of {output_table} failed: {e}")
+            etl_operation.status = 'failed'
+            etl_operation.error_message = str(e)
+            etl_operation.save()
+            return False, {'error': str(e), 'operation_id': str(etl_operation.id)}
+
+    def _get_source_tables(self, source: DataSource, integrated_table: Optional[str]) -> Set[str]:
+        """The source's integrated table plus every ETL output its owner derived from it, directly or not"""
+        tables = {integrated_table} if integrated_table else set()
+        operations = list(ETLOperation.objects.filter(created_by_id=source.created_by_id, status='completed').values(
+            'output_table_name', 'source_tables', 'data_lineage'
+        ))
+        derived = True
+        while derived:
+            derived = False
+            for operation in operations:
+                if operation['output_table_name'] in tables:
+                    continue
+                lineage_sources = (operation['data_lineage'] or {}).get('source_data_sources') or []
+                inputs = {str(table).split('.')[-1].strip('"') for table in operation['source_tables'] or []}
+                if str(source.id) in lineage_sources or inputs & tables:
+                    tables.add(operation['output_table_name'])
+                    derived = True
+        return tables
+
+    def _parse_aggregations(self, aggregate_functions: Any) -> List[Dict[str, str]]:
+        """Normalise the accepted aggregate specifications to [{'function', 'column', 'alias'}]"""
+        pairs = []
+        if isinstance(aggregate_functions, dict):
+            for column, functions in aggregate_functions.items():
+                for function in (functions if isinstance(functions, list) else [functions]):
+                    pairs.append((str(function).upper(), column))
+        else:
+            for aggregation in aggregate_functions or []:
+                if not isinstance(aggregation, dict):
+                    aggregation = {}
+                pairs.append((str(aggregation.get('function', '')).upper(), aggregation.get('column', '')))
+
+        aggregations = []
+        for function, column in pairs:
+            alias = f"{function.lower()}_{'all' if column == '*' else column}"
+            if any(existing['alias'] == alias for existing in aggregations):
+                continue
+            aggregations.append({'function': function, 'column': column, 'alias': alias})
+        return aggregations
+
+    def _validate(self, column_types: Dict[str, str], group_by_columns: List[str],
+                  aggregations: List[Dict[str, str]], watermark_column: Optional[str]) -> Optional[str]:
+        if not aggregations:
+            return 'At least one aggregate function must be specified'
+
+        for column in group_by_columns:
+            if column not in column_types:
+                return f'Unknown GROUP BY column: {column}'
+
+        for aggregation in aggregations:
+            if aggregation['function'] not in ALLOWED_FUNCTIONS:
+                return f"Invalid aggregation function: {aggregation['function']}"
+            if aggregation['column'] == '*':
+                if aggregation['function'] != 'COUNT':
+                    return f"{aggregation['function']}(*) is not supported"
+            elif aggregation['column'] not in column_types:
+                return f"Unknown aggregate column: {aggregation['column']}"
+
+        if watermark_column and watermark_column not in column_types:
+            return f'Unknown watermark column: {watermark_column}'
+        return None
+
+    def _build_partial_sql(self, source_table: str, group_by_columns: List[str], aggregations: List[Dict[str, str]],
+                           watermark_column: Optional[str], where: Optional[str] = None) -> str:
+        """Decomposable partial aggregates of the source rows matching an optional filter"""
+        select_list = [_quote_identifier(column) for column in group_by_columns]
+        for aggregation in aggregations:
+            function = aggregation['function']
+            column = '*' if aggregation['column'] == '*' else _quote_identifier(aggregation['column'])
+            if function == 'AVG':
+                select_list.append(f"SUM({column}) AS {_quote_identifier('__sum_' + aggregation['alias'])}")
+                select_list.append(f"COUNT({column}) AS {_quote_identifier('__count_' + aggregation['alias'])}")
+            else:
+                select_list.append(f"{function}({column}) AS {_quote_identifier(aggregation['alias'])}")
+        if watermark_column:
+            select_list.append(f"MAX({_quote_identifier(watermark_column)}) AS {_quote_identifier(WATERMARK_COLUMN)}")
+
+        sql = f"SELECT {', '.join(select_list)} FROM {_quote_identifier(source_table)}"
+        if where:
+            sql += f" WHERE {where}"
+        if group_by_columns:
+            sql += f" GROUP BY {', '.join(_quote_identifier(column) for column in group_by_columns)}"
+        return sql
+
+    def _build_output_sql(self, partial_sql: str, group_by_columns: List[str], aggregations: List[Dict[str, str]],
+                          watermark_column: Optional[str]) -> str:
+        """Output columns in a fixed order, with averages derived from their stored sum and count"""
+        select_list = [_quote_identifier(column) for column in group_by_columns]
+        helper_columns = []
+        for aggregation in aggregations:
+            alias = aggregation['alias']
+            if aggregation['function'] == 'AVG':
+                sum_column = _quote_identifier('__sum_' + alias)
+                count_column = _quote_identifier('__count_' + alias)
+                select_list.append(f"CAST({sum_column} AS DOUBLE) / NULLIF({count_column}, 0) AS {_quote_identifier(alias)}")
+                helper_columns.extend([sum_column, count_column])
+            else:
+                select_list.append(_quote_identifier(alias))
+        if watermark_column:
+            helper_columns.append(_quote_identifier(WATERMARK_COLUMN))
+
+        return f"SELECT {', '.join(select_list + helper_columns)} FROM ({partial_sql}) AS partials"
+
+    def _build_full_sql(self, source_table: str, group_by_columns: List[str], aggregations: List[Dict[str, str]],
+                        watermark_column: Optional[str]) -> str:
+        partial_sql = self._build_partial_sql(source_table, group_by_columns, aggregations, watermark_column)
+        return self._build_output_sql(partial_sql, group_by_columns, aggregations, watermark_column)
+
+    def _build_merge_sql(self, output_table: str, delta_sql: str, group_by_columns: List[str],
+                         aggregations: List[Dict[str, str]], watermark_column: Optional[str]) -> str:
+        """Combine the stored partials with the partials of newly appended rows"""
+        partial_columns = []
+        merged = [_quote_identifier(column) for column in group_by_columns]
+        for aggregation in aggregations:
+            alias = aggregation['alias']
+            if aggregation['function'] == 'AVG':
+                for helper in ('__sum_' + alias, '__count_' + alias):
+                    partial_columns.append(_quote_identifier(helper))
+                    merged.append(f"SUM({_quote_identifier(helper)}) AS {_quote_identifier(helper)}")
+            else:
+                function = _MERGE_FUNCTIONS[aggregation['function']]
+                expression = f"{function}({_quote_identifier(alias)})"
+                if aggregation['function'] == 'COUNT':
+                    expression = f"CAST({expression} AS BIGINT)"
+                partial_columns.append(_quote_identifier(alias))
+                merged.append(f"{expression} AS {_quote_identifier(alias)}")
+        if watermark_column:
+            partial_columns.append(_quote_identifier(WATERMARK_COLUMN))
+            merged.append(f"MAX({_quote_identifier(WATERMARK_COLUMN)}) AS {_quote_identifier(WATERMARK_COLUMN)}")
+
+        group_columns = [_quote_identifier(column) for column in group_by_columns]
+        stored = f"SELECT {', '.join(group_columns + partial_columns)} FROM {_quote_identifier(output_table)}"
+        delta = f"SELECT {', '.join(group_columns + partial_columns)} FROM ({delta_sql}) AS delta"
+        merge_sql = f"SELECT {', '.join(merged)} FROM ({stored} UNION ALL {delta}) AS combined"
+        if group_by_columns:
+            merge_sql += f" GROUP BY {', '.join(group_columns)}"
+        return self._build_output_sql(merge_sql, group_by_columns, aggregations, watermark_column)
+
+    def _replace_output(self, output_table: str, sql: str, params: Optional[List[Any]] = None) -> int:
+        """Swap in a new output table built from a query in one transaction; returns its row count"""
+        stage_table = f"{output_table}__stage"
+        with duckdb_manager.writer() as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {_quote_identifier(stage_table)}")
+            conn.begin()
+            try:
+                conn.execute(f"CREATE TABLE {_quote_identifier(stage_table)} AS {sql}", params or [])
+                conn.execute(f"DROP TABLE IF EXISTS {_quote_identifier(output_table)}")
+                conn.execute(f"ALTER TABLE {_quote_identifier(stage_table)} RENAME TO {_quote_identifier(output_table)}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {_quote_identifier(output_table)}").fetchone()[0]
+
+        data_catalog.refresh_table(output_table)
+        return row_count
+
+    def _get_column_types(self, table_name: str) -> Optional[Dict[str, str]]:
+        with duckdb_manager.session() as conn:
+            if not self._table_exists(table_name):
+                return None
+            schema = conn.execute(f"DESCRIBE {_quote_identifier(table_name)}").fetchall()
+        return {column[0]: column[1] for column in schema}
+
+    def _table_exists(self, table_name: str) -> bool:
+        with duckdb_manager.session() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [table_name]
+            ).fetchone()[0] > 0
+
+    def _get_source_state(self, source_table: str) -> Optional[Dict[str, Any]]:
+        """Row count of the source, or None if it does not exist"""
+        with duckdb_manager.session() as conn:
+            if not self._table_exists(source_table):
+                return None
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {_quote_identifier(source_table)}").fetchone()[0]
+        return {'rows': row_count}
+
+    def _count_covered_rows(self, source_table: str, watermark_column: str, watermark: Any) -> int:
+        """Number of source rows at or below a watermark, i.e. already aggregated into the output"""
+        with duckdb_manager.session() as conn:
+            return conn.execute(
+                f"SELECT COUNT(*) FROM {_quote_identifier(source_table)} WHERE {_quote_identifier(watermark_column)} <= ?",
+                [watermark]
+            ).fetchone()[0]
+
+    def _get_output_watermark(self, output_table: str) -> Any:
+        try:
+            with duckdb_manager.session() as conn:
+                return conn.execute(
+                    f"SELECT MAX({_quote_identifier(WATERMARK_COLUMN)}) FROM {_quote_identifier(output_table)}"
+                ).fetchone()[0]
+        except Exception as e:
+            logger.warning(f"[ETL_AGGREGATE] Could not read watermark of {output_table}: {e}")
+            return None
+
+    def _get_new_rows(self, source_table: str, watermark_column: str, last_watermark: Any) -> Tuple[Any, int]:
+        """Highest watermark and number of source rows above the stored watermark"""
+        column = _quote_identifier(watermark_column)
+        with duckdb_manager.session() as conn:
+            new_watermark, new_rows = conn.execute(
+                f"SELECT MAX({column}), COUNT(*) FROM {_quote_identifier(source_table)} WHERE {column} > ?",
+                [last_watermark]
+            ).fetchone()
+        return new_watermark, new_rows
+
+
+# Global instance
+etl_aggregate_service = ETLAggregateService()
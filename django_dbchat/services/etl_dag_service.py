@@ -0,0 +1,402 @@
+"""
+ETL DAG Service for ConvaBI Application
+Re-runs the ETL operations downstream of refreshed data sources in dependency order
+"""
+
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from celery import shared_task
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from datasets.models import DataSource, ETLOperation
+from utils.duckdb_manager import duckdb_manager
+from utils.data_catalog import data_catalog
+from utils.join_estimator import JoinEstimate, preflight_join
+
+logger = logging.getLogger(__name__)
+
+_CREATE_TABLE = re.compile(r'^\s*CREATE\s+(OR\s+REPLACE\s+)?TABLE\s', re.IGNORECASE)
+
+
+def _source_key(source_id) -> str:
+    return f"ds:{source_id}"
+
+
+def _operation_key(operation_id) -> str:
+    return f"op:{operation_id}"
+
+
+class ETLDagService:
+    """
+    Dependency graph over ETL operations and the data sources they read.
+
+    Each ``ETLOperation.source_tables`` entry is resolved to either a data
+    source or the operation whose output table it names; data sources created
+    from an ETL result (``source_lineage`` type ``etl_result``) resolve to the
+    operation that produced them. A refresh walks the operations downstream of
+    the refreshed sources in topological order, running independent branches
+    on up to ``ETL_DAG_MAX_WORKERS`` threads.
+
+    Every run records the data version of each input on the operation's
+    ``data_lineage`` and bumps the operation's own ``output_version``. An
+    operation whose inputs still have the recorded versions is skipped, so
+    only the stale part of the graph is recomputed. Result data sources of a
+    re-run operation get their ``data_version`` bumped, which invalidates
+    cached queries and dashboard tiles built on them.
+    """
+
+    def __init__(self):
+        self.max_workers = getattr(settings, 'ETL_DAG_MAX_WORKERS', 4)
+
+    def build_graph(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Dependency graph of all re-runnable ETL operations
+
+        Returns:
+            Dictionary keyed by operation id with the operation's inputs (source
+            and operation keys) and the ids of the operations it reads from
+        """
+        operations = list(
+            ETLOperation.objects.filter(status__in=['completed', 'failed']).exclude(output_table_name='')
+            .only('id', 'operation_type', 'source_tables', 'parameters', 'output_table_name')
+        )
+        operations_by_table = {operation.output_table_name: str(operation.id) for operation in operations}
+        sources_by_table, result_sources = self._index_sources()
+
+        graph = {}
+        for operation in operations:
+            inputs = []
+            for reference in operation.source_tables or []:
+                key = self._resolve_input(str(reference), operations_by_table, sources_by_table, result_sources)
+                if key is None and (operation.parameters or {}).get('source_id'):
+                    key = _source_key(operation.parameters['source_id'])
+                if key is None:
+                    logger.debug(f"[ETL_DAG] Input {reference} of {operation.id} is not a known source or operation")
+                elif key not in inputs and key != _operation_key(operation.id):
+                    inputs.append(key)
+
+            graph[str(operation.id)] = {
+                'inputs': inputs,
+                'upstream': [key[len('op:'):] for key in inputs if key.startswith('op:')],
+            }
+        return graph
+
+    def refresh(self, data_source_ids: Optional[Iterable[str]] = None,
+                operation_ids: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Re-run the stale operations downstream of the given sources or operations
+
+        Args:
+            data_source_ids: Refreshed data sources; operations reading them and everything downstream are checked
+            operation_ids: Operations to check together with everything downstream of them
+            force: Re-run every checked operation even if its inputs are unchanged
+
+        Returns:
+            Dictionary with checked, refreshed, skipped, failed and blocked counts, and the
+            ids of result data sources whose data changed
+        """
+        graph = self.build_graph()
+
+        if data_source_ids is None and operation_ids is None:
+            roots = set(graph)
+        else:
+            source_keys = {_source_key(source_id) for source_id in data_source_ids or []}
+            roots = {operation_id for operation_id, node in graph.items() if source_keys & set(node['inputs'])}
+            roots.update(str(operation_id) for operation_id in operation_ids or [] if str(operation_id) in graph)
+
+        selected = self._downstream(graph, roots)
+        stats = {'checked': len(selected), 'refreshed': 0, 'skipped': 0, 'failed': 0, 'blocked': 0,
+                 'refreshed_sources': []}
+        if not selected:
+            return stats
+
+        outcomes = self._execute(graph, selected, force)
+        for operation_id, (outcome, changed_sources) in outcomes.items():
+            stats[outcome] += 1
+            stats['refreshed_sources'].extend(changed_sources)
+
+        logger.info(
+            f"[ETL_DAG] Checked {stats['checked']} operations: {stats['refreshed']} refreshed, "
+            f"{stats['skipped']} unchanged, {stats['failed']} failed, {stats['blocked']} blocked"
+        )
+        return stats
+
+    def _execute(self, graph: Dict[str, Dict[str, Any]], selected: set,
+                 force: bool) -> Dict[str, Tuple[str, List[str]]]:
+        """Run the selected operations once all of their selected upstream operations have finished"""
+        waiting_on = {
+            operation_id: {upstream for upstream in graph[operation_id]['upstream'] if upstream in selected}
+            for operation_id in selected
+        }
+        outcomes: Dict[str, Tuple[str, List[str]]] = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers), thread_name_prefix='etl-dag') as executor:
+            running = {}
+
+            def submit_ready():
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for operation_id in sorted(waiting_on):
+                        if operation_id in outcomes or operation_id in running.values() or waiting_on[operation_id]:
+                            continue
+                        upstream_ids = [upstream for upstream in graph[operation_id]['upstream'] if upstream in selected]
+                        if any(outcomes[upstream][0] in ('failed', 'blocked') for upstream in upstream_ids):
+                            # Do not build on the output of a failed operation
+                            outcomes[operation_id] = ('blocked', [])
+                            release(operation_id)
+                            progressed = True
+                            continue
+                        future = executor.submit(self._run_node, operation_id, graph[operation_id], force)
+                        running[future] = operation_id
+
+            def release(operation_id):
+                for dependencies in waiting_on.values():
+                    dependencies.discard(operation_id)
+
+            submit_ready()
+            while running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    operation_id = running.pop(future)
+                    try:
+                        outcomes[operation_id] = future.result()
+                    except Exception as e:
+                        logger.error(f"[ETL_DAG] Operation {operation_id} failed: {e}")
+                        outcomes[operation_id] = ('failed', [])
+                    release(operation_id)
+                submit_ready()
+
+        # Operations left waiting are part of a dependency cycle
+        for operation_id in selected - set(outcomes):
+            logger.warning(f"[ETL_DAG] Operation {operation_id} is part of a dependency cycle and was not run")
+            outcomes[operation_id] = ('blocked', [])
+        return outcomes
+
+    def _run_node(self, operation_id: str, node: Dict[str, Any], force: bool) -> Tuple[str, List[str]]:
+        """Re-run one operation if its inputs changed; returns its outcome and changed result sources"""
+        try:
+            etl_operation = ETLOperation.objects.get(id=operation_id)
+            lineage = dict(etl_operation.data_lineage or {})
+            versions = self._input_versions(node['inputs'])
+
+            if not force and lineage.get('input_versions') == versions:
+                return 'skipped', []
+
+            refresh = self._get_refresher(etl_operation)
+            if refresh is None:
+                logger.info(f"[ETL_DAG] {etl_operation.name} ({etl_operation.operation_type}) cannot be re-run, skipping")
+                return 'skipped', []
+
+            logger.info(f"[ETL_DAG] Re-running {etl_operation.name} ({etl_operation.operation_type})")
+            success, result = refresh(etl_operation)
+            if not success:
+                logger.error(f"[ETL_DAG] Re-running {etl_operation.name} failed: {result.get('error')}")
+                return 'failed', []
+
+            etl_operation.refresh_from_db(fields=['data_lineage'])
+            lineage = dict(etl_operation.data_lineage or {})
+            lineage['input_versions'] = versions
+            lineage['output_version'] = lineage.get('output_version', 0) + 1
+            lineage['refreshed_at'] = timezone.now().isoformat()
+            ETLOperation.objects.filter(pk=etl_operation.pk).update(data_lineage=lineage)
+
+            changed_sources = []
+            for source in DataSource.objects.filter(
+                source_type='etl_result', connection_info__source_etl_operation_id=operation_id
+            ):
+                source.bump_data_version()
+                changed_sources.append(str(source.id))
+            return 'refreshed', changed_sources
+        finally:
+            # Pool threads own their Django and DuckDB connections
+            connection.close()
+            duckdb_manager.release_cursor()
+
+    def _get_refresher(self, etl_operation: ETLOperation):
+        """Function re-running an operation in place, or None for operations that cannot be replayed"""
+        parameters = etl_operation.parameters or {}
+        if etl_operation.operation_type == 'aggregate' and 'aggregations' in parameters:
+            from services.etl_aggregate_service import etl_aggregate_service
+            return etl_aggregate_service.refresh_aggregate_operation
+        if etl_operation.operation_type == 'union' and 'source_ids' in parameters:
+            from services.etl_union_service import etl_union_service
+            return etl_union_service.refresh_union_operation
+        if etl_operation.operation_type == 'join' and (etl_operation.sql_query or 'left_table' in parameters):
+            return self._refresh_join
+        return None
+
+    def _refresh_join(self, etl_operation: ETLOperation) -> Tuple[bool, Dict[str, Any]]:
+        """Replay a join's SQL, replacing its output table, unless its estimated output is too large"""
+        try:
+            sql = etl_operation.sql_query or self._join_sql_from_parameters(etl_operation)
+            if not _CREATE_TABLE.match(sql):
+                return False, {'error': 'Stored join SQL does not create a table'}
+            sql = _CREATE_TABLE.sub('CREATE OR REPLACE TABLE ', sql, count=1)
+
+            # Inputs may have grown since the join last ran - estimate before rebuilding
+            estimate = self._preflight_join(etl_operation)
+            if estimate and not estimate.allowed:
+                error = f"Join refused: estimated output of {estimate.estimated_rows:,} rows is too large"
+                logger.warning(f"[JOIN_PREFLIGHT] {etl_operation.name}: {error}")
+                etl_operation.status = 'failed'
+                etl_operation.error_message = error
+                etl_operation.save()
+                return False, {'error': error, 'error_type': 'join_too_large', 'preflight': estimate.to_dict()}
+
+            output_table = etl_operation.output_table_name
+            with duckdb_manager.writer() as conn:
+                conn.execute(sql)
+                row_count = conn.execute(f'SELECT COUNT(*) FROM "{output_table}"').fetchone()[0]
+            data_catalog.refresh_table(output_table)
+
+            etl_operation.status = 'completed'
+            etl_operation.error_message = ''
+            etl_operation.sql_query = sql
+            etl_operation.row_count = row_count
+            etl_operation.last_run = timezone.now()
+            etl_operation.save()
+            return True, {'row_count': row_count, 'output_table': output_table}
+
+        except Exception as e:
+            return False, {'error': str(e)}
+
+    def _preflight_join(self, etl_operation: ETLOperation) -> Optional[JoinEstimate]:
+        """Estimate a stored join from its parameters; None when they don't describe the join"""
+        parameters = etl_operation.parameters or {}
+        left_column = parameters.get('validated_left_column', parameters.get('left_column'))
+        right_column = parameters.get('validated_right_column', parameters.get('right_column'))
+        if not (parameters.get('left_table') and parameters.get('right_table') and left_column and right_column):
+            return None
+
+        def table_reference(name: str) -> str:
+            # Schema-qualified or already quoted names are used as stored
+            return name if '"' in name or '.' in name else f'"{name}"'
+
+        with duckdb_manager.session() as conn:
+            return preflight_join(
+                conn, table_reference(parameters['left_table']), table_reference(parameters['right_table']),
+                left_column, right_column, parameters.get('join_type', 'INNER')
+            )
+
+    def _join_sql_from_parameters(self, etl_operation: ETLOperation) -> str:
+        """Regenerate join SQL for operations created before the SQL was stored"""
+        from utils.join_validator import JoinSQLValidator
+
+        parameters = etl_operation.parameters
+        result = JoinSQLValidator.generate_join_sql(
+            left_table=parameters['left_table'],
+            right_table=parameters['right_table'],
+            left_column=parameters.get('validated_left_column', parameters.get('left_column')),
+            right_column=parameters.get('validated_right_column', parameters.get('right_column')),
+            join_type=parameters.get('join_type', 'INNER'),
+            output_table=etl_operation.output_table_name
+        )
+        if not result.is_valid:
+            raise ValueError(f"Cannot regenerate join SQL: {result.error_message}")
+        return result.corrected_sql
+
+    def _index_sources(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Table names that identify each data source, and the producing operation of ETL result sources
+
+        Returns:
+            Tuple[source id by table name, operation id by result source id]
+        """
+        sources_by_table = {}
+        result_sources = {}
+        for source in DataSource.objects.filter(is_deleted=False).only(
+            'id', 'name', 'source_type', 'table_name', 'connection_info', 'source_lineage'
+        ):
+            source_id = str(source.id)
+            source_hex = source.id.hex
+            names = [source_id, f"ds_{source_hex}", f"source_{source_hex}", source.table_name]
+            connection_info = source.connection_info or {}
+            for table_name in connection_info.get('tables') or []:
+                # Tables extracted from source databases (see ScheduledETLService._extract_table)
+                names.append(f"{source.name}_{table_name}".replace('-', '_').replace(' ', '_'))
+            for name in names:
+                if name:
+                    sources_by_table.setdefault(name, source_id)
+
+            operation_id = connection_info.get('source_etl_operation_id') or \
+                ((source.source_lineage or {}).get('source_operation') or {}).get('id')
+            if source.source_type == 'etl_result' and operation_id:
+                result_sources[source_id] = str(operation_id)
+        return sources_by_table, result_sources
+
+    def _resolve_input(self, reference: str, operations_by_table: Dict[str, str],
+                       sources_by_table: Dict[str, str], result_sources: Dict[str, str]) -> Optional[str]:
+        """Source or operation key for one source_tables entry (a source id or a possibly qualified table name)"""
+        name = reference.split('.')[-1].strip('"')
+        if name in operations_by_table:
+            return _operation_key(operations_by_table[name])
+
+        source_id = sources_by_table.get(reference) or sources_by_table.get(name)
+        if source_id is None:
+            return None
+        if source_id in result_sources:
+            return _operation_key(result_sources[source_id])
+        return _source_key(source_id)
+
+    def _input_versions(self, inputs: List[str]) -> Dict[str, int]:
+        """Current data version of every input"""
+        source_ids = [key[len('ds:'):] for key in inputs if key.startswith('ds:')]
+        operation_ids = [key[len('op:'):] for key in inputs if key.startswith('op:')]
+
+        versions = {}
+        for source_id, data_version in DataSource.objects.filter(id__in=source_ids).values_list('id', 'data_version'):
+            versions[_source_key(source_id)] = data_version
+        for operation_id, lineage in ETLOperation.objects.filter(id__in=operation_ids).values_list('id', 'data_lineage'):
+            versions[_operation_key(operation_id)] = (lineage or {}).get('output_version', 0)
+        return versions
+
+    def _downstream(self, graph: Dict[str, Dict[str, Any]], roots: Iterable[str]) -> set:
+        """Roots and every operation that reads from them, directly or transitively"""
+        dependents: Dict[str, List[str]] = {}
+        for operation_id, node in graph.items():
+            for upstream in node['upstream']:
+                dependents.setdefault(upstream, []).append(operation_id)
+
+        selected = set()
+        stack = list(roots)
+        while stack:
+            operation_id = stack.pop()
+            if operation_id in selected or operation_id not in graph:
+                continue
+            selected.add(operation_id)
+            stack.extend(dependents.get(operation_id, []))
+        return selected
+
+
+@shared_task
+def refresh_etl_pipeline(data_source_ids: Optional[List[str]] = None):
+    """
+    Celery task to re-run the ETL operations downstream of refreshed data sources.
+    Queued after ETL jobs; dashboards on changed ETL results are refreshed afterwards.
+    """
+    try:
+        stats = etl_dag_service.refresh(data_source_ids)
+        if stats['refreshed_sources']:
+            from services.dashboard_refresh_service import refresh_dashboard_items
+            refresh_dashboard_items.delay(stats['refreshed_sources'])
+        return {'success': True, **stats}
+
+    except Exception as e:
+        error_msg = f"Error refreshing ETL pipeline: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        return {
+            'success': False,
+            'error': error_msg
+        }
+    finally:
+        connection.close()
+
+
+# Global instance
+etl_dag_service = ETLDagService()
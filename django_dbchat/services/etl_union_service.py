@@ -5,32 +5,35 @@ Handles union operations between data sources without external dependencies
 """
 
 import logging
-import pandas as pd
 from typing import List, Dict, Any, Tuple, Optional
 from django.utils import timezone
 from datasets.models import DataSource, ETLOperation
 from datasets.data_access_layer import unified_data_access
+from utils.duckdb_manager import duckdb_manager
+from utils.data_catalog import data_catalog
 
 logger = logging.getLogger(__name__)
 
+_NUMERIC_TYPES = ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'UTINYINT', 'USMALLINT',
+                  'UINTEGER', 'UBIGINT', 'FLOAT', 'REAL', 'DOUBLE', 'DECIMAL', 'NUMERIC')
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _is_numeric_type(column_type: str) -> bool:
+    return str(column_type).upper().split('(')[0].strip() in _NUMERIC_TYPES
+
+
 class ETLUnionService:
-    """Service for executing union operations on data sources"""
+    """
+    Service for executing union operations on data sources.
     
-    def __init__(self):
-        self.duckdb_conn = None
-        self._init_connection()
-    
-    def _init_connection(self):
-        """Initialize DuckDB connection"""
-        try:
-            unified_data_access._ensure_duckdb_connection()
-            self.duckdb_conn = unified_data_access.duckdb_connection
-            if self.duckdb_conn:
-                logger.info("ETL Union Service initialized with DuckDB connection")
-            else:
-                logger.warning("ETL Union Service initialized without DuckDB connection")
-        except Exception as e:
-            logger.error(f"Failed to initialize ETL Union Service: {e}")
+    The union runs entirely inside the integrated DuckDB database as one
+    CREATE TABLE AS SELECT ... UNION [ALL] BY NAME over the sources' tables,
+    so every row is included and no data passes through pandas.
+    """
     
     def execute_union_operation(self, source_ids: List[str], operation_name: str, 
                                union_type: str = 'UNION ALL', user_id: Optional[int] = None) -> Tuple[bool, Dict[str, Any]]:
@@ -65,42 +68,32 @@ class ETLUnionService:
                 except DataSource.DoesNotExist:
                     return False, {'error': f'Data source {source_id} not found or inactive'}
             
-            # Load data from all sources
-            dataframes = []
-            source_info = []
-            
-            for source in sources:
-                success, df, message = unified_data_access.get_data_source_data(source)
-                if not success or df is None or df.empty:
-                    return False, {'error': f'Failed to load data from {source.name}: {message}'}
-                
-                dataframes.append(df)
-                source_info.append({
-                    'name': source.name,
-                    'id': str(source.id),
-                    'rows': len(df),
-                    'columns': list(df.columns)
-                })
-                logger.info(f"Loaded data from {source.name}: {len(df)} rows, {len(df.columns)} columns")
+            # Resolve the integrated DuckDB table and schema of every source
+            source_tables, source_info, error = self._describe_sources(sources)
+            if error:
+                return False, {'error': error}
             
             # Perform schema alignment
-            aligned_dataframes, schema_alignment = self._align_schemas(dataframes, source_info)
-            
-            # Execute union
-            union_result = self._execute_union(aligned_dataframes, union_type)
-            
-            if union_result is None or union_result.empty:
-                return False, {'error': 'Union operation produced no results'}
+            schema_alignment = self._align_schemas(source_info)
             
             # Generate output table name
             output_table_name = f"etl_union_{timezone.now().strftime('%Y%m%d_%H%M%S')}_" + \
                                "_".join([f"ds_{source.id.hex[:5]}" for source in sources])
             
-            # Store result in DuckDB
-            storage_success = self._store_union_result(union_result, output_table_name)
-            if not storage_success:
+            # Execute union inside DuckDB
+            union_sql = self._build_union_sql(source_tables, source_info, schema_alignment, union_type)
+            row_count = self._store_union_result(union_sql, output_table_name)
+            if row_count is None:
                 return False, {'error': 'Failed to store union results'}
             
+            if row_count == 0:
+                self._drop_table(output_table_name)
+                return False, {'error': 'Union operation produced no results'}
+            
+            column_count = schema_alignment['total_unique_columns']
+            for info in source_info:
+                info.pop('column_types', None)
+            
             # Create ETL operation record
             etl_operation = ETLOperation.objects.create(
                 name=operation_name,
@@ -114,11 +107,11 @@ class ETLUnionService:
                 output_table_name=output_table_name,
                 status='completed',
                 created_by_id=user_id or 1,
-                row_count=len(union_result),
+                row_count=row_count,
                 result_summary={
                     'sources_count': len(sources),
-                    'total_rows': len(union_result),
-                    'total_columns': len(union_result.columns),
+                    'total_rows': row_count,
+                    'total_columns': column_count,
                     'union_type': union_type,
                     'schema_alignment_applied': bool(schema_alignment),
                     'source_breakdown': source_info
@@ -131,14 +124,14 @@ class ETLUnionService:
                 }
             )
             
-            logger.info(f"Union operation completed successfully: {output_table_name} with {len(union_result)} rows")
+            logger.info(f"Union operation completed successfully: {output_table_name} with {row_count} rows")
             
             return True, {
                 'operation_id': str(etl_operation.id),
                 'operation_name': operation_name,
                 'output_table': output_table_name,
-                'row_count': len(union_result),
-                'column_count': len(union_result.columns),
+                'row_count': row_count,
+                'column_count': column_count,
                 'sources': [source.name for source in sources],
                 'union_type': union_type,
                 'schema_alignment': schema_alignment
@@ -150,119 +143,202 @@ class ETLUnionService:
             logger.error(f"Traceback: {traceback.format_exc()}")
             return False, {'error': str(e)}
     
-    def _align_schemas(self, dataframes: List[pd.DataFrame], source_info: List[Dict]) -> Tuple[List[pd.DataFrame], Dict[str, Any]]:
+    def refresh_union_operation(self, etl_operation: ETLOperation) -> Tuple[bool, Dict[str, Any]]:
         """
-        Align schemas across multiple dataframes for union compatibility
+        Re-run a completed union operation over its sources' current data, replacing its output table
         
         Returns:
-            Tuple[aligned_dataframes, alignment_info]
+            Tuple[success, result_info]
         """
-        if not dataframes:
-            return [], {}
-        
-        # Get all unique columns across all dataframes
-        all_columns = set()
-        for df in dataframes:
-            all_columns.update(df.columns)
-        
-        all_columns = sorted(list(all_columns))
-        
-        # Align each dataframe
-        aligned_dataframes = []
-        alignment_details = []
-        
-        for i, df in enumerate(dataframes):
-            aligned_df = df.copy()
-            source_alignment = {
-                'source_name': source_info[i]['name'],
-                'original_columns': list(df.columns),
-                'added_columns': [],
-                'column_count_before': len(df.columns),
-                'column_count_after': 0
-            }
+        try:
+            union_type = etl_operation.parameters.get('union_type', 'UNION ALL')
+            sources = []
+            for source_id in etl_operation.source_tables:
+                try:
+                    sources.append(DataSource.objects.get(id=source_id, status='active'))
+                except DataSource.DoesNotExist:
+                    return False, {'error': f'Data source {source_id} not found or inactive'}
             
-            # Add missing columns with None values
-            for col in all_columns:
-                if col not in aligned_df.columns:
-                    aligned_df[col] = None
-                    source_alignment['added_columns'].append(col)
+            source_tables, source_info, error = self._describe_sources(sources)
+            if error:
+                return False, {'error': error}
             
-            # Reorder columns to match
-            aligned_df = aligned_df[all_columns]
-            source_alignment['column_count_after'] = len(aligned_df.columns)
+            schema_alignment = self._align_schemas(source_info)
+            union_sql = self._build_union_sql(source_tables, source_info, schema_alignment, union_type)
+            row_count = self._store_union_result(union_sql, etl_operation.output_table_name, replace=True)
+            if row_count is None:
+                return False, {'error': 'Failed to store union results'}
+            
+            for info in source_info:
+                info.pop('column_types', None)
+            
+            etl_operation.row_count = row_count
+            etl_operation.last_run = timezone.now()
+            etl_operation.parameters = {**etl_operation.parameters, 'schema_alignment': schema_alignment}
+            etl_operation.result_summary = {
+                **(etl_operation.result_summary or {}),
+                'total_rows': row_count,
+                'total_columns': schema_alignment['total_unique_columns'],
+                'source_breakdown': source_info
+            }
+            etl_operation.save()
             
-            aligned_dataframes.append(aligned_df)
-            alignment_details.append(source_alignment)
+            logger.info(f"Union operation refreshed: {etl_operation.output_table_name} with {row_count} rows")
+            return True, {'row_count': row_count, 'output_table': etl_operation.output_table_name}
             
-            logger.info(f"Aligned schema for {source_info[i]['name']}: {len(df.columns)} -> {len(aligned_df.columns)} columns")
+        except Exception as e:
+            logger.error(f"Union refresh failed: {e}")
+            return False, {'error': str(e)}
+    
+    def _describe_sources(self, sources: List[DataSource]) -> Tuple[List[str], List[Dict], Optional[str]]:
+        """
+        Integrated table, row count and schema of every source
+        
+        Returns:
+            Tuple[source_tables, source_info, error]
+        """
+        # Resolve tables first - a source missing from DuckDB may have to be loaded
+        resolved = []
+        for source in sources:
+            table_name = self._resolve_source_table(source)
+            if not table_name:
+                return [], [], f'Failed to load data from {source.name}: no integrated table found'
+            resolved.append((source, table_name))
         
-        schema_alignment = {
+        source_tables = []
+        source_info = []
+        
+        with duckdb_manager.session() as conn:
+            for source, table_name in resolved:
+                schema = conn.execute(f'DESCRIBE {_quote_identifier(table_name)}').fetchall()
+                row_count = conn.execute(f'SELECT COUNT(*) FROM {_quote_identifier(table_name)}').fetchone()[0]
+                if not row_count:
+                    return [], [], f'Failed to load data from {source.name}: table {table_name} is empty'
+                
+                source_tables.append(table_name)
+                source_info.append({
+                    'name': source.name,
+                    'id': str(source.id),
+                    'table': table_name,
+                    'rows': row_count,
+                    'columns': [column[0] for column in schema],
+                    'column_types': {column[0]: column[1] for column in schema}
+                })
+                logger.info(f"Union source {source.name}: table {table_name}, {row_count} rows, {len(schema)} columns")
+        
+        return source_tables, source_info, None
+    
+    def _resolve_source_table(self, source: DataSource) -> Optional[str]:
+        """
+        Integrated DuckDB table holding a source's full data.
+        Sources not yet in DuckDB are loaded once through the unified data access layer.
+        """
+        table_name = unified_data_access.get_integrated_table_name(source)
+        if table_name:
+            return table_name
+        
+        success, df, message = unified_data_access.get_data_source_data(source)
+        if not success or df is None or df.empty:
+            logger.warning(f"Could not load {source.name} into DuckDB: {message}")
+            return None
+        return unified_data_access.get_integrated_table_name(source)
+    
+    def _align_schemas(self, source_info: List[Dict]) -> Dict[str, Any]:
+        """
+        Align schemas across sources for union compatibility.
+        Columns missing from a source are filled with NULL by UNION BY NAME; columns
+        whose types differ between sources are cast to a common type.
+        
+        Returns:
+            Alignment info with the final column order and the casts applied
+        """
+        all_columns = sorted({column for info in source_info for column in info['columns']})
+        
+        column_casts = {}
+        for column in all_columns:
+            types = {info['column_types'][column] for info in source_info if column in info['column_types']}
+            common_type = self._common_type(types)
+            if common_type:
+                column_casts[column] = common_type
+        
+        alignment_details = []
+        for info in source_info:
+            added_columns = [column for column in all_columns if column not in info['column_types']]
+            alignment_details.append({
+                'source_name': info['name'],
+                'original_columns': info['columns'],
+                'added_columns': added_columns,
+                'column_count_before': len(info['columns']),
+                'column_count_after': len(all_columns)
+            })
+            logger.info(f"Aligned schema for {info['name']}: {len(info['columns'])} -> {len(all_columns)} columns")
+        
+        return {
             'total_unique_columns': len(all_columns),
-            'alignment_required': any(details['added_columns'] for details in alignment_details),
+            'alignment_required': any(details['added_columns'] for details in alignment_details) or bool(column_casts),
             'alignment_details': alignment_details,
-            'final_column_order': all_columns
+            'final_column_order': all_columns,
+            'column_casts': column_casts
         }
-        
-        return aligned_dataframes, schema_alignment
     
-    def _execute_union(self, dataframes: List[pd.DataFrame], union_type: str) -> Optional[pd.DataFrame]:
+    def _common_type(self, types: set) -> Optional[str]:
+        """Type to cast a column to when sources disagree, or None when DuckDB can combine them as-is"""
+        if len(types) <= 1:
+            return None
+        if all(_is_numeric_type(column_type) for column_type in types):
+            # DuckDB widens numeric types across union branches
+            return None
+        return 'VARCHAR'
+    
+    def _build_union_sql(self, source_tables: List[str], source_info: List[Dict],
+                         schema_alignment: Dict[str, Any], union_type: str) -> str:
         """
-        Execute the actual union operation
+        Single SELECT combining all sources with UNION [ALL] BY NAME, projected in the final column order
         """
-        try:
-            if not dataframes:
-                return None
-            
-            if len(dataframes) == 1:
-                return dataframes[0]
-            
-            # Start with first dataframe
-            result = dataframes[0].copy()
-            
-            # Union with remaining dataframes
-            for df in dataframes[1:]:
-                if union_type == 'UNION ALL':
-                    # UNION ALL - simply concatenate
-                    result = pd.concat([result, df], ignore_index=True)
+        column_casts = schema_alignment['column_casts']
+        branches = []
+        for table_name, info in zip(source_tables, source_info):
+            select_list = []
+            for column in info['columns']:
+                quoted = _quote_identifier(column)
+                if column in column_casts:
+                    select_list.append(f"CAST({quoted} AS {column_casts[column]}) AS {quoted}")
                 else:
-                    # UNION - concatenate and remove duplicates
-                    result = pd.concat([result, df], ignore_index=True).drop_duplicates()
-            
-            logger.info(f"Union completed: {len(result)} rows in result")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error executing union: {e}")
-            return None
+                    select_list.append(quoted)
+            branches.append(f"SELECT {', '.join(select_list)} FROM {_quote_identifier(table_name)}")
+        
+        union_sql = f"\n{union_type} BY NAME\n".join(branches)
+        projection = ', '.join(_quote_identifier(column) for column in schema_alignment['final_column_order'])
+        return f"SELECT {projection} FROM (\n{union_sql}\n) AS union_sources"
     
-    def _store_union_result(self, result_df: pd.DataFrame, table_name: str) -> bool:
+    def _store_union_result(self, union_sql: str, table_name: str, replace: bool = False) -> Optional[int]:
         """
-        Store union result in DuckDB
+        Materialize the union as a DuckDB table, replacing an existing table when asked
+        
+        Returns:
+            Row count of the new table, or None on failure
         """
         try:
-            if not self.duckdb_conn:
-                logger.error("No DuckDB connection available")
-                return False
-            
-            # Register DataFrame temporarily
-            temp_name = f"temp_{table_name}"
-            self.duckdb_conn.register(temp_name, result_df)
-            
-            # Create permanent table
-            self.duckdb_conn.execute(f"""
-                CREATE TABLE "{table_name}" AS 
-                SELECT * FROM {temp_name}
-            """)
+            with duckdb_manager.writer() as conn:
+                create = 'CREATE OR REPLACE TABLE' if replace else 'CREATE TABLE'
+                conn.execute(f"{create} {_quote_identifier(table_name)} AS {union_sql}")
+                row_count = conn.execute(f"SELECT COUNT(*) FROM {_quote_identifier(table_name)}").fetchone()[0]
             
-            # Unregister temporary DataFrame
-            self.duckdb_conn.unregister(temp_name)
-            
-            logger.info(f"Stored union result in table: {table_name}")
-            return True
+            data_catalog.refresh_table(table_name)
+            logger.info(f"Stored union result in table: {table_name} ({row_count} rows)")
+            return row_count
             
         except Exception as e:
             logger.error(f"Error storing union result: {e}")
-            return False
+            return None
+    
+    def _drop_table(self, table_name: str):
+        try:
+            with duckdb_manager.writer() as conn:
+                conn.execute(f"DROP TABLE IF EXISTS {_quote_identifier(table_name)}")
+            data_catalog.remove_table(table_name)
+        except Exception as e:
+            logger.warning(f"Could not drop union table {table_name}: {e}")
 
 # Global instance
 etl_union_service = ETLUnionService() 
\ No newline at end of file
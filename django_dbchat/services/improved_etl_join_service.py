@@ -12,6 +12,7 @@ from django.db import transaction
 from datasets.models import DataSource, ETLOperation
 from services.robust_table_validation_service import robust_table_validator, JoinPreValidationResult
 from utils.join_validator import JoinSQLValidator, JoinValidationResult
+from utils.join_estimator import JoinEstimate, preflight_join
 
 logger = logging.getLogger(__name__)
 
@@ -112,7 +113,8 @@ class ImprovedETLJoinService:
                 
                 # Step 5: Execute the join
                 execution_result = self._execute_join_sql(
-                    etl_operation, sql_result.corrected_sql, pre_validation
+                    etl_operation, sql_result.corrected_sql, pre_validation,
+                    left_table, right_table, validated_left_column, validated_right_column, join_type
                 )
                 
                 if execution_result['success']:
@@ -201,12 +203,22 @@ class ImprovedETLJoinService:
         )
     
     def _execute_join_sql(self, etl_operation: ETLOperation, sql: str,
-                         pre_validation: JoinPreValidationResult) -> Dict[str, Any]:
-        """Execute the validated join SQL"""
+                         pre_validation: JoinPreValidationResult,
+                         left_table: str, right_table: str,
+                         left_column: str, right_column: str, join_type: str) -> Dict[str, Any]:
+        """Execute the validated join SQL unless its estimated output is too large"""
         
         start_time = timezone.now()
         
         try:
+            # Estimate the output from key statistics before building it
+            estimate = preflight_join(
+                self.connection, f'"{left_table}"', f'"{right_table}"', left_column, right_column, join_type
+            )
+            preflight = estimate.to_dict() if estimate else None
+            if estimate and not estimate.allowed:
+                return self._refuse_join(etl_operation, estimate, start_time)
+            
             logger.info(f"Executing SQL: {sql}")
             
             # Execute the join SQL
@@ -222,6 +234,7 @@ class ImprovedETLJoinService:
             
             # Update ETL operation
             etl_operation.status = 'completed'
+            etl_operation.sql_query = sql
             etl_operation.row_count = row_count
             etl_operation.execution_time = execution_time
             etl_operation.result_summary = {
@@ -235,6 +248,7 @@ class ImprovedETLJoinService:
                     pre_validation.left_table_result.row_count,
                     pre_validation.right_table_result.row_count
                 ),
+                'preflight': preflight,
                 'execution_timestamp': timezone.now().isoformat()
             }
             etl_operation.save()
@@ -243,7 +257,8 @@ class ImprovedETLJoinService:
                 'success': True,
                 'row_count': row_count,
                 'execution_time': execution_time,
-                'output_table': etl_operation.output_table_name
+                'output_table': etl_operation.output_table_name,
+                'warnings': estimate.warnings if estimate else []
             }
             
         except Exception as e:
@@ -266,6 +281,31 @@ class ImprovedETLJoinService:
                 'execution_time': (timezone.now() - start_time).total_seconds()
             }
     
+    def _refuse_join(self, etl_operation: ETLOperation, estimate: JoinEstimate, start_time) -> Dict[str, Any]:
+        """Fail a join whose estimated output exceeds JOIN_PREFLIGHT_MAX_ROWS without running it"""
+        error = f"Join refused: estimated output of {estimate.estimated_rows:,} rows is too large"
+        logger.warning(f"[JOIN_PREFLIGHT] {etl_operation.name}: {error}")
+        
+        etl_operation.status = 'failed'
+        etl_operation.error_message = error
+        etl_operation.result_summary = {
+            'success': False,
+            'error_type': 'join_too_large',
+            'error': error,
+            'preflight': estimate.to_dict(),
+            'execution_time': (timezone.now() - start_time).total_seconds(),
+            'execution_timestamp': timezone.now().isoformat()
+        }
+        etl_operation.save()
+        
+        return {
+            'success': False,
+            'error': error,
+            'error_type': 'join_too_large',
+            'recommendations': estimate.recommendations + estimate.warnings,
+            'execution_time': (timezone.now() - start_time).total_seconds()
+        }
+    
     def _calculate_join_efficiency(self, result_rows: int, left_rows: int, right_rows: int) -> float:
         """Calculate join efficiency as a percentage"""
         if left_rows == 0 or right_rows == 0:
@@ -317,9 +357,10 @@ class ImprovedETLJoinService:
             error_message=f"Join execution failed: {execution_result['error']}",
             validation_details=pre_validation,
             execution_details=execution_result,
-            recommendations=self._generate_execution_failure_recommendations(execution_result['error']),
+            recommendations=(execution_result.get('recommendations') or
+                             self._generate_execution_failure_recommendations(execution_result['error'])),
             root_cause_analysis={
-                'error_type': 'execution_failure',
+                'error_type': execution_result.get('error_type', 'execution_failure'),
                 'error_details': execution_result['error'],
                 'execution_time': execution_result.get('execution_time', 0)
             }
@@ -6,6 +6,7 @@ Enhanced with DuckDB, security, and proper error handling
 import pandas as pd
 import numpy as np
 import sqlite3
+import importlib.util
 import json
 import re
 from typing import Dict, List, Tuple, Optional, Any
@@ -21,10 +22,15 @@ from utils.type_helpers import (
     map_pandas_dtype_to_standard,
     get_column_type_info,
     ensure_no_object_types,
-    validate_semantic_data_type
+    validate_semantic_data_type,
+    infer_and_convert_types
 )
 from utils.data_contracts import DataType
 from utils.table_name_helper import validate_table_name, TableNameManager
+from utils.duckdb_manager import duckdb_manager
+from utils.data_catalog import data_catalog
+from utils.result_cache import bump_data_version
+from services.column_index_service import column_index_service
 
 logger = logging.getLogger(__name__)
 
@@ -45,53 +51,50 @@ class DataIntegrationService:
     """Enhanced data integration service with DuckDB and security features"""
     
     def __init__(self):
-        self.integrated_db: Optional[Any] = None
+        self._fallback_db: Optional[Any] = None
+        self._uses_duckdb_manager = False
         self._init_integrated_database()
     
+    @property
+    def integrated_db(self) -> Optional[Any]:
+        """Per-thread cursor on the shared DuckDB connection (inside a duckdb_manager session), or the SQLite fallback"""
+        if self._uses_duckdb_manager:
+            try:
+                return duckdb_manager.cursor()
+            except Exception as e:
+                logger.error(f"Failed to get DuckDB cursor: {e}")
+                return None
+        return self._fallback_db
+    
     def _init_integrated_database(self):
         """Initialize DuckDB database for better performance and persistence with enhanced logging"""
         try:
-            import duckdb
-            from django.conf import settings
+            if importlib.util.find_spec('duckdb') is None:
+                raise ImportError('duckdb')
             
-            # Use settings for consistent database path
-            db_path = getattr(settings, 'INTEGRATED_DB_PATH', getattr(settings, 'DUCKDB_PATH', ':memory:'))
+            # Use the connection manager for a consistent path; it opens the file per request or task
+            db_path = duckdb_manager.db_path
             
             # Log connection details for debugging
             if db_path == ':memory:':
                 logger.warning("Using in-memory DuckDB database - data will not persist between restarts")
             else:
                 logger.info(f"Using persistent DuckDB database at: {db_path}")
-                # Ensure directory exists
-                import os
-                os.makedirs(os.path.dirname(db_path), exist_ok=True)
             
-            self.integrated_db = duckdb.connect(db_path)
+            self._uses_duckdb_manager = True
             logger.info(f"DuckDB integrated database initialized successfully at: {db_path}")
-            
-            # Log current connection status for debugging
-            try:
-                version_result = self.integrated_db.execute("SELECT version()").fetchone()
-                logger.info(f"DuckDB version: {version_result[0] if version_result else 'Unknown'}")
-            except Exception as version_error:
-                logger.warning(f"Could not retrieve DuckDB version: {version_error}")
                 
         except ImportError:
             logger.warning("DuckDB not available, falling back to SQLite")
             try:
-                self.integrated_db = sqlite3.connect(':memory:', check_same_thread=False)
+                self._fallback_db = sqlite3.connect(':memory:', check_same_thread=False)
                 logger.info("SQLite integrated database initialized")
             except Exception as e:
                 logger.error(f"Failed to initialize integrated database: {e}")
         except Exception as e:
             logger.error(f"Failed to initialize DuckDB: {e}")
-            # Fallback to SQLite
-            try:
-                self.integrated_db = sqlite3.connect(':memory:', check_same_thread=False)
-                logger.info("Fallback SQLite integrated database initialized")
-            except Exception as fallback_e:
-                logger.error(f"Failed to initialize fallback database: {fallback_e}")
     
+    @duckdb_manager.session()
     def check_table_exists(self, table_name: str) -> bool:
         """
         Check if a table exists in the integrated database before attempting to query it
@@ -200,6 +203,7 @@ class DataIntegrationService:
             logger.error(f"Failed to add data source {name}: {e}")
             return None
     
+    @duckdb_manager.session()
     def remove_data_source(self, source_id: str) -> bool:
         """Remove a data source with proper cleanup and transaction support"""
         try:
@@ -216,6 +220,7 @@ class DataIntegrationService:
                         if hasattr(self.integrated_db, 'execute'):
                             # DuckDB syntax
                             self.integrated_db.execute(f"DROP TABLE IF EXISTS \"{table_name}\"")
+                            data_catalog.remove_table(table_name)
                         else:
                             # SQLite syntax
                             cursor = self.integrated_db.cursor()
@@ -224,6 +229,8 @@ class DataIntegrationService:
                     except Exception as db_error:
                         logger.warning(f"Failed to drop table {table_name}: {db_error}")
                 
+                column_index_service.remove_source(source_id)
+                
                 # Remove related ETL operations
                 ETLOperation.objects.filter(
                     source_tables__contains=f"source_{source_id}"
@@ -276,6 +283,7 @@ class DataIntegrationService:
         from utils.table_name_helper import generate_safe_table_name
         return generate_safe_table_name(source_id)
     
+    @duckdb_manager.session()
     def _load_cleaned_data_to_integrated_db(self, source_id: str, data: pd.DataFrame) -> bool:
         """Load cleaned data into integrated database with proper type conversions"""
         if not self.integrated_db:
@@ -307,10 +315,13 @@ class DataIntegrationService:
                 
                 # Store transformation metadata in DuckDB for future reference
                 self._store_transformation_metadata(source_id, table_name, transformation_log)
+                data_catalog.refresh_table(table_name)
             else:
                 # SQLite approach
                 converted_data.to_sql(table_name, self.integrated_db, if_exists='replace', index=False)
             
+            # Table contents changed - invalidate cached query results
+            bump_data_version(source_id)
             logger.info(f"Loaded {len(converted_data)} rows into table {table_name} with proper type conversions")
             return True
             
@@ -323,70 +334,31 @@ class DataIntegrationService:
         Apply ETL type conversions based on detected data types
         CRITICAL: Convert date strings to proper datetime objects for DuckDB DATE storage
         """
-        converted_data = data.copy()
-        transformation_log = {}
-        
         try:
-            # Analyze each column for potential type conversions
-            for col in data.columns:
-                original_dtype = str(data[col].dtype)
-                
-                # Check if this looks like a date column
-                if self._is_date_column(col, data[col]):
-                    try:
-                        # Attempt date conversion with multiple format attempts
-                        converted_series, date_format = self._convert_to_date(data[col])
-                        if converted_series is not None:
-                            converted_data[col] = converted_series
-                            transformation_log[col] = {
-                                'from': original_dtype,
-                                'to': 'datetime64[ns]',
-                                'format_detected': date_format,
-                                'transformation_type': 'date_conversion',
-                                'etl_enriched': True
-                            }
-                            logger.info(f"Converted {col} from {original_dtype} to datetime using format: {date_format}")
-                        else:
-                            logger.warning(f"Could not convert {col} to date - keeping as {original_dtype}")
-                    except Exception as date_error:
-                        logger.warning(f"Date conversion failed for {col}: {date_error}")
+            # Shared vectorised inference - same rules as upload and schema discovery
+            converted_data, conversions = infer_and_convert_types(data)
+            
+            transformation_log = {}
+            for col, conversion in conversions.items():
+                if conversion['from'] == conversion['to']:
+                    continue
                 
-                # Check for numeric conversions
-                elif self._is_numeric_column(col, data[col]) and original_dtype == 'object':
-                    try:
-                        # Attempt numeric conversion
-                        converted_series = pd.to_numeric(data[col], errors='coerce')
-                        # Only apply if we don't lose too much data
-                        non_null_original = data[col].notna().sum()
-                        non_null_converted = converted_series.notna().sum()
-                        if non_null_converted >= non_null_original * 0.9:  # 90% conversion success
-                            converted_data[col] = converted_series
-                            final_dtype = str(converted_series.dtype)
-                            transformation_log[col] = {
-                                'from': original_dtype,
-                                'to': final_dtype,
-                                'transformation_type': 'numeric_conversion',
-                                'etl_enriched': True
-                            }
-                            logger.info(f"Converted {col} from {original_dtype} to {final_dtype}")
-                    except Exception as num_error:
-                        logger.warning(f"Numeric conversion failed for {col}: {num_error}")
+                if conversion['type'] in ('date', 'datetime'):
+                    transformation_type = 'date_conversion'
+                elif conversion['type'] == 'boolean':
+                    transformation_type = 'boolean_conversion'
+                else:
+                    transformation_type = 'numeric_conversion'
                 
-                # Check for boolean conversions
-                elif self._is_boolean_column(col, data[col]):
-                    try:
-                        converted_series = self._convert_to_boolean(data[col])
-                        if converted_series is not None:
-                            converted_data[col] = converted_series
-                            transformation_log[col] = {
-                                'from': original_dtype,
-                                'to': 'bool',
-                                'transformation_type': 'boolean_conversion',
-                                'etl_enriched': True
-                            }
-                            logger.info(f"Converted {col} from {original_dtype} to bool")
-                    except Exception as bool_error:
-                        logger.warning(f"Boolean conversion failed for {col}: {bool_error}")
+                transformation_log[col] = {
+                    'from': conversion['from'],
+                    'to': conversion['to'],
+                    'transformation_type': transformation_type,
+                    'etl_enriched': True
+                }
+                if conversion['format']:
+                    transformation_log[col]['format_detected'] = conversion['format']
+                logger.info(f"Converted {col} from {conversion['from']} to {conversion['to']}")
             
             return converted_data, transformation_log
             
@@ -394,148 +366,6 @@ class DataIntegrationService:
             logger.error(f"Error during ETL type conversions: {e}")
             return data, {}
     
-    def _is_date_column(self, col_name: str, series: pd.Series) -> bool:
-        """
-        Detect if a column should be treated as a date column
-        """
-        col_name_lower = col_name.lower()
-        
-        # Check column name patterns
-        date_patterns = ['date', 'time', 'timestamp', 'created', 'updated', 'modified', 'ship', 'order']
-        name_indicates_date = any(pattern in col_name_lower for pattern in date_patterns)
-        
-        if not name_indicates_date:
-            return False
-        
-        # Check if current type is object (string-like)
-        if series.dtype != 'object':
-            return False
-        
-        # Check sample values for date-like patterns
-        try:
-            sample_values = series.dropna().head(10)
-            if len(sample_values) == 0:
-                return False
-            
-            date_like_count = 0
-            for value in sample_values:
-                if self._looks_like_date(str(value)):
-                    date_like_count += 1
-            
-            # If 60% or more look like dates, consider it a date column
-            return date_like_count >= len(sample_values) * 0.6
-            
-        except Exception:
-            return False
-    
-    def _looks_like_date(self, value: str) -> bool:
-        """
-        Check if a string value looks like a date
-        """
-        import re
-        
-        # Common date patterns
-        date_patterns = [
-            r'^\d{1,2}[-/]\d{1,2}[-/]\d{4}$',      # DD-MM-YYYY or MM-DD-YYYY
-            r'^\d{4}[-/]\d{1,2}[-/]\d{1,2}$',      # YYYY-MM-DD
-            r'^\d{1,2}[-/]\d{1,2}[-/]\d{2}$',       # DD-MM-YY or MM-DD-YY
-            r'^\d{4}\d{2}\d{2}$',                   # YYYYMMDD
-            r'^\w{3}\s+\d{1,2},?\s+\d{4}$',        # Jan 15, 2023
-            r'^\d{1,2}\s+\w{3}\s+\d{4}$',          # 15 Jan 2023
-        ]
-        
-        for pattern in date_patterns:
-            if re.match(pattern, value.strip()):
-                return True
-        
-        return False
-    
-    def _convert_to_date(self, series: pd.Series) -> Tuple[Optional[pd.Series], Optional[str]]:
-        """
-        Convert a series to datetime with multiple format attempts
-        """
-        # Common date formats to try
-        date_formats = [
-            '%d-%m-%Y',    # 08-11-2016
-            '%m-%d-%Y',    # 11-08-2016
-            '%Y-%m-%d',    # 2016-11-08
-            '%d/%m/%Y',    # 08/11/2016
-            '%m/%d/%Y',    # 11/08/2016
-            '%Y/%m/%d',    # 2016/11/08
-            '%d-%m-%y',    # 08-11-16
-            '%m-%d-%y',    # 11-08-16
-            '%Y%m%d',      # 20161108
-            '%b %d, %Y',   # Nov 08, 2016
-            '%d %b %Y',    # 08 Nov 2016
-        ]
-        
-        # First try pandas' automatic parsing
-        try:
-            converted = pd.to_datetime(series, errors='coerce', infer_datetime_format=True)
-            if converted.notna().sum() >= len(series) * 0.8:  # 80% success rate
-                return converted, 'auto_detected'
-        except Exception:
-            pass
-        
-        # Try specific formats
-        for date_format in date_formats:
-            try:
-                converted = pd.to_datetime(series, format=date_format, errors='coerce')
-                success_rate = converted.notna().sum() / len(series)
-                if success_rate >= 0.8:  # 80% success rate
-                    return converted, date_format
-            except Exception:
-                continue
-        
-        # If no format works well, return None
-        return None, None
-    
-    def _is_numeric_column(self, col_name: str, series: pd.Series) -> bool:
-        """
-        Detect if a column should be treated as numeric
-        """
-        if series.dtype != 'object':
-            return False
-        
-        # Check if values can be converted to numeric
-        try:
-            converted = pd.to_numeric(series, errors='coerce')
-            success_rate = converted.notna().sum() / len(series)
-            return success_rate >= 0.9  # 90% success rate
-        except Exception:
-            return False
-    
-    def _is_boolean_column(self, col_name: str, series: pd.Series) -> bool:
-        """
-        Detect if a column should be treated as boolean
-        """
-        if series.dtype == 'bool':
-            return False  # Already boolean
-        
-        unique_values = set(str(v).lower().strip() for v in series.dropna().unique())
-        boolean_values = {'true', 'false', 'yes', 'no', '1', '0', 'y', 'n'}
-        
-        return len(unique_values) <= 2 and unique_values.issubset(boolean_values)
-    
-    def _convert_to_boolean(self, series: pd.Series) -> Optional[pd.Series]:
-        """
-        Convert a series to boolean
-        """
-        try:
-            # Create mapping for boolean conversion
-            true_values = {'true', 'yes', '1', 'y'}
-            
-            def convert_value(val):
-                if pd.isna(val):
-                    return None
-                return str(val).lower().strip() in true_values
-            
-            converted = series.apply(convert_value)
-            return converted
-            
-        except Exception:
-            return None
-    
     def _store_transformation_metadata(self, source_id: str, table_name: str, transformation_log: Dict[str, Dict[str, str]]):
         """
         Store transformation metadata in DuckDB for future reference
@@ -738,62 +568,67 @@ class DataIntegrationService:
             if not new_source.schema_info:
                 return
             
-            # Get existing data sources
-            existing_sources = DataSource.objects.filter(
-                status='active'
-            ).exclude(id=new_source_id)
+            # Index the new source (with value sketches) so only candidate columns are compared
+            column_index_service.index_source(new_source)
             
-            for existing_source in existing_sources:
-                if existing_source.schema_info:
-                    relationships = self._find_column_relationships(
-                        new_source_id, new_source.schema_info,
-                        str(existing_source.id), existing_source.schema_info
-                    )
-                    
-                    # Save relationships to database
-                    for relationship in relationships:
-                        self._save_relationship(relationship)
+            for relationship in self._find_column_relationships(str(new_source.id)):
+                self._save_relationship(relationship)
                         
         except Exception as e:
             logger.error(f"Failed to detect relationships for source {new_source_id}: {e}")
     
-    def _find_column_relationships(self, source1_id: str, schema1: Dict, 
-                                  source2_id: str, schema2: Dict) -> List[DataRelationship]:
-        """Find potential relationships between columns in two data sources"""
+    def _find_column_relationships(self, source_id: str, after_id: Optional[str] = None,
+                                   sources: Optional[Dict[str, Dict[str, Any]]] = None) -> List[DataRelationship]:
+        """
+        Find potential relationships between a source's columns and columns of other sources.
+        Only candidates from the column index are scored; with after_id, only sources with a greater id are paired.
+        """
         relationships = []
         
-        # Get main table columns from both schemas
-        table1_columns = schema1.get('tables', {}).get('main_table', {}).get('columns', {})
-        table2_columns = schema2.get('tables', {}).get('main_table', {}).get('columns', {})
+        if sources is None:
+            sources = column_index_service.get_sources()
+        entry = sources.get(source_id)
+        if not entry:
+            return relationships
         
-        for col1_name, col1_info in table1_columns.items():
-            for col2_name, col2_info in table2_columns.items():
-                confidence = self._calculate_relationship_confidence(
-                    col1_name, col1_info, col2_name, col2_info
-                )
+        for col1_name, other_id, col2_name in column_index_service.candidates(source_id, after_id=after_id):
+            other_entry = sources.get(other_id)
+            if not other_entry or col2_name not in other_entry['columns']:
+                continue
+            profile1, profile2 = entry['columns'][col1_name], other_entry['columns'][col2_name]
+            col1_info, col2_info = profile1['info'], profile2['info']
+            
+            confidence = self._calculate_relationship_confidence(
+                col1_name, col1_info, col2_name, col2_info,
+                containment=column_index_service.estimate_overlap(profile1, profile2)
+            )
+            
+            if confidence > 0.6:  # Threshold for potential relationship
+                relationship_type = self._determine_relationship_type(col1_info, col2_info)
+                suggested_join = self._suggest_join_type(relationship_type, col1_info, col2_info)
                 
-                if confidence > 0.6:  # Threshold for potential relationship
-                    relationship_type = self._determine_relationship_type(col1_info, col2_info)
-                    suggested_join = self._suggest_join_type(relationship_type, col1_info, col2_info)
-                    
-                    relationship = DataRelationship(
-                        source1_id=source1_id,
-                        source1_table='main_table',
-                        source1_column=col1_name,
-                        source2_id=source2_id,
-                        source2_table='main_table',
-                        source2_column=col2_name,
-                        relationship_type=relationship_type,
-                        confidence_score=confidence,
-                        suggested_join_type=suggested_join
-                    )
-                    relationships.append(relationship)
+                relationship = DataRelationship(
+                    source1_id=source_id,
+                    source1_table='main_table',
+                    source1_column=col1_name,
+                    source2_id=other_id,
+                    source2_table='main_table',
+                    source2_column=col2_name,
+                    relationship_type=relationship_type,
+                    confidence_score=confidence,
+                    suggested_join_type=suggested_join
+                )
+                relationships.append(relationship)
                     
         return relationships
     
     def _calculate_relationship_confidence(self, col1_name: str, col1_info: Dict, 
-                                         col2_name: str, col2_info: Dict) -> float:
-        """Calculate confidence score for potential relationship between two columns"""
+                                         col2_name: str, col2_info: Dict,
+                                         containment: Optional[float] = None) -> float:
+        """
+        Calculate confidence score for potential relationship between two columns.
+        containment is the estimated value overlap of the two columns, when both were sketched.
+        """
         confidence = 0.0
         
         # Name similarity (most important factor)
@@ -817,6 +652,12 @@ class DataIntegrationService:
             ratio_diff = abs(unique1 - unique2) / max(unique1, unique2)
             confidence += (1 - ratio_diff) * 0.1
         
+        # Value overlap confirms (or rules out) what the names suggest
+        if containment is not None:
+            confidence += containment * 0.3
+            if containment < 0.1:
+                confidence *= 0.5
+        
         return min(confidence, 1.0)
     
     def _calculate_name_similarity(self, name1: str, name2: str) -> float:
@@ -922,36 +763,38 @@ class DataIntegrationService:
     
     def get_suggested_joins(self) -> List[Dict[str, Any]]:
         """Get AI-suggested joins between data sources"""
-        suggestions = []
-        
         try:
-            # Get all active data sources
-            data_sources = DataSource.objects.filter(status='active')
-            source_dict = {str(ds.id): ds for ds in data_sources}
-            
-            # Find relationships between all pairs
-            for i, source1 in enumerate(data_sources):
-                for source2 in data_sources[i+1:]:
-                    if source1.schema_info and source2.schema_info:
-                        relationships = self._find_column_relationships(
-                            str(source1.id), source1.schema_info,
-                            str(source2.id), source2.schema_info
-                        )
-                        
-                        for relationship in relationships:
-                            suggestion = {
-                                'relationship': relationship,
-                                'source1_name': source1.name,
-                                'source2_name': source2.name,
-                                'confidence': relationship.confidence_score,
-                                'join_type': relationship.suggested_join_type,
-                                'suggestion_text': f"Join {source1.name}.{relationship.source1_column} with {source2.name}.{relationship.source2_column}"
-                            }
-                            suggestions.append(suggestion)
+            # Suggestions only change when the column index does
+            index_version = column_index_service.version
+            cache_key = f"suggested_joins:{index_version}"
+            suggestions = cache.get(cache_key) if index_version is not None else None
+            if suggestions is not None:
+                return suggestions
+            
+            suggestions = []
+            sources = column_index_service.get_sources()
+            
+            # Each pair of sources is scored once, from the source with the smaller id
+            for source_id, entry in sources.items():
+                for relationship in self._find_column_relationships(source_id, after_id=source_id, sources=sources):
+                    source1_name = entry['name']
+                    source2_name = sources[relationship.source2_id]['name']
+                    suggestion = {
+                        'relationship': relationship,
+                        'source1_name': source1_name,
+                        'source2_name': source2_name,
+                        'confidence': relationship.confidence_score,
+                        'join_type': relationship.suggested_join_type,
+                        'suggestion_text': f"Join {source1_name}.{relationship.source1_column} with {source2_name}.{relationship.source2_column}"
+                    }
+                    suggestions.append(suggestion)
             
             # Sort by confidence score
             suggestions.sort(key=lambda x: x['confidence'], reverse=True)
-            return suggestions[:10]  # Return top 10 suggestions
+            suggestions = suggestions[:10]  # Return top 10 suggestions
+            if index_version is not None:
+                cache.set(cache_key, suggestions, timeout=3600)
+            return suggestions
             
         except Exception as e:
             logger.error(f"Failed to get suggested joins: {e}")
@@ -1101,6 +944,7 @@ class DataIntegrationService:
         
         return f"SELECT {select_clause} FROM {table} {group_clause}"
     
+    @duckdb_manager.session()
     def get_integrated_data(self, table_name: Optional[str] = None) -> pd.DataFrame:
         """Get integrated data from a specific table or list all tables with enhanced error handling"""
         if not self.integrated_db:
@@ -1200,42 +1044,34 @@ class DataIntegrationService:
                              transformations: Dict[str, str], source_id: str) -> bool:
         """Store transformed data to integrated database"""
         try:
-            import duckdb
-            from django.conf import settings
-            import os
-            
-            # Create/connect to integrated database
-            db_path = os.path.join(settings.BASE_DIR, 'data', 'integrated.duckdb')
-            os.makedirs(os.path.dirname(db_path), exist_ok=True)
-            
-            conn = duckdb.connect(db_path)
-            
-            # Drop existing table if it exists
-            conn.execute(f"DROP TABLE IF EXISTS {table_name}")
-            
-            # Create table from DataFrame with proper types
-            conn.register('temp_df', data)
-            conn.execute(f"CREATE TABLE {table_name} AS SELECT * FROM temp_df")
-            
-            # Add metadata about transformations
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS transformation_metadata (
-                    table_name VARCHAR,
-                    source_id VARCHAR,
-                    transformations JSON,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Store transformation metadata
-            import json
-            conn.execute("""
-                INSERT INTO transformation_metadata (table_name, source_id, transformations)
-                VALUES (?, ?, ?)
-            """, (table_name, source_id, json.dumps(transformations)))
-            
-            conn.close()
-            
+            with duckdb_manager.writer() as conn:
+                # Drop existing table if it exists
+                conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+                
+                # Create table from DataFrame with proper types
+                conn.register('temp_df', data)
+                conn.execute(f"CREATE TABLE {table_name} AS SELECT * FROM temp_df")
+                conn.unregister('temp_df')
+                
+                # Add metadata about transformations
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS transformation_metadata (
+                        table_name VARCHAR,
+                        source_id VARCHAR,
+                        transformations JSON,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                
+                # Store transformation metadata
+                conn.execute("""
+                    INSERT INTO transformation_metadata (table_name, source_id, transformations)
+                    VALUES (?, ?, ?)
+                """, (table_name, source_id, json.dumps(transformations)))
+            
+            # Table contents changed - invalidate cached query results and catalog entry
+            bump_data_version(source_id)
+            data_catalog.refresh_table(table_name)
             logger.info(f"Successfully stored transformed data: {table_name} with {len(data)} rows")
             return True
             
@@ -1332,38 +1168,38 @@ def execute_etl_operation(etl_operation_id: str):
         
         # Execute the SQL operation
         try:
-            if integration_service.integrated_db:
-                start_time = datetime.now()
+            start_time = datetime.now()
+            with duckdb_manager.writer():
+                integrated_db = integration_service.integrated_db
+                if not integrated_db:
+                    raise Exception("Integrated database not available")
                 
-                if hasattr(integration_service.integrated_db, 'execute'):
+                if hasattr(integrated_db, 'execute'):
                     # DuckDB execution
-                    result = integration_service.integrated_db.execute(etl_operation.sql_query).fetchdf()
+                    result = integrated_db.execute(etl_operation.sql_query).fetchdf()
                 else:
                     # SQLite execution
-                    result = pd.read_sql(etl_operation.sql_query, integration_service.integrated_db)
+                    result = pd.read_sql(etl_operation.sql_query, integrated_db)
                 
                 # Store results
                 output_table = etl_operation.output_table_name
-                if hasattr(integration_service.integrated_db, 'register'):
-                    integration_service.integrated_db.register(f"temp_{output_table}", result)
-                    integration_service.integrated_db.execute(f"CREATE TABLE {output_table} AS SELECT * FROM temp_{output_table}")
-                    integration_service.integrated_db.unregister(f"temp_{output_table}")
+                if hasattr(integrated_db, 'register'):
+                    integrated_db.register(f"temp_{output_table}", result)
+                    integrated_db.execute(f"CREATE TABLE {output_table} AS SELECT * FROM temp_{output_table}")
+                    integrated_db.unregister(f"temp_{output_table}")
                 else:
-                    result.to_sql(output_table, integration_service.integrated_db, if_exists='replace', index=False)
-                
-                # Update operation with results - Fixed: use result_summary not result_info
-                execution_time = (datetime.now() - start_time).total_seconds()
-                etl_operation.status = 'completed'
-                etl_operation.last_run = datetime.now()
-                etl_operation.execution_time = execution_time
-                etl_operation.row_count = len(result) if hasattr(result, '__len__') else 0
-                etl_operation.save()
-                
-                logger.info(f"ETL operation {etl_operation_id} completed successfully")
-                return {'success': True, 'operation_id': etl_operation_id, 'row_count': len(result)}
-                
-            else:
-                raise Exception("Integrated database not available")
+                    result.to_sql(output_table, integrated_db, if_exists='replace', index=False)
+            
+            # Update operation with results - Fixed: use result_summary not result_info
+            execution_time = (datetime.now() - start_time).total_seconds()
+            etl_operation.status = 'completed'
+            etl_operation.last_run = datetime.now()
+            etl_operation.execution_time = execution_time
+            etl_operation.row_count = len(result) if hasattr(result, '__len__') else 0
+            etl_operation.save()
+            
+            logger.info(f"ETL operation {etl_operation_id} completed successfully")
+            return {'success': True, 'operation_id': etl_operation_id, 'row_count': len(result)}
                 
         except Exception as exec_error:
             etl_operation.status = 'failed'
@@ -0,0 +1,219 @@
+/**
+ * Dashboard Render Worker
+ * =======================
+ *
+ * Long-lived Puppeteer worker used by PuppeteerExportService (see utils/render_worker.py).
+ * Keeps headless Chromium warm and renders dashboards to PDF or PNG.
+ *
+ * Jobs arrive as JSON lines on stdin:
+ *   {"id": "...", "url": "...", "format": "pdf" | "png", "cookie": {...}, "header": "..."}
+ * Results are written as JSON lines on stdout:
+ *   {"id": "...", "ok": true, "data": "<base64>"} or {"id": "...", "ok": false, "error": "..."}
+ *
+ * At most RENDER_WORKER_CONCURRENCY pages render at once. A browser is retired after
+ * RENDER_WORKER_MAX_RENDERS renders and closed once its last page finishes.
+ * Logs go to stderr so stdout carries only results.
+ */
+
+const puppeteer = require('puppeteer');
+const readline = require('readline');
+
+const MAX_CONCURRENCY = Math.max(1, parseInt(process.env.RENDER_WORKER_CONCURRENCY || '2', 10));
+const MAX_RENDERS = Math.max(1, parseInt(process.env.RENDER_WORKER_MAX_RENDERS || '50', 10));
+
+const LAUNCH_OPTIONS = {
+    headless: true,
+    args: [
+        '--no-sandbox',
+        '--disable-setuid-sandbox',
+        '--disable-dev-shm-usage',
+        '--disable-accelerated-2d-canvas',
+        '--no-first-run',
+        '--disable-gpu'
+    ]
+};
+
+// Hide header, navigation and controls so only the charts are exported
+const EXPORT_CSS = `
+    .navbar, .header, .dashboard-header, .btn-group, .card-header, .mb-4 { display: none !important; }
+    .btn, .dropdown, .share-btn, .edit-btn, .delete-btn, .export-btn { display: none !important; }
+    .dashboard-info, .dashboard-actions { display: none !important; }
+    .card-body { padding: 10px !important; border: none !important; box-shadow: none !important; }
+    .card-title { font-size: 16px !important; margin-bottom: 10px !important; }
+    .breadcrumb, .alert, .toast { display: none !important; }
+    .plotly-graph-div { margin: 5px 0 !important; }
+    body { margin: 0 !important; padding: 10px !important; background: white !important; }
+`;
+
+const browsers = new Map();  // browser -> { renders, active, retired }
+let current = null;
+let launching = null;
+let active = 0;
+const queue = [];
+
+function log(...args) {
+    console.error('[RENDER_WORKER]', ...args);
+}
+
+function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+function launchBrowser() {
+    if (!launching) {
+        launching = puppeteer.launch(LAUNCH_OPTIONS)
+            .then(browser => {
+                browsers.set(browser, { renders: 0, active: 0, retired: false });
+                browser.on('disconnected', () => {
+                    browsers.delete(browser);
+                    if (current === browser) {
+                        current = null;
+                    }
+                });
+                current = browser;
+                log('Launched browser');
+                return browser;
+            })
+            .finally(() => {
+                launching = null;
+            });
+    }
+    return launching;
+}
+
+function retireBrowser(browser) {
+    const state = browsers.get(browser);
+    if (current === browser) {
+        current = null;
+    }
+    if (!state) {
+        return;
+    }
+    state.retired = true;
+    if (state.active === 0) {
+        browser.close().catch(() => {});
+    }
+}
+
+async function acquireBrowser() {
+    for (;;) {
+        if (current && browsers.get(current).renders >= MAX_RENDERS) {
+            log(`Recycling browser after ${MAX_RENDERS} renders`);
+            retireBrowser(current);
+        }
+        const browser = current || await launchBrowser();
+        const state = browsers.get(browser);
+        if (state && !state.retired) {
+            state.renders += 1;
+            state.active += 1;
+            return browser;
+        }
+    }
+}
+
+function releaseBrowser(browser) {
+    const state = browsers.get(browser);
+    if (!state) {
+        return;
+    }
+    state.active -= 1;
+    if (state.retired && state.active === 0) {
+        browser.close().catch(() => {});
+    }
+}
+
+async function render(job) {
+    const browser = await acquireBrowser();
+    let page = null;
+    try {
+        page = await browser.newPage();
+        await page.setViewport({ width: 1200, height: 800, deviceScaleFactor: 2 });
+        if (job.cookie) {
+            await page.setCookie(job.cookie);
+        }
+
+        await page.goto(job.url, { waitUntil: 'networkidle0', timeout: 30000 });
+
+        // Wait for Plotly charts, then for their scripts and animations to settle
+        try {
+            await page.waitForSelector('.plotly-graph-div', { timeout: 10000 });
+        } catch (e) {
+            log('No Plotly charts found on', job.url);
+        }
+        await sleep(3000);
+        const chartCount = await page.evaluate(() => document.querySelectorAll('.plotly-graph-div').length);
+        if (chartCount > 0) {
+            await sleep(2000);
+        }
+
+        await page.addStyleTag({ content: EXPORT_CSS });
+
+        if (job.format === 'pdf') {
+            return await page.pdf({
+                format: 'A4',
+                printBackground: true,
+                margin: { top: '1cm', right: '1cm', bottom: '1cm', left: '1cm' },
+                displayHeaderFooter: true,
+                headerTemplate: `<div style="font-size: 10px; margin: 0 auto;">${job.header || ''}</div>`,
+                footerTemplate: '<div style="font-size: 10px; margin: 0 auto;">Page <span class="pageNumber"></span> of <span class="totalPages"></span></div>'
+            });
+        }
+        return await page.screenshot({ fullPage: true, type: 'png' });
+    } catch (error) {
+        if (!browser.isConnected()) {
+            retireBrowser(browser);
+        }
+        throw error;
+    } finally {
+        if (page) {
+            await page.close().catch(() => {});
+        }
+        releaseBrowser(browser);
+    }
+}
+
+function respond(message) {
+    process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+function pump() {
+    while (active < MAX_CONCURRENCY && queue.length > 0) {
+        const job = queue.shift();
+        active += 1;
+        render(job)
+            .then(
+                buffer => respond({ id: job.id, ok: true, data: Buffer.from(buffer).toString('base64') }),
+                error => respond({ id: job.id, ok: false, error: String((error && error.message) || error) })
+            )
+            .finally(() => {
+                active -= 1;
+                pump();
+            });
+    }
+}
+
+async function shutdown() {
+    await Promise.all([...browsers.keys()].map(browser => browser.close().catch(() => {})));
+    process.exit(0);
+}
+
+const input = readline.createInterface({ input: process.stdin });
+input.on('line', line => {
+    if (!line.trim()) {
+        return;
+    }
+    let job;
+    try {
+        job = JSON.parse(line);
+    } catch (e) {
+        log('Ignoring malformed job:', e.message);
+        return;
+    }
+    queue.push(job);
+    pump();
+});
+// The parent closes stdin when it shuts down
+input.on('close', shutdown);
+process.on('SIGTERM', shutdown);
+
+log(`Ready (concurrency ${MAX_CONCURRENCY}, ${MAX_RENDERS} renders per browser)`);
@@ -8,6 +8,7 @@ import traceback
 import pytz
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.utils import timezone
 from django.db import transaction, connection
 from django.conf import settings
@@ -15,10 +16,12 @@ from celery import shared_task
 from celery.exceptions import Retry
 
 from datasets.models import DataSource, ScheduledETLJob, ETLJobRunLog
-from datasets.data_access_layer import unified_data_access
+from utils.duckdb_manager import duckdb_manager
 from services.data_service import DataService
 from services.integration_service import DataIntegrationService
 from services.universal_data_loader import universal_data_loader
+from services.csv_ingestion_service import csv_ingestion_service, EmptyCSVError
+from services.streaming_extract_service import streaming_extract_service
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +29,8 @@ logger = logging.getLogger(__name__)
 class ScheduledETLService:
     """Service for managing scheduled ETL operations with proper resource management."""
     
+    DATABASE_SOURCE_TYPES = ('postgresql', 'mysql', 'oracle', 'sqlserver')
+    
     def __init__(self):
         self.data_service = DataService()
         self.integration_service = DataIntegrationService()
@@ -49,13 +54,11 @@ class ScheduledETLService:
             # Close Django database connections to prevent locks
             connection.close()
             
-            # FIXED: Also close unified data access connections to prevent DuckDB locks
+            # Release this thread's DuckDB lease so other processes can open the file
             try:
-                if hasattr(unified_data_access, 'duckdb_connection') and unified_data_access.duckdb_connection:
-                    unified_data_access.duckdb_connection.close()
-                    unified_data_access.duckdb_connection = None
+                duckdb_manager.release_cursor()
             except Exception as duck_error:
-                logger.warning(f"Error closing DuckDB connection: {duck_error}")
+                logger.warning(f"Error releasing DuckDB cursor: {duck_error}")
             
         except Exception as e:
             logger.warning(f"Error during resource cleanup: {e}")
@@ -339,7 +342,9 @@ class ScheduledETLService:
             if data_source.source_type == 'csv':
                 return self._process_csv_data_source_safely(data_source, etl_mode, results)
             elif data_source.source_type in ['postgresql', 'mysql', 'oracle', 'sqlserver']:
-                return self._process_database_data_source_safely(data_source, etl_mode, results)
+                return self._process_database_data_source_safely(
+                    data_source, etl_mode, results, max_parallel_extracts=job.max_parallel_extracts
+                )
             elif data_source.source_type == 'api':
                 return self._process_api_data_source_safely(data_source, etl_mode, results)
             else:
@@ -365,8 +370,6 @@ class ScheduledETLService:
         Process CSV data source with proper transaction management.
         ENHANCED: Fetch fresh data from the original CSV file path.
         """
-        duckdb_conn = None
-        
         try:
             logger.info(f"Fetching fresh data from CSV source: {data_source.name}")
             
@@ -387,7 +390,6 @@ class ScheduledETLService:
             
             # ENHANCED: Read fresh data directly from the CSV file
             try:
-                import pandas as pd
                 import os
                 
                 # ENHANCED: Use comprehensive path resolution to find CSV files
@@ -421,39 +423,6 @@ class ScheduledETLService:
                     
                     logger.info(f"Using CSV file path: {csv_file_path}")
                 
-                # Read fresh data from CSV with comprehensive encoding handling
-                encodings_to_try = ['utf-8', 'utf-16', 'latin-1', 'cp1252', 'iso-8859-1', 'windows-1252']
-                separators_to_try = [',', ';', '\t', '|']
-                
-                df = None
-                successful_encoding = None
-                successful_separator = None
-                
-                for encoding in encodings_to_try:
-                    for separator in separators_to_try:
-                        try:
-                            logger.info(f"Attempting to read CSV with encoding: {encoding}, separator: '{separator}'")
-                            df = pd.read_csv(csv_file_path, encoding=encoding, sep=separator)
-                            successful_encoding = encoding
-                            successful_separator = separator
-                            logger.info(f"Successfully read {len(df)} rows from CSV file (encoding: {encoding}, separator: '{separator}')")
-                            break
-                        except UnicodeDecodeError as e:
-                            logger.warning(f"Failed to read CSV with {encoding} encoding: {e}")
-                            continue
-                        except Exception as e:
-                            logger.warning(f"Failed to read CSV with {encoding} encoding, {separator} separator: {e}")
-                            continue
-                    if df is not None:
-                        break
-                
-                if df is None:
-                    raise Exception("Failed to read CSV file with any encoding or separator combination")
-                
-                if df.empty:
-                    results['error'] = f"CSV file is empty: {csv_file_path}"
-                    return False, results
-                    
             except Exception as csv_error:
                 results['error'] = f"Failed to read CSV file {csv_file_path}: {str(csv_error)}"
                 return False, results
@@ -461,74 +430,36 @@ class ScheduledETLService:
             # Get or create table name
             table_name = data_source.table_name or f"source_{str(data_source.id).replace('-', '_')}"
             
-            # CRITICAL FIX: Use dedicated DuckDB connection to prevent locks
-            import duckdb
-            import os
-            
-            db_path = 'data/integrated.duckdb'
-            os.makedirs(os.path.dirname(db_path), exist_ok=True)
-            
-            # Use a dedicated connection for this operation
-            duckdb_conn = duckdb.connect(db_path)
-            
-            if not duckdb_conn:
-                results['error'] = "DuckDB connection not available"
-                return False, results
-            
             logger.info(f"Processing fresh CSV data for table: {table_name}")
             
-            # ENHANCED: Apply data type optimization and cleaning
-            df = self._optimize_dataframe_types(df)
-            
-            # FIXED: Use atomic operations with proper error handling
+            # Stream the file straight into DuckDB - encoding and dialect are sniffed once
             try:
-                # Begin transaction-like operation
-                with duckdb_conn.begin() if hasattr(duckdb_conn, 'begin') else duckdb_conn:
-                    
-                    # Handle incremental vs full refresh
-                    if etl_mode == 'incremental':
-                        # For incremental, we would compare timestamps or unique keys
-                        # For now, implement as full refresh with timestamp tracking
-                        logger.info(f"Processing incremental refresh for CSV: {data_source.name}")
-                        
-                        # Check if table exists and get last update info
-                        try:
-                            existing_count = duckdb_conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
-                            logger.info(f"Existing table has {existing_count} rows, adding {len(df)} new rows")
-                        except:
-                            # Table doesn't exist, treat as full refresh
-                            logger.info("Table doesn't exist, treating incremental as full refresh")
-                            etl_mode = 'full'
-                    
-                    if etl_mode == 'full':
-                        # Drop existing table and recreate (full refresh)
-                        duckdb_conn.execute(f"DROP TABLE IF EXISTS {table_name}")
-                        logger.info(f"Dropped existing table: {table_name}")
-                    
-                    # Create table from DataFrame in one operation
-                    duckdb_conn.register(f"{table_name}_temp", df)
-                    
-                    if etl_mode == 'incremental':
-                        # For incremental, append to existing table
-                        duckdb_conn.execute(f"INSERT INTO {table_name} SELECT * FROM {table_name}_temp")
-                    else:
-                        # For full refresh, create new table
-                        duckdb_conn.execute(f"CREATE TABLE {table_name} AS SELECT * FROM {table_name}_temp")
-                    
-                    duckdb_conn.unregister(f"{table_name}_temp")
-                    
-                    logger.info(f"Created table {table_name} with {len(df)} records")
+                if etl_mode == 'incremental':
+                    # For incremental, we would compare timestamps or unique keys
+                    # For now, append the fresh rows to the existing table
+                    logger.info(f"Processing incremental refresh for CSV: {data_source.name}")
+                
+                ingestion = csv_ingestion_service.ingest_to_duckdb(csv_file_path, table_name, etl_mode)
+                etl_mode = ingestion['mode']
                     
+            except EmptyCSVError:
+                results['error'] = f"CSV file is empty: {csv_file_path}"
+                return False, results
             except Exception as db_error:
                 logger.error(f"Database operation failed: {db_error}")
                 raise
+            
+            logger.info(
+                f"Successfully read {ingestion['rows']} rows from CSV file "
+                f"(encoding: {ingestion['encoding']}, separator: '{ingestion['delimiter']}')"
+            )
                 
-            results['records_processed'] = len(df)
-            results['records_added'] = len(df) if etl_mode == 'full' else len(df)
-            results['records_updated'] = 0 if etl_mode == 'full' else len(df)
+            results['records_processed'] = ingestion['rows']
+            results['records_added'] = ingestion['rows']
+            results['records_updated'] = 0 if etl_mode == 'full' else ingestion['rows']
             results['end_time'] = timezone.now().isoformat()
             results['source_file'] = csv_file_path
-            results['file_size'] = os.path.getsize(csv_file_path) if os.path.exists(csv_file_path) else 0
+            results['file_size'] = ingestion['file_size']
             
             # Update data source status and schema in separate transaction
             with transaction.atomic():
@@ -537,10 +468,11 @@ class ScheduledETLService:
                 
                 # ENHANCED: Update schema information with fresh CSV structure
                 try:
-                    # Generate fresh schema information from the DataFrame
+                    # Summarise the loaded table in DuckDB rather than holding the file in memory
+                    table_summary = csv_ingestion_service.build_schema_info(table_name)
                     schema_info = {
-                        'columns': [],
-                        'row_count': len(df),
+                        'columns': table_summary['columns'],
+                        'row_count': table_summary['row_count'],
                         'file_info': {
                             'path': csv_file_path,
                             'size': results['file_size'],
@@ -548,31 +480,6 @@ class ScheduledETLService:
                         }
                     }
                     
-                    for col in df.columns:
-                        # Convert sample values to simple Python types to avoid serialization issues
-                        sample_values = []
-                        try:
-                            samples = df[col].dropna().head(3)
-                            for val in samples:
-                                if pd.isna(val):
-                                    continue
-                                # Convert to simple types
-                                if isinstance(val, (int, float, str, bool)):
-                                    sample_values.append(val)
-                                else:
-                                    sample_values.append(str(val))
-                        except Exception:
-                            sample_values = []
-                        
-                        col_info = {
-                            'name': str(col),
-                            'type': str(df[col].dtype),
-                            'nullable': bool(df[col].isnull().any()),
-                            'unique_values': int(df[col].nunique()) if df[col].nunique() < 1000 else 1000,
-                            'sample_values': sample_values
-                        }
-                        schema_info['columns'].append(col_info)
-                    
                     # Update schema in the same transaction
                     data_source.schema_info = schema_info
                     
@@ -593,8 +500,10 @@ class ScheduledETLService:
                 workflow_status['schema_updated'] = True
                 data_source.workflow_status = workflow_status
                 data_source.save()
+                # Fresh data invalidates every cached query result for this source
+                data_source.bump_data_version()
             
-            logger.info(f"Successfully refreshed CSV data source {data_source.name}: {len(df)} records from {csv_file_path}")
+            logger.info(f"Successfully refreshed CSV data source {data_source.name}: {results['records_processed']} records from {csv_file_path}")
             return True, results
             
         except Exception as e:
@@ -602,64 +511,14 @@ class ScheduledETLService:
             results['error'] = error_msg
             logger.error(error_msg, exc_info=True)
             return False, results
-        finally:
-            # Always cleanup DuckDB connection
-            if duckdb_conn:
-                try:
-                    duckdb_conn.close()
-                except:
-                    pass
-    
-    def _optimize_dataframe_types(self, df):
-        """Optimize DataFrame data types for better performance and storage."""
-        try:
-            import pandas as pd
-            import numpy as np
-            
-            # Convert object columns to more efficient types where possible
-            for col in df.columns:
-                if df[col].dtype == 'object':
-                    # Try to convert to numeric
-                    try:
-                        df[col] = pd.to_numeric(df[col], errors='ignore')
-                    except:
-                        pass
-                    
-                    # Try to convert to datetime
-                    if df[col].dtype == 'object':
-                        try:
-                            df[col] = pd.to_datetime(df[col], errors='ignore')
-                        except:
-                            pass
-            
-            # Optimize integer types
-            for col in df.select_dtypes(include=['int64']).columns:
-                col_min = df[col].min()
-                col_max = df[col].max()
-                
-                if col_min >= -128 and col_max <= 127:
-                    df[col] = df[col].astype(np.int8)
-                elif col_min >= -32768 and col_max <= 32767:
-                    df[col] = df[col].astype(np.int16)
-                elif col_min >= -2147483648 and col_max <= 2147483647:
-                    df[col] = df[col].astype(np.int32)
-            
-            # Optimize float types
-            for col in df.select_dtypes(include=['float64']).columns:
-                df[col] = pd.to_numeric(df[col], downcast='float')
-            
-            return df
-            
-        except Exception as e:
-            logger.warning(f"DataFrame optimization failed: {e}")
-            return df  # Return original if optimization fails
     
-    def _process_database_data_source_safely(self, data_source: DataSource, etl_mode: str, results: Dict) -> Tuple[bool, Dict]:
+    def _process_database_data_source_safely(self, data_source: DataSource, etl_mode: str, results: Dict,
+                                             max_parallel_extracts: int = 1) -> Tuple[bool, Dict]:
         """
         Process database data source with proper transaction management.
         ENHANCED: Fetch fresh data from the actual database connection.
+        Tables are extracted concurrently by up to ``max_parallel_extracts`` workers.
         """
-        duckdb_conn = None
         source_conn = None
         
         try:
@@ -683,52 +542,11 @@ class ScheduledETLService:
             logger.info(f"Connecting to {source_type} database: {host}:{port}/{database}")
             
             # ENHANCED: Create fresh database connection based on source type
+            if source_type not in self.DATABASE_SOURCE_TYPES:
+                results['error'] = f"Unsupported database type: {source_type}"
+                return False, results
             try:
-                if source_type == 'postgresql':
-                    import psycopg2
-                    import psycopg2.extras
-                    port = port or 5432
-                    source_conn = psycopg2.connect(
-                        host=host,
-                        port=port,
-                        database=database,
-                        user=username,
-                        password=password,
-                        connect_timeout=30
-                    )
-                    
-                elif source_type == 'mysql':
-                    import mysql.connector
-                    port = port or 3306
-                    source_conn = mysql.connector.connect(
-                        host=host,
-                        port=port,
-                        database=database,
-                        user=username,
-                        password=password,
-                        connection_timeout=30
-                    )
-                    
-                elif source_type == 'sqlserver':
-                    import pyodbc
-                    port = port or 1433
-                    connection_string = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={host},{port};DATABASE={database};UID={username};PWD={password};TIMEOUT=30"
-                    source_conn = pyodbc.connect(connection_string)
-                    
-                elif source_type == 'oracle':
-                    import oracledb
-                    port = port or 1521
-                    dsn = f"{host}:{port}/{database}"
-                    source_conn = oracledb.connect(
-                        user=username,
-                        password=password,
-                        dsn=dsn
-                    )
-                    
-                else:
-                    results['error'] = f"Unsupported database type: {source_type}"
-                    return False, results
-                    
+                source_conn = self._connect_source_database(source_type, connection_info)
             except Exception as conn_error:
                 results['error'] = f"Failed to connect to {source_type} database: {str(conn_error)}"
                 return False, results
@@ -754,106 +572,27 @@ class ScheduledETLService:
                         query = "SELECT table_name FROM user_tables"
                     
                     tables_df = pd.read_sql(query, source_conn)
-                    tables_to_process = tables_df.iloc[:, 0].tolist()[:5]  # Limit to first 5 tables
+                    tables_to_process = tables_df.iloc[:, 0].tolist()
                     logger.info(f"Discovered {len(tables_to_process)} tables: {tables_to_process}")
                 
-                total_records = 0
+                # The discovery connection is not needed while tables are extracted in parallel
+                source_conn.close()
+                source_conn = None
+                
+                extracts = self._extract_tables_parallel(
+                    data_source, source_type, connection_info, tables_to_process, etl_mode, max_parallel_extracts
+                )
+                total_records = sum(extract['rows'] for extract in extracts.values())
                 
-                # Process each table
-                for table_name in tables_to_process:
+                # Update incremental tracking from the highest watermark of all tables
+                watermarks = [extract['watermark'] for extract in extracts.values() if extract['watermark'] is not None]
+                if watermarks:
                     try:
-                        logger.info(f"Fetching fresh data from table: {table_name}")
-                        
-                        # Build data query with optional incremental support
-                        data_query = f"SELECT * FROM {table_name}"
-                        
-                        # ENHANCED: Add incremental filtering if configured
-                        if etl_mode == 'incremental':
-                            incremental_column = connection_info.get('incremental_column')
-                            if incremental_column:
-                                # Get last processed timestamp/value
-                                last_value = connection_info.get('last_incremental_value')
-                                if last_value:
-                                    if incremental_column.lower() in ['created_at', 'updated_at', 'timestamp']:
-                                        data_query += f" WHERE {incremental_column} > '{last_value}'"
-                                    else:
-                                        data_query += f" WHERE {incremental_column} > {last_value}"
-                                    logger.info(f"Incremental query: {data_query}")
-                        
-                        # ENHANCED: Add row limit for large tables
-                        max_rows = connection_info.get('max_rows', 100000)
-                        if source_type in ['postgresql', 'mysql']:
-                            data_query += f" LIMIT {max_rows}"
-                        elif source_type == 'sqlserver':
-                            data_query = f"SELECT TOP {max_rows} * FROM ({data_query.replace('SELECT *', 'SELECT *')}) AS limited_query"
-                        elif source_type == 'oracle':
-                            data_query += f" AND ROWNUM <= {max_rows}"
-                        
-                        # Execute query and get fresh data
-                        df = pd.read_sql(data_query, source_conn)
-                        
-                        if df.empty:
-                            logger.info(f"No new data found in table: {table_name}")
-                            continue
-                        
-                        logger.info(f"Retrieved {len(df)} fresh records from {table_name}")
-                        
-                        # ENHANCED: Apply data type optimization
-                        df = self._optimize_dataframe_types(df)
-                        
-                        # Store in DuckDB
-                        target_table_name = f"{data_source.name}_{table_name}".replace('-', '_').replace(' ', '_')
-                        
-                        # Get DuckDB connection
-                        import duckdb
-                        import os
-                        
-                        db_path = 'data/integrated.duckdb'
-                        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-                        duckdb_conn = duckdb.connect(db_path)
-                        
-                        # Store data in DuckDB
-                        with duckdb_conn.begin() if hasattr(duckdb_conn, 'begin') else duckdb_conn:
-                            if etl_mode == 'full':
-                                # Drop and recreate table
-                                duckdb_conn.execute(f"DROP TABLE IF EXISTS {target_table_name}")
-                                logger.info(f"Dropped existing table: {target_table_name}")
-                            
-                            # Register DataFrame and create/insert data
-                            duckdb_conn.register(f"{target_table_name}_temp", df)
-                            
-                            if etl_mode == 'incremental':
-                                try:
-                                    # Check if table exists
-                                    duckdb_conn.execute(f"SELECT 1 FROM {target_table_name} LIMIT 1")
-                                    # Table exists, insert new data
-                                    duckdb_conn.execute(f"INSERT INTO {target_table_name} SELECT * FROM {target_table_name}_temp")
-                                    logger.info(f"Appended {len(df)} records to existing table {target_table_name}")
-                                except:
-                                    # Table doesn't exist, create it
-                                    duckdb_conn.execute(f"CREATE TABLE {target_table_name} AS SELECT * FROM {target_table_name}_temp")
-                                    logger.info(f"Created new table {target_table_name} with {len(df)} records")
-                            else:
-                                # Full refresh - create new table
-                                duckdb_conn.execute(f"CREATE TABLE {target_table_name} AS SELECT * FROM {target_table_name}_temp")
-                                logger.info(f"Created table {target_table_name} with {len(df)} records")
-                            
-                            duckdb_conn.unregister(f"{target_table_name}_temp")
-                        
-                        total_records += len(df)
-                        
-                        # Update incremental tracking if configured
-                        if etl_mode == 'incremental' and connection_info.get('incremental_column'):
-                            try:
-                                max_value = df[connection_info['incremental_column']].max()
-                                connection_info['last_incremental_value'] = str(max_value)
-                                logger.info(f"Updated incremental value to: {max_value}")
-                            except Exception as inc_error:
-                                logger.warning(f"Failed to update incremental value: {inc_error}")
-                        
-                    except Exception as table_error:
-                        logger.error(f"Error processing table {table_name}: {table_error}")
-                        continue  # Continue with other tables
+                        watermark = max(watermarks)
+                    except TypeError:
+                        watermark = watermarks[-1]
+                    connection_info['last_incremental_value'] = str(watermark)
+                    logger.info(f"Updated incremental value to: {watermark}")
                 
                 if total_records == 0:
                     results['error'] = "No data retrieved from any tables"
@@ -868,6 +607,7 @@ class ScheduledETLService:
             results['records_updated'] = 0 if etl_mode == 'full' else total_records
             results['end_time'] = timezone.now().isoformat()
             results['tables_processed'] = len(tables_to_process)
+            results['tables_loaded'] = len([extract for extract in extracts.values() if extract['rows']])
             results['source_host'] = host
             results['source_database'] = database
             
@@ -884,6 +624,8 @@ class ScheduledETLService:
                 workflow_status['tables_processed'] = len(tables_to_process)
                 data_source.workflow_status = workflow_status
                 data_source.save()
+                # Fresh data invalidates every cached query result for this source
+                data_source.bump_data_version()
             
             logger.info(f"Successfully refreshed database source {data_source.name}: {total_records} records from {len(tables_to_process)} tables")
             return True, results
@@ -901,11 +643,138 @@ class ScheduledETLService:
                     logger.info(f"Closed {source_type} database connection")
                 except:
                     pass
-            if duckdb_conn:
+    
+    def _connect_source_database(self, source_type: str, connection_info: Dict[str, Any]):
+        """Open a new connection to a source database"""
+        host = connection_info.get('host', 'localhost')
+        port = connection_info.get('port')
+        database = connection_info.get('database')
+        username = connection_info.get('username')
+        password = connection_info.get('password')
+        
+        if source_type == 'postgresql':
+            import psycopg2
+            port = port or 5432
+            return psycopg2.connect(
+                host=host,
+                port=port,
+                database=database,
+                user=username,
+                password=password,
+                connect_timeout=30
+            )
+        elif source_type == 'mysql':
+            import mysql.connector
+            port = port or 3306
+            return mysql.connector.connect(
+                host=host,
+                port=port,
+                database=database,
+                user=username,
+                password=password,
+                connection_timeout=30
+            )
+        elif source_type == 'sqlserver':
+            import pyodbc
+            port = port or 1433
+            connection_string = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={host},{port};DATABASE={database};UID={username};PWD={password};TIMEOUT=30"
+            return pyodbc.connect(connection_string)
+        elif source_type == 'oracle':
+            import oracledb
+            port = port or 1521
+            dsn = f"{host}:{port}/{database}"
+            return oracledb.connect(
+                user=username,
+                password=password,
+                dsn=dsn
+            )
+        raise ValueError(f"Unsupported database type: {source_type}")
+    
+    def _extract_tables_parallel(self, data_source: DataSource, source_type: str, connection_info: Dict[str, Any],
+                                 tables: List[str], etl_mode: str, max_workers: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Extract source tables concurrently through a bounded worker pool.
+        Each worker reads over its own source connection with no DuckDB lease held;
+        only its staging writes and final swap take the integrated database, and
+        those are serialised by the shared DuckDB writer. Returns extract results by table.
+        """
+        max_workers = max(1, min(int(max_workers or 1), len(tables) or 1))
+        extracts = {}
+        
+        logger.info(f"Extracting {len(tables)} tables from {data_source.name} with {max_workers} workers")
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='etl-extract') as executor:
+            futures = {
+                executor.submit(
+                    self._extract_table_in_worker, data_source, source_type, connection_info, table_name, etl_mode
+                ): table_name
+                for table_name in tables
+            }
+            for future in as_completed(futures):
+                table_name = futures[future]
                 try:
-                    duckdb_conn.close()
-                except:
-                    pass
+                    extracts[table_name] = future.result()
+                except Exception as table_error:
+                    logger.error(f"Error processing table {table_name}: {table_error}")
+        
+        return extracts
+    
+    def _extract_table_in_worker(self, data_source: DataSource, source_type: str, connection_info: Dict[str, Any],
+                                 table_name: str, etl_mode: str) -> Dict[str, Any]:
+        """Run ``_extract_table`` on a pool thread and end that thread's DuckDB lease afterwards"""
+        try:
+            return self._extract_table(data_source, source_type, connection_info, table_name, etl_mode)
+        finally:
+            # Pool threads never reach task_postrun, so a lease left here would keep the file open
+            try:
+                duckdb_manager.release_cursor()
+            except Exception as duck_error:
+                logger.warning(f"Error releasing DuckDB cursor for {table_name}: {duck_error}")
+    
+    def _extract_table(self, data_source: DataSource, source_type: str, connection_info: Dict[str, Any],
+                       table_name: str, etl_mode: str) -> Dict[str, Any]:
+        """Stream one source table into DuckDB over a dedicated connection"""
+        logger.info(f"Fetching fresh data from table: {table_name}")
+        
+        # Build data query with optional incremental support
+        data_query = f"SELECT * FROM {table_name}"
+        
+        # ENHANCED: Add incremental filtering if configured
+        incremental_column = connection_info.get('incremental_column') if etl_mode == 'incremental' else None
+        if incremental_column:
+            # Get last processed timestamp/value
+            last_value = connection_info.get('last_incremental_value')
+            if last_value:
+                if incremental_column.lower() in ['created_at', 'updated_at', 'timestamp']:
+                    data_query += f" WHERE {incremental_column} > '{last_value}'"
+                else:
+                    data_query += f" WHERE {incremental_column} > {last_value}"
+                logger.info(f"Incremental query: {data_query}")
+        
+        # Stream the extract into DuckDB in batches - no row cap unless configured
+        target_table_name = f"{data_source.name}_{table_name}".replace('-', '_').replace(' ', '_')
+        table_conn = self._connect_source_database(source_type, connection_info)
+        try:
+            extract = streaming_extract_service.extract_to_duckdb(
+                table_conn,
+                data_query,
+                source_type,
+                target_table_name,
+                mode=etl_mode,
+                watermark_column=incremental_column,
+                max_rows=connection_info.get('max_rows')
+            )
+        finally:
+            try:
+                table_conn.close()
+            except Exception:
+                pass
+        
+        if extract['rows'] == 0:
+            logger.info(f"No new data found in table: {table_name}")
+        else:
+            logger.info(f"Retrieved {extract['rows']} fresh records from {table_name} in {extract['batches']} batches")
+        return extract
     
     def _process_api_data_source_safely(self, data_source: DataSource, etl_mode: str, results: Dict) -> Tuple[bool, Dict]:
         """
@@ -1019,229 +888,6 @@ class ScheduledETLService:
             except Exception as sync_error:
                 logger.error(f"Fallback notification also failed: {sync_error}")
 
-    # Keep the original _process_data_source method for backward compatibility
-    def _process_data_source(self, data_source: DataSource, job: ScheduledETLJob) -> Tuple[bool, Dict[str, Any]]:
-        """Process a single data source for ETL."""
-        
-        results = {
-            'records_processed': 0,
-            'records_added': 0,
-            'records_updated': 0,
-            'start_time': timezone.now().isoformat()
-        }
-        
-        try:
-            # Determine ETL mode (full vs incremental)
-            etl_mode = job.etl_config.get('mode', 'full')  # 'full' or 'incremental'
-            
-            if data_source.source_type == 'csv':
-                return self._process_csv_data_source(data_source, etl_mode, results)
-            elif data_source.source_type in ['postgresql', 'mysql', 'oracle', 'sqlserver']:
-                return self._process_database_data_source(data_source, etl_mode, results)
-            elif data_source.source_type == 'api':
-                return self._process_api_data_source(data_source, etl_mode, results)
-            else:
-                error_msg = f"Unsupported data source type: {data_source.source_type}"
-                results['error'] = error_msg
-                return False, results
-                
-        except Exception as e:
-            error_msg = f"Error processing data source {data_source.name}: {str(e)}"
-            results['error'] = error_msg
-            logger.error(error_msg, exc_info=True)
-            return False, results
-    
-    def _process_csv_data_source(self, data_source: DataSource, etl_mode: str, results: Dict) -> Tuple[bool, Dict]:
-        """Process CSV data source."""
-        try:
-            # Use universal data loader to reload CSV data
-            success, df, message = universal_data_loader.load_data_for_transformation(data_source)
-            
-            if not success or df is None:
-                results['error'] = f"Failed to load CSV data: {message}"
-                return False, results
-            
-            # Get or create table name
-            table_name = data_source.table_name or f"source_{str(data_source.id).replace('-', '_')}"
-            
-            # Ensure DuckDB connection
-            unified_data_access._ensure_duckdb_connection()
-            conn = unified_data_access.duckdb_connection
-            
-            if not conn:
-                results['error'] = "DuckDB connection not available"
-                return False, results
-            
-            # Handle incremental vs full refresh
-            if etl_mode == 'incremental':
-                # For incremental, we would compare timestamps or unique keys
-                # For now, implement as full refresh
-                logger.info(f"Incremental mode requested but implementing as full refresh for CSV: {data_source.name}")
-            
-            # Drop existing table and recreate (full refresh)
-            try:
-                conn.execute(f"DROP TABLE IF EXISTS {table_name}")
-                logger.info(f"Dropped existing table: {table_name}")
-            except Exception as e:
-                logger.warning(f"Could not drop table {table_name}: {e}")
-            
-            # Create table from DataFrame
-            conn.register(table_name, df)
-            
-            # Make the table persistent
-            conn.execute(f"CREATE TABLE {table_name}_temp AS SELECT * FROM {table_name}")
-            conn.unregister(table_name)
-            conn.execute(f"ALTER TABLE {table_name}_temp RENAME TO {table_name}")
-            
-            results['records_processed'] = len(df)
-            results['records_added'] = len(df)
-            results['end_time'] = timezone.now().isoformat()
-            
-            # Update data source status
-            data_source.last_synced = timezone.now()
-            workflow_status = data_source.workflow_status or {}
-            workflow_status['etl_completed'] = True
-            workflow_status['last_etl_run'] = timezone.now().isoformat()
-            data_source.workflow_status = workflow_status
-            data_source.save()
-            
-            logger.info(f"Successfully refreshed CSV data source {data_source.name}: {len(df)} records")
-            return True, results
-            
-        except Exception as e:
-            error_msg = f"Error processing CSV data source: {str(e)}"
-            results['error'] = error_msg
-            return False, results
-    
-    def _process_database_data_source(self, data_source: DataSource, etl_mode: str, results: Dict) -> Tuple[bool, Dict]:
-        """Process database data source."""
-        try:
-            # Test connection first
-            success, message = self.data_service.test_connection(data_source.connection_info)
-            if not success:
-                results['error'] = f"Database connection failed: {message}"
-                return False, results
-            
-            # Get schema information
-            schema_info = self.data_service.get_schema_info(data_source.connection_info, data_source)
-            if not schema_info:
-                results['error'] = "Failed to retrieve schema information"
-                return False, results
-            
-            # For database sources, we need to determine what tables/queries to sync
-            tables_to_sync = data_source.connection_info.get('tables', [])
-            
-            if not tables_to_sync:
-                # If no specific tables, sync all available tables (be cautious)
-                if isinstance(schema_info, dict) and 'tables' in schema_info:
-                    tables_to_sync = [table['name'] for table in schema_info['tables'][:5]]  # Limit to 5 tables
-                else:
-                    results['error'] = "No tables specified for synchronization"
-                    return False, results
-            
-            total_records = 0
-            
-            # Sync each table
-            for table_name in tables_to_sync:
-                try:
-                    # Execute query to get data
-                    if etl_mode == 'incremental':
-                        # For incremental, add WHERE clause based on timestamp
-                        # This is a simplified example - in production, you'd track last sync timestamps
-                        query = f"SELECT * FROM {table_name} WHERE updated_at > CURRENT_DATE - INTERVAL '1 day'"
-                    else:
-                        query = f"SELECT * FROM {table_name}"
-                    
-                    query_success, df = self.data_service.execute_query(
-                        query, 
-                        data_source.connection_info, 
-                        user_id=1  # System user
-                    )
-                    
-                    if not query_success:
-                        logger.error(f"Failed to query table {table_name}: {df}")
-                        continue
-                    
-                    if df is not None and not df.empty:
-                        # Store in DuckDB
-                        unified_data_access._ensure_duckdb_connection()
-                        conn = unified_data_access.duckdb_connection
-                        
-                        if conn:
-                            target_table = f"{data_source.table_name}_{table_name}"
-                            
-                            # Drop and recreate for full refresh
-                            if etl_mode == 'full':
-                                try:
-                                    conn.execute(f"DROP TABLE IF EXISTS {target_table}")
-                                except:
-                                    pass
-                            
-                            # Register and persist the data
-                            conn.register(f"{target_table}_temp", df)
-                            conn.execute(f"CREATE TABLE {target_table} AS SELECT * FROM {target_table}_temp")
-                            conn.unregister(f"{target_table}_temp")
-                            
-                            total_records += len(df)
-                            logger.info(f"Synced table {table_name}: {len(df)} records")
-                    
-                except Exception as table_error:
-                    logger.error(f"Error syncing table {table_name}: {table_error}")
-                    continue
-            
-            results['records_processed'] = total_records
-            results['records_added'] = total_records if etl_mode == 'full' else 0
-            results['records_updated'] = 0 if etl_mode == 'full' else total_records
-            results['end_time'] = timezone.now().isoformat()
-            
-            # Update data source status
-            data_source.last_synced = timezone.now()
-            workflow_status = data_source.workflow_status or {}
-            workflow_status['etl_completed'] = True
-            workflow_status['last_etl_run'] = timezone.now().isoformat()
-            data_source.workflow_status = workflow_status
-            data_source.save()
-            
-            logger.info(f"Successfully refreshed database data source {data_source.name}: {total_records} total records")
-            return True, results
-            
-        except Exception as e:
-            error_msg = f"Error processing database data source: {str(e)}"
-            results['error'] = error_msg
-            return False, results
-    
-    def _process_api_data_source(self, data_source: DataSource, etl_mode: str, results: Dict) -> Tuple[bool, Dict]:
-        """Process API data source."""
-        try:
-            # This is a placeholder for API data source processing
-            # Implementation would depend on the specific API structure
-            
-            api_config = data_source.connection_info
-            api_url = api_config.get('url')
-            
-            if not api_url:
-                results['error'] = "API URL not configured"
-                return False, results
-            
-            # For now, return success but with 0 records
-            # In a real implementation, you would:
-            # 1. Make API requests
-            # 2. Parse the response
-            # 3. Convert to DataFrame
-            # 4. Store in DuckDB
-            
-            results['records_processed'] = 0
-            results['records_added'] = 0
-            results['end_time'] = timezone.now().isoformat()
-            
-            logger.info(f"API data source processing not fully implemented: {data_source.name}")
-            return True, results
-            
-        except Exception as e:
-            error_msg = f"Error processing API data source: {str(e)}"
-            results['error'] = error_msg
-            return False, results
-    
     def get_job_status(self, job_id: str) -> Dict[str, Any]:
         """Get status information for a scheduled job."""
         try:
@@ -1340,6 +986,7 @@ def execute_scheduled_etl_job(self, job_id: str, triggered_by: str = 'schedule')
         
         if success:
             logger.info(f"ETL job {job_id} completed successfully: {message}")
+            _schedule_dashboard_refresh(job_id)
         else:
             logger.error(f"ETL job {job_id} failed: {message}")
         
@@ -1391,6 +1038,22 @@ def execute_scheduled_etl_job(self, job_id: str, triggered_by: str = 'schedule')
         except:
             pass
 
+def _schedule_dashboard_refresh(job_id: str):
+    """Queue a refresh of the ETL operations and dashboard items downstream of the data sources a job refreshed"""
+    try:
+        from services.dashboard_refresh_service import refresh_dashboard_items
+        from services.etl_dag_service import refresh_etl_pipeline
+        
+        data_source_ids = [
+            str(source_id) for source_id in
+            ScheduledETLJob.objects.get(id=job_id).data_sources.values_list('id', flat=True)
+        ]
+        if data_source_ids:
+            refresh_etl_pipeline.delay(data_source_ids)
+            refresh_dashboard_items.delay(data_source_ids)
+    except Exception as e:
+        logger.warning(f"Could not schedule dashboard refresh for ETL job {job_id}: {e}")
+
 def _is_recoverable_error(error_msg: str) -> bool:
     """
     Determine if an error is recoverable and worth retrying.
@@ -12,6 +12,7 @@ from django.db import transaction
 from datasets.models import DataSource, ETLOperation
 from services.schema_aware_table_service import schema_aware_table_service, SchemaAwareTableResult
 from utils.join_validator import JoinSQLValidator, JoinValidationResult
+from utils.join_estimator import JoinEstimate, preflight_join
 
 logger = logging.getLogger(__name__)
 
@@ -256,11 +257,21 @@ class SchemaAwareETLJoinService:
                                      right_result: SchemaAwareTableResult,
                                      left_column: str, right_column: str, 
                                      join_type: str) -> Dict[str, Any]:
-        """Execute join SQL with schema-qualified table names"""
+        """Execute join SQL with schema-qualified table names unless its estimated output is too large"""
         
         start_time = timezone.now()
         
         try:
+            # Estimate the output from key statistics before building it
+            estimate = preflight_join(
+                self.connection, left_result.qualified_table_name, right_result.qualified_table_name,
+                left_column, right_column, join_type
+            )
+            preflight = estimate.to_dict() if estimate else None
+            if estimate and not estimate.allowed:
+                return self._refuse_join(etl_operation, estimate, left_result, right_result,
+                                         left_column, right_column, join_type, start_time)
+            
             # Generate SQL with qualified table names
             join_sql = f"""
             CREATE TABLE {etl_operation.output_table_name} AS
@@ -284,6 +295,7 @@ class SchemaAwareETLJoinService:
             
             # Update ETL operation with comprehensive result summary
             etl_operation.status = 'completed'
+            etl_operation.sql_query = join_sql.strip()
             etl_operation.row_count = row_count
             etl_operation.execution_time = execution_time
             etl_operation.result_summary = {
@@ -301,6 +313,7 @@ class SchemaAwareETLJoinService:
                 'join_type': join_type,
                 'output_table': etl_operation.output_table_name,
                 'join_efficiency': self._calculate_join_efficiency(row_count, left_result.row_count, right_result.row_count),
+                'preflight': preflight,
                 'completed_at': timezone.now().isoformat()
             }
             etl_operation.save()
@@ -310,7 +323,8 @@ class SchemaAwareETLJoinService:
                 'row_count': row_count,
                 'execution_time': execution_time,
                 'output_table': etl_operation.output_table_name,
-                'sql_executed': join_sql
+                'sql_executed': join_sql,
+                'warnings': estimate.warnings if estimate else []
             }
             
         except Exception as e:
@@ -340,6 +354,40 @@ class SchemaAwareETLJoinService:
                 'execution_time': (timezone.now() - start_time).total_seconds()
             }
     
+    def _refuse_join(self, etl_operation: ETLOperation, estimate: JoinEstimate,
+                     left_result: SchemaAwareTableResult, right_result: SchemaAwareTableResult,
+                     left_column: str, right_column: str, join_type: str, start_time) -> Dict[str, Any]:
+        """Fail a join whose estimated output exceeds JOIN_PREFLIGHT_MAX_ROWS without running it"""
+        error = f"Join refused: estimated output of {estimate.estimated_rows:,} rows is too large"
+        logger.warning(f"[JOIN_PREFLIGHT] {etl_operation.name}: {error}")
+        
+        etl_operation.status = 'failed'
+        etl_operation.error_message = error
+        etl_operation.result_summary = {
+            'operation_type': 'join',
+            'status': 'failed',
+            'success': False,
+            'error_type': 'join_too_large',
+            'error': error,
+            'execution_time': (timezone.now() - start_time).total_seconds(),
+            'left_table': left_result.qualified_table_name,
+            'right_table': right_result.qualified_table_name,
+            'join_column_left': left_column,
+            'join_column_right': right_column,
+            'join_type': join_type,
+            'preflight': estimate.to_dict(),
+            'failed_at': timezone.now().isoformat()
+        }
+        etl_operation.save()
+        
+        return {
+            'success': False,
+            'error': error,
+            'error_type': 'join_too_large',
+            'recommendations': estimate.recommendations + estimate.warnings,
+            'execution_time': (timezone.now() - start_time).total_seconds()
+        }
+    
     def _calculate_join_efficiency(self, result_rows: int, left_rows: int, right_rows: int) -> float:
         """Calculate join efficiency as a percentage"""
         try:
@@ -435,9 +483,10 @@ class SchemaAwareETLJoinService:
             left_table_result=left_result,
             right_table_result=right_result,
             execution_details=execution_result,
-            recommendations=self._generate_execution_failure_recommendations(execution_result['error']),
+            recommendations=(execution_result.get('recommendations') or
+                             self._generate_execution_failure_recommendations(execution_result['error'])),
             root_cause_analysis={
-                'error_type': 'execution_failure',
+                'error_type': execution_result.get('error_type', 'execution_failure'),
                 'error_details': execution_result['error'],
                 'execution_time': execution_result.get('execution_time', 0)
             },
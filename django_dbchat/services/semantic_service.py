@@ -10,9 +10,12 @@ from dataclasses import dataclass, asdict, field
 from enum import Enum
 import logging
 from django.db import transaction
+from django.utils import timezone
 from core.models import LLMConfig
 from datasets.models import SemanticTable, SemanticColumn, SemanticMetric
 from django.core.cache import cache
+from utils.column_profiler import column_profiler
+from utils.duckdb_manager import duckdb_manager
 from utils.type_helpers import validate_semantic_data_type
 
 logger = logging.getLogger(__name__)
@@ -28,6 +31,16 @@ class SemanticService:
     Semantic service that enriches raw database schema with business context
     """
     
+    # Rows per INSERT/UPDATE statement for bulk semantic-layer writes
+    BULK_BATCH_SIZE = 500
+    
+    # Fields rewritten when semantic columns are regenerated
+    SEMANTIC_COLUMN_UPDATE_FIELDS = [
+        'display_name', 'description', 'data_type', 'semantic_type', 'sample_values',
+        'common_filters', 'business_rules', 'aggregation_default', 'is_nullable',
+        'etl_enriched', 'updated_at'
+    ]
+    
     def __init__(self):
         self.business_glossary: Dict[str, str] = {}
         self._load_business_glossary()
@@ -1447,23 +1460,23 @@ LIMIT {limit};'''
     def _generate_dynamic_business_metrics(self):
         """Generate business metrics dynamically from actual semantic tables and columns - ZERO HARDCODING"""
         try:
-            # Get all active semantic tables with their columns
-            semantic_tables = SemanticTable.objects.all()
+            # Get all semantic tables with their columns in two queries
+            semantic_tables = list(SemanticTable.objects.prefetch_related('columns'))
             
             if not semantic_tables:
                 logger.info("No semantic tables found, skipping metric generation")
                 return
             
-            logger.info(f"Generating dynamic business metrics from {semantic_tables.count()} semantic tables")
+            logger.info(f"Generating dynamic business metrics from {len(semantic_tables)} semantic tables")
             
-            metrics_created = 0
+            planned_metrics = []
             
             for semantic_table in semantic_tables:
                 try:
                     # Get columns for this table
-                    columns = SemanticColumn.objects.filter(semantic_table=semantic_table)
+                    columns = list(semantic_table.columns.all())
                     
-                    if not columns.exists():
+                    if not columns:
                         logger.warning(f"No columns found for table {semantic_table.name}")
                         continue
                     
@@ -1486,70 +1499,101 @@ LIMIT {limit};'''
                     
                     logger.info(f"Table {semantic_table.name}: {len(numeric_columns)} numeric, {len(identifier_columns)} identifiers, {len(date_columns)} dates, {len(text_columns)} dimensions")
                     
-                    # Generate metrics based on actual columns found
-                    table_metrics_created = 0
-                    
                     # Basic count metric (always create)
-                    table_metrics_created += self._create_basic_count_metric(semantic_table)
+                    planned_metrics.extend(self._build_basic_count_metric(semantic_table))
                     
                     # Generate metrics for numeric measure columns
                     for column in numeric_columns:
-                        table_metrics_created += self._create_numeric_metrics(semantic_table, column)
+                        planned_metrics.extend(self._build_numeric_metrics(semantic_table, column))
                     
                     # Generate distinct count metrics for identifier/dimension columns
                     for column in identifier_columns + text_columns:
-                        table_metrics_created += self._create_distinct_count_metrics(semantic_table, column)
+                        planned_metrics.extend(self._build_distinct_count_metrics(semantic_table, column))
                     
                     # Generate time-based metrics if date columns exist with numeric measures
                     if date_columns and numeric_columns:
-                        table_metrics_created += self._create_time_based_metrics(semantic_table, numeric_columns, date_columns)
+                        planned_metrics.extend(self._build_time_based_metrics(semantic_table, numeric_columns, date_columns))
                     
                     # Generate ratio metrics if multiple numeric columns exist
                     if len(numeric_columns) >= 2:
-                        table_metrics_created += self._create_ratio_metrics(semantic_table, numeric_columns)
-                    
-                    metrics_created += table_metrics_created
-                    logger.info(f"Created {table_metrics_created} metrics for table {semantic_table.name}")
+                        planned_metrics.extend(self._build_ratio_metrics(semantic_table, numeric_columns))
                 
                 except Exception as table_error:
                     logger.error(f"Error generating metrics for table {semantic_table.name}: {table_error}")
                     continue
             
+            metrics_created = self._save_metrics(planned_metrics)
             logger.info(f"Successfully generated {metrics_created} dynamic business metrics total")
             
         except Exception as e:
             logger.error(f"Error generating dynamic business metrics: {e}")
             logger.info("Skipping metric generation due to errors")
     
-    def _create_basic_count_metric(self, semantic_table: SemanticTable) -> int:
-        """Create basic record count metric for any table"""
-        try:
-            metric_name = f"{semantic_table.name}_record_count"
-            display_name = f"{semantic_table.display_name} Record Count"
-            
-            # Check if metric already exists
-            if SemanticMetric.objects.filter(name=metric_name, base_table=semantic_table).exists():
-                return 0
-            
-            SemanticMetric.objects.create(
-                name=metric_name,
-                display_name=display_name,
-                description=f'Total number of records in {semantic_table.display_name}',
-                metric_type='simple',
-                calculation='COUNT(*)',
-                base_table=semantic_table,
-                created_by_id=1,
-                unit='count',
-                is_active=True
-            )
-            return 1
-        except Exception as e:
-            logger.error(f"Error creating basic count metric for {semantic_table.name}: {e}")
+    def _save_metrics(self, planned_metrics: List[Tuple[SemanticMetric, List[SemanticColumn]]]) -> int:
+        """
+        Insert planned metrics and their column links with bulk queries.
+        Metrics whose name already exists are skipped, as metric names embed the table name.
+        """
+        if not planned_metrics:
             return 0
+        
+        existing_names = set(
+            SemanticMetric.objects.filter(
+                name__in=[metric.name for metric, _ in planned_metrics]
+            ).values_list('name', flat=True)
+        )
+        
+        new_metrics = []
+        for metric, columns in planned_metrics:
+            if metric.name in existing_names:
+                continue
+            existing_names.add(metric.name)
+            new_metrics.append((metric, columns))
+        
+        if not new_metrics:
+            return 0
+        
+        with transaction.atomic():
+            SemanticMetric.objects.bulk_create([metric for metric, _ in new_metrics], batch_size=self.BULK_BATCH_SIZE)
+            
+            # Backends without RETURNING support leave primary keys unset
+            if any(metric.pk is None for metric, _ in new_metrics):
+                ids = dict(
+                    SemanticMetric.objects.filter(
+                        name__in=[metric.name for metric, _ in new_metrics]
+                    ).values_list('name', 'id')
+                )
+                for metric, _ in new_metrics:
+                    metric.pk = ids.get(metric.name)
+            
+            through_model = SemanticMetric.dependent_columns.through
+            links = [
+                through_model(semanticmetric_id=metric.pk, semanticcolumn_id=column.pk)
+                for metric, columns in new_metrics if metric.pk is not None
+                for column in columns
+            ]
+            if links:
+                through_model.objects.bulk_create(links, batch_size=self.BULK_BATCH_SIZE, ignore_conflicts=True)
+        
+        logger.info(f"Created {len(new_metrics)} business metrics with {len(links)} column links")
+        return len(new_metrics)
     
-    def _create_numeric_metrics(self, semantic_table: SemanticTable, column: SemanticColumn) -> int:
-        """Create metrics for numeric columns"""
-        metrics_created = 0
+    def _build_basic_count_metric(self, semantic_table: SemanticTable) -> List[Tuple[SemanticMetric, List[SemanticColumn]]]:
+        """Build basic record count metric for any table"""
+        return [(SemanticMetric(
+            name=f"{semantic_table.name}_record_count",
+            display_name=f"{semantic_table.display_name} Record Count",
+            description=f'Total number of records in {semantic_table.display_name}',
+            metric_type='simple',
+            calculation='COUNT(*)',
+            base_table=semantic_table,
+            created_by_id=1,
+            unit='count',
+            is_active=True
+        ), [])]
+    
+    def _build_numeric_metrics(self, semantic_table: SemanticTable, column: SemanticColumn) -> List[Tuple[SemanticMetric, List[SemanticColumn]]]:
+        """Build metrics for numeric columns"""
         table_name = semantic_table.name
         column_name = column.name
         
@@ -1578,194 +1622,107 @@ LIMIT {limit};'''
             }
         ]
         
-        for template in metric_templates:
-            try:
-                metric_name = f"{table_name}_{column_name}{template['name_suffix']}"
-                
-                # Check if metric already exists
-                existing = SemanticMetric.objects.filter(name=metric_name).first()
-                if not existing:
-                    SemanticMetric.objects.create(
-                        name=metric_name,
-                        display_name=f"{column.display_name}{template['display_suffix']}",
-                        description=template['description_template'],
-                        metric_type=template['metric_type'],
-                        calculation=template['calculation_template'],
-                        base_table=semantic_table,  # FIXED: Link to semantic table
-                        created_by_id=1,  # System user
-                        is_active=True
-                    )
-                    # Link to the column
-                    metric = SemanticMetric.objects.get(name=metric_name)
-                    metric.dependent_columns.add(column)
-                    
-                    metrics_created += 1
-                    logger.info(f"Created numeric metric: {metric_name}")
-                
-            except Exception as metric_error:
-                logger.warning(f"Failed to create numeric metric for {column_name}: {metric_error}")
-                continue
-        
-        return metrics_created
+        return [
+            (SemanticMetric(
+                name=f"{table_name}_{column_name}{template['name_suffix']}",
+                display_name=f"{column.display_name}{template['display_suffix']}",
+                description=template['description_template'],
+                metric_type=template['metric_type'],
+                calculation=template['calculation_template'],
+                base_table=semantic_table,  # FIXED: Link to semantic table
+                created_by_id=1,  # System user
+                is_active=True
+            ), [column])
+            for template in metric_templates
+        ]
     
-    def _create_count_metrics(self, semantic_table: SemanticTable, column: SemanticColumn) -> int:
-        """Create count metrics for identifier columns"""
-        metrics_created = 0
-        table_name = semantic_table.name
-        column_name = column.name
-        
-        try:
-            metric_name = f"{table_name}_{column_name}_count"
-            
-            # Check if metric already exists
-            existing = SemanticMetric.objects.filter(name=metric_name).first()
-            if not existing:
-                SemanticMetric.objects.create(
-                    name=metric_name,
-                    display_name=f"{column.display_name} Count",
-                    description=f'Total count of {column.display_name}',
-                    metric_type='simple',
-                    calculation=f'COUNT(DISTINCT "{column_name}")',
-                    base_table=semantic_table,  # FIXED: Link to semantic table
-                    created_by_id=1,  # System user
-                    is_active=True
-                )
-                # Link to the column
-                metric = SemanticMetric.objects.get(name=metric_name)
-                metric.dependent_columns.add(column)
-                
-                metrics_created += 1
-                logger.info(f"Created count metric: {metric_name}")
-        
-        except Exception as metric_error:
-            logger.warning(f"Failed to create count metric for {column_name}: {metric_error}")
-        
-        return metrics_created
+    def _build_count_metrics(self, semantic_table: SemanticTable, column: SemanticColumn) -> List[Tuple[SemanticMetric, List[SemanticColumn]]]:
+        """Build count metrics for identifier columns"""
+        return [(SemanticMetric(
+            name=f"{semantic_table.name}_{column.name}_count",
+            display_name=f"{column.display_name} Count",
+            description=f'Total count of {column.display_name}',
+            metric_type='simple',
+            calculation=f'COUNT(DISTINCT "{column.name}")',
+            base_table=semantic_table,  # FIXED: Link to semantic table
+            created_by_id=1,  # System user
+            is_active=True
+        ), [column])]
     
-    def _create_distinct_count_metrics(self, semantic_table: SemanticTable, column: SemanticColumn) -> int:
-        """Create distinct count metrics for identifier/dimension columns - ZERO HARDCODING"""
-        try:
-            # Distinct count metric
-            metric_name = f"{semantic_table.name}_{column.name}_distinct_count"
-            display_name = f"{column.display_name} Distinct Count"
-            
-            # Check if metric already exists
-            if SemanticMetric.objects.filter(name=metric_name, base_table=semantic_table).exists():
-                return 0
-            
-            SemanticMetric.objects.create(
-                name=metric_name,
-                display_name=display_name,
-                description=f'Number of unique {column.display_name} values',
-                metric_type='simple',
-                calculation=f'COUNT(DISTINCT "{column.name}")',
-                base_table=semantic_table,
-                created_by_id=1,
-                unit='count',
-                is_active=True
-            )
-            return 1
-            
-        except Exception as e:
-            logger.error(f"Error creating distinct count metric for {column.name}: {e}")
-            return 0
+    def _build_distinct_count_metrics(self, semantic_table: SemanticTable, column: SemanticColumn) -> List[Tuple[SemanticMetric, List[SemanticColumn]]]:
+        """Build distinct count metrics for identifier/dimension columns - ZERO HARDCODING"""
+        return [(SemanticMetric(
+            name=f"{semantic_table.name}_{column.name}_distinct_count",
+            display_name=f"{column.display_name} Distinct Count",
+            description=f'Number of unique {column.display_name} values',
+            metric_type='simple',
+            calculation=f'COUNT(DISTINCT "{column.name}")',
+            base_table=semantic_table,
+            created_by_id=1,
+            unit='count',
+            is_active=True
+        ), [])]
     
-    def _create_ratio_metrics(self, semantic_table: SemanticTable, numeric_columns: list) -> int:
-        """Create ratio metrics between numeric columns - ZERO HARDCODING"""
-        metrics_created = 0
-        
-        try:
-            # Only create ratios for the first few numeric columns to avoid explosion
-            if len(numeric_columns) >= 2:
-                col1 = numeric_columns[0]
-                col2 = numeric_columns[1]
-                
-                # Create a ratio metric
-                metric_name = f"{semantic_table.name}_{col1.name}_to_{col2.name}_ratio"
-                display_name = f"{col1.display_name} to {col2.display_name} Ratio"
-                
-                # Check if metric already exists
-                if SemanticMetric.objects.filter(name=metric_name, base_table=semantic_table).exists():
-                    return 0
-                
-                SemanticMetric.objects.create(
-                    name=metric_name,
-                    display_name=display_name,
-                    description=f'Ratio of {col1.display_name} to {col2.display_name}',
-                    metric_type='ratio',
-                    calculation=f'SUM("{col1.name}") / NULLIF(SUM("{col2.name}"), 0)',
-                    base_table=semantic_table,
-                    created_by_id=1,
-                    unit='ratio',
-                    is_active=True
-                )
-                metrics_created += 1
-                
-        except Exception as e:
-            logger.error(f"Error creating ratio metrics: {e}")
+    def _build_ratio_metrics(self, semantic_table: SemanticTable, numeric_columns: list) -> List[Tuple[SemanticMetric, List[SemanticColumn]]]:
+        """Build ratio metrics between numeric columns - ZERO HARDCODING"""
+        # Only create ratios for the first few numeric columns to avoid explosion
+        if len(numeric_columns) < 2:
+            return []
         
-        return metrics_created
+        col1 = numeric_columns[0]
+        col2 = numeric_columns[1]
+        return [(SemanticMetric(
+            name=f"{semantic_table.name}_{col1.name}_to_{col2.name}_ratio",
+            display_name=f"{col1.display_name} to {col2.display_name} Ratio",
+            description=f'Ratio of {col1.display_name} to {col2.display_name}',
+            metric_type='ratio',
+            calculation=f'SUM("{col1.name}") / NULLIF(SUM("{col2.name}"), 0)',
+            base_table=semantic_table,
+            created_by_id=1,
+            unit='ratio',
+            is_active=True
+        ), [])]
     
-    def _create_time_based_metrics(self, semantic_table: SemanticTable, numeric_columns: list, date_columns: list) -> int:
-        """Create time-based metrics combining numeric and date columns"""
-        metrics_created = 0
-        table_name = semantic_table.name
+    def _build_time_based_metrics(self, semantic_table: SemanticTable, numeric_columns: list, date_columns: list) -> List[Tuple[SemanticMetric, List[SemanticColumn]]]:
+        """Build time-based metrics combining numeric and date columns"""
+        # Create monthly and yearly aggregations for the first numeric column and first date column
+        if not numeric_columns or not date_columns:
+            return []
         
-        try:
-            # Create monthly and yearly aggregations for the first numeric column and first date column
-            if numeric_columns and date_columns:
-                numeric_col = numeric_columns[0]
-                date_col = date_columns[0]
-                
-                time_metrics = [
-                    {
-                        'name_suffix': '_monthly_total',
-                        'display_suffix': ' Monthly Total',
-                        'description': f'Monthly total of {numeric_col.display_name}',
-                        'calculation': f'SUM("{numeric_col.name}") GROUP BY EXTRACT(YEAR FROM "{date_col.name}"), EXTRACT(MONTH FROM "{date_col.name}")',
-                        'metric_type': 'calculated'
-                    },
-                    {
-                        'name_suffix': '_yearly_total',
-                        'display_suffix': ' Yearly Total',
-                        'description': f'Yearly total of {numeric_col.display_name}',
-                        'calculation': f'SUM("{numeric_col.name}") GROUP BY EXTRACT(YEAR FROM "{date_col.name}")',
-                        'metric_type': 'calculated'
-                    }
-                ]
-                
-                for template in time_metrics:
-                    try:
-                        metric_name = f"{table_name}_{numeric_col.name}{template['name_suffix']}"
-                        
-                        # Check if metric already exists
-                        existing = SemanticMetric.objects.filter(name=metric_name).first()
-                        if not existing:
-                            SemanticMetric.objects.create(
-                                name=metric_name,
-                                display_name=f"{numeric_col.display_name}{template['display_suffix']}",
-                                description=template['description'],
-                                metric_type=template['metric_type'],
-                                calculation=template['calculation'],
-                                base_table=semantic_table,  # FIXED: Link to semantic table
-                                created_by_id=1,  # System user
-                                is_active=True
-                            )
-                            # Link to both columns
-                            metric = SemanticMetric.objects.get(name=metric_name)
-                            metric.dependent_columns.add(numeric_col, date_col)
-                            
-                            metrics_created += 1
-                            logger.info(f"Created time-based metric: {metric_name}")
-                    
-                    except Exception as metric_error:
-                        logger.warning(f"Failed to create time-based metric: {metric_error}")
-                        continue
+        numeric_col = numeric_columns[0]
+        date_col = date_columns[0]
         
-        except Exception as e:
-            logger.error(f"Error creating time-based metrics: {e}")
+        time_metrics = [
+            {
+                'name_suffix': '_monthly_total',
+                'display_suffix': ' Monthly Total',
+                'description': f'Monthly total of {numeric_col.display_name}',
+                'calculation': f'SUM("{numeric_col.name}") GROUP BY EXTRACT(YEAR FROM "{date_col.name}"), EXTRACT(MONTH FROM "{date_col.name}")',
+                'metric_type': 'calculated'
+            },
+            {
+                'name_suffix': '_yearly_total',
+                'display_suffix': ' Yearly Total',
+                'description': f'Yearly total of {numeric_col.display_name}',
+                'calculation': f'SUM("{numeric_col.name}") GROUP BY EXTRACT(YEAR FROM "{date_col.name}")',
+                'metric_type': 'calculated'
+            }
+        ]
         
-        return metrics_created
+        # Link to both columns
+        return [
+            (SemanticMetric(
+                name=f"{semantic_table.name}_{numeric_col.name}{template['name_suffix']}",
+                display_name=f"{numeric_col.display_name}{template['display_suffix']}",
+                description=template['description'],
+                metric_type=template['metric_type'],
+                calculation=template['calculation'],
+                base_table=semantic_table,  # FIXED: Link to semantic table
+                created_by_id=1,  # System user
+                is_active=True
+            ), [numeric_col, date_col])
+            for template in time_metrics
+        ]
     
     def _create_sample_metrics(self):
         """Create sample metrics as fallback when no semantic tables exist"""
@@ -1787,25 +1744,20 @@ LIMIT {limit};'''
                 }
             ]
             
-            for metric_def in sample_metrics:
-                try:
-                    # Check if metric already exists
-                    existing = SemanticMetric.objects.filter(name=metric_def['name']).first()
-                    if not existing:
-                        SemanticMetric.objects.create(
-                            name=metric_def['name'],
-                            display_name=metric_def['display_name'],
-                            description=metric_def['description'],
-                            metric_type=metric_def['metric_type'],
-                            calculation=metric_def['calculation'],
-                            created_by_id=1,  # System user
-                            is_active=True
-                        )
-                        logger.info(f"Created sample metric: {metric_def['name']}")
-                except Exception as metric_error:
-                    logger.warning(f"Failed to create sample metric {metric_def['name']}: {metric_error}")
-                    continue
-                    
+            metrics_created = self._save_metrics([
+                (SemanticMetric(
+                    name=metric_def['name'],
+                    display_name=metric_def['display_name'],
+                    description=metric_def['description'],
+                    metric_type=metric_def['metric_type'],
+                    calculation=metric_def['calculation'],
+                    created_by_id=1,  # System user
+                    is_active=True
+                ), [])
+                for metric_def in sample_metrics
+            ])
+            logger.info(f"Created {metrics_created} sample metrics")
+
         except Exception as e:
             logger.error(f"Error creating sample metrics: {e}")
     
@@ -1820,28 +1772,28 @@ LIMIT {limit};'''
                 logger.warning(f"Semantic table not found: {table_name}")
                 return False
             
-            # Delete existing metrics for this table
-            deleted_count = SemanticMetric.objects.filter(base_table=semantic_table).count()
-            SemanticMetric.objects.filter(base_table=semantic_table).delete()
-            logger.info(f"Deleted {deleted_count} existing metrics for table {table_name}")
-            
             # Get columns for this table
-            columns = SemanticColumn.objects.filter(semantic_table=semantic_table)
+            columns = list(SemanticColumn.objects.filter(semantic_table=semantic_table))
             numeric_columns = [col for col in columns if col.data_type in ['integer', 'float'] and col.is_measure]
             count_columns = [col for col in columns if col.semantic_type == 'identifier']
             date_columns = [col for col in columns if col.data_type in ['date', 'datetime']]
             
-            metrics_created = 0
-            
-            # Generate new metrics
+            # Build new metrics
+            planned_metrics = []
             for column in numeric_columns:
-                metrics_created += self._create_numeric_metrics(semantic_table, column)
+                planned_metrics.extend(self._build_numeric_metrics(semantic_table, column))
             
             for column in count_columns:
-                metrics_created += self._create_count_metrics(semantic_table, column)
+                planned_metrics.extend(self._build_count_metrics(semantic_table, column))
             
             if date_columns and numeric_columns:
-                metrics_created += self._create_time_based_metrics(semantic_table, numeric_columns, date_columns)
+                planned_metrics.extend(self._build_time_based_metrics(semantic_table, numeric_columns, date_columns))
+            
+            # Replace existing metrics for this table in one transaction
+            with transaction.atomic():
+                _, deleted = SemanticMetric.objects.filter(base_table=semantic_table).delete()
+                logger.info(f"Deleted {deleted.get(SemanticMetric._meta.label, 0)} existing metrics for table {table_name}")
+                metrics_created = self._save_metrics(planned_metrics)
             
             logger.info(f"Successfully regenerated {metrics_created} business metrics for table {table_name}")
             
@@ -1979,16 +1931,16 @@ LIMIT {limit};'''
                             logger.warning(f"Table {table_name} does not exist in integrated database, skipping semantic generation for source {source_id}")
                             continue
                         
-                        # Get integrated data with proper error handling
+                        # Profile the table inside DuckDB instead of loading it into pandas
                         try:
-                            table_data = integration_service.get_integrated_data(table_name)
-                            if table_data.empty:
+                            table_profile = column_profiler.profile_table(table_name)
+                            if table_profile['row_count'] == 0:
                                 logger.warning(f"No data found for table {table_name}, skipping semantic generation")
                                 continue
                             
-                            logger.info(f"Retrieved {len(table_data)} rows for semantic processing from {table_name}")
+                            logger.info(f"Profiled {table_profile['row_count']} rows for semantic processing from {table_name}")
                         except Exception as data_error:
-                            logger.error(f"Failed to retrieve data for table {table_name}: {data_error}")
+                            logger.error(f"Failed to profile table {table_name}: {data_error}")
                             continue
                         
                         # Validate schema_info for object types
@@ -2003,14 +1955,14 @@ LIMIT {limit};'''
                                                 col_info['type'] = 'string'
                         
                         # Data validation before proceeding with semantic table creation
-                        if len(table_data.columns) == 0:
+                        if len(table_profile['columns']) == 0:
                             logger.warning(f"Table {table_name} has no columns, skipping semantic generation")
                             continue
                         
                         # Generate semantic metadata for this table with enhanced error handling
                         try:
-                            success = self._create_semantic_table_from_dataframe(
-                                table_name, source_info['name'], table_data, source_info['type'], source_id
+                            success = self._create_semantic_table_from_profile(
+                                table_name, source_info['name'], table_profile, source_info['type'], source_id
                             )
                             if success:
                                 tables_created += 1
@@ -2053,20 +2005,22 @@ LIMIT {limit};'''
             logger.error(f"Error auto-generating semantic metadata: {e}")
             return False
     
-    def _create_semantic_table_from_dataframe(self, table_name: str, display_name: str, 
-                                            df: pd.DataFrame, source_type: str, data_source_id: Optional[str] = None) -> bool:
-        """Create semantic table metadata from DataFrame with enhanced error handling"""
+    def _create_semantic_table_from_profile(self, table_name: str, display_name: str, 
+                                            profile: Dict[str, Any], source_type: str, data_source_id: Optional[str] = None) -> bool:
+        """Create semantic table metadata from a column profile with enhanced error handling"""
         try:
+            columns = profile['columns']
             logger.info(f"Creating semantic table: {table_name} ({display_name})")
-            logger.info(f"Data types for {table_name}: {df.dtypes.to_dict()}")
-            if all(dtype == 'object' for dtype in df.dtypes):
-                logger.warning(f"All columns in {table_name} are 'object' dtype. ETL type conversion may be missing!")
+            column_types = {name: column['type'] for name, column in columns.items()}
+            logger.info(f"Data types for {table_name}: {column_types}")
+            if all(column['data_type'] == 'string' for column in columns.values()):
+                logger.warning(f"All columns in {table_name} are text. ETL type conversion may be missing!")
             # ENHANCED: Better validation and error handling
-            if df.empty:
-                logger.warning(f"DataFrame is empty for table {table_name}")
+            if profile['row_count'] == 0:
+                logger.warning(f"Table {table_name} is empty")
                 return False
-            if len(df.columns) == 0:
-                logger.warning(f"DataFrame has no columns for table {table_name}")
+            if len(columns) == 0:
+                logger.warning(f"Table {table_name} has no columns")
                 return False
             
             # FIXED: Get the DataSource object - this was the missing piece!
@@ -2096,7 +2050,7 @@ LIMIT {limit};'''
                 defaults={
                     'display_name': display_name,
                     'description': f"Data from {source_type} source: {display_name}",
-                    'business_purpose': self._infer_business_purpose(table_name, df.columns.tolist(), source_type)
+                    'business_purpose': self._infer_business_purpose(table_name, list(columns), source_type)
                 }
             )
             
@@ -2105,42 +2059,36 @@ LIMIT {limit};'''
             else:
                 logger.info(f"Updated existing semantic table: {table_name}")
             
-            # Create semantic columns with detailed error tracking
-            columns_created = 0
+            # Build semantic columns with detailed error tracking
+            column_objects = []
             columns_failed = 0
+            etl_enriched_columns = self._get_etl_transformed_columns(table_name)
             
-            for col_name in df.columns:
+            for col_name, column_profile in columns.items():
                 try:
-                    col_data = df[col_name]
-                    data_type = str(col_data.dtype)
+                    data_type = column_profile['data_type']
                     
                     # Infer semantic type
-                    semantic_type = self._infer_semantic_type(col_name, col_data)
+                    semantic_type = self._infer_semantic_type(col_name, column_profile)
                     
                     # Generate description
                     description = self._generate_column_description(col_name, semantic_type, data_type)
                     
                     # Get sample values
-                    sample_values = self._get_sample_values(col_data)
+                    sample_values = self._get_sample_values(column_profile)
                     
                     # Generate common filters
-                    common_filters = self._generate_common_filters(col_name, col_data, semantic_type)
+                    common_filters = self._generate_common_filters(col_name, column_profile, semantic_type)
                     
                     # Generate business rules
-                    business_rules = self._generate_business_rules(col_name, col_data, semantic_type)
+                    business_rules = self._generate_business_rules(col_name, column_profile, semantic_type)
                     
                     # Default aggregation
                     aggregation_default = self._get_default_aggregation(semantic_type, data_type)
                     
                     # Map data type to valid semantic data type
                     semantic_data_type = data_type
-                    if data_type == 'object':
-                        semantic_data_type = 'string'
-                        logger.debug(f"Converted object data type to string for column {col_name}")
-                    elif data_type == 'datetime64[ns]':
-                        semantic_data_type = 'datetime'
-                        logger.debug(f"Converted datetime64[ns] data type to datetime for column {col_name}")
-                    elif not self._validate_semantic_data_type(data_type):
+                    if not self._validate_semantic_data_type(data_type):
                         semantic_data_type = 'string'
                         logger.warning(f"Invalid data type '{data_type}' for column {col_name}, defaulting to 'string'")
                     
@@ -2149,62 +2097,30 @@ LIMIT {limit};'''
                         logger.warning(f"Invalid aggregation default '{aggregation_default}' for column {col_name}, setting to None")
                         aggregation_default = None
                     
-                    # ENHANCED: Check if this column has ETL transformations applied
-                    etl_enriched = self._check_etl_transformation(table_name, col_name)
-                    
-                    # Create or update semantic column with enhanced error handling
-                    try:
-                        semantic_column, col_created = SemanticColumn.objects.update_or_create(
-                            semantic_table=semantic_table,
-                            name=col_name,
-                            defaults={
-                                'display_name': col_name.replace("_", " ").title(),
-                                'description': description,
-                                'data_type': semantic_data_type,
-                                'semantic_type': semantic_type.value,
-                                'sample_values': json.dumps(sample_values),
-                                'common_filters': json.dumps(common_filters),
-                                'business_rules': json.dumps(business_rules),
-                                'aggregation_default': aggregation_default,
-                                'is_nullable': bool(col_data.isnull().any()),
-                                'etl_enriched': etl_enriched  # ENHANCED: Set ETL enrichment flag
-                            }
-                        )
-                    except Exception as db_error:
-                        # Specific handling for database constraint errors
-                        error_str = str(db_error).lower()
-                        if 'not null constraint failed' in error_str and 'aggregation_default' in error_str:
-                            logger.error(f"NOT NULL constraint failed for aggregation_default in column '{col_name}'. This should not happen after migration. Error: {db_error}")
-                            # Retry with explicit None
-                            semantic_column, col_created = SemanticColumn.objects.update_or_create(
-                                semantic_table=semantic_table,
-                                name=col_name,
-                                defaults={
-                                    'display_name': col_name.replace("_", " ").title(),
-                                    'description': description,
-                                    'data_type': semantic_data_type,
-                                    'semantic_type': semantic_type.value,
-                                    'sample_values': json.dumps(sample_values),
-                                    'common_filters': json.dumps(common_filters),
-                                    'business_rules': json.dumps(business_rules),
-                                    'aggregation_default': None,  # Explicitly set to None
-                                    'is_nullable': bool(col_data.isnull().any())
-                                }
-                            )
-                        else:
-                            raise  # Re-raise if it's a different error
-                    
-                    columns_created += 1
-                    if col_created:
-                        logger.debug(f"Created semantic column: {col_name}")
-                    else:
-                        logger.debug(f"Updated semantic column: {col_name}")
+                    column_objects.append(SemanticColumn(
+                        semantic_table=semantic_table,
+                        name=col_name,
+                        display_name=col_name.replace("_", " ").title(),
+                        description=description,
+                        data_type=semantic_data_type,
+                        semantic_type=semantic_type.value,
+                        sample_values=json.dumps(sample_values),
+                        common_filters=json.dumps(common_filters),
+                        business_rules=json.dumps(business_rules),
+                        aggregation_default=aggregation_default,
+                        is_nullable=column_profile['null_count'] > 0,
+                        # ENHANCED: Flag columns that have ETL transformations applied
+                        etl_enriched=col_name in etl_enriched_columns
+                    ))
                     
                 except Exception as col_error:
                     columns_failed += 1
-                    logger.error(f"Failed to create semantic column '{col_name}': {col_error}")
+                    logger.error(f"Failed to build semantic column '{col_name}': {col_error}")
                     continue
             
+            # Write all columns in a handful of queries
+            columns_created = self._save_semantic_columns(semantic_table, column_objects)
+            
             logger.info(f"Semantic table creation completed for {table_name}: {columns_created} columns created, {columns_failed} failed")
             
             # Return True if we created the table and at least some columns
@@ -2214,6 +2130,60 @@ LIMIT {limit};'''
             logger.error(f"Failed to create semantic table metadata for {table_name}: {e}")
             return False
     
+    def _save_semantic_columns(self, semantic_table: SemanticTable, column_objects: List[SemanticColumn]) -> int:
+        """
+        Insert new and update existing semantic columns of a table with bulk queries.
+        Existing columns are matched on (semantic_table, name); rows inserted
+        concurrently by another worker are skipped instead of failing the batch.
+        """
+        if not column_objects:
+            return 0
+        
+        existing = {
+            column.name: column
+            for column in SemanticColumn.objects.filter(
+                semantic_table=semantic_table,
+                name__in=[column.name for column in column_objects]
+            )
+        }
+        
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        for column in column_objects:
+            current = existing.get(column.name)
+            if current is None:
+                to_create.append(column)
+                continue
+            for field_name in self.SEMANTIC_COLUMN_UPDATE_FIELDS:
+                setattr(current, field_name, getattr(column, field_name))
+            current.updated_at = now
+            to_update.append(current)
+        
+        try:
+            self._write_semantic_columns(to_create, to_update)
+        except Exception as db_error:
+            # Specific handling for databases that predate the nullable aggregation_default migration
+            error_str = str(db_error).lower()
+            if 'not null constraint failed' in error_str and 'aggregation_default' in error_str:
+                logger.error(f"NOT NULL constraint failed for aggregation_default on {semantic_table.name}. This should not happen after migration. Error: {db_error}")
+                for column in to_create + to_update:
+                    column.aggregation_default = None
+                self._write_semantic_columns(to_create, to_update)
+            else:
+                raise  # Re-raise if it's a different error
+        
+        logger.info(f"Saved semantic columns for {semantic_table.name}: {len(to_create)} created, {len(to_update)} updated")
+        return len(to_create) + len(to_update)
+    
+    def _write_semantic_columns(self, to_create: List[SemanticColumn], to_update: List[SemanticColumn]):
+        """Run the bulk INSERT and UPDATE statements for semantic columns in one transaction"""
+        with transaction.atomic():
+            if to_create:
+                SemanticColumn.objects.bulk_create(to_create, batch_size=self.BULK_BATCH_SIZE, ignore_conflicts=True)
+            if to_update:
+                SemanticColumn.objects.bulk_update(to_update, self.SEMANTIC_COLUMN_UPDATE_FIELDS, batch_size=self.BULK_BATCH_SIZE)
+    
     def _validate_semantic_data_type(self, data_type: str) -> bool:
         """Validate if a data type is acceptable for semantic columns"""
         valid_types = [
@@ -2236,8 +2206,8 @@ LIMIT {limit};'''
         except Exception:
             return 0
     
-    def _infer_semantic_type(self, col_name: str, col_data: pd.Series) -> DataType:
-        """Infer semantic type from column name and data"""
+    def _infer_semantic_type(self, col_name: str, column_profile: Dict[str, Any]) -> DataType:
+        """Infer semantic type from column name and profiled data type"""
         col_name_lower = col_name.lower()
         
         # Identifier patterns
@@ -2253,7 +2223,7 @@ LIMIT {limit};'''
             return DataType.MEASURE
         
         # Check data type
-        if pd.api.types.is_numeric_dtype(col_data) and not col_name_lower.endswith("_id"):
+        if column_profile['data_type'] in ('integer', 'float') and not col_name_lower.endswith("_id"):
             return DataType.MEASURE
         
         # Default to dimension
@@ -2272,22 +2242,14 @@ LIMIT {limit};'''
         else:
             return f"Descriptive attribute for {base_name}"
     
-    def _get_sample_values(self, col_data: pd.Series, max_samples: int = 5) -> List[str]:
-        """Get sample values from column data"""
+    def _get_sample_values(self, column_profile: Dict[str, Any], max_samples: int = 5) -> List[str]:
+        """Get sample values from a column profile"""
         try:
-            # Get unique non-null values
-            unique_values = col_data.dropna().unique()
-            
-            # Convert to strings and take first few
-            sample_values = []
-            for val in unique_values[:max_samples]:
-                sample_values.append(str(val))
-            
-            return sample_values
+            return [str(val) for val in column_profile.get('sample_values', [])[:max_samples]]
         except:
             return []
     
-    def _generate_common_filters(self, col_name: str, col_data: pd.Series, semantic_type: DataType) -> List[str]:
+    def _generate_common_filters(self, col_name: str, column_profile: Dict[str, Any], semantic_type: DataType) -> List[str]:
         """Generate common filter patterns for a column"""
         filters = []
         
@@ -2298,14 +2260,10 @@ LIMIT {limit};'''
                 f"{col_name} < CURRENT_DATE"
             ])
         elif semantic_type == DataType.DIMENSION:
-            # Get common values for filter suggestions
-            try:
-                top_values = col_data.value_counts().head(3).index.tolist()
-                for value in top_values:
-                    if isinstance(value, str) and len(value) < 20:
-                        filters.append(f"{col_name} = '{value}'")
-            except:
-                pass
+            # Most frequent values make good filter suggestions
+            for value, _count in column_profile.get('top_values', [])[:3]:
+                if isinstance(value, str) and len(value) < 20:
+                    filters.append(f"{col_name} = '{value}'")
             
             filters.append(f"{col_name} IS NOT NULL")
             
@@ -2317,12 +2275,13 @@ LIMIT {limit};'''
         
         return filters[:3]  # Limit to 3 filters
     
-    def _generate_business_rules(self, col_name: str, col_data: pd.Series, semantic_type: DataType) -> List[str]:
+    def _generate_business_rules(self, col_name: str, column_profile: Dict[str, Any], semantic_type: DataType) -> List[str]:
         """Generate business rules for a column"""
         rules = []
+        is_numeric = column_profile['data_type'] in ('integer', 'float')
         
         # Check for nulls
-        if col_data.isnull().any():
+        if column_profile['null_count'] > 0:
             rules.append("Can contain null values")
         else:
             rules.append("Cannot be null")
@@ -2330,17 +2289,26 @@ LIMIT {limit};'''
         # Type-specific rules
         if semantic_type == DataType.IDENTIFIER:
             rules.append("Should be unique")
-            if pd.api.types.is_numeric_dtype(col_data):
+            if is_numeric:
                 rules.append("Always positive")
         elif semantic_type == DataType.MEASURE:
-            if pd.api.types.is_numeric_dtype(col_data):
-                min_val = col_data.min()
-                if min_val >= 0:
+            if is_numeric:
+                min_val = column_profile.get('min')
+                if min_val is not None and min_val >= 0:
                     rules.append("Always positive or zero")
                 rules.append("Numeric values only")
         elif semantic_type == DataType.DATE:
             rules.append("Valid date format required")
         
+        # Text columns whose sampled values all parse as another type
+        histogram = column_profile.get('type_histogram', {})
+        if column_profile['data_type'] == 'string' and histogram.get('text') == 0:
+            parsed = sum(histogram.get(kind, 0) for kind in ('numeric', 'date', 'boolean'))
+            if parsed and histogram.get('numeric') == max(histogram.values()):
+                rules.append("Numeric values stored as text")
+            elif parsed and histogram.get('date') == max(histogram.values()):
+                rules.append("Date values stored as text")
+        
         return rules
     
     def _get_default_aggregation(self, semantic_type: DataType, data_type: str) -> Optional[str]:
@@ -2702,31 +2670,28 @@ LIMIT {limit};'''
             logger.error(f"Error assessing query confidence: {e}")
             return 50  # Default moderate confidence 
 
-    def _check_etl_transformation(self, table_name: str, col_name: str) -> bool:
+    def _get_etl_transformed_columns(self, table_name: str) -> set:
         """
-        Check if a column has ETL transformations applied by querying transformation metadata
+        Names of a table's columns that have ETL transformations applied, from transformation metadata
         """
         try:
             from services.integration_service import DataIntegrationService
             
             # Get the integration service to access DuckDB
             integration_service = DataIntegrationService()
-            if not integration_service.integrated_db or not hasattr(integration_service.integrated_db, 'execute'):
-                return False
-            
-            # Query transformation metadata
-            result = integration_service.integrated_db.execute("""
-                SELECT transformation_applied 
-                FROM transformation_metadata 
-                WHERE table_name = ? AND column_name = ?
-                LIMIT 1
-            """, (table_name, col_name)).fetchone()
+            with duckdb_manager.session():
+                if not integration_service.integrated_db or not hasattr(integration_service.integrated_db, 'execute'):
+                    return set()
+                
+                # Query transformation metadata for all columns at once
+                rows = integration_service.integrated_db.execute("""
+                    SELECT column_name 
+                    FROM transformation_metadata 
+                    WHERE table_name = ? AND transformation_applied
+                """, (table_name,)).fetchall()
             
-            if result:
-                return bool(result[0])
-            else:
-                return False
+            return {row[0] for row in rows}
                 
         except Exception as e:
-            logger.warning(f"Could not check ETL transformation for {table_name}.{col_name}: {e}")
-            return False
\ No newline at end of file
+            logger.warning(f"Could not check ETL transformations for {table_name}: {e}")
+            return set()
\ No newline at end of file
@@ -0,0 +1,338 @@
+"""
+Streaming Extract Service for ConvaBI Application
+Streams remote database query results in batches through Arrow instead of one DataFrame
+"""
+
+import re
+import json
+import uuid
+import logging
+from contextlib import closing
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+from django.conf import settings
+
+from utils.duckdb_manager import duckdb_manager
+from utils.data_catalog import data_catalog
+
+logger = logging.getLogger(__name__)
+
+_INTEGER_RANKS = {
+    'TINYINT': 1, 'UTINYINT': 2, 'SMALLINT': 2, 'USMALLINT': 3,
+    'INTEGER': 3, 'UINTEGER': 4, 'BIGINT': 4, 'UBIGINT': 5, 'HUGEINT': 5,
+}
+_INTEGER_BY_RANK = {1: 'TINYINT', 2: 'SMALLINT', 3: 'INTEGER', 4: 'BIGINT', 5: 'HUGEINT'}
+_FLOAT_TYPES = {'FLOAT', 'DOUBLE', 'REAL'}
+_DECIMAL_PATTERN = re.compile(r'DECIMAL\((\d+),\s*(\d+)\)')
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _widened_type(table_type: str, batch_type: str) -> Optional[str]:
+    """
+    DuckDB type a table column must be altered to so a batch of ``batch_type``
+    fits without losing data, or None when the current type already holds it
+    """
+    table_type, batch_type = table_type.upper(), batch_type.upper()
+    if table_type == batch_type or table_type == 'VARCHAR':
+        return None
+
+    table_decimal = _DECIMAL_PATTERN.match(table_type)
+    batch_decimal = _DECIMAL_PATTERN.match(batch_type)
+    table_numeric = table_type in _INTEGER_RANKS or table_type in _FLOAT_TYPES or table_decimal
+    batch_numeric = batch_type in _INTEGER_RANKS or batch_type in _FLOAT_TYPES or batch_decimal
+
+    if table_numeric and batch_numeric:
+        if table_type in _FLOAT_TYPES or batch_type in _FLOAT_TYPES:
+            target = 'DOUBLE'
+        elif table_decimal or batch_decimal:
+            scale = max(int(table_decimal.group(2)) if table_decimal else 0,
+                        int(batch_decimal.group(2)) if batch_decimal else 0)
+            target = f'DECIMAL(38,{scale})'
+        else:
+            target = _INTEGER_BY_RANK[max(_INTEGER_RANKS[table_type], _INTEGER_RANKS[batch_type])]
+        return None if target == table_type else target
+
+    if table_type.startswith('TIMESTAMP') or table_type == 'DATE':
+        if batch_type == 'DATE' or batch_type == table_type:
+            return None
+        if batch_type.startswith('TIMESTAMP'):
+            if 'TIME ZONE' in table_type or 'TIME ZONE' in batch_type:
+                return 'TIMESTAMP WITH TIME ZONE'
+            return 'TIMESTAMP'
+
+    return 'VARCHAR'
+
+
+class StreamingExtractService:
+    """
+    Batch-wise extraction of remote database query results.
+
+    Rows are read with server-side cursors (named cursors on PostgreSQL,
+    unbuffered cursors elsewhere) in ``fetchmany`` batches and converted
+    column-wise to Arrow record batches. ``extract_to_duckdb`` appends each
+    batch to a staging table and swaps it into place in one transaction, so
+    memory use is bounded by the batch size rather than the table size.
+    The integrated database is only leased for each staging write and the
+    swap, never while waiting on the source database.
+    """
+
+    def __init__(self):
+        self.batch_size = getattr(settings, 'ETL_STREAM_BATCH_SIZE', 50000)
+
+    def iter_record_batches(self, conn, query: str, source_type: str,
+                            batch_size: Optional[int] = None,
+                            max_rows: Optional[int] = None) -> Iterator[pa.RecordBatch]:
+        """Yield Arrow record batches for a query, reading at most ``max_rows`` rows"""
+        batch_size = int(batch_size or self.batch_size)
+        raw_conn = getattr(conn, 'raw_connection', conn)
+        restore_autocommit = None
+        cursor = None
+
+        try:
+            if source_type == 'postgresql':
+                # Named cursors only exist inside a transaction
+                if getattr(raw_conn, 'autocommit', False):
+                    restore_autocommit = True
+                    raw_conn.autocommit = False
+                cursor = raw_conn.cursor(name=f"convabi_extract_{uuid.uuid4().hex[:12]}")
+                cursor.itersize = batch_size
+            elif source_type == 'mysql':
+                cursor = raw_conn.cursor(buffered=False)
+            else:
+                cursor = raw_conn.cursor()
+                if source_type == 'oracle':
+                    cursor.arraysize = batch_size
+                    cursor.prefetchrows = batch_size
+
+            cursor.execute(query)
+
+            columns = None
+            fetched = 0
+            while True:
+                size = batch_size if max_rows is None else min(batch_size, max_rows - fetched)
+                if size <= 0:
+                    break
+                rows = cursor.fetchmany(size)
+                if columns is None:
+                    # Named cursors only describe their result after the first fetch
+                    columns = self._column_names(cursor.description or [])
+                if not rows:
+                    break
+
+                fetched += len(rows)
+                yield self._rows_to_record_batch(rows, columns)
+                if len(rows) < size:
+                    break
+
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            if restore_autocommit is not None:
+                try:
+                    raw_conn.rollback()
+                    raw_conn.autocommit = restore_autocommit
+                except Exception as e:
+                    logger.warning(f"Failed to restore autocommit after streaming extract: {e}")
+
+    def fetch_dataframe(self, conn, query: str, source_type: str, max_rows: Optional[int] = None) -> pd.DataFrame:
+        """Run a query through the batch reader and return a single DataFrame"""
+        with closing(self.iter_record_batches(conn, query, source_type, max_rows=max_rows)) as batch_iter:
+            batches = list(batch_iter)
+        if not batches:
+            return pd.DataFrame()
+        try:
+            return self._unify_batches(batches).to_pandas()
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return pd.concat([batch.to_pandas() for batch in batches], ignore_index=True)
+
+    def extract_to_duckdb(self, conn, query: str, source_type: str, table_name: str, mode: str = 'full',
+                          watermark_column: Optional[str] = None,
+                          max_rows: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Stream a query's result into an integrated DuckDB table
+
+        Args:
+            conn: Source database connection
+            query: Extract query
+            source_type: postgresql, mysql, sqlserver or oracle
+            table_name: Target table name
+            mode: 'full' replaces the table, 'incremental' appends (falls back to full for new tables)
+            watermark_column: Column whose maximum extracted value is returned for incremental tracking
+            max_rows: Optional row limit; unlimited by default
+
+        Returns:
+            Dictionary with rows, batches, mode and watermark
+        """
+        stage_name = f"{table_name}__stage_{uuid.uuid4().hex[:8]}"
+        null_columns = set()
+        rows = 0
+        batch_count = 0
+
+        # The remote fetch runs with no DuckDB lease held; only each batch's staging
+        # write and the final swap take the file, so other processes get it in between
+        try:
+            with closing(self.iter_record_batches(conn, query, source_type, max_rows=max_rows)) as batches:
+                for batch in batches:
+                    self._stage_batch(stage_name, batch, first=batch_count == 0, null_columns=null_columns)
+                    rows += batch.num_rows
+                    batch_count += 1
+                    logger.debug(f"Staged batch {batch_count} ({batch.num_rows} rows) for {table_name}")
+
+            if batch_count == 0:
+                logger.info(f"Extract for {table_name} returned no rows")
+                return {'rows': 0, 'batches': 0, 'mode': mode, 'watermark': None}
+
+            applied_mode, watermark = self._swap_in_stage(stage_name, table_name, mode, watermark_column)
+
+        except Exception:
+            self._drop_stage(stage_name)
+            raise
+
+        data_catalog.refresh_table(table_name)
+        logger.info(f"Streamed {rows} rows in {batch_count} batches into {table_name} ({applied_mode})")
+        return {'rows': rows, 'batches': batch_count, 'mode': applied_mode, 'watermark': watermark}
+
+    def _stage_batch(self, stage_name: str, batch: pa.RecordBatch, first: bool, null_columns: set):
+        """Append one record batch to the staging table, creating it from the first batch"""
+        stage = _quote_identifier(stage_name)
+        view_name = f"{stage_name}_batch"
+
+        with duckdb_manager.writer() as duckdb_conn:
+            duckdb_conn.register(view_name, pa.Table.from_batches([batch]))
+            try:
+                if first:
+                    duckdb_conn.execute(f"CREATE TABLE {stage} AS SELECT * FROM {_quote_identifier(view_name)}")
+                    null_columns.update(field.name for field in batch.schema if pa.types.is_null(field.type))
+                else:
+                    self._align_column_types(duckdb_conn, stage_name, view_name, batch.schema, null_columns)
+                    duckdb_conn.execute(f"INSERT INTO {stage} BY NAME SELECT * FROM {_quote_identifier(view_name)}")
+            finally:
+                duckdb_conn.unregister(view_name)
+
+    def _swap_in_stage(self, stage_name: str, table_name: str, mode: str,
+                       watermark_column: Optional[str]) -> Tuple[str, Any]:
+        """Replace or extend the target table from the staging table in one transaction"""
+        stage = _quote_identifier(stage_name)
+        table = _quote_identifier(table_name)
+
+        with duckdb_manager.writer() as duckdb_conn:
+            table_exists = duckdb_conn.execute(
+                "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
+                [table_name]
+            ).fetchone()[0] > 0
+            if mode == 'incremental' and not table_exists:
+                logger.info(f"Table {table_name} doesn't exist, treating incremental as full refresh")
+                mode = 'full'
+
+            watermark = None
+            if watermark_column:
+                try:
+                    watermark = duckdb_conn.execute(
+                        f"SELECT MAX({_quote_identifier(watermark_column)}) FROM {stage}"
+                    ).fetchone()[0]
+                except Exception as e:
+                    logger.warning(f"Failed to read watermark column {watermark_column}: {e}")
+
+            duckdb_conn.begin()
+            try:
+                if mode == 'incremental':
+                    self._align_column_types(duckdb_conn, table_name, stage_name)
+                    duckdb_conn.execute(f"INSERT INTO {table} BY NAME SELECT * FROM {stage}")
+                    duckdb_conn.execute(f"DROP TABLE {stage}")
+                else:
+                    duckdb_conn.execute(f"DROP TABLE IF EXISTS {table}")
+                    duckdb_conn.execute(f"ALTER TABLE {stage} RENAME TO {table}")
+                duckdb_conn.commit()
+            except Exception:
+                duckdb_conn.rollback()
+                raise
+
+        return mode, watermark
+
+    def _align_column_types(self, duckdb_conn, table_name: str, source_name: str,
+                            source_schema: Optional[pa.Schema] = None, null_columns: Optional[set] = None):
+        """Widen table columns whose type cannot hold the incoming data"""
+        table_types = {row[0]: row[1] for row in duckdb_conn.execute(f"DESCRIBE {_quote_identifier(table_name)}").fetchall()}
+        source_types = {row[0]: row[1] for row in duckdb_conn.execute(f"DESCRIBE SELECT * FROM {_quote_identifier(source_name)}").fetchall()}
+        null_columns = null_columns if null_columns is not None else set()
+
+        for column, source_type in source_types.items():
+            table_type = table_types.get(column)
+            if table_type is None:
+                continue
+            if source_schema is not None and pa.types.is_null(source_schema.field(column).type):
+                continue
+
+            if column in null_columns:
+                # Column was all NULL so far - adopt the first real type seen
+                target = None if source_type == table_type else source_type
+                null_columns.discard(column)
+            else:
+                target = _widened_type(table_type, source_type)
+
+            if target:
+                logger.info(f"Widening {table_name}.{column} from {table_type} to {target}")
+                duckdb_conn.execute(
+                    f"ALTER TABLE {_quote_identifier(table_name)} ALTER COLUMN {_quote_identifier(column)} SET DATA TYPE {target}"
+                )
+
+    def _drop_stage(self, stage_name: str):
+        try:
+            with duckdb_manager.writer() as duckdb_conn:
+                duckdb_conn.execute(f"DROP TABLE IF EXISTS {_quote_identifier(stage_name)}")
+        except Exception as e:
+            logger.warning(f"Failed to drop staging table {stage_name}: {e}")
+
+    def _column_names(self, description) -> List[str]:
+        """Column names from a cursor description, de-duplicated"""
+        names = []
+        seen = {}
+        for index, column in enumerate(description):
+            name = str(column[0]) if column[0] else f"column_{index + 1}"
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}_{seen[name]}"
+            seen.setdefault(name, 0)
+            names.append(name)
+        return names
+
+    def _rows_to_record_batch(self, rows: List[tuple], columns: List[str]) -> pa.RecordBatch:
+        """Convert a list of row tuples to an Arrow record batch column by column"""
+        arrays = []
+        for index in range(len(columns)):
+            values = [row[index] for row in rows]
+            arrays.append(self._to_arrow_array(values))
+        return pa.RecordBatch.from_arrays(arrays, names=columns)
+
+    def _to_arrow_array(self, values: List[Any]) -> pa.Array:
+        sample = next((value for value in values if value is not None), None)
+        if isinstance(sample, (dict, list)):
+            values = [None if value is None else json.dumps(value, default=str) for value in values]
+        elif isinstance(sample, memoryview):
+            values = [None if value is None else bytes(value) for value in values]
+
+        try:
+            return pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError, OverflowError):
+            # Mixed or driver-specific Python types - keep their text form
+            return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+    def _unify_batches(self, batches: List[pa.RecordBatch]) -> pa.Table:
+        """Combine batches whose inferred column types differ"""
+        try:
+            return pa.Table.from_batches(batches)
+        except pa.ArrowInvalid:
+            tables = [pa.Table.from_batches([batch]) for batch in batches]
+            return pa.concat_tables(tables, promote_options='permissive')
+
+
+# Global instance
+streaming_extract_service = StreamingExtractService()
@@ -8,6 +8,7 @@ import pandas as pd
 import logging
 from typing import Tuple, Optional, Dict, Any
 from datasets.models import DataSource
+from utils.duckdb_manager import duckdb_manager
 
 logger = logging.getLogger(__name__)
 
@@ -167,6 +168,7 @@ class UniversalDataLoader:
             logger.error(f"Error loading CSV data: {e}")
             return False, None, f"CSV loading error: {str(e)}"
     
+    @duckdb_manager.session()
     def _load_from_etl_result(self, data_source: DataSource) -> Tuple[bool, Optional[pd.DataFrame], str]:
         """Load data from ETL result table in DuckDB"""
         try:
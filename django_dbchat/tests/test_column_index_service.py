@@ -0,0 +1,137 @@
+"""
+Tests for the column index used to find join candidates
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from services.column_index_service import ColumnIndexService, name_tokens
+from utils.duckdb_manager import DuckDBConnectionManager
+
+
+def _source(name, columns):
+    return SimpleNamespace(
+        id=uuid.uuid4(), name=name, updated_at='2026-01-01',
+        schema_info={'tables': {'main_table': {'columns': {column: {'type': kind} for column, kind in columns.items()}}}},
+    )
+
+
+class NameTokenTests(SimpleTestCase):
+
+    def test_names_are_normalised(self):
+        self.assertEqual(name_tokens('CustomerIDs'), ['customer', 'id'])
+        self.assertEqual(name_tokens('cust_no'), ['customer', 'number'])
+
+
+class ColumnIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.delete_many([ColumnIndexService.MANIFEST_KEY, ColumnIndexService.VERSION_KEY, ColumnIndexService.LOCK_KEY])
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = DuckDBConnectionManager(db_path=os.path.join(self.temp_dir, 'integrated.duckdb'))
+        self.tables = {}
+        catalog = mock.Mock()
+        catalog.get_table_for_data_source.side_effect = lambda source_id: self.tables.get(source_id, {}).get('name')
+        catalog.get_table.side_effect = lambda name: next(t for t in self.tables.values() if t['name'] == name)
+        for patcher in (mock.patch('services.column_index_service.duckdb_manager', self.manager),
+                        mock.patch('services.column_index_service.data_catalog', catalog)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.index = ColumnIndexService()
+        # Keep the reconcile against the data source table out of these tests
+        self.index.reconcile_interval = 3600
+        self.index._reconciled_at = time.time()
+
+    def tearDown(self):
+        cache.delete_many([ColumnIndexService.MANIFEST_KEY, ColumnIndexService.VERSION_KEY, ColumnIndexService.LOCK_KEY])
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _indexed(self, name, columns, select):
+        data_source = _source(name, columns)
+        table_name = f"ds_{data_source.id.hex}"
+        with self.manager.writer() as conn:
+            conn.execute(f'CREATE TABLE "{table_name}" AS {select}')
+        self.tables[data_source.id] = {'name': table_name, 'columns': list(columns)}
+        self.index.index_source(data_source)
+        return str(data_source.id)
+
+    def test_contained_column_has_full_overlap(self):
+        customers = self._indexed('customers', {'customer_id': 'integer'}, 'SELECT range AS customer_id FROM range(5000)')
+        orders = self._indexed('orders', {'buyer': 'integer'},
+                               'SELECT range % 2000 AS buyer FROM range(10000)')
+
+        overlap = self.index.estimate_overlap(self.index.get_source(customers)['columns']['customer_id'],
+                                              self.index.get_source(orders)['columns']['buyer'])
+
+        self.assertGreater(overlap, 0.8)
+
+    def test_disjoint_columns_do_not_overlap(self):
+        first = self._indexed('first', {'code': 'string'}, "SELECT 'a' || range AS code FROM range(3000)")
+        second = self._indexed('second', {'code': 'string'}, "SELECT 'b' || range AS code FROM range(3000)")
+
+        overlap = self.index.estimate_overlap(self.index.get_source(first)['columns']['code'],
+                                              self.index.get_source(second)['columns']['code'])
+
+        self.assertLess(overlap, 0.05)
+
+    def test_small_columns_overlap_exactly(self):
+        first = self._indexed('first', {'code': 'string'}, "SELECT unnest(['A', 'b', 'c', 'd']) AS code")
+        second = self._indexed('second', {'code': 'string'}, "SELECT unnest(['a', 'B', 'x']) AS code")
+
+        overlap = self.index.estimate_overlap(self.index.get_source(first)['columns']['code'],
+                                              self.index.get_source(second)['columns']['code'])
+
+        self.assertAlmostEqual(overlap, 2 / 3)
+
+    def test_value_overlap_finds_differently_named_columns(self):
+        customers = self._indexed('customers', {'customer_id': 'integer', 'signup': 'date'},
+                                  "SELECT range AS customer_id, DATE '2024-01-01' AS signup FROM range(500)")
+        orders = self._indexed('orders', {'buyer': 'integer', 'customer_id': 'date'},
+                               "SELECT range % 500 AS buyer, DATE '2024-01-01' AS customer_id FROM range(500)")
+
+        candidates = self.index.candidates(customers)
+
+        self.assertIn(('customer_id', orders, 'buyer'), candidates)
+        # Same name, but an integer key never meets a date
+        self.assertNotIn(('customer_id', orders, 'customer_id'), candidates)
+
+    def _other_index(self):
+        other = ColumnIndexService()
+        other.reconcile_interval = 3600
+        other._reconciled_at = time.time()
+        return other
+
+    def test_entries_are_shared_through_the_cache(self):
+        source_id = self._indexed('customers', {'customer_id': 'integer'}, 'SELECT range AS customer_id FROM range(10)')
+        other = self._other_index()
+
+        self.assertEqual(other.get_source(source_id)['columns']['customer_id']['distinct'], 10)
+        self.assertEqual(other.version, cache.get(ColumnIndexService.VERSION_KEY))
+
+    def test_sketches_indexed_while_the_index_is_locked_are_not_lost(self):
+        other = self._other_index()
+        self.index.LOCK_WAIT = 0
+        cache.add(ColumnIndexService.LOCK_KEY, 1)
+
+        # Another publisher holds the lock: the entry stays local
+        customers = self._indexed('customers', {'customer_id': 'integer'}, 'SELECT range AS customer_id FROM range(10)')
+        self.assertIsNone(cache.get(ColumnIndexService.MANIFEST_KEY))
+        cache.delete(ColumnIndexService.LOCK_KEY)
+
+        orders = _source('orders', {'buyer': 'string'})
+        other.index_source(orders, sketch=False)
+        # Reloading the shared index keeps the unpublished entry and publishes it
+        self.assertEqual(set(self.index.get_sources()), {customers, str(orders.id)})
+
+        shared = self._other_index().get_source(customers)
+        self.assertEqual(shared['columns']['customer_id']['distinct'], 10)
@@ -0,0 +1,48 @@
+"""
+Tests for single-pass column profiling
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from utils.column_profiler import ColumnProfiler
+from utils.duckdb_manager import DuckDBConnectionManager
+
+
+class ColumnProfilerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = DuckDBConnectionManager(db_path=os.path.join(self.temp_dir, 'integrated.duckdb'))
+        patcher = mock.patch('utils.column_profiler.duckdb_manager', self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with self.manager.writer() as conn:
+            # approx_count_distinct overestimates 1000 unique ids
+            conn.execute(
+                "CREATE TABLE ds_orders AS SELECT range AS id, CASE WHEN range % 4 = 0 THEN NULL "
+                "ELSE 'r' || (range % 3) END AS region FROM range(1000)"
+            )
+        self.profile = ColumnProfiler().profile_table('ds_orders')
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_null_and_range_statistics(self):
+        region = self.profile['columns']['region']
+        identifier = self.profile['columns']['id']
+
+        self.assertEqual(self.profile['row_count'], 1000)
+        self.assertEqual((region['null_count'], region['non_null_count']), (250, 750))
+        self.assertEqual((identifier['min'], identifier['max']), (0, 999))
+
+    def test_distinct_count_never_exceeds_non_null_count(self):
+        for column in self.profile['columns'].values():
+            self.assertLessEqual(column['distinct_count'], column['non_null_count'], column['name'])
+        self.assertEqual(self.profile['columns']['id']['distinct_count'], 1000)
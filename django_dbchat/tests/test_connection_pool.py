@@ -0,0 +1,119 @@
+"""
+Tests for the bounded source database connection pool
+"""
+
+import threading
+
+from django.test import SimpleTestCase
+
+from utils.performance import PoolTimeoutError, _ConnectionPool
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def _pool(self, **overrides):
+        options = dict(name='test', factory=FakeConnection, health_check=None, max_size=1,
+                       idle_timeout=300, max_lifetime=1800, checkout_timeout=0.05)
+        options.update(overrides)
+        return _ConnectionPool(**options)
+
+    def test_released_connection_is_reused(self):
+        pool = self._pool()
+
+        with pool.acquire() as first:
+            raw = first.raw_connection
+        second = pool.acquire()
+
+        self.assertIs(second.raw_connection, raw)
+        self.assertEqual(raw.rollbacks, 1)
+        stats = pool.get_stats()
+        self.assertEqual((stats['created'], stats['reused'], stats['active_connections']), (1, 1, 1))
+
+    def test_exhausted_pool_times_out(self):
+        pool = self._pool()
+        held = pool.acquire()
+
+        with self.assertRaises(PoolTimeoutError):
+            pool.acquire()
+
+        self.assertEqual(pool.get_stats()['timeouts'], 1)
+        held.close()
+        pool.acquire().close()
+
+    def test_waiter_gets_the_released_connection(self):
+        pool = self._pool(checkout_timeout=5)
+        held = pool.acquire()
+        timer = threading.Timer(0.05, held.close)
+        timer.start()
+
+        with pool.acquire() as conn:
+            self.assertIs(conn.raw_connection, held.raw_connection)
+
+        timer.join()
+        self.assertGreaterEqual(pool.get_stats()['waits'], 1)
+
+    def test_unhealthy_connection_is_replaced(self):
+        pool = self._pool(health_check=lambda conn: False)
+        with pool.acquire() as first:
+            stale = first.raw_connection
+
+        with pool.acquire() as second:
+            self.assertIsNot(second.raw_connection, stale)
+
+        self.assertTrue(stale.closed)
+        self.assertEqual(pool.get_stats()['discarded'], 1)
+
+    def test_connection_past_its_lifetime_is_closed(self):
+        pool = self._pool(max_lifetime=0)
+
+        with pool.acquire() as conn:
+            raw = conn.raw_connection
+
+        self.assertTrue(raw.closed)
+        self.assertEqual(pool.get_stats()['idle_connections'], 0)
+
+    def test_failed_connect_frees_the_slot(self):
+        pool = self._pool(factory=lambda: None)
+
+        with self.assertRaises(Exception):
+            pool.acquire()
+
+        pool.factory = FakeConnection
+        pool.acquire().close()
+        self.assertEqual(pool.get_stats()['failed_requests'], 1)
+
+    def test_idle_connections_are_closed_outside_the_lock(self):
+        pool = self._pool(idle_timeout=0)
+        lock_free_on_close = []
+
+        class SlowClosingConnection(FakeConnection):
+            def close(self):
+                # Another thread must still be able to use the pool while a connection closes
+                reader = threading.Thread(target=pool.get_stats)
+                reader.start()
+                reader.join(1)
+                lock_free_on_close.append(not reader.is_alive())
+                super().close()
+
+        pool.factory = SlowClosingConnection
+        with pool.acquire() as first:
+            idle = first.raw_connection
+
+        with pool.acquire() as second:
+            self.assertIsNot(second.raw_connection, idle)
+
+        self.assertTrue(idle.closed)
+        self.assertTrue(lock_free_on_close[0])
@@ -0,0 +1,81 @@
+"""
+Tests for the streaming CSV ingestion pipeline
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from services.csv_ingestion_service import CSVIngestionService, EmptyCSVError
+from utils.duckdb_manager import DuckDBConnectionManager
+
+
+class CSVIngestionLoadTests(SimpleTestCase):
+    """Run ``_load`` against a real DuckDB file"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = DuckDBConnectionManager(db_path=os.path.join(self.temp_dir, 'integrated.duckdb'))
+        patcher = mock.patch('services.csv_ingestion_service.duckdb_manager', self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = CSVIngestionService()
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write_csv(self, content: str) -> str:
+        path = os.path.join(self.temp_dir, 'upload.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+        return path
+
+    def _fetch(self, sql: str):
+        with self.manager.session() as conn:
+            return conn.execute(sql).fetchall()
+
+    def test_full_load_uses_sniffed_dialect(self):
+        path = self._write_csv('region;sales\nEast;10\nWest;20\n')
+        dialect = self.service.processor.sniff_csv_dialect(path)
+
+        mode, rows = self.service._load(path, 'ds_sales', dialect, 'full', 100)
+
+        self.assertEqual((mode, rows), ('full', 2))
+        self.assertEqual(self._fetch('SELECT region, sales FROM ds_sales ORDER BY sales'), [('East', 10), ('West', 20)])
+
+    def test_whole_file_sample_size(self):
+        path = self._write_csv('id,name\n1,a\n2,b\n')
+        dialect = self.service.processor.sniff_csv_dialect(path)
+
+        _, rows = self.service._load(path, 'ds_ids', dialect, 'full', -1)
+
+        self.assertEqual(rows, 2)
+
+    def test_headerless_file_keeps_first_row(self):
+        path = self._write_csv('1,2\n3,4\n')
+        dialect = {'delimiter': ',', 'quotechar': '"', 'has_header': False}
+
+        _, rows = self.service._load(path, 'ds_plain', dialect, 'full', 100)
+
+        self.assertEqual(rows, 2)
+
+    def test_incremental_appends_by_name(self):
+        path = self._write_csv('id,name\n1,a\n')
+        dialect = self.service.processor.sniff_csv_dialect(path)
+        self.service._load(path, 'ds_rows', dialect, 'full', 100)
+
+        mode, rows = self.service._load(path, 'ds_rows', dialect, 'incremental', 100)
+
+        self.assertEqual((mode, rows), ('incremental', 1))
+        self.assertEqual(self._fetch('SELECT COUNT(*) FROM ds_rows'), [(2,)])
+
+    def test_header_only_file_is_rejected(self):
+        path = self._write_csv('id,name\n')
+        dialect = {'delimiter': ',', 'quotechar': '"', 'has_header': True}
+
+        with self.assertRaises(EmptyCSVError):
+            self.service._load(path, 'ds_empty', dialect, 'full', 100)
@@ -0,0 +1,61 @@
+"""
+Tests for running compiled dashboard item plans
+"""
+
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from services.dashboard_data_service import DashboardDataService
+from utils.duckdb_manager import DuckDBConnectionManager
+
+
+class CompiledPlanFilterTests(SimpleTestCase):
+    """Filter bindings must apply however the compiled SQL names the target table"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = DuckDBConnectionManager(db_path=os.path.join(self.temp_dir, 'integrated.duckdb'))
+        patcher = mock.patch('services.dashboard_data_service.duckdb_manager', self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with self.manager.writer() as conn:
+            conn.execute(
+                "CREATE TABLE ds_sales AS SELECT i AS id, CASE WHEN i % 2 = 0 THEN 'East' ELSE 'West' END AS region "
+                "FROM range(10) t(i)"
+            )
+        self.service = DashboardDataService()
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _count(self, sql, bindings):
+        item = SimpleNamespace(id=1, sql_query=sql, target_table='ds_sales')
+        return int(self.service._run_plan(item, bindings).iloc[0, 0])
+
+    def test_unqualified_reference_is_filtered(self):
+        self.assertEqual(self._count('SELECT COUNT(*) FROM "ds_sales"', {'region': 'East'}), 5)
+
+    def test_schema_qualified_references_are_filtered(self):
+        for sql in ('select count(*) from main.ds_sales',
+                    'SELECT COUNT(*) FROM "main"."ds_sales"',
+                    'SELECT COUNT(*) FROM MAIN . "ds_sales" s WHERE s.id >= 0'):
+            self.assertEqual(self._count(sql, {'region': 'East'}), 5, sql)
+
+    def test_qualified_column_reference_is_filtered(self):
+        sql = 'SELECT COUNT(main.ds_sales.id) FROM main.ds_sales'
+        self.assertEqual(self._count(sql, {'region': ['West']}), 5)
+
+    def test_leading_with_clause_keeps_bindings(self):
+        sql = 'WITH east AS (SELECT * FROM main.ds_sales) SELECT COUNT(*) FROM east'
+        self.assertEqual(self._count(sql, {'id': {'min': 0, 'max': 3}}), 4)
+
+    def test_no_bindings_leaves_sql_unchanged(self):
+        self.assertEqual(self.service._bind_sql('SELECT * FROM main.ds_sales', 'ds_sales', {}),
+                         ('SELECT * FROM main.ds_sales', []))
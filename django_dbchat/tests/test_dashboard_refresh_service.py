@@ -0,0 +1,95 @@
+"""
+Tests for background recomputation of dashboard item results
+"""
+
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from services.dashboard_refresh_service import DashboardRefreshService
+
+
+class RefreshDueItemsTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.service = DashboardRefreshService()
+        self.now = timezone.now()
+        self.item = SimpleNamespace(id=1, result_ref='', computed_at=None, refresh_interval=0, data_version=None,
+                                    target_table='ds_sales', dashboard=SimpleNamespace(refresh_interval=0, owner='owner'))
+        self.success = False
+
+        data_service = mock.patch('services.dashboard_refresh_service.dashboard_data_service')
+        items = mock.patch('services.dashboard_refresh_service.DashboardItem')
+        clock = mock.patch('services.dashboard_refresh_service.timezone.now', side_effect=lambda: self.now)
+        for patcher in (data_service, items, clock):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        from services.dashboard_refresh_service import DashboardItem, dashboard_data_service
+        DashboardItem.objects.select_related.return_value.exclude.return_value.exclude.return_value = [self.item]
+        self.data_service = dashboard_data_service
+        self.data_service.data_versions.return_value = {}
+        self.data_service.source_key.return_value = 'ds:1'
+        self.data_service.get_items_data.side_effect = lambda batch, owner, force_refresh: {
+            str(item.id): {'success': self.success} for item in batch
+        }
+
+    def _advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+    def test_failing_item_without_result_backs_off(self):
+        self.assertEqual(self.service.refresh_due_items()['failed'], 1)
+
+        self._advance(60)
+        self.assertEqual(self.service.refresh_due_items()['due'], 0)
+
+        self._advance(240)
+        self.assertEqual(self.service.refresh_due_items()['failed'], 1)
+
+        # The second failure doubles the wait
+        self._advance(300)
+        self.assertEqual(self.service.refresh_due_items()['due'], 0)
+        self._advance(300)
+        self.assertEqual(self.service.refresh_due_items()['due'], 1)
+        self.assertEqual(self.data_service.get_items_data.call_count, 3)
+
+    def test_backoff_is_capped(self):
+        with self.settings(DASHBOARD_REFRESH_RETRY_BACKOFF=300, DASHBOARD_REFRESH_MAX_BACKOFF=500):
+            service = DashboardRefreshService()
+            service.refresh_due_items()
+            self._advance(300)
+            service.refresh_due_items()
+            self._advance(500)
+
+            self.assertEqual(service.refresh_due_items()['due'], 1)
+
+    def test_success_clears_the_failure_record(self):
+        self.service.refresh_due_items()
+        self._advance(300)
+        self.success = True
+
+        self.assertEqual(self.service.refresh_due_items()['refreshed'], 1)
+        self.assertIsNone(cache.get(DashboardRefreshService.FAILURE_KEY.format(self.item.id)))
+
+    def test_item_claimed_by_another_run_is_skipped(self):
+        cache.add(DashboardRefreshService.LOCK_KEY.format(self.item.id), 1)
+
+        stats = self.service.refresh_due_items()
+
+        self.assertEqual((stats['due'], stats['locked'], stats['failed']), (1, 1, 0))
+        self.data_service.get_items_data.assert_not_called()
+
+    def test_crashing_batch_is_backed_off_and_released(self):
+        self.data_service.get_items_data.side_effect = RuntimeError('query failed')
+
+        self.assertEqual(self.service.refresh_due_items()['failed'], 1)
+
+        self.assertIsNone(cache.get(DashboardRefreshService.LOCK_KEY.format(self.item.id)))
+        self._advance(60)
+        self.assertEqual(self.service.refresh_due_items()['due'], 0)
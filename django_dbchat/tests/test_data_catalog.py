@@ -0,0 +1,107 @@
+"""
+Tests for the integrated database catalog
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from utils.data_catalog import DataEnvironmentCatalog
+from utils.duckdb_manager import DuckDBConnectionManager
+
+
+class DataCatalogTests(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = DuckDBConnectionManager(db_path=os.path.join(self.temp_dir, 'integrated.duckdb'))
+        patcher = mock.patch('utils.data_catalog.duckdb_manager', self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.delete_many([DataEnvironmentCatalog.CACHE_KEY, DataEnvironmentCatalog.VERSION_KEY])
+
+        self.source_id = uuid.uuid4()
+        self.table_name = f"ds_{self.source_id.hex}"
+        self.catalog = self._catalog()
+
+    def tearDown(self):
+        cache.delete_many([DataEnvironmentCatalog.CACHE_KEY, DataEnvironmentCatalog.VERSION_KEY])
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _catalog(self):
+        catalog = DataEnvironmentCatalog()
+        catalog.reconcile_interval = 3600
+        return catalog
+
+    def _create_table(self):
+        with self.manager.writer() as conn:
+            conn.execute(f'CREATE TABLE "{self.table_name}" AS SELECT range AS id FROM range(3)')
+
+    def test_refresh_analyses_table_and_releases_lease(self):
+        self._create_table()
+
+        self.assertTrue(self.catalog.refresh_table(self.table_name))
+
+        self.assertEqual(self.catalog.get_table(self.table_name)['row_count'], 3)
+        self.assertEqual(self.catalog.get_table_for_data_source(self.source_id), self.table_name)
+        self.assertFalse(self.manager.get_stats()['connected'])
+
+    def test_missing_source_is_probed_once(self):
+        with mock.patch.object(self.catalog, '_analyze_table', wraps=self.catalog._analyze_table) as analyze:
+            self.assertIsNone(self.catalog.get_table_for_data_source(self.source_id))
+            probes = analyze.call_count
+            self.assertIsNone(self.catalog.get_table_for_data_source(self.source_id))
+            self.assertIsNone(self.catalog.get_table_for_data_source(str(self.source_id)))
+
+        self.assertEqual(probes, 1)
+        self.assertEqual(analyze.call_count, probes)
+        self.assertFalse(self.manager.get_stats()['connected'])
+
+    def test_missing_source_is_found_after_reconcile(self):
+        self.assertIsNone(self.catalog.get_table_for_data_source(self.source_id))
+        self._create_table()
+
+        self.catalog.invalidate()
+
+        self.assertEqual(self.catalog.get_table_for_data_source(self.source_id), self.table_name)
+
+    def test_publishers_bump_a_shared_version(self):
+        other = self._catalog()
+        self._create_table()
+        with self.manager.writer() as conn:
+            conn.execute('CREATE TABLE extra AS SELECT 1 AS x')
+
+        self.catalog.refresh_table(self.table_name)
+        other.refresh_table('extra')
+
+        self.assertEqual(cache.get(DataEnvironmentCatalog.VERSION_KEY), 2)
+        self.assertEqual(set(self.catalog.get_tables()), {self.table_name, 'extra'})
+        with mock.patch.object(other, 'refresh_table') as refresh:
+            self.assertEqual(other.get_table_for_data_source(self.source_id), self.table_name)
+        refresh.assert_not_called()
+
+    def test_changes_published_while_the_catalog_is_locked_are_not_lost(self):
+        other = self._catalog()
+        self._create_table()
+        with self.manager.writer() as conn:
+            conn.execute('CREATE TABLE extra AS SELECT 1 AS x')
+        self.catalog.LOCK_WAIT = 0
+        cache.add(DataEnvironmentCatalog.LOCK_KEY, 1)
+
+        # Another publisher holds the lock: the change stays local
+        self.catalog.refresh_table(self.table_name)
+        self.assertIsNone(cache.get(DataEnvironmentCatalog.CACHE_KEY))
+        cache.delete(DataEnvironmentCatalog.LOCK_KEY)
+
+        other.refresh_table('extra')
+        # Reloading the shared catalog keeps the unpublished table and publishes it
+        self.assertEqual(set(self.catalog.get_tables()), {self.table_name, 'extra'})
+
+        with mock.patch.object(DataEnvironmentCatalog, '_reconcile'):
+            self.assertEqual(set(self._catalog().get_tables()), {self.table_name, 'extra'})
@@ -0,0 +1,77 @@
+"""
+Tests for the leased integrated DuckDB connection manager
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+
+from django.test import SimpleTestCase
+
+from utils.duckdb_manager import DuckDBConnectionManager
+
+
+class DuckDBLeaseTests(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = DuckDBConnectionManager(db_path=os.path.join(self.temp_dir, 'integrated.duckdb'))
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_cursor_outside_a_block_is_rejected(self):
+        with self.assertRaises(RuntimeError):
+            self.manager.cursor()
+        self.assertFalse(self.manager.get_stats()['connected'])
+
+    def test_session_closes_the_database_when_it_ends(self):
+        with self.manager.session() as conn:
+            self.assertEqual(conn.execute('SELECT 42').fetchone(), (42,))
+            self.assertIs(self.manager.cursor(), conn)
+
+        stats = self.manager.get_stats()
+        self.assertFalse(stats['connected'])
+        self.assertEqual(stats['active_leases'], 0)
+
+    def test_nested_blocks_reuse_the_outer_lease(self):
+        with self.manager.session():
+            with self.manager.writer() as conn:
+                conn.execute('CREATE TABLE t AS SELECT 1 AS x')
+            with self.manager.session() as conn:
+                self.assertEqual(conn.execute('SELECT COUNT(*) FROM t').fetchone(), (1,))
+            self.assertTrue(self.manager.holds_lease())
+
+        self.assertEqual(self.manager.get_stats()['connections_opened'], 1)
+        self.assertFalse(self.manager.holds_lease())
+
+    def test_session_as_decorator(self):
+        @self.manager.session()
+        def read():
+            return self.manager.cursor().execute('SELECT 1').fetchone()[0]
+
+        self.assertEqual(read(), 1)
+        self.assertEqual(read(), 1)
+        self.assertFalse(self.manager.get_stats()['connected'])
+
+    def test_database_stays_open_until_the_last_lease_ends(self):
+        entered = threading.Event()
+        finish = threading.Event()
+
+        def hold():
+            with self.manager.session():
+                entered.set()
+                finish.wait(5)
+
+        worker = threading.Thread(target=hold)
+        worker.start()
+        entered.wait(5)
+        with self.manager.session():
+            pass
+        self.assertTrue(self.manager.get_stats()['connected'])
+
+        finish.set()
+        worker.join()
+        self.assertFalse(self.manager.get_stats()['connected'])
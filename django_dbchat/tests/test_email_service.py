@@ -0,0 +1,56 @@
+"""
+Tests for sending dashboard emails to several recipients
+"""
+
+import smtplib
+import socket
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from services.email_service import EmailService
+
+CONFIG = {'SMTP_SERVER': 'smtp.example.com', 'SMTP_USERNAME': 'user', 'SMTP_PASSWORD': 'secret',
+          'SENDER_EMAIL': 'reports@example.com'}
+
+
+class SendDashboardEmailsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = EmailService()
+        self.server = mock.Mock()
+        for patcher in (mock.patch.object(self.service, 'get_email_config', return_value=dict(CONFIG)),
+                        mock.patch.object(self.service, '_open_smtp', return_value=self.server)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_every_recipient_gets_a_copy_over_one_connection(self):
+        results = self.service.send_dashboard_emails(['a@example.com', 'b@example.com', 'a@example.com'], 'Sales', '<p/>')
+
+        self.assertEqual(results, {'a@example.com': True, 'b@example.com': True})
+        self.assertEqual(self.service._open_smtp.call_count, 1)
+        self.server.quit.assert_called_once()
+
+    def test_socket_error_fails_only_that_recipient(self):
+        self.server.sendmail.side_effect = [socket.timeout('timed out'), None]
+
+        results = self.service.send_dashboard_emails(['a@example.com', 'b@example.com'], 'Sales', '<p/>')
+
+        self.assertEqual(results, {'a@example.com': False, 'b@example.com': True})
+
+    def test_dropped_connection_is_reopened(self):
+        self.server.sendmail.side_effect = [None, smtplib.SMTPServerDisconnected('gone'), None]
+
+        results = self.service.send_dashboard_emails(['a@example.com', 'b@example.com'], 'Sales', '<p/>')
+
+        self.assertEqual(results, {'a@example.com': True, 'b@example.com': True})
+        self.assertEqual(self.service._open_smtp.call_count, 2)
+
+    def test_connection_errors_return_false(self):
+        self.service._open_smtp.side_effect = ConnectionRefusedError('refused')
+
+        self.assertFalse(self.service.send_dashboard_email('a@example.com', 'Sales', '<p/>'))
+
+    def test_message_errors_return_false(self):
+        with mock.patch.object(self.service, '_build_message', side_effect=ValueError('bad attachment')):
+            self.assertFalse(self.service.send_dashboard_email('a@example.com', 'Sales', '<p/>'))
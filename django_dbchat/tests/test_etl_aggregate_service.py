@@ -0,0 +1,186 @@
+"""
+Tests for incremental aggregate refreshes inside DuckDB
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from datasets.models import DataSource, ETLOperation
+from services.etl_aggregate_service import ETLAggregateService
+from utils.duckdb_manager import DuckDBConnectionManager
+
+
+class AggregateRefreshTests(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = DuckDBConnectionManager(db_path=os.path.join(self.temp_dir, 'integrated.duckdb'))
+        for patcher in (mock.patch('services.etl_aggregate_service.duckdb_manager', self.manager),
+                        mock.patch('services.etl_aggregate_service.data_catalog')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.service = ETLAggregateService()
+        with self.manager.writer() as conn:
+            conn.execute(
+                "CREATE TABLE sales AS SELECT 'region_' || (range % 3) AS region, "
+                "range AS amount, range AS ts FROM range(10)"
+            )
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _operation(self, output_table, watermark_column='ts'):
+        aggregations = self.service._parse_aggregations({'amount': ['SUM', 'AVG', 'MIN', 'MAX'], '*': 'COUNT'})
+        return SimpleNamespace(
+            id=uuid.uuid4(), source_tables=['sales'], output_table_name=output_table,
+            parameters={'group_by_columns': ['region'], 'aggregations': aggregations,
+                        'watermark_column': watermark_column},
+            row_count=None, status='running', error_message='', save=mock.Mock(),
+        )
+
+    def _rows(self, table):
+        with self.manager.session() as conn:
+            return conn.execute(
+                f'SELECT region, sum_amount, avg_amount, min_amount, max_amount, count_all '
+                f'FROM "{table}" ORDER BY region'
+            ).fetchall()
+
+    def _tables(self):
+        with self.manager.session() as conn:
+            return {row[0] for row in conn.execute('SELECT table_name FROM duckdb_tables()').fetchall()}
+
+    def test_incremental_refresh_matches_a_full_rebuild(self):
+        operation = self._operation('etl_aggregate_sales')
+        self.service.refresh_aggregate_operation(operation, force_full=True)
+        with self.manager.writer() as conn:
+            conn.execute("INSERT INTO sales SELECT 'region_' || (range % 4), range * 2, range FROM range(10, 25)")
+
+        success, result = self.service.refresh_aggregate_operation(operation)
+        rebuilt = self._operation('etl_aggregate_rebuilt')
+        self.service.refresh_aggregate_operation(rebuilt, force_full=True)
+
+        self.assertTrue(success)
+        self.assertEqual(result['mode'], 'incremental')
+        self.assertEqual(result['rows_aggregated'], 15)
+        self.assertEqual(result['row_count'], 4)
+        self.assertEqual(self._rows('etl_aggregate_sales'), self._rows('etl_aggregate_rebuilt'))
+
+    def test_refresh_without_new_rows_keeps_the_output(self):
+        operation = self._operation('etl_aggregate_sales')
+        self.service.refresh_aggregate_operation(operation, force_full=True)
+        before = self._rows('etl_aggregate_sales')
+
+        success, result = self.service.refresh_aggregate_operation(operation)
+
+        self.assertTrue(success)
+        self.assertEqual(result['mode'], 'incremental')
+        self.assertEqual(result['rows_aggregated'], 0)
+        self.assertEqual(self._rows('etl_aggregate_sales'), before)
+
+    def test_replaced_source_falls_back_to_a_full_rebuild(self):
+        operation = self._operation('etl_aggregate_sales')
+        self.service.refresh_aggregate_operation(operation, force_full=True)
+        with self.manager.writer() as conn:
+            # A re-extract that grew overall but no longer has some of the rows already aggregated
+            conn.execute("DROP TABLE sales")
+            conn.execute("CREATE TABLE sales AS SELECT 'region_0' AS region, range AS amount, range AS ts "
+                         "FROM range(20) WHERE range <> 3")
+
+        success, result = self.service.refresh_aggregate_operation(operation)
+
+        self.assertTrue(success)
+        self.assertEqual(result['mode'], 'full')
+        self.assertEqual(self._rows('etl_aggregate_sales'), [('region_0', 187, 187 / 19, 0, 19, 19)])
+
+    def test_shrunk_source_falls_back_to_a_full_rebuild(self):
+        operation = self._operation('etl_aggregate_sales')
+        self.service.refresh_aggregate_operation(operation, force_full=True)
+        with self.manager.writer() as conn:
+            conn.execute("DELETE FROM sales WHERE region <> 'region_1'")
+
+        success, result = self.service.refresh_aggregate_operation(operation)
+
+        self.assertTrue(success)
+        self.assertEqual(result['mode'], 'full')
+        self.assertEqual(self._rows('etl_aggregate_sales'), [('region_1', 12, 4.0, 1, 7, 3)])
+
+    def test_failed_build_keeps_the_previous_output(self):
+        operation = self._operation('etl_aggregate_sales')
+        self.service.refresh_aggregate_operation(operation, force_full=True)
+        before = self._rows('etl_aggregate_sales')
+        with self.manager.writer() as conn:
+            conn.execute("DROP TABLE sales")
+            conn.execute("CREATE TABLE sales AS SELECT 'region_0' AS region, range AS ts FROM range(5)")
+
+        success, result = self.service.refresh_aggregate_operation(operation)
+
+        self.assertFalse(success)
+        self.assertEqual(operation.status, 'failed')
+        self.assertEqual(self._rows('etl_aggregate_sales'), before)
+        self.assertNotIn('etl_aggregate_sales__stage', self._tables())
+
+
+class AggregateRequestTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = ETLAggregateService()
+        self.source = SimpleNamespace(id=uuid.uuid4(), name='Sales', created_by_id=7, connection_info={})
+        self.operations = []
+        sources = mock.patch.object(DataSource, 'objects')
+        operations = mock.patch.object(ETLOperation, 'objects')
+        table_name = mock.patch('services.etl_aggregate_service.unified_data_access.get_integrated_table_name',
+                                return_value='ds_sales')
+        for patcher in (sources, operations, table_name):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        DataSource.objects.get.return_value = self.source
+        ETLOperation.objects.filter.return_value.values.side_effect = lambda *fields: self.operations
+
+    def _execute(self, **kwargs):
+        arguments = {'source_id': str(self.source.id), 'group_by_columns': ['region'],
+                     'aggregate_functions': {'amount': 'SUM'}, 'operation_name': 'Sales by region', 'user_id': 7}
+        arguments.update(kwargs)
+        with mock.patch.object(self.service, '_get_column_types', return_value={'region': 'VARCHAR', 'amount': 'BIGINT'}), \
+                mock.patch.object(self.service, 'refresh_aggregate_operation') as refresh:
+            refresh.return_value = (True, {'mode': 'full', 'row_count': 3, 'rows_aggregated': 10, 'watermark': None})
+            return self.service.execute_aggregate_operation(**arguments)
+
+    def test_table_of_another_source_is_rejected(self):
+        success, result = self._execute(source_table='ds_payroll')
+
+        self.assertFalse(success)
+        self.assertEqual(result['error_type'], 'invalid_request')
+        ETLOperation.objects.create.assert_not_called()
+
+    def test_outputs_derived_from_the_source_are_accepted(self):
+        self.operations = [
+            {'output_table_name': 'etl_aggregate_daily', 'source_tables': ['etl_join_orders'], 'data_lineage': {}},
+            {'output_table_name': 'etl_join_orders', 'source_tables': ['main.ds_sales', 'ds_customers'],
+             'data_lineage': {}},
+            {'output_table_name': 'etl_union_all', 'source_tables': ['ds_other'],
+             'data_lineage': {'source_data_sources': [str(self.source.id)]}},
+            {'output_table_name': 'etl_join_payroll', 'source_tables': ['ds_payroll'], 'data_lineage': None},
+        ]
+
+        self.assertEqual(self.service._get_source_tables(self.source, 'ds_sales'),
+                         {'ds_sales', 'etl_join_orders', 'etl_aggregate_daily', 'etl_union_all'})
+        ETLOperation.objects.filter.assert_called_with(created_by_id=7, status='completed')
+
+        success, result = self._execute(source_table='etl_aggregate_daily')
+        self.assertTrue(success)
+        self.assertEqual(result['source_table'], 'etl_aggregate_daily')
+
+    def test_group_by_without_aggregates_is_an_invalid_request(self):
+        success, result = self._execute(aggregate_functions={})
+
+        self.assertFalse(success)
+        self.assertEqual(result['error_type'], 'invalid_request')
+        ETLOperation.objects.create.assert_not_called()
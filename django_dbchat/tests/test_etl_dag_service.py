@@ -0,0 +1,195 @@
+"""
+Tests for re-running ETL operations in dependency order
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from datasets.models import DataSource, ETLOperation
+from services.etl_dag_service import ETLDagService
+from utils.duckdb_manager import DuckDBConnectionManager
+
+
+class JoinRefreshTests(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = DuckDBConnectionManager(db_path=os.path.join(self.temp_dir, 'integrated.duckdb'))
+        for patcher in (mock.patch('services.etl_dag_service.duckdb_manager', self.manager),
+                        mock.patch('services.etl_dag_service.data_catalog')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        with self.manager.writer() as conn:
+            conn.execute("CREATE TABLE orders AS SELECT range % 2 AS customer_id FROM range(6)")
+            conn.execute("CREATE TABLE customers AS SELECT range % 2 AS id FROM range(4)")
+        self.operation = SimpleNamespace(
+            name='orders with customers', output_table_name='etl_join_orders',
+            sql_query='CREATE TABLE etl_join_orders AS SELECT * FROM "orders" o '
+                      'INNER JOIN "customers" c ON o.customer_id = c.id',
+            parameters={'left_table': 'orders', 'right_table': 'customers',
+                        'left_column': 'customer_id', 'right_column': 'id', 'join_type': 'inner'},
+            status='completed', error_message='', save=mock.Mock(),
+        )
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _tables(self):
+        with self.manager.session() as conn:
+            return {row[0] for row in conn.execute('SELECT table_name FROM duckdb_tables()').fetchall()}
+
+    def test_join_is_replayed_within_the_limit(self):
+        success, result = ETLDagService()._refresh_join(self.operation)
+
+        self.assertTrue(success)
+        self.assertEqual(result['row_count'], 12)
+        self.assertEqual(self.operation.status, 'completed')
+
+    @override_settings(JOIN_PREFLIGHT_MAX_ROWS=10)
+    def test_exploding_join_is_refused_before_replay(self):
+        success, result = ETLDagService()._refresh_join(self.operation)
+
+        self.assertFalse(success)
+        self.assertEqual(result['error_type'], 'join_too_large')
+        self.assertEqual(result['preflight']['estimated_rows'], 12)
+        self.assertEqual(self.operation.status, 'failed')
+        self.operation.save.assert_called_once()
+        self.assertNotIn('etl_join_orders', self._tables())
+
+
+def _node(*upstream, sources=()):
+    return {'inputs': [f'ds:{source}' for source in sources] + [f'op:{operation}' for operation in upstream],
+            'upstream': list(upstream)}
+
+
+class DagExecutionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = ETLDagService()
+        self.graph = {}
+        self.outcomes = {}
+        self.order = []
+        self.lock = threading.Lock()
+        for patcher in (mock.patch.object(self.service, 'build_graph', side_effect=lambda: self.graph),
+                        mock.patch.object(self.service, '_run_node', side_effect=self._run_node)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _run_node(self, operation_id, node, force):
+        with self.lock:
+            self.order.append(operation_id)
+        outcome = self.outcomes.get(operation_id, 'refreshed')
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome, []
+
+    def test_operations_run_after_everything_they_read(self):
+        self.graph = {
+            'orders_by_day': _node('orders_joined'),
+            'orders_joined': _node('orders_clean', sources=['customers']),
+            'orders_clean': _node(sources=['orders']),
+            'orders_summary': _node('orders_clean', 'orders_by_day'),
+        }
+
+        stats = self.service.refresh()
+
+        self.assertEqual(stats['refreshed'], 4)
+        self.assertEqual(self.order, ['orders_clean', 'orders_joined', 'orders_by_day', 'orders_summary'])
+
+    def test_only_operations_downstream_of_the_refreshed_source_run(self):
+        self.graph = {
+            'orders_clean': _node(sources=['orders']),
+            'orders_joined': _node('orders_clean', sources=['customers']),
+            'payroll_clean': _node(sources=['payroll']),
+        }
+
+        stats = self.service.refresh(data_source_ids=['orders'])
+
+        self.assertEqual(stats['checked'], 2)
+        self.assertEqual(sorted(self.order), ['orders_clean', 'orders_joined'])
+
+    def test_cycles_are_blocked_instead_of_run(self):
+        self.graph = {
+            'first': _node('second', sources=['orders']),
+            'second': _node('first'),
+            'after_cycle': _node('second'),
+            'independent': _node(sources=['orders']),
+        }
+
+        stats = self.service.refresh()
+
+        self.assertEqual(self.order, ['independent'])
+        self.assertEqual(stats['blocked'], 3)
+        self.assertEqual(stats['refreshed'], 1)
+
+    def test_failure_blocks_everything_downstream(self):
+        self.graph = {
+            'extract': _node(sources=['orders']),
+            'clean': _node('extract'),
+            'summary': _node('clean'),
+            'crashing': _node(sources=['orders']),
+            'after_crash': _node('crashing'),
+            'independent': _node(sources=['orders']),
+        }
+        self.outcomes = {'extract': 'failed', 'crashing': RuntimeError('worker died')}
+
+        stats = self.service.refresh()
+
+        self.assertEqual(sorted(self.order), ['crashing', 'extract', 'independent'])
+        self.assertEqual(stats['failed'], 2)
+        self.assertEqual(stats['blocked'], 3)
+        self.assertEqual(stats['refreshed'], 1)
+
+
+class RunNodeTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = ETLDagService()
+        self.operation = SimpleNamespace(
+            pk='op-1', name='orders by day', operation_type='aggregate',
+            data_lineage={'input_versions': {'ds:orders': 3, 'op:orders_clean': 2}, 'output_version': 5},
+            refresh_from_db=mock.Mock(),
+        )
+        self.refresher = mock.Mock(return_value=(True, {}))
+        for patcher in (mock.patch.object(ETLOperation, 'objects'),
+                        mock.patch.object(DataSource, 'objects'),
+                        mock.patch('services.etl_dag_service.connection'),
+                        mock.patch('services.etl_dag_service.duckdb_manager'),
+                        mock.patch.object(self.service, '_get_refresher', return_value=self.refresher)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        ETLOperation.objects.get.return_value = self.operation
+        DataSource.objects.filter.return_value = []
+
+    def _run(self, versions, force=False):
+        with mock.patch.object(self.service, '_input_versions', return_value=versions):
+            return self.service._run_node('op-1', _node('orders_clean', sources=['orders']), force)
+
+    def test_unchanged_inputs_are_skipped(self):
+        outcome = self._run({'ds:orders': 3, 'op:orders_clean': 2})
+
+        self.assertEqual(outcome, ('skipped', []))
+        self.refresher.assert_not_called()
+
+    def test_changed_input_reruns_and_bumps_the_output_version(self):
+        outcome = self._run({'ds:orders': 4, 'op:orders_clean': 2})
+
+        self.assertEqual(outcome, ('refreshed', []))
+        self.refresher.assert_called_once_with(self.operation)
+        lineage = ETLOperation.objects.filter.return_value.update.call_args.kwargs['data_lineage']
+        self.assertEqual(lineage['input_versions'], {'ds:orders': 4, 'op:orders_clean': 2})
+        self.assertEqual(lineage['output_version'], 6)
+
+    def test_force_reruns_unchanged_inputs(self):
+        outcome = self._run({'ds:orders': 3, 'op:orders_clean': 2}, force=True)
+
+        self.assertEqual(outcome, ('refreshed', []))
+        self.refresher.assert_called_once()
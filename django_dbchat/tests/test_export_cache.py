@@ -0,0 +1,95 @@
+"""
+Tests for the rendered dashboard export cache
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from utils.export_cache import ExportCache
+
+KEYS = ['a' * 64, 'b' * 64, 'c' * 64]
+
+
+def _dashboard(*items):
+    rows = [dict(id=index, title='Sales', item_type='chart', chart_type='bar', chart_config={}, query='',
+                 sql_query='SELECT 1', query_params={}, position_x=0, position_y=0, width=4, height=3,
+                 **item) for index, item in enumerate(items)]
+    queryset = mock.Mock()
+    queryset.order_by.return_value.values.return_value = rows
+    return SimpleNamespace(id=1, name='Sales', description='', layout_config={}, filters={}, items=queryset)
+
+
+class ExportCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with override_settings(EXPORT_CACHE_PATH=self.temp_dir):
+            self.cache = ExportCache()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_key_follows_item_data(self):
+        key = self.cache.dashboard_key(_dashboard({'result_ref': 'r1', 'data_version': 1}), 'email.html')
+
+        self.assertEqual(key, self.cache.dashboard_key(_dashboard({'result_ref': 'r1', 'data_version': 1}), 'email.html'))
+        self.assertNotEqual(key, self.cache.dashboard_key(_dashboard({'result_ref': 'r1', 'data_version': 2}), 'email.html'))
+        self.assertNotEqual(key, self.cache.dashboard_key(_dashboard({'result_ref': 'r1', 'data_version': 1}), 'puppeteer.pdf'))
+
+    def test_items_without_stored_results_are_not_cacheable(self):
+        self.assertIsNone(self.cache.dashboard_key(_dashboard({'result_ref': '', 'data_version': 1}), 'email.html'))
+
+    def test_render_happens_once_per_key(self):
+        render = mock.Mock(return_value=b'%PDF')
+
+        self.assertEqual(self.cache.get_or_render(KEYS[0], render), b'%PDF')
+        self.assertEqual(self.cache.get_or_render(KEYS[0], render), b'%PDF')
+
+        render.assert_called_once()
+
+    def test_uncacheable_and_empty_renders_are_not_stored(self):
+        self.assertEqual(self.cache.get_or_render(None, lambda: b'%PDF'), b'%PDF')
+        self.assertEqual(self.cache.get_or_render(KEYS[0], lambda: b''), b'')
+
+        self.assertIsNone(self.cache.get(KEYS[0]))
+        self.assertEqual([name for name in os.listdir(self.temp_dir) if name.endswith('.bin')], [])
+
+    def test_concurrent_requests_share_one_render(self):
+        calls = []
+
+        def render():
+            calls.append(1)
+            time.sleep(0.1)
+            return b'%PDF'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get_or_render(KEYS[0], render)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [b'%PDF'] * 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_least_recently_used_export_is_evicted(self):
+        self.cache.max_bytes = 25
+        now = time.time()
+        for age, key in zip((30, 20), KEYS):
+            self.cache.set(key, b'x' * 10)
+            os.utime(self.cache._file_path(key), (now - age, now - age))
+        self.cache.get(KEYS[0])
+
+        self.cache.set(KEYS[2], b'x' * 10)
+
+        self.assertIsNotNone(self.cache.get(KEYS[0]))
+        self.assertIsNone(self.cache.get(KEYS[1]))
+        self.assertIsNotNone(self.cache.get(KEYS[2]))
@@ -0,0 +1,69 @@
+"""
+Tests for join pre-flight estimation
+"""
+
+import duckdb
+from django.test import SimpleTestCase, override_settings
+
+from utils.join_estimator import JoinEstimator, preflight_join
+
+
+class JoinEstimatorTests(SimpleTestCase):
+
+    def setUp(self):
+        self.conn = duckdb.connect(':memory:')
+        self.addCleanup(self.conn.close)
+        # Duplicated and NULL keys on both sides, plus unmatched keys
+        self.conn.execute(
+            "CREATE TABLE orders AS SELECT * FROM (VALUES (1), (1), (2), (3), (NULL), (NULL), (9)) t(customer_id)"
+        )
+        self.conn.execute(
+            "CREATE TABLE customers AS SELECT * FROM (VALUES (1), (2), (2), (4), (NULL)) t(id)"
+        )
+
+    def _actual(self, join_type):
+        return self.conn.execute(
+            f'SELECT COUNT(*) FROM "orders" {join_type} "customers" ON "orders".customer_id = "customers".id'
+        ).fetchone()[0]
+
+    def test_estimates_match_actual_join_sizes(self):
+        for join_type in ('inner', 'left', 'right', 'outer'):
+            estimate = JoinEstimator.estimate(self.conn, '"orders"', '"customers"', 'customer_id', 'id', join_type)
+            self.assertEqual(estimate.estimated_rows, self._actual(estimate.join_type), join_type)
+
+    def test_key_statistics(self):
+        estimate = JoinEstimator.estimate(self.conn, 'orders', 'customers', 'customer_id', 'id', 'inner')
+
+        left = estimate.left
+        self.assertEqual((left.row_count, left.null_keys, left.distinct_keys, left.max_key_rows, left.matched_rows),
+                         (7, 2, 4, 2, 3))
+        self.assertEqual(estimate.relationship, 'many_to_many')
+        self.assertTrue(estimate.allowed)
+        self.assertTrue(estimate.warnings)
+        self.assertEqual(estimate.to_dict()['left']['duplicate_factor'], 1.25)
+
+    def test_unique_keys_are_one_to_many(self):
+        self.conn.execute("DELETE FROM customers WHERE id = 2")
+
+        estimate = JoinEstimator.estimate(self.conn, 'customers', 'orders', 'id', 'customer_id', 'left')
+
+        self.assertEqual(estimate.relationship, 'one_to_many')
+        self.assertEqual(estimate.estimated_rows, self.conn.execute(
+            "SELECT COUNT(*) FROM customers LEFT JOIN orders ON customers.id = orders.customer_id").fetchone()[0])
+
+    def test_disjoint_keys_estimate_no_matches(self):
+        self.conn.execute("CREATE TABLE others AS SELECT range + 100 AS id FROM range(5)")
+
+        estimate = JoinEstimator.estimate(self.conn, 'orders', 'others', 'customer_id', 'id', 'inner')
+
+        self.assertEqual(estimate.estimated_rows, 0)
+
+    @override_settings(JOIN_PREFLIGHT_MAX_ROWS=3)
+    def test_joins_above_the_limit_are_refused(self):
+        estimate = JoinEstimator.estimate(self.conn, 'orders', 'customers', 'customer_id', 'id', 'inner')
+
+        self.assertFalse(estimate.allowed)
+        self.assertTrue(estimate.recommendations)
+
+    def test_preflight_failure_lets_the_join_run(self):
+        self.assertIsNone(preflight_join(self.conn, 'orders', 'missing', 'customer_id', 'id', 'inner'))
@@ -0,0 +1,97 @@
+"""
+Tests for the versioned, size-bounded query result cache
+"""
+
+from unittest import mock
+
+import pandas as pd
+from django.core.cache import cache
+from django.db import models
+from django.test import SimpleTestCase
+
+from datasets.models import DataSource
+from utils.result_cache import QueryResultCache, normalize_sql
+
+
+def _frame(value):
+    return pd.DataFrame({'region': [f'r{value}'] * 50, 'sales': range(50)})
+
+
+class NormalizeSQLTests(SimpleTestCase):
+
+    def test_spelling_differences_share_a_key(self):
+        self.assertEqual(
+            normalize_sql('SELECT  *\n FROM "Sales" -- latest\nWHERE region = \'East\';'),
+            'select * from "Sales" where region = \'East\'',
+        )
+
+    def test_literals_keep_their_case(self):
+        self.assertNotEqual(normalize_sql("SELECT 'East'"), normalize_sql("SELECT 'EAST'"))
+
+
+class QueryResultCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.cache = QueryResultCache()
+        self.entry_size = len(self.cache._serialize(_frame(0)))
+        # Room for two entries
+        self.cache.max_bytes = self.entry_size * 2 + self.entry_size // 2
+
+    def test_round_trip(self):
+        key = self.cache.build_key('SELECT 1', 'ds', 1)
+
+        self.assertTrue(self.cache.set(key, _frame(1)))
+
+        pd.testing.assert_frame_equal(self.cache.get(key), _frame(1))
+
+    def test_data_version_changes_the_key(self):
+        self.assertNotEqual(self.cache.build_key('SELECT 1', 'ds', 1), self.cache.build_key('SELECT 1', 'ds', 2))
+        self.assertEqual(self.cache.build_key('select 1;', 'ds', 1), self.cache.build_key('SELECT 1', 'ds', 1))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        first, second, third = (self.cache.build_key(f'SELECT {n}', 'ds', 1) for n in range(3))
+        self.cache.set(first, _frame(1))
+        self.cache.set(second, _frame(2))
+        self.assertIsNotNone(self.cache.get(first))
+
+        self.cache.set(third, _frame(3))
+
+        self.assertIsNotNone(self.cache.get(first))
+        self.assertIsNone(self.cache.get(second))
+        self.assertIsNotNone(self.cache.get(third))
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['entries'], 2)
+        self.assertLessEqual(stats['total_bytes'], self.cache.max_bytes)
+
+    def test_oversized_results_are_not_cached(self):
+        self.cache.max_entry_bytes = self.entry_size - 1
+        key = self.cache.build_key('SELECT 1', 'ds', 1)
+
+        self.assertFalse(self.cache.set(key, _frame(1)))
+        self.assertIsNone(self.cache.get(key))
+
+
+class DataVersionSaveTests(SimpleTestCase):
+
+    def _saved_fields(self, data_source, **kwargs):
+        with mock.patch.object(models.Model, 'save') as save:
+            data_source.save(**kwargs)
+        return save.call_args.kwargs.get('update_fields')
+
+    def test_full_save_never_writes_the_data_version(self):
+        data_source = DataSource(pk='6f1c2a1e-8a6b-4a57-9d44-1b2f6c1e0d2a', name='sales', data_version=3)
+        data_source._state.adding = False
+
+        fields = self._saved_fields(data_source)
+
+        self.assertNotIn('data_version', fields)
+        self.assertIn('status', fields)
+
+    def test_new_rows_and_explicit_fields_are_untouched(self):
+        self.assertIsNone(self._saved_fields(DataSource(name='sales')))
+
+        data_source = DataSource(pk='6f1c2a1e-8a6b-4a57-9d44-1b2f6c1e0d2a', name='sales')
+        data_source._state.adding = False
+        self.assertEqual(self._saved_fields(data_source, update_fields=['data_version']), ['data_version'])
@@ -0,0 +1,115 @@
+"""
+Tests for the Parquet result store and the query log results built on it
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core.views import _with_stored_results
+from utils.result_store import ResultStore
+
+ROWS = [{'region': 'East', 'sales': 10}, {'region': 'West', 'sales': 20}, {'region': 'North', 'sales': 30}]
+
+
+class ResultStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with override_settings(RESULT_STORE_PATH=self.temp_dir, RESULT_STORE_PREVIEW_ROWS=2):
+            self.store = ResultStore()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _age(self, file_name, seconds=7200):
+        path = os.path.join(self.temp_dir, file_name)
+        stamp = time.time() - seconds
+        os.utime(path, (stamp, stamp))
+
+    def test_put_and_read_pages(self):
+        stored = self.store.put(ROWS)
+
+        self.assertEqual(stored['row_count'], 3)
+        self.assertEqual(stored['preview'], ROWS[:2])
+        self.assertEqual(self.store.read(stored['ref']), ROWS)
+        self.assertEqual(self.store.read(stored['ref'], ['sales', 'missing'], offset=1, limit=1), [{'sales': 20}])
+
+    def test_failed_write_leaves_no_result(self):
+        def partial_write(table, path, **kwargs):
+            with open(path, 'wb') as f:
+                f.write(b'PAR1')
+            raise OSError('disk full')
+
+        with mock.patch('utils.result_store.pq.write_table', side_effect=partial_write):
+            with self.assertRaises(OSError):
+                self.store.put(ROWS)
+
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_write_is_published_by_rename(self):
+        stored = self.store.put(ROWS)
+
+        self.assertEqual(os.listdir(self.temp_dir), [f"{stored['ref']}.parquet"])
+
+    def test_purge_removes_only_old_unreferenced_results(self):
+        kept = self.store.put(ROWS)['ref']
+        orphan = self.store.put(ROWS)['ref']
+        recent = self.store.put(ROWS)['ref']
+        self._age(f'{kept}.parquet')
+        self._age(f'{orphan}.parquet')
+
+        self.assertEqual(self.store.purge_unreferenced([kept]), 1)
+
+        self.assertTrue(self.store.exists(kept))
+        self.assertFalse(self.store.exists(orphan))
+        self.assertTrue(self.store.exists(recent))
+
+    def test_purge_removes_abandoned_partial_writes(self):
+        ref = self.store.put(ROWS)['ref']
+        partial = f'{ref}.parquet.tmp'
+        shutil.copy(os.path.join(self.temp_dir, f'{ref}.parquet'), os.path.join(self.temp_dir, partial))
+        self._age(partial)
+
+        self.assertEqual(self.store.purge_unreferenced([ref]), 1)
+
+        self.assertEqual(os.listdir(self.temp_dir), [f'{ref}.parquet'])
+
+    def test_invalid_reference_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.store.read('../secrets')
+        self.store.delete('../secrets')
+
+
+class QueryLogResultsTests(SimpleTestCase):
+
+    def test_log_without_stored_result_pages_its_preview(self):
+        query_log = SimpleNamespace(id=1, result_ref='', result_row_count=3)
+
+        results = _with_stored_results(query_log, {'preview': ROWS[:2], 'row_count': 3}, ['region'], 1, 10)
+
+        self.assertEqual(results['data'], [{'region': 'West'}])
+        self.assertTrue(results['truncated'])
+        self.assertNotIn('preview', results)
+
+    def test_complete_preview_is_not_truncated(self):
+        query_log = SimpleNamespace(id=1, result_ref='', result_row_count=0)
+
+        results = _with_stored_results(query_log, {'preview': ROWS, 'row_count': 3})
+
+        self.assertEqual(results['data'], ROWS)
+        self.assertFalse(results['truncated'])
+
+    def test_missing_stored_result_falls_back_to_preview(self):
+        query_log = SimpleNamespace(id=1, result_ref='0' * 32, result_row_count=3)
+
+        with mock.patch('utils.result_store.result_store.read', side_effect=FileNotFoundError):
+            results = _with_stored_results(query_log, {'preview': ROWS[:2]})
+
+        self.assertEqual(results['data'], ROWS[:2])
+        self.assertTrue(results['truncated'])
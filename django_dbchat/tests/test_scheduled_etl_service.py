@@ -0,0 +1,70 @@
+"""
+Tests for parallel table extraction in scheduled ETL
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from services.scheduled_etl_service import ScheduledETLService
+from services.streaming_extract_service import streaming_extract_service
+from utils.duckdb_manager import DuckDBConnectionManager
+
+
+class ParallelExtractTests(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = DuckDBConnectionManager(db_path=os.path.join(self.temp_dir, 'integrated.duckdb'))
+        for patcher in (mock.patch('services.streaming_extract_service.duckdb_manager', self.manager),
+                        mock.patch('services.scheduled_etl_service.duckdb_manager', self.manager),
+                        mock.patch('services.streaming_extract_service.data_catalog')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # Only the extract helpers are exercised; skip building the data and integration services
+        self.service = ScheduledETLService.__new__(ScheduledETLService)
+        self.service._connect_source_database = mock.Mock(side_effect=self._source)
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _source(self, source_type, connection_info):
+        conn = sqlite3.connect(':memory:', check_same_thread=False)
+        for table in ('orders', 'customers'):
+            conn.execute(f'CREATE TABLE {table} (id INTEGER)')
+            conn.executemany(f'INSERT INTO {table} VALUES (?)', [(n,) for n in range(3)])
+        return conn
+
+    def _fetch(self, sql):
+        with self.manager.session() as conn:
+            return conn.execute(sql).fetchall()
+
+    def test_tables_are_fetched_concurrently_without_a_lease(self):
+        both_fetching = threading.Barrier(2, timeout=5)
+        connected = []
+        read_batches = streaming_extract_service.iter_record_batches
+
+        def fetch(*args, **kwargs):
+            # Checked before the barrier: once past it, a fetch may already be staging its first batch
+            connected.append(self.manager.get_stats()['connected'])
+            both_fetching.wait()
+            yield from read_batches(*args, **kwargs)
+
+        data_source = SimpleNamespace(name='shop')
+        with mock.patch.object(streaming_extract_service, 'iter_record_batches', side_effect=fetch):
+            extracts = self.service._extract_tables_parallel(
+                data_source, 'sqlite', {}, ['orders', 'customers'], 'full', max_workers=2
+            )
+
+        self.assertEqual({table: extract['rows'] for table, extract in extracts.items()}, {'orders': 3, 'customers': 3})
+        self.assertEqual(connected, [False, False])
+        self.assertEqual(self._fetch('SELECT COUNT(*) FROM shop_orders'), [(3,)])
+        self.assertEqual(self.manager.get_stats()['active_leases'], 0)
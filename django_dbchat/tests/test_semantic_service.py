@@ -0,0 +1,132 @@
+"""
+Tests for the bulk writes of generated semantic columns and metrics
+"""
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from datasets.models import SemanticColumn, SemanticMetric, SemanticTable
+from services.semantic_service import SemanticService
+
+
+class BulkSaveTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.service = SemanticService.__new__(SemanticService)
+        self.table = SemanticTable(id=1, name='sales', display_name='Sales')
+        for patcher in (mock.patch.object(SemanticColumn, 'objects'),
+                        mock.patch.object(SemanticMetric, 'objects'),
+                        mock.patch.object(SemanticMetric.dependent_columns.through, 'objects'),
+                        mock.patch('services.semantic_service.transaction')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _column(self, name, pk=None, **fields):
+        fields.setdefault('data_type', 'string')
+        return SemanticColumn(id=pk, semantic_table=self.table, name=name, display_name=name.title(), **fields)
+
+
+class SaveSemanticColumnsTests(BulkSaveTestCase):
+
+    def test_regeneration_updates_existing_rows_and_inserts_new_ones(self):
+        stored = self._column('region', pk=10, description='old description')
+        SemanticColumn.objects.filter.return_value = [stored]
+
+        written = self.service._save_semantic_columns(self.table, [
+            self._column('region', description='Sales region', aggregation_default='COUNT'),
+            self._column('amount', data_type='float', aggregation_default='SUM'),
+        ])
+
+        self.assertEqual(written, 2)
+        created = SemanticColumn.objects.bulk_create.call_args.args[0]
+        self.assertEqual([column.name for column in created], ['amount'])
+        updated, fields = SemanticColumn.objects.bulk_update.call_args.args
+        self.assertEqual(updated, [stored])
+        self.assertEqual(stored.pk, 10)
+        self.assertEqual(stored.description, 'Sales region')
+        self.assertEqual(stored.aggregation_default, 'COUNT')
+        self.assertEqual(fields, SemanticService.SEMANTIC_COLUMN_UPDATE_FIELDS)
+
+    def test_rows_inserted_concurrently_do_not_fail_the_batch(self):
+        SemanticColumn.objects.filter.return_value = []
+
+        written = self.service._save_semantic_columns(self.table, [self._column('region'), self._column('amount')])
+
+        self.assertEqual(written, 2)
+        self.assertTrue(SemanticColumn.objects.bulk_create.call_args.kwargs['ignore_conflicts'])
+        SemanticColumn.objects.bulk_update.assert_not_called()
+
+    def test_not_null_aggregation_default_is_retried_without_it(self):
+        SemanticColumn.objects.filter.return_value = []
+        SemanticColumn.objects.bulk_create.side_effect = [
+            Exception('NOT NULL constraint failed: semantic_columns.aggregation_default'), None
+        ]
+        column = self._column('amount', aggregation_default='SUM')
+
+        written = self.service._save_semantic_columns(self.table, [column])
+
+        self.assertEqual(written, 1)
+        self.assertEqual(SemanticColumn.objects.bulk_create.call_count, 2)
+        self.assertIsNone(column.aggregation_default)
+
+    def test_nothing_to_save(self):
+        self.assertEqual(self.service._save_semantic_columns(self.table, []), 0)
+        SemanticColumn.objects.filter.assert_not_called()
+
+
+class SaveMetricsTests(BulkSaveTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.stored_names = []
+        self.assigned_ids = {}
+        SemanticMetric.objects.filter.return_value.values_list.side_effect = self._values_list
+
+    def _values_list(self, *fields, flat=False):
+        return self.stored_names if flat else list(self.assigned_ids.items())
+
+    def _metric(self, name):
+        return SemanticMetric(name=name, display_name=name, metric_type='simple', calculation='COUNT(*)',
+                              base_table=self.table, created_by_id=1)
+
+    def test_existing_and_repeated_names_are_skipped(self):
+        self.stored_names = ['sales_record_count']
+        amount = self._column('amount', pk=20)
+        planned = [
+            (self._metric('sales_record_count'), []),
+            (self._metric('sales_total_amount'), [amount]),
+            (self._metric('sales_total_amount'), [amount]),
+            (self._metric('sales_average_amount'), [amount]),
+        ]
+
+        def assign_ids(metrics, **kwargs):
+            for pk, metric in enumerate(metrics, start=100):
+                metric.pk = pk
+
+        SemanticMetric.objects.bulk_create.side_effect = assign_ids
+
+        written = self.service._save_metrics(planned)
+
+        self.assertEqual(written, 2)
+        created = SemanticMetric.objects.bulk_create.call_args.args[0]
+        self.assertEqual([metric.name for metric in created], ['sales_total_amount', 'sales_average_amount'])
+        links = SemanticMetric.dependent_columns.through.objects.bulk_create.call_args.args[0]
+        self.assertEqual([(link.semanticmetric_id, link.semanticcolumn_id) for link in links], [(100, 20), (101, 20)])
+
+    def test_primary_keys_are_looked_up_when_not_returned(self):
+        self.assigned_ids = {'sales_total_amount': 7}
+
+        written = self.service._save_metrics([(self._metric('sales_total_amount'), [self._column('amount', pk=20)])])
+
+        self.assertEqual(written, 1)
+        links = SemanticMetric.dependent_columns.through.objects.bulk_create.call_args.args[0]
+        self.assertEqual([(link.semanticmetric_id, link.semanticcolumn_id) for link in links], [(7, 20)])
+
+    def test_regeneration_with_every_metric_present_writes_nothing(self):
+        self.stored_names = ['sales_record_count']
+
+        written = self.service._save_metrics([(self._metric('sales_record_count'), [])])
+
+        self.assertEqual(written, 0)
+        SemanticMetric.objects.bulk_create.assert_not_called()
@@ -0,0 +1,43 @@
+"""
+Tests for the LLM SQL generation cache
+"""
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from utils.sql_generation_cache import SQLGenerationCache
+
+MAX_SQL = 'SELECT region, MAX(sales) FROM "ds_sales" GROUP BY region'
+EAST_SQL = 'SELECT SUM(sales) FROM "ds_sales" WHERE region = \'East\''
+MONTH_SQL = 'SELECT month, SUM(sales) FROM "ds_sales" GROUP BY month'
+
+
+class SimilarQuestionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = SQLGenerationCache()
+        pairs = [
+            ('max sales by region', MAX_SQL),
+            ('total sales in east region', EAST_SQL),
+            ('total sales by month', MONTH_SQL),
+        ]
+        patcher = mock.patch.object(self.cache, '_load_pairs', return_value=pairs)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rewording_reuses_sql(self):
+        self.assertEqual(self.cache.find_similar('Show me the max sales by region', 'ds_sales'), MAX_SQL)
+        self.assertEqual(self.cache.find_similar('What is the total sales by month?', 'ds_sales'), MONTH_SQL)
+
+    def test_near_misses_never_qualify(self):
+        # No threshold makes a question with a differing word reuse SQL
+        self.cache.similarity_threshold = 0.0
+        for question in ('min sales by region', 'total sales in west region', 'total sales by month excluding returns'):
+            self.assertIsNone(self.cache.find_similar(question, 'ds_sales'), question)
+
+    def test_missing_condition_is_not_reused(self):
+        self.assertIsNone(self.cache.find_similar('sales by month', 'ds_sales'))
+
+    def test_different_literal_is_not_reused(self):
+        self.assertIsNone(self.cache.find_similar('top 5 max sales by region', 'ds_sales'))
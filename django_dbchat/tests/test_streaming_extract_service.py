@@ -0,0 +1,107 @@
+"""
+Tests for streaming database extracts into DuckDB
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+import pyarrow as pa
+from django.test import SimpleTestCase
+
+from services.streaming_extract_service import StreamingExtractService
+from utils.duckdb_manager import DuckDBConnectionManager
+
+
+class ExtractToDuckDBTests(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = DuckDBConnectionManager(db_path=os.path.join(self.temp_dir, 'integrated.duckdb'))
+        for patcher in (mock.patch('services.streaming_extract_service.duckdb_manager', self.manager),
+                        mock.patch('services.streaming_extract_service.data_catalog')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.source = sqlite3.connect(':memory:')
+        self.source.execute('CREATE TABLE orders (id INTEGER, amount)')
+        self.source.executemany('INSERT INTO orders VALUES (?, ?)', [(n, n * 10) for n in range(1, 6)])
+        self.service = StreamingExtractService()
+        self.service.batch_size = 2
+
+    def tearDown(self):
+        self.source.close()
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _extract(self, query='SELECT * FROM orders', **kwargs):
+        return self.service.extract_to_duckdb(self.source, query, 'sqlite', 'ds_orders', **kwargs)
+
+    def _fetch(self, sql):
+        with self.manager.session() as conn:
+            return conn.execute(sql).fetchall()
+
+    def _tables(self):
+        return sorted(row[0] for row in self._fetch('SELECT table_name FROM duckdb_tables()'))
+
+    def test_full_extract_streams_in_batches(self):
+        result = self._extract(watermark_column='id')
+
+        self.assertEqual((result['rows'], result['batches'], result['mode'], result['watermark']), (5, 3, 'full', 5))
+        self.assertEqual(self._fetch('SELECT SUM(amount) FROM ds_orders'), [(150,)])
+        self.assertEqual(self._tables(), ['ds_orders'])
+
+    def test_source_is_read_without_holding_the_database(self):
+        read_batches = self.service.iter_record_batches
+        connected = []
+
+        def watched_batches(*args, **kwargs):
+            for batch in read_batches(*args, **kwargs):
+                connected.append(self.manager.get_stats()['connected'])
+                yield batch
+
+        with mock.patch.object(self.service, 'iter_record_batches', side_effect=watched_batches):
+            self._extract()
+
+        self.assertEqual(connected, [False, False, False])
+        self.assertEqual(self._fetch('SELECT COUNT(*) FROM ds_orders'), [(5,)])
+
+    def test_max_rows_limits_the_extract(self):
+        self.assertEqual(self._extract(max_rows=3)['rows'], 3)
+        self.assertEqual(self._fetch('SELECT COUNT(*) FROM ds_orders'), [(3,)])
+
+    def test_failed_extract_keeps_the_previous_table(self):
+        self._extract()
+
+        def failing_batches(*args, **kwargs):
+            yield pa.RecordBatch.from_pydict({'id': [9], 'amount': [90]})
+            raise ConnectionError('source went away')
+
+        with mock.patch.object(self.service, 'iter_record_batches', side_effect=failing_batches):
+            with self.assertRaises(ConnectionError):
+                self._extract()
+
+        self.assertEqual(self._fetch('SELECT COUNT(*) FROM ds_orders'), [(5,)])
+        self.assertEqual(self._tables(), ['ds_orders'])
+
+    def test_incremental_extract_appends_and_widens_types(self):
+        self._extract()
+        self.source.execute('INSERT INTO orders VALUES (6, 2.5)')
+
+        result = self._extract('SELECT * FROM orders WHERE id > 5', mode='incremental')
+
+        self.assertEqual((result['rows'], result['mode']), (1, 'incremental'))
+        self.assertEqual(self._fetch('SELECT COUNT(*), SUM(amount) FROM ds_orders'), [(6, 152.5)])
+        self.assertEqual(self._fetch("SELECT data_type FROM information_schema.columns "
+                                     "WHERE table_name = 'ds_orders' AND column_name = 'amount'"), [('DOUBLE',)])
+
+    def test_incremental_extract_into_a_new_table_is_full(self):
+        self.assertEqual(self._extract(mode='incremental')['mode'], 'full')
+
+    def test_empty_result_leaves_no_table(self):
+        result = self._extract('SELECT * FROM orders WHERE id > 100')
+
+        self.assertEqual(result['rows'], 0)
+        self.assertEqual(self._tables(), [])
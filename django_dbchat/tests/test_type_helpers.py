@@ -0,0 +1,61 @@
+"""
+Tests for the vectorised type-inference helpers
+"""
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from utils.type_helpers import convert_column, infer_and_convert_types, infer_column_type
+
+
+class ConvertColumnTests(SimpleTestCase):
+
+    def test_large_integers_round_trip_exactly(self):
+        series = pd.Series(['9007199254740993', '1', None, '-9007199254740995'])
+
+        converted, applied_type, _ = convert_column(series, 'integer')
+
+        self.assertEqual(applied_type, 'integer')
+        self.assertEqual(str(converted.dtype), 'Int64')
+        self.assertEqual(converted.tolist(), [9007199254740993, 1, pd.NA, -9007199254740995])
+
+    def test_large_integer_ids_survive_frame_conversion(self):
+        df = pd.DataFrame({'id': ['1420070400000000001', '1420070400000000002', '1420070400000000003']})
+
+        converted, conversions = infer_and_convert_types(df)
+
+        self.assertEqual(conversions['id']['type'], 'integer')
+        self.assertEqual(converted['id'].tolist(), [1420070400000000001, 1420070400000000002, 1420070400000000003])
+
+    def test_integers_with_thousands_separators(self):
+        converted, applied_type, _ = convert_column(pd.Series(['1,000', '2,500', '$3']), 'integer')
+
+        self.assertEqual(applied_type, 'integer')
+        self.assertEqual(converted.tolist(), [1000, 2500, 3])
+
+    def test_fractional_values_stay_float(self):
+        converted, applied_type, _ = convert_column(pd.Series(['1', '2', '3.5']), 'integer')
+
+        self.assertEqual(applied_type, 'float')
+        self.assertEqual(converted.tolist(), [1.0, 2.0, 3.5])
+
+    def test_values_beyond_bigint_stay_float(self):
+        converted, applied_type, _ = convert_column(pd.Series(['1', '99999999999999999999']), 'integer')
+
+        self.assertEqual(applied_type, 'float')
+
+
+class InferColumnTypeTests(SimpleTestCase):
+
+    def test_timestamps_with_fractional_seconds_are_datetimes(self):
+        self.assertEqual(infer_column_type(pd.Series(['2023-01-15 10:30:00.123', '2023-01-16 08:00:00.5'])), 'datetime')
+        self.assertEqual(infer_column_type(pd.Series(['2023-01-15T10:30:00.123456', '2023-01-16T08:00:00.5'])), 'datetime')
+
+    def test_fractional_seconds_keep_their_value(self):
+        converted, applied_type, date_format = convert_column(
+            pd.Series(['2023-01-15 10:30:00.123', '2023-01-16 08:00:00.5']), 'datetime'
+        )
+
+        self.assertEqual(applied_type, 'datetime')
+        self.assertEqual(date_format, '%Y-%m-%d %H:%M:%S.%f')
+        self.assertEqual(converted.tolist(), [pd.Timestamp('2023-01-15 10:30:00.123'), pd.Timestamp('2023-01-16 08:00:00.5')])
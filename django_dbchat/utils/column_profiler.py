@@ -0,0 +1,207 @@
+"""
+Column Profiler for ConvaBI Application
+Profiles integrated DuckDB tables with batched aggregate queries instead of loading them into pandas
+"""
+
+import re
+import logging
+from typing import Dict, Any, List
+
+from django.conf import settings
+
+from utils.duckdb_manager import duckdb_manager
+
+logger = logging.getLogger(__name__)
+
+_INTEGER_TYPES = {
+    'TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT',
+    'UTINYINT', 'USMALLINT', 'UINTEGER', 'UBIGINT', 'UHUGEINT',
+}
+_FLOAT_TYPES = {'FLOAT', 'REAL', 'DOUBLE'}
+_TEXT_TYPES = {'VARCHAR', 'TEXT', 'STRING', 'CHAR', 'BPCHAR'}
+# Types MIN/MAX and histograms are meaningless or unsupported for
+_UNORDERED_PATTERN = re.compile(r'^(BLOB|BIT|UNION|MAP|STRUCT)|\[\]$')
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def standard_type_for_duckdb(duckdb_type: str) -> str:
+    """Map a DuckDB column type to the standard semantic-layer data type"""
+    duckdb_type = str(duckdb_type).upper()
+    if duckdb_type in _INTEGER_TYPES:
+        return 'integer'
+    if duckdb_type in _FLOAT_TYPES or duckdb_type.startswith('DECIMAL') or duckdb_type.startswith('NUMERIC'):
+        return 'float'
+    if duckdb_type == 'BOOLEAN':
+        return 'boolean'
+    if duckdb_type == 'DATE':
+        return 'date'
+    if duckdb_type.startswith('TIMESTAMP') or duckdb_type == 'DATETIME':
+        return 'datetime'
+    return 'string'
+
+
+class ColumnProfiler:
+    """
+    Profiles every column of an integrated table inside DuckDB.
+
+    One aggregate query over the whole table computes null counts,
+    approximate distinct counts and min/max for every column. A second query
+    builds value histograms for the low-cardinality columns only, from which
+    top-k values are taken. The histogram of the types text values parse as
+    (numeric, date, boolean, text) needs per-value casts, so it is computed
+    over a reservoir sample of ``SEMANTIC_PROFILE_SAMPLE_ROWS`` rows.
+    """
+
+    def __init__(self):
+        self.sample_rows = getattr(settings, 'SEMANTIC_PROFILE_SAMPLE_ROWS', 100000)
+        self.top_k_max_distinct = getattr(settings, 'SEMANTIC_PROFILE_TOP_K_MAX_DISTINCT', 1000)
+
+    def profile_table(self, table_name: str, top_k: int = 5, sample_values: int = 5) -> Dict[str, Any]:
+        """
+        Profile all columns of a table
+
+        Returns:
+            Dictionary with table_name, row_count, type_sample_rows and
+            columns (ordered dict of column name -> column profile)
+        """
+        with duckdb_manager.session() as conn:
+            table = _quote_identifier(table_name)
+            schema = conn.execute(f"DESCRIBE {table}").fetchall()
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+            profile = {
+                'table_name': table_name,
+                'row_count': int(row_count),
+                'columns': {},
+            }
+            if not schema:
+                return profile
+
+            columns = [{'name': str(row[0]), 'type': str(row[1])} for row in schema]
+            self._profile_aggregates(conn, table, columns)
+            self._profile_top_values(conn, table, columns, top_k)
+            profile['type_sample_rows'] = self._profile_text_types(conn, table, columns, row_count)
+            self._collect_sample_values(conn, table, columns, sample_values)
+
+        for column in columns:
+            profile['columns'][column['name']] = column
+
+        logger.info(
+            f"[PROFILE] Profiled {len(columns)} columns of {table_name} "
+            f"({row_count} rows, text types from {profile['type_sample_rows']} sampled rows)"
+        )
+        return profile
+
+    def _profile_aggregates(self, conn, source: str, columns: List[Dict[str, Any]]):
+        """Null/distinct/min/max statistics for every column in one query"""
+        expressions = ['COUNT(*)']
+        layout = []
+        for column in columns:
+            name = _quote_identifier(column['name'])
+            fields = ['non_null_count', 'distinct_count']
+            expressions.extend([f"COUNT({name})", f"approx_count_distinct({name})"])
+
+            if not _UNORDERED_PATTERN.search(column['type'].upper()):
+                fields.extend(['min', 'max'])
+                expressions.extend([f"MIN({name})", f"MAX({name})"])
+            layout.append(fields)
+
+        row = conn.execute(f"SELECT {', '.join(expressions)} FROM {source}").fetchone()
+        total_rows = int(row[0])
+        position = 1
+
+        for column, fields in zip(columns, layout):
+            values = dict(zip(fields, row[position:position + len(fields)]))
+            position += len(fields)
+
+            non_null = int(values['non_null_count'])
+            column['data_type'] = standard_type_for_duckdb(column['type'])
+            column['null_count'] = total_rows - non_null
+            column['non_null_count'] = non_null
+            # HyperLogLog estimates can overshoot; a column never has more distinct values than non-null ones
+            column['distinct_count'] = min(int(values['distinct_count'] or 0), non_null)
+            column['min'] = values.get('min')
+            column['max'] = values.get('max')
+            column['type_histogram'] = {column['data_type']: non_null}
+
+    def _profile_text_types(self, conn, table: str, columns: List[Dict[str, Any]], row_count: int) -> int:
+        """Histogram of the types text values parse as, over a reservoir sample; returns the rows examined"""
+        text_columns = [column for column in columns if column['type'].upper() in _TEXT_TYPES]
+        if not text_columns or not row_count:
+            return 0
+
+        projection = ', '.join(_quote_identifier(column['name']) for column in text_columns)
+        source = f"(SELECT {projection} FROM {table}"
+        if self.sample_rows and row_count > self.sample_rows:
+            source += f" USING SAMPLE reservoir({int(self.sample_rows)} ROWS) REPEATABLE (42)"
+        source += ")"
+
+        expressions = ['COUNT(*)']
+        for column in text_columns:
+            name = _quote_identifier(column['name'])
+            expressions.extend([
+                f"COUNT(TRY_CAST({name} AS DOUBLE))",
+                f"COUNT(TRY_CAST({name} AS TIMESTAMP))",
+                f"COUNT(TRY_CAST({name} AS BOOLEAN))",
+                f"COUNT(*) FILTER (WHERE {name} IS NOT NULL AND TRY_CAST({name} AS DOUBLE) IS NULL "
+                f"AND TRY_CAST({name} AS TIMESTAMP) IS NULL AND TRY_CAST({name} AS BOOLEAN) IS NULL)",
+            ])
+
+        row = conn.execute(f"SELECT {', '.join(expressions)} FROM {source}").fetchone()
+        for index, column in enumerate(text_columns):
+            numeric, date, boolean, text = row[1 + index * 4:5 + index * 4]
+            column['type_histogram'] = {
+                'numeric': int(numeric),
+                'date': int(date),
+                'boolean': int(boolean),
+                'text': int(text),
+            }
+        return int(row[0])
+
+    def _profile_top_values(self, conn, source: str, columns: List[Dict[str, Any]], top_k: int):
+        """Most frequent values for low-cardinality columns from one batched histogram query"""
+        candidates = [
+            column for column in columns
+            if 0 < column['distinct_count'] <= self.top_k_max_distinct
+            and not _UNORDERED_PATTERN.search(column['type'].upper())
+        ]
+        for column in columns:
+            column['top_values'] = []
+        if not candidates:
+            return
+
+        expressions = ', '.join(f"histogram({_quote_identifier(column['name'])})" for column in candidates)
+        try:
+            row = conn.execute(f"SELECT {expressions} FROM {source}").fetchone()
+        except Exception as e:
+            logger.warning(f"[PROFILE] Top-value histogram failed: {e}")
+            return
+
+        for column, histogram in zip(candidates, row):
+            if not histogram:
+                continue
+            if isinstance(histogram, dict) and set(histogram.keys()) == {'key', 'value'}:
+                # Older DuckDB releases return MAPs as parallel key/value lists
+                histogram = dict(zip(histogram['key'], histogram['value']))
+            ranked = sorted(histogram.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            column['top_values'] = [(value, int(count)) for value, count in ranked]
+
+    def _collect_sample_values(self, conn, table: str, columns: List[Dict[str, Any]], sample_values: int):
+        """First few distinct non-null values per column from a small head scan"""
+        rows = conn.execute(f"SELECT * FROM {table} LIMIT {max(50, sample_values * 10)}").fetchall()
+        for index, column in enumerate(columns):
+            samples = []
+            for row in rows:
+                value = row[index]
+                if value is not None and value not in samples:
+                    samples.append(value)
+                    if len(samples) >= sample_values:
+                        break
+            column['sample_values'] = samples
+
+
+# Global instance
+column_profiler = ColumnProfiler()
@@ -0,0 +1,293 @@
+"""
+Data Environment Catalog for ConvaBI Application
+Keeps table metadata for the integrated DuckDB database so queries don't re-discover it
+"""
+
+import re
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, List
+
+from django.core.cache import cache
+from django.conf import settings
+
+from utils.duckdb_manager import duckdb_manager
+
+logger = logging.getLogger(__name__)
+
+_UUID_HEX = re.compile(r'(?<![0-9a-f])([0-9a-f]{8})[_-]?([0-9a-f]{4})[_-]?([0-9a-f]{4})[_-]?([0-9a-f]{4})[_-]?([0-9a-f]{12})(?![0-9a-f])')
+
+
+def _source_ids_in_table_name(table_name: str) -> List[str]:
+    """Data source UUIDs (as 32-char hex) embedded in a table name"""
+    return [''.join(match) for match in _UUID_HEX.findall(table_name.lower())]
+
+
+class DataEnvironmentCatalog:
+    """
+    Catalog of the tables in the integrated DuckDB database.
+
+    Each table's columns, column types, sample rows and row count are analysed
+    once and kept until the table changes. Services that create or replace a
+    table call ``refresh_table()``; the entry is published through the Django
+    cache so every worker picks it up. Tables written by other code paths are
+    picked up by a periodic reconcile against ``duckdb_tables()``, which only
+    re-analyses tables that were re-created or changed size. Data sources
+    without an integrated table are remembered until the next reconcile or
+    shared catalog change, so repeated lookups don't probe DuckDB.
+
+    Publishers merge into the shared catalog under a short ``cache.add``
+    lock so concurrent updates never drop each other's tables. Changes that
+    could not be published yet stay in the local catalog and are retried on
+    the next lookup.
+    """
+
+    CACHE_KEY = 'data_environment_catalog'
+    VERSION_KEY = 'data_environment_catalog_version'
+    LOCK_KEY = 'data_environment_catalog_lock'
+    LOCK_TIMEOUT = 10
+    LOCK_WAIT = 2.0
+    SAMPLE_ROWS = 5
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tables: Dict[str, Dict[str, Any]] = {}
+        self._by_source: Dict[str, str] = {}
+        self._missing_sources = set()
+        self._unpublished: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._version = None
+        self._reconciled_at = 0.0
+        self.reconcile_interval = getattr(settings, 'DATA_CATALOG_RECONCILE_INTERVAL', 60)
+
+    def get_tables(self) -> Dict[str, Dict[str, Any]]:
+        """Return table analyses keyed by table name"""
+        self._sync()
+        with self._lock:
+            return dict(self._tables)
+
+    def get_table(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """Return the analysis of one table"""
+        self._sync()
+        return self._tables.get(table_name)
+
+    def get_table_for_data_source(self, data_source_id) -> Optional[str]:
+        """Return the integrated table for a data source id in O(1)"""
+        self._sync()
+        source_hex = str(data_source_id).replace('-', '').lower()
+        table_name = self._by_source.get(source_hex)
+        if table_name:
+            return table_name
+        if source_hex in self._missing_sources:
+            return None
+
+        # The table may have been created after the last reconcile
+        candidate = f"ds_{source_hex}"
+        if self.refresh_table(candidate):
+            return candidate
+        with self._lock:
+            self._missing_sources.add(source_hex)
+        return None
+
+    def refresh_table(self, table_name: str) -> bool:
+        """Re-analyse one table after it was created or replaced"""
+        try:
+            with duckdb_manager.session() as conn:
+                analysis = self._analyze_table(conn, table_name, self._table_signatures(conn).get(table_name))
+        except Exception as e:
+            logger.debug(f"[CATALOG] Could not analyse {table_name}: {e}")
+            return False
+
+        with self._lock:
+            self._put(table_name, analysis)
+        self._publish({table_name: analysis})
+        logger.info(f"[CATALOG] Refreshed {table_name}: {analysis['row_count']} rows, {len(analysis['columns'])} columns")
+        return True
+
+    def remove_table(self, table_name: str):
+        """Forget a dropped table"""
+        with self._lock:
+            self._drop(table_name)
+        self._publish({}, removed=[table_name])
+
+    def invalidate(self):
+        """Force a full reconcile on the next lookup"""
+        with self._lock:
+            self._reconciled_at = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get catalog statistics"""
+        return {
+            'tables': len(self._tables),
+            'data_sources': len(self._by_source),
+            'version': self._version,
+            'reconciled_at': self._reconciled_at,
+        }
+
+    def _sync(self):
+        """Pick up entries published by other processes and reconcile when due"""
+        try:
+            shared_version = cache.get(self.VERSION_KEY)
+            if shared_version is not None and shared_version != self._version:
+                shared = cache.get(self.CACHE_KEY) or {}
+                with self._lock:
+                    self._tables = {}
+                    self._by_source = {}
+                    self._missing_sources = set()
+                    for table_name, analysis in shared.items():
+                        self._put(table_name, analysis)
+                    # Local changes the shared catalog doesn't have yet
+                    for table_name, analysis in self._unpublished.items():
+                        if analysis is None:
+                            self._drop(table_name)
+                        else:
+                            self._put(table_name, analysis)
+                    self._version = shared_version
+        except Exception as e:
+            logger.debug(f"[CATALOG] Shared catalog unavailable: {e}")
+
+        if self._unpublished:
+            # Don't hold up lookups waiting for the lock; the next one retries
+            self._publish({}, wait=False)
+
+        if time.time() - self._reconciled_at >= self.reconcile_interval:
+            self._reconcile()
+
+    def _reconcile(self):
+        """Bring the catalog in line with the database, analysing only changed tables"""
+        changed = {}
+        try:
+            with duckdb_manager.session() as conn:
+                signatures = self._table_signatures(conn)
+
+                with self._lock:
+                    removed = [name for name in self._tables if name not in signatures]
+                    for table_name in removed:
+                        self._drop(table_name)
+
+                for table_name, signature in signatures.items():
+                    current = self._tables.get(table_name)
+                    if current is not None and current.get('signature') == signature:
+                        continue
+                    try:
+                        changed[table_name] = self._analyze_table(conn, table_name, signature)
+                    except Exception as e:
+                        logger.warning(f"[CATALOG] Could not analyse table {table_name}: {e}")
+        except Exception as e:
+            logger.warning(f"[CATALOG] Reconcile failed: {e}")
+            return
+
+        with self._lock:
+            for table_name, analysis in changed.items():
+                self._put(table_name, analysis)
+            self._missing_sources = set()
+            self._reconciled_at = time.time()
+
+        if changed or removed:
+            logger.info(f"[CATALOG] Reconciled: {len(changed)} analysed, {len(removed)} removed, {len(signatures)} total")
+            self._publish(changed, removed=removed)
+
+    def _table_signatures(self, conn) -> Dict[str, Any]:
+        """Cheap per-table change signature from DuckDB metadata (no table scans)"""
+        signatures = {}
+        rows = conn.execute(
+            "SELECT table_name, table_oid, estimated_size, column_count FROM duckdb_tables() WHERE schema_name = 'main'"
+        ).fetchall()
+        for table_name, table_oid, estimated_size, column_count in rows:
+            # The oid changes whenever a table is dropped and re-created
+            signatures[table_name] = (table_oid, estimated_size, column_count)
+
+        views = conn.execute(
+            "SELECT view_name, view_oid FROM duckdb_views() WHERE NOT internal AND schema_name = 'main'"
+        ).fetchall()
+        for view_name, view_oid in views:
+            signatures[view_name] = ('view', view_oid)
+        return signatures
+
+    def _analyze_table(self, conn, table_name: str, signature=None) -> Dict[str, Any]:
+        schema = conn.execute(f'DESCRIBE "{table_name}"').fetchall()
+        sample_data = conn.execute(f'SELECT * FROM "{table_name}" LIMIT {self.SAMPLE_ROWS}').fetchall()
+        row_count = conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+
+        return {
+            'columns': [row[0] for row in schema],
+            'column_types': {row[0]: row[1] for row in schema},
+            'sample_data': sample_data,
+            'row_count': row_count,
+            'schema': schema,
+            'signature': signature,
+            'analyzed_at': time.time(),
+        }
+
+    def _put(self, table_name: str, analysis: Dict[str, Any]):
+        self._tables[table_name] = analysis
+        for source_hex in _source_ids_in_table_name(table_name):
+            existing = self._by_source.get(source_hex)
+            # The canonical ds_<hex> table wins over derived tables that embed the same id
+            if existing is None or table_name == f"ds_{source_hex}" or (existing != f"ds_{source_hex}" and table_name < existing):
+                self._by_source[source_hex] = table_name
+
+    def _drop(self, table_name: str):
+        self._tables.pop(table_name, None)
+        for source_hex in _source_ids_in_table_name(table_name):
+            if self._by_source.get(source_hex) == table_name:
+                del self._by_source[source_hex]
+                for other in sorted(self._tables):
+                    if source_hex in _source_ids_in_table_name(other):
+                        self._put(other, self._tables[other])
+                        break
+
+    def _publish(self, changed: Dict[str, Dict[str, Any]], removed: Optional[List[str]] = None, wait: bool = True):
+        """Merge local changes into the shared catalog and bump its version"""
+        with self._lock:
+            self._unpublished.update(changed)
+            for table_name in removed or []:
+                self._unpublished[table_name] = None
+            pending = dict(self._unpublished)
+        if not pending:
+            return
+
+        if not self._acquire_shared_lock(self.LOCK_WAIT if wait else 0):
+            logger.debug(f"[CATALOG] Shared catalog busy, {len(pending)} changes left for the next lookup")
+            return
+        try:
+            shared = cache.get(self.CACHE_KEY) or {}
+            for table_name, analysis in pending.items():
+                if analysis is None:
+                    shared.pop(table_name, None)
+                else:
+                    shared[table_name] = analysis
+            cache.set(self.CACHE_KEY, shared, timeout=None)
+
+            # Atomic bump so concurrent publishers never hand out the same version
+            cache.add(self.VERSION_KEY, 0, timeout=None)
+            version = cache.incr(self.VERSION_KEY)
+            with self._lock:
+                for table_name, analysis in pending.items():
+                    if self._unpublished.get(table_name, False) is analysis:
+                        del self._unpublished[table_name]
+                # Another process published in between: leave the version stale so the next lookup reloads
+                if version == (self._version or 0) + 1:
+                    self._version = version
+        except Exception as e:
+            logger.debug(f"[CATALOG] Could not publish catalog changes: {e}")
+        finally:
+            cache.delete(self.LOCK_KEY)
+
+    def _acquire_shared_lock(self, wait: float) -> bool:
+        """Take the cross-process catalog lock, waiting up to ``wait`` seconds for another publisher"""
+        deadline = time.time() + wait
+        while True:
+            try:
+                if cache.add(self.LOCK_KEY, 1, timeout=self.LOCK_TIMEOUT):
+                    return True
+            except Exception as e:
+                logger.debug(f"[CATALOG] Shared catalog unavailable: {e}")
+                return False
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.01)
+
+
+# Global instance shared by every service in the process
+data_catalog = DataEnvironmentCatalog()
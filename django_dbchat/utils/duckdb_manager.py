@@ -0,0 +1,300 @@
+"""
+DuckDB Connection Manager for ConvaBI Application
+Provides leased, per-thread access to the integrated DuckDB database
+"""
+
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def get_integrated_db_path() -> str:
+    """Resolve the integrated DuckDB path the same way for every service"""
+    try:
+        from django.conf import settings
+        db_path = getattr(settings, 'INTEGRATED_DB_PATH', None)
+        if not db_path:
+            db_path = os.path.join(settings.BASE_DIR, 'data', 'integrated.duckdb')
+        return str(db_path)
+    except Exception:
+        return os.path.join('data', 'integrated.duckdb')
+
+
+class DuckDBConnectionManager:
+    """
+    Process-wide owner of the integrated DuckDB database.
+
+    DuckDB lets only one process open the file read/write, so the file is
+    never held for the life of a process. A thread takes a lease on the
+    database for the length of a ``session()`` or ``writer()`` block; the
+    first lease in the process takes a cross-process file lock and opens the
+    database, and the last lease to end closes it and releases the lock so
+    another gunicorn worker or Celery child can open it. Keep blocks around
+    the DuckDB work only - never around LLM calls or other slow I/O - and
+    wrap a multi-step operation in one outer ``session()`` so nested blocks
+    reuse its lease instead of reopening the file. ``session()`` also works
+    as a decorator for methods that read a cursor property throughout.
+    ``release_cursor()`` runs at the end of every request and Celery task as
+    a safety net. Processes waiting for the file give up after
+    ``DUCKDB_LOCK_TIMEOUT`` seconds; leases held longer than
+    ``DUCKDB_MAX_HOLD_SECONDS`` are logged, and leases of threads that have
+    exited are dropped.
+
+    While the database is open every thread gets its own cursor derived from
+    the one connection; ``cursor()`` returns it inside a block. Writers should
+    use ``writer()`` so DDL and bulk loads are serialised inside the process.
+
+    In read-only mode (``INTEGRATED_DB_READ_ONLY=True``, intended for Celery
+    workers that only read integrated data) the file is attached read-only
+    under a shared lock, so several such processes can read at the same time.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, read_only: Optional[bool] = None):
+        self._db_path = db_path
+        self._read_only = read_only
+        self._connection = None
+        self._lock_file = None
+        self._owner_pid = None
+        self._leases: Dict[int, float] = {}
+        self._lock = threading.RLock()
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._stats = {
+            'connections_opened': 0,
+            'cursors_created': 0,
+            'write_sections': 0,
+            'lock_waits': 0,
+        }
+
+    @property
+    def db_path(self) -> str:
+        if not self._db_path:
+            self._db_path = get_integrated_db_path()
+        return self._db_path
+
+    @property
+    def read_only(self) -> bool:
+        if self._read_only is None:
+            self._read_only = bool(_get_setting('INTEGRATED_DB_READ_ONLY', False))
+        return self._read_only
+
+    def cursor(self):
+        """Return the calling thread's cursor; only valid inside a session() or writer() block"""
+        if threading.get_ident() not in self._leases:
+            raise RuntimeError("Integrated DuckDB cursor requested outside duckdb_manager.session() or writer()")
+        return self._thread_cursor(self._acquire())
+
+    def holds_lease(self) -> bool:
+        """Whether the calling thread is inside a session() or writer() block"""
+        return threading.get_ident() in self._leases
+
+    def _thread_cursor(self, connection):
+        local = self._local
+        cursor = getattr(local, 'cursor', None)
+        if cursor is None or getattr(local, 'owner', None) is not connection:
+            cursor = connection.cursor()
+            local.cursor = cursor
+            local.owner = connection
+            self._stats['cursors_created'] += 1
+        return cursor
+
+    @contextmanager
+    def session(self):
+        """Hold the database for a block and yield the calling thread's cursor"""
+        owns_lease = threading.get_ident() not in self._leases
+        try:
+            yield self._thread_cursor(self._acquire())
+        finally:
+            if owns_lease:
+                self.release_cursor()
+
+    @contextmanager
+    def writer(self):
+        """Serialise a write section and yield the calling thread's cursor"""
+        if self.read_only:
+            raise RuntimeError("Integrated DuckDB is attached read-only in this process")
+        with self._write_lock:
+            with self.session() as cursor:
+                self._stats['write_sections'] += 1
+                yield cursor
+
+    def release_cursor(self):
+        """Close the calling thread's cursor and end its lease; the last lease closes the database"""
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception as e:
+                logger.debug(f"[DUCKDB] Error closing thread cursor: {e}")
+            self._local.cursor = None
+            self._local.owner = None
+
+        with self._lock:
+            self._check_owner()
+            self._leases.pop(threading.get_ident(), None)
+            self._reap_leases()
+            if not self._leases:
+                self._close()
+
+    def close(self):
+        """Close the database regardless of leases (used on shutdown and in maintenance scripts)"""
+        with self._lock:
+            self._check_owner()
+            self._leases.clear()
+            self._close(force=True)
+            self._local = threading.local()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get connection manager statistics"""
+        return {
+            **self._stats,
+            'db_path': self.db_path,
+            'read_only': self.read_only,
+            'connected': self._connection is not None and self._owner_pid == os.getpid(),
+            'active_leases': len(self._leases),
+        }
+
+    def _acquire(self):
+        """Take a lease for the calling thread, opening the database for the first lease"""
+        ident = threading.get_ident()
+        with self._lock:
+            self._check_owner()
+            if self._connection is None:
+                self._leases.clear()
+                self._open()
+            self._leases.setdefault(ident, time.time())
+            return self._connection
+
+    def _open(self):
+        """Take the cross-process file lock and open the database (called with the lock held)"""
+        import duckdb
+
+        db_path = self.db_path
+        if db_path == ':memory:':
+            self._connection = duckdb.connect(db_path)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._lock_file = self._lock_database(db_path)
+            try:
+                self._connection = duckdb.connect(db_path, read_only=self.read_only)
+            except Exception:
+                self._unlock_database()
+                raise
+            logger.debug(f"[DUCKDB] Opened DuckDB{' read-only' if self.read_only else ''} at: {db_path}")
+
+        self._owner_pid = os.getpid()
+        self._stats['connections_opened'] += 1
+
+    def _close(self, force: bool = False):
+        """Close the database and release the file lock (called with the lock held)"""
+        if self._connection is None:
+            return
+        if self.db_path == ':memory:' and not force:
+            return  # An in-memory database lives only as long as its connection
+
+        try:
+            self._connection.close()
+        except Exception as e:
+            logger.warning(f"[DUCKDB] Error closing DuckDB connection: {e}")
+        self._connection = None
+        self._unlock_database()
+
+    def _check_owner(self):
+        """Forget state inherited across fork (e.g. Celery prefork) without touching the parent's handle"""
+        pid = os.getpid()
+        if self._owner_pid is not None and self._owner_pid != pid:
+            logger.info(f"[DUCKDB] Process {pid} inherited a DuckDB handle, discarding it")
+            if self._lock_file is not None:
+                self._lock_file.close()  # Our copy only; the parent keeps its lock
+            self._connection = None
+            self._lock_file = None
+            self._owner_pid = None
+            self._leases = {}
+            self._local = threading.local()
+
+    def _reap_leases(self):
+        """Drop leases of threads that have exited and log leases held too long"""
+        alive = {thread.ident for thread in threading.enumerate()}
+        max_hold = _get_setting('DUCKDB_MAX_HOLD_SECONDS', 300)
+        now = time.time()
+        for ident, started in list(self._leases.items()):
+            if ident not in alive:
+                del self._leases[ident]
+            elif now - started > max_hold:
+                logger.warning(f"[DUCKDB] Thread {ident} has held the integrated database for {now - started:.0f}s")
+                self._leases[ident] = now  # Warn once per interval
+
+    def _lock_database(self, db_path: str):
+        """Wait for the cross-process lock on the database file"""
+        lock_file = open(f"{db_path}.process.lock", 'a+')
+        if fcntl is None:  # Windows: no cross-process coordination
+            return lock_file
+
+        mode = fcntl.LOCK_SH if self.read_only else fcntl.LOCK_EX
+        deadline = time.time() + _get_setting('DUCKDB_LOCK_TIMEOUT', 30)
+        waited = False
+        while True:
+            try:
+                fcntl.flock(lock_file, mode | fcntl.LOCK_NB)
+                return lock_file
+            except BlockingIOError:
+                if not waited:
+                    waited = True
+                    self._stats['lock_waits'] += 1
+                if time.time() >= deadline:
+                    lock_file.close()
+                    raise TimeoutError(f"Integrated DuckDB at {db_path} is held by another process")
+                time.sleep(0.05)
+
+    def _unlock_database(self):
+        if self._lock_file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        finally:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def _get_setting(name: str, default):
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+# Global instance shared by every service in the process
+duckdb_manager = DuckDBConnectionManager()
+
+
+def _release_thread_lease(**kwargs):
+    """End the calling thread's lease when a request or task finishes"""
+    try:
+        duckdb_manager.release_cursor()
+    except Exception as e:
+        logger.warning(f"[DUCKDB] Error releasing DuckDB lease: {e}")
+
+
+try:
+    from django.core.signals import request_finished
+    request_finished.connect(_release_thread_lease, dispatch_uid='duckdb_release_request_lease')
+except ImportError:
+    pass
+
+try:
+    from celery.signals import task_postrun
+    task_postrun.connect(_release_thread_lease, dispatch_uid='duckdb_release_task_lease', weak=False)
+except ImportError:
+    pass
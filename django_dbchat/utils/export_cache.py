@@ -0,0 +1,181 @@
+"""
+Export Cache for ConvaBI Application
+Keeps rendered dashboard exports on disk, keyed by dashboard layout and item data
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Item fields that change what an export shows
+_LAYOUT_FIELDS = [
+    'id', 'title', 'item_type', 'chart_type', 'chart_config', 'query', 'sql_query', 'query_params',
+    'position_x', 'position_y', 'width', 'height',
+]
+
+
+class ExportCache:
+    """
+    Content-addressed cache of dashboard exports (PDF, PNG, email HTML).
+
+    The key hashes the dashboard's layout (its own settings plus every item's
+    layout fields) together with each item's stored result reference and data
+    version, so any edit or data refresh yields a new key and stale exports
+    are never served. Dashboards with items that have no stored result are
+    not cached, since their data is only known once they run.
+
+    Concurrent renders of the same key are serialised with a file lock, so a
+    schedule fanning out to many recipients renders once and every other task
+    reads the cached file. Keys share a fixed set of ``LOCK_STRIPES`` lock
+    files, which are never deleted. Least recently used files are evicted once the
+    cache exceeds ``EXPORT_CACHE_MAX_BYTES``.
+    """
+
+    LOCK_STRIPES = 64
+
+    def __init__(self):
+        self.path = getattr(settings, 'EXPORT_CACHE_PATH', os.path.join(settings.BASE_DIR, 'data', 'exports'))
+        self.max_bytes = getattr(settings, 'EXPORT_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+        self._lock = threading.Lock()
+
+    def dashboard_key(self, dashboard, kind: str) -> Optional[str]:
+        """
+        Cache key for an export of a dashboard
+
+        Args:
+            dashboard: Dashboard instance
+            kind: Renderer and format, e.g. 'puppeteer.pdf' or 'email.html'
+
+        Returns:
+            Hex key, or None when the export cannot be cached
+        """
+        items = list(dashboard.items.order_by('id').values(*_LAYOUT_FIELDS, 'result_ref', 'data_version'))
+        if any(not item['result_ref'] for item in items):
+            return None
+
+        fingerprint = {
+            'kind': kind,
+            'dashboard': [str(dashboard.id), dashboard.name, dashboard.description,
+                          dashboard.layout_config, dashboard.filters],
+            'items': items,
+        }
+        payload = json.dumps(fingerprint, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        file_path = self._file_path(key)
+        try:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(file_path)  # Mark as recently used for eviction
+        except OSError:
+            pass
+        return content
+
+    def set(self, key: str, content: bytes):
+        os.makedirs(self.path, exist_ok=True)
+        file_path = self._file_path(key)
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, file_path)
+        self._evict()
+
+    def get_or_render(self, key: Optional[str], render: Callable[[], bytes]) -> bytes:
+        """
+        Cached export for a key, rendering and storing it on a miss.
+        Without a key the export is rendered and not stored; empty renders are never stored.
+        """
+        if not key:
+            return render()
+
+        content = self.get(key)
+        if content is not None:
+            logger.info(f"[EXPORT_CACHE] Hit {key[:12]}")
+            return content
+
+        with self._render_lock(key):
+            # Another task may have rendered it while we waited for the lock
+            content = self.get(key)
+            if content is not None:
+                logger.info(f"[EXPORT_CACHE] Hit {key[:12]} after waiting for its render")
+                return content
+
+            content = render()
+            if content:
+                try:
+                    self.set(key, content)
+                    logger.info(f"[EXPORT_CACHE] Stored {key[:12]} ({len(content)} bytes)")
+                except OSError as e:
+                    logger.warning(f"[EXPORT_CACHE] Could not store {key[:12]}: {e}")
+            return content
+
+    def _file_path(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.bin")
+
+    @contextmanager
+    def _render_lock(self, key: str):
+        """Exclusive lock for rendering a key, shared across processes where the platform allows"""
+        if fcntl is None:
+            yield
+            return
+
+        os.makedirs(self.path, exist_ok=True)
+        lock_path = os.path.join(self.path, f"render_{int(key, 16) % self.LOCK_STRIPES}.lock")
+        with open(lock_path, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _evict(self):
+        """Remove least recently used exports until the cache fits in EXPORT_CACHE_MAX_BYTES"""
+        with self._lock:
+            entries = []
+            total = 0
+            for file_name in os.listdir(self.path):
+                if not file_name.endswith('.bin'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.path, file_name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            removed = 0
+            for _, size, file_name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.path, file_name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            logger.info(f"[EXPORT_CACHE] Evicted {removed} exports, {total} bytes remain")
+
+
+# Global instance
+export_cache = ExportCache()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Join pre-flight estimation for ETL operations
+"""
+
+import logging
+from typing import Dict, List, Optional, Any
+from dataclasses import dataclass, field, asdict
+
+from django.conf import settings
+
+from utils.join_validator import JoinSQLValidator
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class JoinSideStats:
+    """Key statistics of one side of a join"""
+    row_count: int
+    null_keys: int
+    distinct_keys: int
+    max_key_rows: int
+    matched_rows: int
+
+    @property
+    def null_rate(self) -> float:
+        return self.null_keys / self.row_count if self.row_count else 0.0
+
+    @property
+    def duplicate_factor(self) -> float:
+        """Average rows per non-null key value"""
+        return (self.row_count - self.null_keys) / self.distinct_keys if self.distinct_keys else 0.0
+
+@dataclass
+class JoinEstimate:
+    """Pre-flight estimate of a join's output"""
+    join_type: str
+    estimated_rows: int
+    left: JoinSideStats
+    right: JoinSideStats
+    relationship: str
+    allowed: bool = True
+    warnings: List[str] = field(default_factory=list)
+    recommendations: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        for side in ('left', 'right'):
+            stats = getattr(self, side)
+            result[side]['null_rate'] = round(stats.null_rate, 4)
+            result[side]['duplicate_factor'] = round(stats.duplicate_factor, 2)
+        return result
+
+class JoinEstimator:
+    """
+    Estimates the size of an equi-join before it runs.
+
+    Each side's join key is grouped once to get its row count, null keys,
+    distinct keys and largest key group; joining the two grouped key sets
+    gives the exact number of matched pairs (sum of left rows times right
+    rows per shared key) and of matched rows on each side, from which the
+    output of INNER, LEFT, RIGHT and FULL joins follows without building it.
+
+    Joins estimated above ``JOIN_PREFLIGHT_MAX_ROWS`` rows are refused;
+    joins that multiply the larger input more than
+    ``JOIN_PREFLIGHT_WARN_FACTOR`` times, or whose keys are duplicated on
+    both sides, are allowed with warnings.
+    """
+
+    @classmethod
+    def estimate(cls, connection, left_table: str, right_table: str,
+                 left_column: str, right_column: str, join_type: str) -> JoinEstimate:
+        """
+        Estimate a join's output size
+
+        Args:
+            connection: DuckDB connection
+            left_table: Left table as it appears in the join SQL (quoted or schema-qualified)
+            right_table: Right table as it appears in the join SQL
+            left_column: Join column in the left table
+            right_column: Join column in the right table
+            join_type: Join type in any form accepted by JoinSQLValidator
+
+        Returns:
+            JoinEstimate with key statistics and whether the join may run
+        """
+        sql_join_type = JoinSQLValidator.normalize_join_type(join_type)
+        left_key = '"' + left_column.replace('"', '""') + '"'
+        right_key = '"' + right_column.replace('"', '""') + '"'
+
+        row = connection.execute(f"""
+            WITH l AS (SELECT {left_key} AS k, COUNT(*) AS c FROM {left_table} GROUP BY 1),
+                 r AS (SELECT {right_key} AS k, COUNT(*) AS c FROM {right_table} GROUP BY 1),
+                 m AS (SELECT SUM(CAST(l.c AS DOUBLE) * r.c) AS pairs, SUM(l.c) AS left_matched,
+                              SUM(r.c) AS right_matched
+                       FROM l JOIN r ON l.k = r.k)
+            SELECT
+                (SELECT COALESCE(SUM(c), 0) FROM l),
+                (SELECT COALESCE(SUM(c) FILTER (WHERE k IS NULL), 0) FROM l),
+                (SELECT COUNT(k) FROM l),
+                (SELECT COALESCE(MAX(c) FILTER (WHERE k IS NOT NULL), 0) FROM l),
+                (SELECT COALESCE(SUM(c), 0) FROM r),
+                (SELECT COALESCE(SUM(c) FILTER (WHERE k IS NULL), 0) FROM r),
+                (SELECT COUNT(k) FROM r),
+                (SELECT COALESCE(MAX(c) FILTER (WHERE k IS NOT NULL), 0) FROM r),
+                COALESCE(pairs, 0), COALESCE(left_matched, 0), COALESCE(right_matched, 0)
+            FROM m
+        """).fetchone()
+
+        left = JoinSideStats(int(row[0]), int(row[1]), int(row[2]), int(row[3]), int(row[9]))
+        right = JoinSideStats(int(row[4]), int(row[5]), int(row[6]), int(row[7]), int(row[10]))
+        pairs = int(row[8])
+
+        estimated_rows = pairs
+        if sql_join_type in ('LEFT JOIN', 'FULL OUTER JOIN'):
+            estimated_rows += left.row_count - left.matched_rows
+        if sql_join_type in ('RIGHT JOIN', 'FULL OUTER JOIN'):
+            estimated_rows += right.row_count - right.matched_rows
+
+        estimate = JoinEstimate(
+            join_type=sql_join_type,
+            estimated_rows=estimated_rows,
+            left=left,
+            right=right,
+            relationship=cls._relationship(left, right)
+        )
+        cls._check_limits(estimate, left_column, right_column)
+
+        logger.info(f"[JOIN_PREFLIGHT] {left_table}.{left_column} {sql_join_type} {right_table}.{right_column}: "
+                    f"~{estimated_rows} rows from {left.row_count} x {right.row_count} ({estimate.relationship})")
+        return estimate
+
+    @staticmethod
+    def _relationship(left: JoinSideStats, right: JoinSideStats) -> str:
+        left_unique = left.max_key_rows <= 1
+        right_unique = right.max_key_rows <= 1
+        if left_unique and right_unique:
+            return 'one_to_one'
+        if left_unique:
+            return 'one_to_many'
+        if right_unique:
+            return 'many_to_one'
+        return 'many_to_many'
+
+    @classmethod
+    def _check_limits(cls, estimate: JoinEstimate, left_column: str, right_column: str):
+        max_rows = getattr(settings, 'JOIN_PREFLIGHT_MAX_ROWS', 50000000)
+        warn_factor = getattr(settings, 'JOIN_PREFLIGHT_WARN_FACTOR', 10)
+        larger_input = max(estimate.left.row_count, estimate.right.row_count)
+
+        if estimate.relationship == 'many_to_many':
+            estimate.warnings.append(
+                f"Join keys repeat on both sides (up to {estimate.left.max_key_rows} rows per "
+                f"'{left_column}' value and {estimate.right.max_key_rows} per '{right_column}' value)"
+            )
+        if larger_input and estimate.estimated_rows > larger_input * warn_factor:
+            estimate.warnings.append(
+                f"Join would produce about {estimate.estimated_rows:,} rows, "
+                f"{estimate.estimated_rows / larger_input:.0f}x the larger input"
+            )
+        for side, column in ((estimate.left, left_column), (estimate.right, right_column)):
+            if side.null_rate > 0.5:
+                estimate.warnings.append(f"{side.null_rate:.0%} of '{column}' values are NULL and never match")
+
+        if estimate.estimated_rows > max_rows:
+            estimate.allowed = False
+            estimate.recommendations.extend([
+                f"The join would produce about {estimate.estimated_rows:,} rows, above the limit of {max_rows:,}",
+                "Check that the selected columns identify the same entity in both tables",
+                "Deduplicate or aggregate one side so each key appears once before joining",
+            ])
+        elif estimate.warnings:
+            estimate.recommendations.append("Verify the join columns; duplicated keys multiply output rows")
+
+
+def preflight_join(connection, left_table: str, right_table: str,
+                   left_column: str, right_column: str, join_type: str) -> Optional[JoinEstimate]:
+    """Estimate a join, returning None when the estimate itself fails so the join can still run"""
+    try:
+        return JoinEstimator.estimate(connection, left_table, right_table, left_column, right_column, join_type)
+    except Exception as e:
+        logger.warning(f"[JOIN_PREFLIGHT] Could not estimate join of {left_table} and {right_table}: {e}")
+        return None
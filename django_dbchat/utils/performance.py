@@ -3,9 +3,12 @@ Performance utilities for ConvaBI Application
 Provides caching, connection pooling, and performance monitoring
 """
 
+import os
 import time
 import logging
-from typing import Dict, Any, Optional, Callable
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable
 from functools import wraps
 from django.core.cache import cache
 from django.conf import settings
@@ -117,22 +120,239 @@ class QueryPerformanceMonitor:
         except Exception as e:
             logger.error(f"Failed to log performance: {e}")
 
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the checkout timeout"""
+
+
+class _PooledConnection:
+    """
+    Proxy around a pooled DB-API connection.
+
+    Behaves like the wrapped connection, except that ``close()`` hands the
+    connection back to its pool instead of closing the socket.
+    """
+
+    def __init__(self, pool: '_ConnectionPool', entry: Dict[str, Any]):
+        self._pool = pool
+        self._entry = entry
+        self._released = False
+
+    @property
+    def raw_connection(self):
+        return self._entry['conn']
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._entry)
+
+    def __getattr__(self, name):
+        return getattr(self._entry['conn'], name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __del__(self):
+        # A caller that forgot close() must not leak a pool slot
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class _ConnectionPool:
+    """Bounded LIFO pool of connections to one database"""
+
+    def __init__(self, name: str, factory: Callable[[], Any], health_check: Optional[Callable[[Any], bool]],
+                 max_size: int, idle_timeout: float, max_lifetime: float, checkout_timeout: float):
+        self.name = name
+        self.factory = factory
+        self.health_check = health_check
+        self.max_size = max(1, int(max_size))
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self._idle = deque()
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self.stats = {
+            'requests': 0,
+            'created': 0,
+            'reused': 0,
+            'discarded': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'failed_requests': 0,
+        }
+
+    def acquire(self) -> _PooledConnection:
+        deadline = time.monotonic() + self.checkout_timeout
+        expired = []
+        try:
+            with self._condition:
+                self.stats['requests'] += 1
+                while True:
+                    expired.extend(self._evict_expired())
+                    if self._idle:
+                        entry = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._in_use < self.max_size:
+                        self._in_use += 1
+                        entry = None
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.checkout_timeout}s waiting for a connection from pool {self.name}"
+                        )
+                    self.stats['waits'] += 1
+                    self._condition.wait(remaining)
+        finally:
+            for expired_entry in expired:
+                self._close_quietly(expired_entry['conn'])
+
+        # Network I/O happens outside the lock
+        if entry is not None:
+            if self.health_check is None or self.health_check(entry['conn']):
+                entry['last_used'] = time.monotonic()
+                with self._condition:
+                    self.stats['reused'] += 1
+                return _PooledConnection(self, entry)
+            logger.info(f"[POOL] Discarding unhealthy connection from {self.name}")
+            self._close_quietly(entry['conn'])
+            with self._condition:
+                self.stats['discarded'] += 1
+
+        try:
+            conn = self.factory()
+            if conn is None:
+                raise Exception(f"Connection factory returned no connection for {self.name}")
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self.stats['failed_requests'] += 1
+                self._condition.notify()
+            raise
+
+        now = time.monotonic()
+        entry = {'conn': conn, 'created_at': now, 'last_used': now}
+        with self._condition:
+            self.stats['created'] += 1
+        return _PooledConnection(self, entry)
+
+    def release(self, entry: Dict[str, Any]):
+        conn = entry['conn']
+        reusable = not getattr(conn, 'closed', False)
+        if reusable and time.monotonic() - entry['created_at'] >= self.max_lifetime:
+            reusable = False
+        if reusable:
+            try:
+                # Leave no open transaction behind for the next borrower
+                conn.rollback()
+            except Exception:
+                reusable = False
+
+        with self._condition:
+            self._in_use -= 1
+            if reusable:
+                entry['last_used'] = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self.stats['discarded'] += 1
+            self._condition.notify()
+
+        if not reusable:
+            self._close_quietly(conn)
+
+    def close(self):
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+        for entry in idle:
+            self._close_quietly(entry['conn'])
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                **self.stats,
+                'active_connections': self._in_use,
+                'idle_connections': len(self._idle),
+                'max_size': self.max_size,
+            }
+
+    def _evict_expired(self) -> List[Dict[str, Any]]:
+        """
+        Remove idle connections past the idle timeout or max lifetime (caller holds the lock).
+        Returns the removed entries; the caller closes them once the lock is released.
+        """
+        now = time.monotonic()
+        kept = deque()
+        expired = []
+        while self._idle:
+            entry = self._idle.popleft()
+            if now - entry['last_used'] >= self.idle_timeout or now - entry['created_at'] >= self.max_lifetime:
+                self.stats['discarded'] += 1
+                expired.append(entry)
+            else:
+                kept.append(entry)
+        self._idle = kept
+        return expired
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
 class ConnectionPoolManager:
-    """Manage database connection pools"""
-    
+    """
+    Manage per-database connection pools.
+
+    Pools are keyed by a connection fingerprint and bounded by
+    ``DATABASE_CONNECTION_POOL_SIZE``. Connections are health-checked on
+    checkout, evicted after ``DATABASE_POOL_IDLE_TIMEOUT`` seconds idle or
+    ``DATABASE_POOL_MAX_LIFETIME`` seconds of age, and callers wait up to
+    ``DATABASE_POOL_TIMEOUT`` seconds when a pool is exhausted.
+    """
+
     def __init__(self):
-        self.pools = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.pools: Dict[str, _ConnectionPool] = {}
         self.pool_stats = {}
-    
+
+    def get_connection(self, pool_key: str, factory: Callable[[], Any],
+                       health_check: Optional[Callable[[Any], bool]] = None,
+                       max_size: Optional[int] = None, name: Optional[str] = None) -> _PooledConnection:
+        """Check a connection out of the pool for ``pool_key``, creating the pool on first use"""
+        pool = self._get_pool(pool_key, factory, health_check, max_size, name)
+        return pool.acquire()
+
     def get_pool_stats(self, pool_name: str) -> Dict[str, Any]:
         """Get connection pool statistics"""
+        for pool in list(self.pools.values()):
+            if pool.name == pool_name:
+                return pool.get_stats()
         return self.pool_stats.get(pool_name, {
             'active_connections': 0,
             'idle_connections': 0,
             'total_requests': 0,
             'failed_requests': 0
         })
-    
+
+    def get_all_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get statistics for every live pool, keyed by pool name"""
+        return {pool.name: pool.get_stats() for pool in list(self.pools.values())}
+
     def record_connection_usage(self, pool_name: str, success: bool):
         """Record connection usage statistics"""
         if pool_name not in self.pool_stats:
@@ -147,6 +367,41 @@ class ConnectionPoolManager:
         if not success:
             self.pool_stats[pool_name]['failed_requests'] += 1
 
+    def close_all(self):
+        """Close every idle pooled connection and forget the pools"""
+        with self._lock:
+            pools = list(self.pools.values())
+            self.pools = {}
+        for pool in pools:
+            pool.close()
+
+    def _get_pool(self, pool_key: str, factory: Callable[[], Any], health_check: Optional[Callable[[Any], bool]],
+                  max_size: Optional[int], name: Optional[str]) -> _ConnectionPool:
+        with self._lock:
+            if self._pid != os.getpid():
+                # Sockets inherited from the parent (e.g. a Celery prefork worker) must not be shared
+                self._pid = os.getpid()
+                self.pools = {}
+
+            pool = self.pools.get(pool_key)
+            if pool is None:
+                pool = _ConnectionPool(
+                    name=name or pool_key,
+                    factory=factory,
+                    health_check=health_check,
+                    max_size=max_size or getattr(settings, 'DATABASE_CONNECTION_POOL_SIZE', 5),
+                    idle_timeout=getattr(settings, 'DATABASE_POOL_IDLE_TIMEOUT', 300),
+                    max_lifetime=getattr(settings, 'DATABASE_POOL_MAX_LIFETIME', 1800),
+                    checkout_timeout=getattr(settings, 'DATABASE_POOL_TIMEOUT', 10),
+                )
+                self.pools[pool_key] = pool
+                logger.info(f"[POOL] Created connection pool {pool.name} (max {pool.max_size})")
+            else:
+                # Pick up refreshed credentials or factories for an existing pool
+                pool.factory = factory
+                pool.health_check = health_check
+            return pool
+
 class MemoryManager:
     """Memory management utilities for large datasets"""
     
@@ -0,0 +1,167 @@
+"""
+Render Worker Client for ConvaBI Application
+Sends dashboard render jobs to a long-lived headless-browser worker
+"""
+
+import os
+import json
+import uuid
+import atexit
+import base64
+import logging
+import threading
+import subprocess
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RenderWorker:
+    """
+    Client for the Puppeteer render worker (services/render_worker.js).
+
+    The worker is started on first use and kept running for the life of the
+    process, so Chromium stays warm between exports. Jobs are written to its
+    stdin as JSON lines and results come back on stdout with the rendered
+    bytes, matched to callers by job id. The worker caps concurrent pages at
+    ``RENDER_WORKER_CONCURRENCY`` and recycles its browser after
+    ``RENDER_WORKER_MAX_RENDERS`` renders. If the worker exits, waiting jobs
+    fail and the next job starts a new worker.
+    """
+
+    def __init__(self):
+        self.script = os.path.join(settings.BASE_DIR, 'services', 'render_worker.js')
+        self.concurrency = getattr(settings, 'RENDER_WORKER_CONCURRENCY', 2)
+        self.max_renders = getattr(settings, 'RENDER_WORKER_MAX_RENDERS', 50)
+        self.timeout = getattr(settings, 'RENDER_WORKER_TIMEOUT', 120)
+        self.node_path = getattr(settings, 'RENDER_WORKER_NODE_PATH', '/usr/lib/node_modules')
+        self._process = None
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+    def render(self, url: str, format_type: str, cookie: Optional[Dict[str, Any]] = None,
+               header: str = '') -> bytes:
+        """
+        Render a page to PDF or PNG
+
+        Args:
+            url: Page to render
+            format_type: 'pdf' or 'png'
+            cookie: Cookie set before navigating (name, value, domain, path)
+            header: Text for the PDF page header
+
+        Returns:
+            The rendered file's bytes
+
+        Raises:
+            TimeoutError: No result within RENDER_WORKER_TIMEOUT seconds
+            RuntimeError: The worker could not be started or the render failed
+        """
+        job_id = uuid.uuid4().hex
+        job = {'id': job_id, 'url': url, 'format': format_type, 'cookie': cookie, 'header': header}
+        future = Future()
+
+        with self._lock:
+            process = self._ensure_started()
+            pending = self._pending
+            pending[job_id] = future
+            try:
+                process.stdin.write(json.dumps(job) + '\n')
+                process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                pending.pop(job_id, None)
+                raise RuntimeError(f"Render worker is not accepting jobs: {e}")
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                pending.pop(job_id, None)
+            raise TimeoutError(f"Render of {url} did not finish within {self.timeout}s")
+
+        if not result.get('ok'):
+            raise RuntimeError(f"Render of {url} failed: {result.get('error')}")
+        return base64.b64decode(result['data'])
+
+    def close(self):
+        """Stop the worker; it closes its browsers when stdin closes"""
+        with self._lock:
+            process, self._process = self._process, None
+        if process is None or process.poll() is not None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=10)
+        except Exception:
+            process.kill()
+
+    def _ensure_started(self):
+        """Start the worker if it is not running (called with the lock held)"""
+        if self._process is not None and self._process.poll() is None:
+            return self._process
+
+        env = os.environ.copy()
+        env.setdefault('NODE_PATH', self.node_path)
+        env['RENDER_WORKER_CONCURRENCY'] = str(self.concurrency)
+        env['RENDER_WORKER_MAX_RENDERS'] = str(self.max_renders)
+
+        try:
+            process = subprocess.Popen(
+                ['node', self.script],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                env=env
+            )
+        except OSError as e:
+            raise RuntimeError(f"Could not start render worker: {e}")
+
+        self._process = process
+        self._pending = {}
+        threading.Thread(
+            target=self._read_results, args=(process, self._pending), name='render-worker-results', daemon=True
+        ).start()
+        threading.Thread(
+            target=self._read_logs, args=(process,), name='render-worker-logs', daemon=True
+        ).start()
+        if not self._atexit_registered:
+            atexit.register(self.close)
+            self._atexit_registered = True
+
+        logger.info(f"[RENDER_WORKER] Started render worker (pid {process.pid})")
+        return process
+
+    def _read_results(self, process, pending: Dict[str, Future]):
+        """Resolve waiting jobs from the worker's output until it exits"""
+        for line in process.stdout:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                logger.warning(f"[RENDER_WORKER] Ignoring unexpected output: {line[:200]}")
+                continue
+            with self._lock:
+                future = pending.pop(result.get('id'), None)
+            if future is not None:
+                future.set_result(result)
+
+        process.wait()
+        logger.warning(f"[RENDER_WORKER] Render worker exited with code {process.returncode}")
+        with self._lock:
+            waiting = list(pending.values())
+            pending.clear()
+        for future in waiting:
+            future.set_result({'ok': False, 'error': f'render worker exited with code {process.returncode}'})
+
+    def _read_logs(self, process):
+        for line in process.stderr:
+            logger.info(line.rstrip())
+
+
+# Global instance
+render_worker = RenderWorker()
@@ -0,0 +1,231 @@
+"""
+Query Result Cache for ConvaBI Application
+Caches query results keyed by normalised SQL and data-source data version
+"""
+
+import io
+import re
+import json
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+import pandas as pd
+from django.core.cache import cache
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_QUOTED_SEGMENT = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_LINE_COMMENT = re.compile(r'--[^\n]*')
+_BLOCK_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normalise SQL so trivially different spellings share a cache entry.
+    Comments are dropped, whitespace collapsed and unquoted text lower-cased;
+    quoted literals and identifiers are kept verbatim.
+    """
+    if not sql:
+        return ''
+
+    parts = _QUOTED_SEGMENT.split(sql)
+    normalized = []
+    for index, part in enumerate(parts):
+        if index % 2 == 1:
+            # Quoted literal or identifier - keep as is
+            normalized.append(part)
+        else:
+            part = _BLOCK_COMMENT.sub(' ', _LINE_COMMENT.sub(' ', part))
+            normalized.append(re.sub(r'\s+', ' ', part).lower())
+
+    return ''.join(normalized).strip().rstrip(';').strip()
+
+
+def connection_fingerprint(connection_info: Dict[str, Any]) -> str:
+    """Stable digest of connection info (secrets excluded) - identical across processes"""
+    safe_info = {
+        'type': connection_info.get('type'),
+        'host': connection_info.get('host'),
+        'port': connection_info.get('port'),
+        'database': connection_info.get('database'),
+        'username': connection_info.get('username'),
+        'file_path': connection_info.get('file_path'),
+        'table_name': connection_info.get('table_name'),
+    }
+    payload = json.dumps(safe_info, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class QueryResultCache:
+    """
+    Shared query result cache.
+
+    Entries are stored in the Django cache (Redis in production, so every
+    gunicorn/Celery worker shares hits) as compressed Parquet. Keys include
+    the data source's ``data_version``, so a refresh makes old entries
+    unreachable immediately. A size-bounded index of written entries evicts
+    the least recently used ones once ``QUERY_RESULT_CACHE_MAX_BYTES`` is
+    exceeded; hits only update recency in-process until the next write.
+    """
+
+    KEY_PREFIX = 'query_result'
+    INDEX_KEY = 'query_result_index'
+    INDEX_LOCK_KEY = 'query_result_index_lock'
+    INDEX_LOCK_TIMEOUT = 10
+    INDEX_LOCK_WAIT = 0.5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recent: Dict[str, float] = {}
+        self.max_bytes = getattr(settings, 'QUERY_RESULT_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+        self.max_entry_bytes = getattr(settings, 'QUERY_RESULT_CACHE_MAX_ENTRY_BYTES', 16 * 1024 * 1024)
+        self.timeout = getattr(settings, 'QUERY_RESULT_CACHE_TIMEOUT', 24 * 60 * 60)
+        self.unversioned_timeout = getattr(settings, 'QUERY_RESULT_CACHE_UNVERSIONED_TIMEOUT', 300)
+
+    def build_key(self, sql: str, scope: str, data_version: Optional[int] = None) -> str:
+        """Build the cache key from normalised SQL, the data scope and its data version"""
+        version = 'unversioned' if data_version is None else str(data_version)
+        payload = f"{normalize_sql(sql)}|{scope}|{version}"
+        return f"{self.KEY_PREFIX}_{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Return the cached DataFrame for a key, or None on a miss"""
+        try:
+            payload = cache.get(key)
+            if payload is None:
+                return None
+
+            df = self._deserialize(payload)
+            # Recency is folded into the shared index on the next write, not on every hit
+            with self._lock:
+                self._recent[key] = time.time()
+            logger.debug(f"Result cache hit for {key}")
+            return df
+
+        except Exception as e:
+            logger.warning(f"Result cache read failed for {key}: {e}")
+            return None
+
+    def set(self, key: str, df: pd.DataFrame, versioned: bool = True) -> bool:
+        """Store a DataFrame result; oversized results are not cached"""
+        if not isinstance(df, pd.DataFrame):
+            return False
+
+        try:
+            payload = self._serialize(df)
+            if len(payload) > self.max_entry_bytes:
+                logger.info(f"Result too large to cache ({len(payload)} bytes)")
+                return False
+
+            timeout = self.timeout if versioned else self.unversioned_timeout
+            cache.set(key, payload, timeout=timeout)
+            self._record(key, len(payload), timeout)
+            return True
+
+        except Exception as e:
+            logger.warning(f"Result cache write failed for {key}: {e}")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get result cache statistics"""
+        now = time.time()
+        index = {key: entry for key, entry in (cache.get(self.INDEX_KEY) or {}).items() if entry[2] > now}
+        return {
+            'entries': len(index),
+            'total_bytes': sum(entry[0] for entry in index.values()),
+            'max_bytes': self.max_bytes,
+        }
+
+    def _record(self, key: str, size: int, timeout: int):
+        """
+        Add a written entry to the shared index and evict entries above the size budget.
+
+        Index entries are (size, last_access, expires_at). Updates are serialised
+        across workers with a short ``cache.add`` lock; if it cannot be taken the
+        update is skipped and accounting stays approximate until the next write.
+        Expired entries are dropped before the budget is checked.
+        """
+        if not self._acquire_index_lock():
+            logger.debug(f"Result cache index busy, not recording {key}")
+            return
+
+        try:
+            now = time.time()
+            with self._lock:
+                recent, self._recent = self._recent, {}
+
+            index = {
+                index_key: (entry[0], max(entry[1], recent.get(index_key, 0)), entry[2])
+                for index_key, entry in (cache.get(self.INDEX_KEY) or {}).items()
+                if len(entry) == 3 and entry[2] > now
+            }
+            index[key] = (size, now, now + timeout)
+
+            total = sum(entry[0] for entry in index.values())
+            if total > self.max_bytes:
+                for old_key, (old_size, _, _) in sorted(index.items(), key=lambda item: item[1][1]):
+                    if total <= self.max_bytes:
+                        break
+                    if old_key == key:
+                        continue
+                    cache.delete(old_key)
+                    del index[old_key]
+                    total -= old_size
+                    logger.debug(f"Evicted {old_key} from result cache ({old_size} bytes)")
+
+            cache.set(self.INDEX_KEY, index, timeout=None)
+
+        finally:
+            cache.delete(self.INDEX_LOCK_KEY)
+
+    def _acquire_index_lock(self) -> bool:
+        """Take the cross-process index lock, waiting briefly for another writer"""
+        deadline = time.time() + self.INDEX_LOCK_WAIT
+        while True:
+            if cache.add(self.INDEX_LOCK_KEY, 1, timeout=self.INDEX_LOCK_TIMEOUT):
+                return True
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def _serialize(self, df: pd.DataFrame) -> bytes:
+        """Serialise as zstd-compressed Parquet, falling back to compressed pickle"""
+        try:
+            buffer = io.BytesIO()
+            df.to_parquet(buffer, engine='pyarrow', compression='zstd', index=False)
+            return b'PQ' + buffer.getvalue()
+        except Exception as e:
+            logger.debug(f"Parquet serialisation unavailable, using pickle: {e}")
+            import zlib
+            return b'PK' + zlib.compress(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _deserialize(self, payload: bytes) -> pd.DataFrame:
+        marker, body = payload[:2], payload[2:]
+        if marker == b'PQ':
+            return pd.read_parquet(io.BytesIO(body), engine='pyarrow')
+        import zlib
+        return pickle.loads(zlib.decompress(body))
+
+
+def bump_data_version(data_source_id) -> Optional[int]:
+    """Invalidate cached results for a data source by bumping its data version"""
+    try:
+        from datasets.models import DataSource
+
+        data_source = DataSource.objects.get(pk=data_source_id)
+        version = data_source.bump_data_version()
+        logger.info(f"Data version for {data_source.name} bumped to {version}")
+        return version
+
+    except Exception as e:
+        logger.warning(f"Failed to bump data version for {data_source_id}: {e}")
+        return None
+
+
+# Global instance for easy access
+query_result_cache = QueryResultCache()
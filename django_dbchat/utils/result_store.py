@@ -0,0 +1,193 @@
+"""
+Result Store for ConvaBI Application
+Keeps query and dashboard result sets as Parquet files outside the Django database
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Iterable
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_RESULT_REF = re.compile(r'^[0-9a-f]{32}$')
+_reader_local = threading.local()
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class ResultStore:
+    """
+    Columnar store for result sets.
+
+    Each result is written once as a Parquet file named by its result id, and
+    models keep only that reference, a row count and a small JSON preview.
+    Reads go through DuckDB's Parquet reader on a per-thread in-memory
+    connection, so they never wait on the integrated database; a column
+    projection only decodes the requested columns and a page only scans up
+    to its last row.
+    Files no longer referenced by any model are removed by ``purge_unreferenced``.
+    """
+
+    def __init__(self):
+        self.path = getattr(settings, 'RESULT_STORE_PATH', os.path.join(settings.BASE_DIR, 'data', 'results'))
+        self.preview_rows = getattr(settings, 'RESULT_STORE_PREVIEW_ROWS', 20)
+
+    def put(self, records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Store a result set
+
+        Returns:
+            Dictionary with ref, row_count, columns and a JSON-safe preview
+        """
+        frame = records if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(list(records or []))
+        table = self._to_arrow(frame)
+
+        ref = uuid.uuid4().hex
+        os.makedirs(self.path, exist_ok=True)
+        file_path = self._file_path(ref)
+        temp_path = f"{file_path}.tmp"
+        try:
+            pq.write_table(table, temp_path, compression='zstd')
+            os.replace(temp_path, file_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        preview = table.slice(0, self.preview_rows).to_pylist() if table.num_columns else []
+        logger.info(f"[RESULT_STORE] Stored result {ref}: {table.num_rows} rows, {table.num_columns} columns")
+        return {
+            'ref': ref,
+            'row_count': table.num_rows,
+            'columns': table.column_names,
+            'preview': json.loads(json.dumps(preview, default=str)),
+        }
+
+    def read(self, ref: str, columns: Optional[List[str]] = None, offset: int = 0,
+             limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Read rows of a stored result
+
+        Args:
+            ref: Result id returned by put()
+            columns: Columns to return (all when empty); unknown names are ignored
+            offset: Rows to skip
+            limit: Maximum rows to return (all when None)
+
+        Raises:
+            FileNotFoundError: The result does not exist
+        """
+        file_path = self._file_path(ref)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Stored result {ref} not found")
+
+        available = pq.read_schema(file_path).names
+        if columns:
+            columns = [column for column in columns if column in available]
+            if not columns:
+                return []
+        if not available:
+            return []
+        projection = ', '.join(_quote_identifier(column) for column in columns) if columns else '*'
+
+        sql = f"SELECT {projection} FROM read_parquet({_sql_literal(file_path)})"
+        if limit is not None:
+            sql += f" LIMIT {max(0, int(limit))}"
+        if offset:
+            sql += f" OFFSET {max(0, int(offset))}"
+
+        cursor = self._reader().execute(sql)
+        names = [description[0] for description in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def _reader(self):
+        """In-memory DuckDB connection of the calling thread; Parquet reads never touch the integrated database"""
+        con = getattr(_reader_local, 'connection', None)
+        if con is None:
+            import duckdb
+            con = duckdb.connect(':memory:')
+            _reader_local.connection = con
+        return con
+
+    def exists(self, ref: Optional[str]) -> bool:
+        return bool(ref) and _RESULT_REF.match(ref) is not None and os.path.exists(self._file_path(ref))
+
+    def delete(self, ref: Optional[str]):
+        """Remove a stored result; unknown references are ignored"""
+        if not ref or not _RESULT_REF.match(ref):
+            return
+        try:
+            os.remove(self._file_path(ref))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"[RESULT_STORE] Could not remove result {ref}: {e}")
+
+    def purge_unreferenced(self, referenced: Iterable[str], min_age: int = 3600) -> int:
+        """
+        Remove stored results that no model references any more; returns the number removed.
+        Results younger than min_age seconds are kept, as their model may not be saved yet.
+        """
+        if not os.path.isdir(self.path):
+            return 0
+
+        referenced = set(referenced)
+        cutoff = time.time() - min_age
+        removed = 0
+        for file_name in os.listdir(self.path):
+            ref, extension = os.path.splitext(file_name)
+            partial = extension == '.tmp'
+            if partial:
+                # Left behind by a write that never reached os.replace()
+                ref, extension = os.path.splitext(ref)
+            if extension != '.parquet' or not _RESULT_REF.match(ref) or (ref in referenced and not partial):
+                continue
+            file_path = os.path.join(self.path, file_name)
+            try:
+                if os.path.getmtime(file_path) > cutoff:
+                    continue
+                if partial:
+                    os.remove(file_path)
+            except OSError:
+                continue
+            if not partial:
+                self.delete(ref)
+            removed += 1
+        if removed:
+            logger.info(f"[RESULT_STORE] Purged {removed} unreferenced results")
+        return removed
+
+    def _file_path(self, ref: str) -> str:
+        if not _RESULT_REF.match(str(ref)):
+            raise ValueError(f"Invalid result reference: {ref}")
+        return os.path.join(self.path, f"{ref}.parquet")
+
+    def _to_arrow(self, frame: pd.DataFrame) -> pa.Table:
+        """Convert to Arrow, falling back to text for columns of mixed Python types"""
+        frame = frame.rename(columns=str)
+        try:
+            return pa.Table.from_pandas(frame, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            for column in frame.columns[frame.dtypes == object]:
+                frame[column] = frame[column].map(lambda value: None if value is None else str(value))
+            return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+# Global instance
+result_store = ResultStore()
@@ -0,0 +1,237 @@
+"""
+SQL Generation Cache for ConvaBI Application
+Reuses previously generated SQL for repeated or paraphrased natural language questions
+"""
+
+import re
+import math
+import time
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Any, Optional, List, Tuple
+
+from django.core.cache import cache
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Filler words that do not change the meaning of an analytics question
+_STOP_WORDS = {
+    'a', 'an', 'the', 'of', 'me', 'show', 'display', 'give', 'get', 'list', 'please',
+    'what', 'which', 'is', 'are', 'was', 'were', 'can', 'you', 'i', 'want', 'to', 'see',
+    'tell', 'find', 'all', 'data', 'from', 'table', 'would', 'like', 'could',
+}
+_LITERAL_PATTERN = re.compile(r"'[^']*'|\"[^\"]*\"|\b\d+(?:\.\d+)?\b")
+_WORD_PATTERN = re.compile(r'[a-z0-9_]+')
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case a question and collapse punctuation and whitespace"""
+    if not question:
+        return ''
+    text = question.lower().strip()
+    text = re.sub(r'[^\w\s\'"\.]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip(' .?')
+
+
+def schema_fingerprint(target_table: str, columns: List[str], column_types: Optional[Dict[str, str]] = None) -> str:
+    """Digest of a table's column names and types - changes whenever the schema changes"""
+    column_types = column_types or {}
+    payload = '|'.join(f"{col}:{column_types.get(col, '')}" for col in columns)
+    return hashlib.sha256(f"{target_table}|{payload}".encode('utf-8')).hexdigest()[:32]
+
+
+def _question_literals(question: str) -> Tuple[str, ...]:
+    """Numbers and quoted values - paraphrases must agree on these exactly"""
+    return tuple(sorted(_LITERAL_PATTERN.findall(question.lower())))
+
+
+def _content_words(question: str) -> List[str]:
+    """Words of a question other than filler words"""
+    return [w for w in _WORD_PATTERN.findall(question.lower()) if w not in _STOP_WORDS]
+
+
+def _question_terms(question: str) -> List[str]:
+    """Unigram and bigram terms used for TF-IDF matching"""
+    words = _content_words(question)
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+class _SimilarityIndex:
+    """
+    TF-IDF index over validated question -> SQL pairs for one target table.
+
+    A past question is only a candidate when it uses exactly the same content
+    words and literals as the new one - a single differing word ("min" vs
+    "max", "east" vs "west", "excluding returns") changes the answer, and
+    no similarity score can tell that apart. The score only ranks candidates
+    that differ in filler words and word order.
+    """
+
+    def __init__(self, pairs: List[Tuple[str, str]]):
+        self.built_at = time.time()
+        self.entries = []
+        document_frequency = Counter()
+        term_counts = []
+
+        for question, sql in pairs:
+            counts = Counter(_question_terms(question))
+            if not counts:
+                continue
+            term_counts.append((question, sql, counts))
+            document_frequency.update(counts.keys())
+
+        total = len(term_counts)
+        self.idf = {term: math.log((1 + total) / (1 + df)) + 1 for term, df in document_frequency.items()}
+        self.unknown_idf = math.log(1 + total) + 1
+
+        for question, sql, counts in term_counts:
+            self.entries.append((
+                question, sql, _question_literals(question), frozenset(_content_words(question)), self._vectorize(counts)
+            ))
+
+    def _vectorize(self, counts: Counter) -> Dict[str, float]:
+        vector = {term: count * self.idf.get(term, self.unknown_idf) for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def best_match(self, question: str) -> Tuple[Optional[str], Optional[str], float]:
+        counts = Counter(_question_terms(question))
+        if not counts or not self.entries:
+            return None, None, 0.0
+
+        literals = _question_literals(question)
+        words = frozenset(_content_words(question))
+        vector = self._vectorize(counts)
+        best_question, best_sql, best_score = None, None, 0.0
+
+        for candidate_question, sql, candidate_literals, candidate_words, candidate_vector in self.entries:
+            if candidate_literals != literals or candidate_words != words:
+                continue
+            score = sum(weight * candidate_vector.get(term, 0.0) for term, weight in vector.items())
+            if score > best_score:
+                best_question, best_sql, best_score = candidate_question, sql, score
+
+        return best_question, best_sql, best_score
+
+
+class SQLGenerationCache:
+    """
+    Two-tier cache for LLM SQL generation.
+
+    Exact tier: the Django cache keyed on the normalised question, target table
+    and schema fingerprint, so any process can reuse a generated query until
+    the table's schema changes.
+
+    Similarity tier: a per-table TF-IDF index over completed ``QueryLog``
+    ``natural_query`` -> ``final_sql`` pairs, so rewordings of a question that
+    already ran successfully - same content words, different filler words or
+    word order - reuse its SQL.
+    """
+
+    KEY_PREFIX = 'llm_sql'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, _SimilarityIndex] = {}
+        self.timeout = getattr(settings, 'LLM_CACHE_TIMEOUT', 1800)
+        self.similarity_threshold = getattr(settings, 'SQL_SIMILARITY_THRESHOLD', 0.85)
+        self.index_ttl = getattr(settings, 'SQL_SIMILARITY_INDEX_TTL', 300)
+        self.index_size = getattr(settings, 'SQL_SIMILARITY_INDEX_SIZE', 500)
+        self._stats = {'exact_hits': 0, 'similar_hits': 0, 'misses': 0}
+
+    def build_key(self, question: str, target_table: str, fingerprint: str) -> str:
+        """Build the exact-match cache key"""
+        payload = f"{normalize_question(question)}|{target_table}|{fingerprint}"
+        return f"{self.KEY_PREFIX}_{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def get(self, question: str, target_table: str, fingerprint: str) -> Optional[str]:
+        """Return SQL cached for exactly this question and schema"""
+        try:
+            cached = cache.get(self.build_key(question, target_table, fingerprint))
+            if cached:
+                self._stats['exact_hits'] += 1
+                return cached.get('sql')
+        except Exception as e:
+            logger.warning(f"SQL generation cache read failed: {e}")
+        return None
+
+    def set(self, question: str, target_table: str, fingerprint: str, sql: str):
+        """Remember generated SQL for this question and schema"""
+        if not sql:
+            return
+        try:
+            cache.set(
+                self.build_key(question, target_table, fingerprint),
+                {'sql': sql, 'question': question, 'created_at': time.time()},
+                timeout=self.timeout
+            )
+        except Exception as e:
+            logger.warning(f"SQL generation cache write failed: {e}")
+
+    def find_similar(self, question: str, target_table: str) -> Optional[str]:
+        """Return validated SQL from the closest past paraphrase above the similarity threshold"""
+        try:
+            index = self._get_index(target_table)
+            matched_question, sql, score = index.best_match(question)
+            if sql and score >= self.similarity_threshold:
+                self._stats['similar_hits'] += 1
+                logger.info(f"Reusing SQL from similar question '{matched_question[:80]}' (score {score:.2f})")
+                return sql
+        except Exception as e:
+            logger.warning(f"SQL similarity lookup failed: {e}")
+
+        self._stats['misses'] += 1
+        return None
+
+    def invalidate_index(self, target_table: Optional[str] = None):
+        """Drop the in-process similarity index so it is rebuilt from QueryLog"""
+        with self._lock:
+            if target_table:
+                self._indexes.pop(target_table, None)
+            else:
+                self._indexes.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get SQL generation cache statistics"""
+        return {
+            **self._stats,
+            'indexed_tables': len(self._indexes),
+            'similarity_threshold': self.similarity_threshold,
+        }
+
+    def _get_index(self, target_table: str) -> _SimilarityIndex:
+        with self._lock:
+            index = self._indexes.get(target_table)
+            if index is not None and time.time() - index.built_at < self.index_ttl:
+                return index
+
+        index = _SimilarityIndex(self._load_pairs(target_table))
+        with self._lock:
+            self._indexes[target_table] = index
+        return index
+
+    def _load_pairs(self, target_table: str) -> List[Tuple[str, str]]:
+        """Load the most recent successful question -> SQL pairs that ran against a table"""
+        from core.models import QueryLog
+
+        rows = QueryLog.objects.filter(
+            status='completed',
+            final_sql__icontains=target_table
+        ).exclude(final_sql='').order_by('-created_at').values_list('natural_query', 'final_sql')[:self.index_size]
+
+        pairs = []
+        seen = set()
+        for natural_query, final_sql in rows:
+            normalized = normalize_question(natural_query)
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                pairs.append((normalized, final_sql))
+        return pairs
+
+
+# Global instance for easy access
+sql_generation_cache = SQLGenerationCache()
@@ -5,9 +5,9 @@ Provides centralized data type mapping and conversion utilities for the ETL pipe
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Tuple, Union
 import logging
-import re
+import threading
 from datetime import datetime, date
 
 logger = logging.getLogger(__name__)
@@ -86,94 +86,277 @@ def _infer_type_from_samples(sample_values: List[Any]) -> str:
     if not sample_values:
         return 'string'
     
-    # Filter out None/NaN values and ensure all are strings with defensive programming
-    valid_samples = []
-    for v in sample_values:
-        if v is not None and pd.notna(v):
-            try:
-                # Safely convert to string, handling any type
-                str_v = str(v).strip()
-                if str_v and str_v.lower() not in ['none', 'nan', 'null', '']:
-                    valid_samples.append(str_v)
-            except Exception as e:
-                logger.warning(f"Failed to convert value to string: {v}, error: {e}")
-                # Skip problematic values rather than failing
-                continue
+    return infer_column_type(pd.Series(list(sample_values), dtype=object))
+
+
+# Shared vectorised type inference used by upload, ETL and schema discovery
+TYPE_INFERENCE_SAMPLE_SIZE = 1000
+
+BOOLEAN_TRUE_VALUES = {'true', 'yes', '1', 'y', 't'}
+BOOLEAN_FALSE_VALUES = {'false', 'no', '0', 'n', 'f'}
+NULL_LIKE_VALUES = {'', 'none', 'nan', 'null', 'nat'}
+
+_DATE_REGEX = (
+    r'^(?:\d{4}[-/]\d{1,2}[-/]\d{1,2}'            # YYYY-MM-DD, YYYY/MM/DD
+    r'|\d{1,2}[-/]\d{1,2}[-/]\d{2,4}'             # DD-MM-YYYY, MM/DD/YYYY, MM/DD/YY
+    r'|\d{8}'                                     # YYYYMMDD
+    r'|[A-Za-z]{3,9}\.?\s+\d{1,2},?\s+\d{4}'        # Jan 15, 2023
+    r'|\d{1,2}\s+[A-Za-z]{3,9}\.?\s+\d{4})'         # 15 Jan 2023
+)
+_TIME_SUFFIX_REGEX = r'(?:[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:\s*(?:[AaPp][Mm]|Z|[+-]\d{2}:?\d{2}))?)?$'
+_NUMERIC_CLEANUP_REGEX = r'[,$%\s]'
+
+# Explicit formats are parsed vectorised; tried in order on the sample
+DATE_FORMATS = [
+    '%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%m-%d-%Y', '%d/%m/%Y', '%m/%d/%Y',
+    '%d-%m-%y', '%m-%d-%y', '%d/%m/%y', '%m/%d/%y', '%Y%m%d', '%b %d, %Y', '%d %b %Y',
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%d %H:%M', '%d/%m/%Y %H:%M:%S', '%m/%d/%Y %H:%M:%S',
+]
+
+
+def _is_text_dtype(series: pd.Series) -> bool:
+    return series.dtype == object or isinstance(series.dtype, pd.StringDtype)
+
+
+def stratified_sample(series: pd.Series, size: int = TYPE_INFERENCE_SAMPLE_SIZE) -> pd.Series:
+    """
+    Take a bounded sample of non-null values spread evenly across the column.
+    
+    Sampling from the start, middle and end of the data catches values that
+    only appear later in a file, which a plain head() would miss.
+    """
+    values = series.dropna()
+    if len(values) <= size:
+        return values
+    positions = np.linspace(0, len(values) - 1, num=size).astype(np.int64)
+    return values.iloc[np.unique(positions)]
+
+
+def _text_sample(series: pd.Series, size: int) -> pd.Series:
+    sample = stratified_sample(series, size).astype(str).str.strip()
+    return sample[~sample.str.lower().isin(NULL_LIKE_VALUES)]
+
+
+def detect_date_format(values: pd.Series, threshold: float = 0.8) -> Optional[str]:
+    """Return the first explicit date format that parses at least ``threshold`` of the values"""
+    if values.empty:
+        return None
+    for date_format in DATE_FORMATS:
+        parsed = pd.to_datetime(values, format=date_format, errors='coerce')
+        if parsed.notna().mean() >= threshold:
+            return date_format
+    return None
+
+
+def infer_column_type(series: pd.Series, sample_size: int = TYPE_INFERENCE_SAMPLE_SIZE) -> str:
+    """
+    Infer the semantic type of a column from a stratified sample.
+    
+    Typed columns map directly from their dtype; text columns are probed with
+    vectorised string operations in priority order: dates, booleans, numbers.
+    
+    Returns:
+        One of 'string', 'integer', 'float', 'boolean', 'date', 'datetime'
+    """
+    if series is None or len(series) == 0:
+        return 'string'
+    
+    if not _is_text_dtype(series):
+        return map_pandas_dtype_to_standard(str(series.dtype))
     
-    if not valid_samples:
+    sample = _text_sample(series, sample_size)
+    if sample.empty:
         return 'string'
     
-    # Check for boolean values (check string representations)
-    boolean_values = {'true', 'false', '1', '0', 'yes', 'no', 'y', 'n'}
-    try:
-        if all(str(v).lower() in boolean_values for v in valid_samples):
-            return 'boolean'
-    except (AttributeError, TypeError) as e:
-        logger.warning(f"Error checking boolean values: {e}")
-        # Continue with other type checks
+    # PRIORITY 1: dates - checked before numbers so "2023-01-15" is never read
+    # as a number; compact 20230115 style values are left to the numeric check
+    date_like = sample.str.match(_DATE_REGEX + _TIME_SUFFIX_REGEX)
+    if date_like.mean() >= 0.8 and detect_date_format(sample) is not None:
+        has_time = sample.str.contains(r'\d{1,2}:\d{2}', regex=True)
+        if not sample.str.fullmatch(r'\d{8}').all():
+            return 'datetime' if has_time.mean() >= 0.5 else 'date'
+    
+    # PRIORITY 2: booleans
+    lowered = sample.str.lower()
+    if lowered.isin(BOOLEAN_TRUE_VALUES | BOOLEAN_FALSE_VALUES).all():
+        return 'boolean'
+    
+    # PRIORITY 3: numbers (thousands separators, currency and percent signs allowed)
+    cleaned = sample.str.replace(_NUMERIC_CLEANUP_REGEX, '', regex=True)
+    numeric = pd.to_numeric(cleaned, errors='coerce')
+    if numeric.notna().all():
+        if cleaned.str.contains(r'[.eE]', regex=True).any():
+            return 'float'
+        return 'integer'
+    
+    return 'string'
+
+
+_NULL_LIKE_VARIANTS = NULL_LIKE_VALUES | {v.upper() for v in NULL_LIKE_VALUES} | {v.capitalize() for v in NULL_LIKE_VALUES} | {'NaN', 'NaT'}
+_probe_local = threading.local()
+
+
+def _duckdb_probe(series: pd.Series, expression: str, integer: bool = False) -> pd.Series:
+    """
+    Evaluate a conversion expression over a column with an in-memory DuckDB
+    connection. DuckDB's TRY_CAST/TRY_STRPTIME parse in native code, which is
+    an order of magnitude faster than pandas on large object columns.
     
-    # Check for numeric values with enhanced error handling
+    With ``integer=True`` the BIGINT result is returned as a nullable Int64
+    column; going through ``df()`` would turn it into float64 and round
+    values above 2**53.
+    """
+    con = getattr(_probe_local, 'connection', None)
+    if con is None:
+        import duckdb
+        con = duckdb.connect(':memory:')
+        _probe_local.connection = con
+    
+    con.register('type_probe', series.to_frame('v'))
     try:
-        numeric_values = []
-        for v in valid_samples:
+        query = con.execute(f"SELECT {expression} AS v FROM type_probe")
+        if integer:
+            values = query.fetchnumpy()['v']
+            result = pd.Series(pd.arrays.IntegerArray(
+                np.ma.getdata(values).astype('int64'), np.ma.getmaskarray(values).copy()
+            ))
+        else:
+            result = query.df()['v']
+    finally:
+        con.unregister('type_probe')
+    result.index = series.index
+    return result
+
+
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def convert_column(series: pd.Series, inferred_type: str,
+                   max_null_ratio: Optional[float] = None) -> Tuple[pd.Series, str, Optional[str]]:
+    """
+    Convert a text column to an inferred semantic type with vectorised parsing.
+    
+    A conversion is rejected (the column is returned unchanged as 'string')
+    when it would turn more than ``max_null_ratio`` of the non-null values
+    into nulls - 10% for numbers and booleans, 20% for dates by default.
+    
+    Returns:
+        Tuple of (converted series, applied type, detected date format)
+    """
+    if not _is_text_dtype(series):
+        return series, inferred_type, None
+    
+    valid = int(series.notna().sum()) - int(series.isin(_NULL_LIKE_VARIANTS).sum())
+    if valid <= 0:
+        return series, 'string', None
+    
+    def acceptable(converted: pd.Series, default_ratio: float) -> bool:
+        ratio = default_ratio if max_null_ratio is None else max_null_ratio
+        return valid - int(converted.notna().sum()) <= valid * ratio
+    
+    sample = _text_sample(series, TYPE_INFERENCE_SAMPLE_SIZE)
+    
+    if inferred_type in ('integer', 'float'):
+        needs_cleanup = bool(sample.str.contains(_NUMERIC_CLEANUP_REGEX, regex=True).any())
+        try:
+            value = "regexp_replace(CAST(v AS VARCHAR), '[,$%\\s]', '', 'g')" if needs_cleanup else "trim(CAST(v AS VARCHAR))"
+            converted = _duckdb_probe(series, f"TRY_CAST({value} AS DOUBLE)")
+        except Exception as e:
+            logger.debug(f"DuckDB numeric probe unavailable, using pandas: {e}")
+            text = series.astype(str).str.replace(_NUMERIC_CLEANUP_REGEX, '', regex=True) if needs_cleanup else series
+            converted = pd.to_numeric(text, errors='coerce')
+        converted = converted.astype('float64')
+        converted[np.isinf(converted)] = np.nan
+        
+        if not acceptable(converted, 0.1):
+            return series, 'string', None
+        if inferred_type == 'integer' and (converted.dropna() % 1 == 0).all():
+            # Parse again as integers - the DOUBLE values above lose precision past 2**53
             try:
-                # Ensure v is a string before processing
-                str_v = str(v).strip()
-                # Remove common numeric formatting
-                clean_v = str_v.replace(',', '').replace('$', '').replace('%', '')
-                
-                try:
-                    if '.' in clean_v:
-                        float_val = float(clean_v)
-                        numeric_values.append(float_val)
-                    else:
-                        int_val = int(clean_v)
-                        numeric_values.append(int_val)
-                except (ValueError, TypeError):
-                    break
+                integers = _duckdb_probe(series, f"TRY_CAST({value} AS BIGINT)", integer=True)
             except Exception as e:
-                logger.debug(f"Error processing numeric value {v}: {e}")
-                break
-        
-        if len(numeric_values) == len(valid_samples):
-            # All values are numeric
-            if all(isinstance(v, int) or (isinstance(v, float) and v.is_integer()) for v in numeric_values):
-                return 'integer'
+                logger.debug(f"DuckDB integer probe unavailable, using pandas: {e}")
+                text = series.astype(str).str.replace(_NUMERIC_CLEANUP_REGEX, '', regex=True) if needs_cleanup else series
+                integers = pd.to_numeric(text, errors='coerce', dtype_backend='numpy_nullable').astype('Int64')
+            # Values outside the BIGINT range stay floats
+            if int(integers.notna().sum()) == int(converted.notna().sum()):
+                return integers, 'integer', None
+        return converted, 'float', None
+    
+    if inferred_type == 'boolean':
+        lowered = series.astype(str).str.strip().str.lower()
+        converted = pd.Series(pd.NA, index=series.index, dtype='boolean')
+        converted[lowered.isin(BOOLEAN_TRUE_VALUES)] = True
+        converted[lowered.isin(BOOLEAN_FALSE_VALUES)] = False
+        if not acceptable(converted, 0.1):
+            return series, 'string', None
+        return converted, 'boolean', None
+    
+    if inferred_type in ('date', 'datetime'):
+        date_format = detect_date_format(sample)
+        converted = None
+        if date_format:
+            # DuckDB's %f reads the digits as microseconds ('.123' -> 123us) where Python
+            # pads them ('.123' -> 123ms); its ISO timestamp cast pads like Python
+            if date_format.endswith('.%f'):
+                expression = "TRY_CAST(trim(CAST(v AS VARCHAR)) AS TIMESTAMP)"
             else:
-                return 'float'
-    except (ValueError, AttributeError, TypeError) as e:
-        logger.debug(f"Error in numeric type inference: {e}")
-        # Continue with other type checks
-    
-    # Check for date values with enhanced error handling
-    date_patterns = [
-        r'\d{4}-\d{2}-\d{2}',  # YYYY-MM-DD
-        r'\d{2}/\d{2}/\d{4}',  # MM/DD/YYYY
-        r'\d{2}-\d{2}-\d{4}',  # MM-DD-YYYY
-    ]
+                expression = f"TRY_STRPTIME(trim(CAST(v AS VARCHAR)), {_sql_string(date_format)})"
+            try:
+                converted = _duckdb_probe(series, expression)
+            except Exception as e:
+                logger.debug(f"DuckDB date probe unavailable, using pandas: {e}")
+                converted = pd.to_datetime(series, format=date_format, errors='coerce')
+        else:
+            converted = pd.to_datetime(series, errors='coerce')
+        
+        if not acceptable(converted, 0.2):
+            return series, 'string', None
+        return converted, inferred_type, date_format or 'auto_detected'
     
-    try:
-        for pattern in date_patterns:
-            if all(re.match(pattern, str(v).strip()) for v in valid_samples):
-                return 'date'
-    except (AttributeError, TypeError) as e:
-        logger.debug(f"Error in date pattern matching: {e}")
-    
-    # Check for datetime values with enhanced error handling
-    datetime_patterns = [
-        r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}',  # YYYY-MM-DD HH:MM:SS
-        r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}',  # ISO format
-    ]
+    return series, 'string', None
+
+
+def infer_and_convert_types(df: pd.DataFrame, sample_size: int = TYPE_INFERENCE_SAMPLE_SIZE,
+                            columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict[str, Dict[str, Any]]]:
+    """
+    Infer and apply semantic types for every text column of a DataFrame.
     
-    try:
-        for pattern in datetime_patterns:
-            if all(re.match(pattern, str(v).strip()) for v in valid_samples):
-                return 'datetime'
-    except (AttributeError, TypeError) as e:
-        logger.debug(f"Error in datetime pattern matching: {e}")
+    Only a shallow copy of the frame is made - converted columns replace the
+    originals by reference, so column data is never duplicated and the
+    caller's frame is left untouched.
     
-    # Default to string
-    return 'string'
+    Returns:
+        Tuple of (converted DataFrame, per-column dict with 'from', 'to', 'type' and 'format')
+    """
+    converted_df = df.copy(deep=False)
+    conversions = {}
+    
+    for col in (columns if columns is not None else df.columns):
+        series = df[col]
+        original_dtype = str(series.dtype)
+        try:
+            inferred_type = infer_column_type(series, sample_size)
+            if _is_text_dtype(series) and inferred_type != 'string':
+                converted, applied_type, date_format = convert_column(series, inferred_type)
+                if applied_type != 'string':
+                    converted_df[col] = converted
+            else:
+                applied_type, date_format = inferred_type, None
+        except Exception as e:
+            logger.warning(f"Type inference failed for column {col}: {e}")
+            applied_type, date_format = 'string', None
+        
+        conversions[col] = {
+            'from': original_dtype,
+            'to': str(converted_df[col].dtype),
+            'type': applied_type,
+            'format': date_format,
+        }
+    
+    return converted_df, conversions
 
 
 def infer_semantic_type_from_series(series: pd.Series) -> str: